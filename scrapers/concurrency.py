@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Adaptive Concurrency Control
+Features:
+- AIMD limiter: grow parallelism while p95 latency and error rate stay healthy
+- Multiplicative back-off on timeouts, connection failures, 429s and 5xx
+- Global pause when the server sends Retry-After
+- Limit history exported as a metrics gauge and an optional JSON-lines log
+"""
+
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from retry_policy import RETRYABLE_OUTCOMES
+
+logger = logging.getLogger(__name__)
+
+# Outcomes that mean the site is overloaded and we should back off right away
+OVERLOAD_OUTCOMES = RETRYABLE_OUTCOMES
+
+class AdaptiveConcurrencyController:
+    """Additive-increase / multiplicative-decrease limit on in-flight requests
+
+    Latency samples are evaluated in windows: a healthy window (p95 under
+    target, error rate under threshold) raises the limit by `increase_step`.
+    Overload outcomes cut the limit by `decrease_factor` immediately, at most
+    once per `cooldown` seconds so a burst of failures counts as one signal.
+    """
+
+    def __init__(self, initial: int = 3, min_limit: int = 1, max_limit: int = 16,
+                 adaptive: bool = True, target_p95: float = 3.0, max_error_rate: float = 0.05,
+                 window: int = 20, increase_step: float = 1.0, decrease_factor: float = 0.5,
+                 cooldown: float = 5.0, metrics=None, history_file: Optional[str] = None):
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.adaptive = adaptive
+        self.limit = float(min(max(initial, min_limit), self.max_limit))
+        self.target_p95 = target_p95
+        self.max_error_rate = max_error_rate
+        self.window = window
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.metrics = metrics
+        self.history_file = Path(history_file) if history_file else None
+        self.history: List[Dict] = []
+
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self._latencies: List[float] = []
+        self._errors = 0
+        self._last_decrease = 0.0
+        self._paused_until = 0.0
+        self._record_limit("initial")
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    def acquire(self):
+        """Block until a request slot is free and no Retry-After pause is active"""
+        with self._cond:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    self._cond.wait(pause)
+                    continue
+                if self.in_flight < self.current_limit:
+                    self.in_flight += 1
+                    return
+                self._cond.wait()
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def pause(self, seconds: float):
+        """Hold all new requests for `seconds` (from a Retry-After header)"""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(f"[CONCURRENCY] Server asked us to wait {seconds:.1f}s, pausing new requests")
+
+    def record(self, latency: float, outcome: str):
+        """Feed one completed request into the controller"""
+        if not self.adaptive:
+            return
+        with self._cond:
+            self._latencies.append(latency)
+            if outcome in OVERLOAD_OUTCOMES:
+                self._errors += 1
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    self._last_decrease = now
+                    self._set_limit(self.limit * self.decrease_factor, outcome)
+                    self._reset_window()
+                return
+            if len(self._latencies) >= self.window:
+                self._evaluate_window()
+
+    def _evaluate_window(self):
+        latencies = sorted(self._latencies)
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        error_rate = self._errors / len(latencies)
+        self._reset_window()
+        if p95 > self.target_p95:
+            self._set_limit(self.limit - self.increase_step, f"p95 {p95:.2f}s over target")
+        elif error_rate <= self.max_error_rate and self.in_flight >= self.current_limit - 1:
+            # Only grow when we are actually using the current limit
+            self._set_limit(self.limit + self.increase_step, f"healthy p95 {p95:.2f}s")
+
+    def _reset_window(self):
+        self._latencies = []
+        self._errors = 0
+
+    def _set_limit(self, new_limit: float, reason: str):
+        new_limit = min(max(new_limit, float(self.min_limit)), float(self.max_limit))
+        if int(new_limit) == int(self.limit):
+            self.limit = new_limit
+            return
+        old = self.current_limit
+        self.limit = new_limit
+        logger.info(f"[CONCURRENCY] Limit {old} -> {self.current_limit} ({reason})")
+        self._record_limit(reason)
+        self._cond.notify_all()
+
+    def _record_limit(self, reason: str):
+        entry = {"timestamp": datetime.now().isoformat(), "limit": self.current_limit, "reason": reason}
+        self.history.append(entry)
+        if self.metrics is not None:
+            self.metrics.set_gauge("concurrency_limit", self.current_limit)
+            self.metrics.inc("concurrency_changes_total")
+        if self.history_file is not None:
+            try:
+                self.history_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.history_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                logger.debug(f"[CONCURRENCY] Could not append to {self.history_file}: {e}")
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+pytest Setup for the Scraper Tests
+Importing the scraper modules attaches log files in the working directory, and
+building a scraper creates scraped_data/ there. The session runs in a
+throwaway directory so test runs leave the source tree untouched.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+
+# Test modules add '.' to sys.path, which no longer points here once the session moves
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_original_cwd = os.getcwd()
+_session_dir = None
+
+def pytest_configure(config):
+    global _session_dir
+    _session_dir = tempfile.mkdtemp(prefix="scrapers-tests-")
+    os.chdir(_session_dir)
+
+def pytest_unconfigure(config):
+    os.chdir(_original_cwd)
+    if _session_dir:
+        shutil.rmtree(_session_dir, ignore_errors=True)
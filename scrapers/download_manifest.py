@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Download Manifest and Image Integrity Checks
+Features:
+- Per-folder append-only manifest (manifest.jsonl) of verified page images
+- "Is this page done?" is a dict lookup, not a filesystem probe
+- Safe with several threads or worker processes writing the same folder
+- Decode check with Pillow when installed, image signature check otherwise
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; fall back to signature checks
+    Image = None
+
+MANIFEST_NAME = "manifest.jsonl"
+
+# (leading signature, required trailer or None)
+_SIGNATURES = {
+    ".jpg": (b"\xff\xd8\xff", b"\xff\xd9"),
+    ".png": (b"\x89PNG\r\n\x1a\n", b"IEND\xaeB`\x82"),
+    ".gif": (b"GIF8", b";"),
+    ".webp": (b"RIFF", None),
+}
+
+def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def verify_image(path: Path) -> Optional[str]:
+    """None if the file is a complete, decodable image, otherwise the reason it is not"""
+    try:
+        size = path.stat().st_size
+    except OSError as e:
+        return f"unreadable: {e}"
+    if size == 0:
+        return "empty file"
+    if Image is not None:
+        try:
+            with Image.open(path) as img:
+                img.load()  # decodes every byte, so truncation is caught
+            return None
+        except Exception as e:
+            return f"decode failed: {e}"
+    with open(path, 'rb') as f:
+        head = f.read(16)
+        f.seek(max(0, size - 16))
+        tail = f.read()
+    for lead, trailer in _SIGNATURES.values():
+        if head.startswith(lead):
+            if trailer is not None and trailer not in tail:
+                return "truncated (missing image trailer)"
+            return None
+    return "not an image"
+
+class DownloadManifest:
+    """Verified downloads in one folder, keyed by file stem (e.g. "page_003")
+
+    Entries are appended as JSON lines, so a crash never loses earlier
+    entries and a half-written last line is simply ignored on load.
+    """
+
+    def __init__(self, folder: Path):
+        self.folder = Path(folder)
+        self.path = self.folder / MANIFEST_NAME
+        self.entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    if entry.get("file") is None:
+                        self.entries.pop(entry["stem"], None)  # discarded
+                    else:
+                        self.entries[entry["stem"]] = entry
+                except (ValueError, KeyError):
+                    continue
+
+    def get(self, stem: str) -> Optional[Dict]:
+        with self._lock:
+            return self.entries.get(stem)
+
+    def is_done(self, stem: str) -> bool:
+        with self._lock:
+            return stem in self.entries
+
+    def record(self, stem: str, file_name: str, size: int, sha256: str, url: str = ""):
+        entry = {"stem": stem, "file": file_name, "bytes": size, "sha256": sha256, "url": url}
+        with self._lock:
+            self.entries[stem] = entry
+            self._append(entry)
+
+    def discard(self, stem: str):
+        """Mark a page as not done (e.g. found corrupt), so the next download fetches it again"""
+        with self._lock:
+            if self.entries.pop(stem, None) is not None:
+                self._append({"stem": stem, "file": None})
+
+    def _append(self, entry: Dict):
+        line = json.dumps(entry) + "\n"
+        self.folder.mkdir(parents=True, exist_ok=True)
+        # One small O_APPEND write per entry: concurrent writers never interleave lines
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode('utf-8'))
+        finally:
+            os.close(fd)
+
+_manifests: "OrderedDict[str, DownloadManifest]" = OrderedDict()
+_manifests_lock = threading.Lock()
+_MAX_OPEN_MANIFESTS = 256
+
+def manifest_for(folder: Path) -> DownloadManifest:
+    """Shared manifest for a folder (recently used folders stay loaded)"""
+    key = str(Path(folder).resolve())
+    with _manifests_lock:
+        manifest = _manifests.get(key)
+        if manifest is None:
+            manifest = DownloadManifest(Path(folder))
+            _manifests[key] = manifest
+            if len(_manifests) > _MAX_OPEN_MANIFESTS:
+                _manifests.popitem(last=False)
+        else:
+            _manifests.move_to_end(key)
+        return manifest
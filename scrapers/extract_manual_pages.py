@@ -8,11 +8,20 @@ import csv
 import requests
 import time
 import logging
+import threading
 from bs4 import BeautifulSoup
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from dataclasses import dataclass
 
+import profiling
+from parallel_backfill import HostLimiter, run_backfill, ORDERS
+from retry_policy import (
+    RetryPolicy, HostCircuitBreakers, DEFAULT_BREAKERS, OK, TERMINAL_OUTCOMES, classify_exception, fetch_with_retry
+)
+from page_probe import PageProber, PageScanInterrupted, PROBE_MODES
+from scheduling import SCHEDULES, estimate_cost, page_range_parts, merge_page_ranges
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -28,34 +37,36 @@ logger = logging.getLogger(__name__)
 class ManualPageExtractor:
     """Extract all page URLs from a manual"""
     
-    def __init__(self):
+    def __init__(self, retry_policy: Optional[RetryPolicy] = None,
+                 breakers: Optional[HostCircuitBreakers] = None, probe_mode: str = "stream"):
         self.session = requests.Session()
         self.session.headers.update({
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         })
         self.max_retries = 3
         self.timeout = 30
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=self.max_retries)
+        # Shared across extractors so parallel workers see the same host health
+        self.breakers = breakers or DEFAULT_BREAKERS
+        # "stream"/"head" decide most pages without downloading and parsing them
+        self.prober = None
+        if probe_mode != "full":
+            self.prober = PageProber(
+                lambda url, method, stream: self.session.request(method, url, stream=stream, timeout=self.timeout),
+                probe_mode, policy=self.retry_policy, breakers=self.breakers
+            )
     
     def make_request_with_retry(self, url: str) -> Optional[requests.Response]:
-        """Make HTTP request with retry logic"""
-        for attempt in range(self.max_retries):
-            try:
-                response = self.session.get(url, timeout=self.timeout)
-                if response.status_code == 404:
-                    return None
-                response.raise_for_status()
-                return response
-                
-            except requests.exceptions.RequestException as e:
-                if attempt == self.max_retries - 1:
-                    logger.error(f"Failed to fetch {url} after {self.max_retries} attempts: {e}")
-                    return None
-                else:
-                    wait_time = (attempt + 1) * 2
-                    logger.warning(f"Attempt {attempt + 1} failed for {url}, retrying in {wait_time}s: {e}")
-                    time.sleep(wait_time)
-        
-        return None
+        """Make HTTP request with retry logic (None for 404s and exhausted retries)"""
+        return self.fetch_with_outcome(url)[0]
+    
+    def fetch_with_outcome(self, url: str) -> Tuple[Optional[requests.Response], str]:
+        """make_request_with_retry, also returning the retry_policy outcome"""
+        return fetch_with_retry(
+            lambda: self.session.get(url, timeout=self.timeout), url,
+            policy=self.retry_policy,
+            breakers=self.breakers
+        )
     
     def extract_image_pages(self, manual_url: str, manual_title: str = "") -> List[str]:
         """Extract all image page URLs from a manual
@@ -66,24 +77,68 @@ class ManualPageExtractor:
             
         Returns:
             List of all valid page URLs including the base URL
+        
+        Raises:
+            PageScanInterrupted: a page could not be checked, so the list would be incomplete
+        """
+        title_display = manual_title if manual_title else manual_url
+        logger.info(f"🔍 [PAGES] Starting page extraction for: {title_display}")
+        
+        # Start with the base URL (page 1)
+        page_urls = [manual_url] + self.scan_image_pages(manual_url, manual_title=manual_title)[0]
+        
+        total_pages = len(page_urls)
+        logger.info(f"✅ [PAGES] Found {total_pages} pages for: {title_display}")
+        
+        return page_urls
+    
+    def scan_image_pages(self, manual_url: str, start_page: int = 2, end_page: Optional[int] = None,
+                         manual_title: str = "") -> Tuple[List[str], bool]:
+        """Check pages start_page..end_page (inclusive; open-ended when end_page is None)
+        
+        Returns:
+            (URLs of pages with manual content, whether the scan reached end_page
+            without hitting the end of the manual)
+        
+        Raises:
+            PageScanInterrupted: a page could not be checked (failed request, open
+                circuit); only 404s and end-of-manual markers end the scan
         """
-        page_urls = [manual_url]  # Start with the base URL (page 1)
-        page_number = 2
+        page_urls = []
+        page_number = start_page
         max_pages = 10000  # Safety limit
+        last_page = min(end_page, max_pages) if end_page else max_pages
         consecutive_failures = 0
         max_consecutive_failures = 5
-        
         title_display = manual_title if manual_title else manual_url
-        logger.info(f"🔍 [PAGES] Starting page extraction for: {title_display}")
         
-        while page_number <= max_pages and consecutive_failures < max_consecutive_failures:
+        while page_number <= last_page and consecutive_failures < max_consecutive_failures:
             page_url = f"{manual_url}/{page_number}"
             
             try:
-                response = self.make_request_with_retry(page_url)
+                if self.prober is not None:
+                    probe = self.prober.probe(page_url)
+                    if probe.exists:
+                        consecutive_failures = 0
+                        page_urls.append(page_url)
+                        logger.debug(f"✅ [PAGES] Added page {page_number}: {page_url} ({probe.bytes_read} bytes read)")
+                        page_number += 1
+                        time.sleep(0.1)
+                        continue
+                    if probe.exists is False and probe.outcome == OK:
+                        logger.debug(f"[PAGES] Page {page_number} probe: {probe.reason}, stopping")
+                        break
+                    if probe.failed:
+                        raise PageScanInterrupted(page_url, probe.outcome)
+                    # 404s fall through to the full fetch's accounting
+                    response, outcome = (None, probe.outcome) if probe.exists is False else self.fetch_with_outcome(page_url)
+                else:
+                    response, outcome = self.fetch_with_outcome(page_url)
                 
-                if not response:
-                    logger.debug(f"[PAGES] Page {page_number} not accessible (404 or error)")
+                if response is None:
+                    if outcome not in TERMINAL_OUTCOMES:
+                        raise PageScanInterrupted(page_url, outcome)
+                    logger.debug(f"[PAGES] Page {page_number} not accessible ({outcome})")
                     consecutive_failures += 1
                     
                     # If we get several 404s in a row, likely we've reached the end
@@ -151,31 +206,45 @@ class ManualPageExtractor:
                 # Small delay to be respectful
                 time.sleep(0.1)
                 
+            except PageScanInterrupted as e:
+                logger.warning(f"[PAGES] Stopped at page {page_number} of {title_display}, scan incomplete: {e}")
+                raise
+                
             except Exception as e:
                 logger.error(f"❌ [PAGES] Unexpected error on page {page_number}: {e}")
                 consecutive_failures += 1
                 
                 if consecutive_failures >= max_consecutive_failures:
-                    logger.warning(f"[PAGES] Too many errors, stopping at page {page_number}")
-                    break
+                    logger.warning(f"[PAGES] Too many errors at page {page_number} of {title_display}")
+                    outcome = classify_exception(e) if isinstance(e, requests.exceptions.RequestException) else "error"
+                    raise PageScanInterrupted(page_url, outcome) from e
                     
                 page_number += 1
         
-        total_pages = len(page_urls)
-        logger.info(f"✅ [PAGES] Found {total_pages} pages for: {title_display}")
-        
-        return page_urls
+        return page_urls, end_page is not None and page_number > end_page
     
     def close(self):
         """Close the session"""
         self.session.close()
 
-def extract_pages_from_csv(input_csv: str, output_csv: str = None) -> None:
+def extract_pages_from_csv(input_csv: str, output_csv: str = None, workers: int = 4,
+                           per_host: int = 4, order: str = "input", resume: bool = True,
+                           delay: float = 0.25, probe_mode: str = "stream", schedule: str = "lpt",
+                           split_pages: int = 500) -> None:
     """Extract page URLs for all manuals in a CSV file
     
     Args:
         input_csv: Path to input CSV file with manual data
         output_csv: Path to output CSV file (defaults to input_csv + '_with_pages.csv')
+        workers: Number of manuals processed in parallel
+        per_host: Maximum manuals in flight against the same host
+        order: "input" keeps the input row order, "completion" writes rows as they finish
+        resume: Skip manuals already present in a partially written output file
+        delay: Minimum spacing in seconds between manual starts on the same host
+        probe_mode: Page discovery mode, one of "full", "stream", "head"
+        schedule: "lpt" starts the largest manuals first, "input" keeps file order
+        split_pages: Split manuals with more pages than this into page ranges checked
+            in parallel (0 disables)
     """
     input_path = Path(input_csv)
     
@@ -187,104 +256,126 @@ def extract_pages_from_csv(input_csv: str, output_csv: str = None) -> None:
         output_csv = str(input_path).replace('.csv', '_with_pages.csv')
     
     output_path = Path(output_csv)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
     
-    extractor = ManualPageExtractor()
+    # Read input CSV
+    with open(input_path, 'r', newline='', encoding='utf-8') as infile:
+        reader = csv.DictReader(infile)
+        fieldnames = list(reader.fieldnames)
+        
+        # Add new fields if they don't exist
+        if 'total_image_pages' not in fieldnames:
+            fieldnames.append('total_image_pages')
+        if 'image_pages' not in fieldnames:
+            fieldnames.append('image_pages')
+        
+        rows = list(reader)
     
-    try:
-        # Read input CSV
-        with open(input_path, 'r', newline='', encoding='utf-8') as infile:
-            reader = csv.DictReader(infile)
-            fieldnames = list(reader.fieldnames)
-            
-            # Add new fields if they don't exist
-            if 'total_image_pages' not in fieldnames:
-                fieldnames.append('total_image_pages')
-            if 'image_pages' not in fieldnames:
-                fieldnames.append('image_pages')
-            
-            rows = list(reader)
+    logger.info(f"📊 Processing {len(rows)} manuals from {input_csv} with {workers} workers")
+    
+    # One extractor (and HTTP session) per worker thread
+    local = threading.local()
+    extractors = []
+    extractors_lock = threading.Lock()
+    host_limiter = HostLimiter(per_host=per_host, min_interval=delay)
+    
+    def get_extractor() -> ManualPageExtractor:
+        if not hasattr(local, "extractor"):
+            local.extractor = ManualPageExtractor(probe_mode=probe_mode)
+            with extractors_lock:
+                extractors.append(local.extractor)
+        return local.extractor
+    
+    def process_row(index: int, row: dict) -> dict:
+        i = index + 1
+        row = dict(row)
+        manual_url = row.get('url', '')
+        manual_title = row.get('title', '') or row.get('slug', '') or manual_url
         
-        logger.info(f"📊 Processing {len(rows)} manuals from {input_csv}")
+        if not manual_url:
+            logger.warning(f"⚠️  Row {i}: No URL found, skipping")
+            row['total_image_pages'] = '0'
+            row['image_pages'] = ''
+            return row
         
-        # Process each manual
-        processed_rows = []
-        for i, row in enumerate(rows, 1):
-            manual_url = row.get('url', '')
-            manual_title = row.get('title', '') or row.get('slug', '') or manual_url
-            
-            if not manual_url:
-                logger.warning(f"⚠️  Row {i}: No URL found, skipping")
-                row['total_image_pages'] = '0'
-                row['image_pages'] = ''
-                processed_rows.append(row)
-                continue
-            
-            logger.info(f"\n📋 [{i}/{len(rows)}] Processing: {manual_title}")
-            
-            try:
-                # Extract page URLs
-                page_urls = extractor.extract_image_pages(manual_url, manual_title)
-                
-                # Update row with new data
-                row['total_image_pages'] = str(len(page_urls))
-                row['image_pages'] = '|'.join(page_urls)
-                
-                logger.info(f"✅ [{i}/{len(rows)}] Found {len(page_urls)} pages for: {manual_title}")
-                
-            except Exception as e:
-                logger.error(f"❌ [{i}/{len(rows)}] Error processing {manual_title}: {e}")
-                row['total_image_pages'] = '0'
-                row['image_pages'] = ''
+        logger.info(f"📋 [{i}/{len(rows)}] Processing: {manual_title}")
+        
+        try:
+            # Extract page URLs
+            with host_limiter.slot(manual_url):
+                page_urls = get_extractor().extract_image_pages(manual_url, manual_title)
             
-            processed_rows.append(row)
+            # Update row with new data
+            row['total_image_pages'] = str(len(page_urls))
+            row['image_pages'] = '|'.join(page_urls)
             
-            # Progress save every 10 manuals
-            if i % 10 == 0:
-                logger.info(f"💾 Progress save: {i}/{len(rows)} completed")
-                
-                # Save progress
-                with open(output_path, 'w', newline='', encoding='utf-8') as outfile:
-                    writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-                    writer.writeheader()
-                    writer.writerows(processed_rows)
+            logger.info(f"✅ [{i}/{len(rows)}] Found {len(page_urls)} pages for: {manual_title}")
             
-            # Respectful delay between manuals
-            time.sleep(1.0)
+        except Exception as e:
+            # Zero pages fails the resume check, so the row is retried on the next run
+            logger.error(f"❌ [{i}/{len(rows)}] Error processing {manual_title}: {e}")
+            row['total_image_pages'] = '0'
+            row['image_pages'] = ''
         
-        # Final save
-        with open(output_path, 'w', newline='', encoding='utf-8') as outfile:
-            writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(processed_rows)
-        
-        # Calculate statistics
-        total_pages = sum(int(row.get('total_image_pages', 0)) for row in processed_rows)
-        manuals_with_pages = sum(1 for row in processed_rows if int(row.get('total_image_pages', 0)) > 1)
-        
-        logger.info(f"""
-        🎉 PAGE EXTRACTION COMPLETED!
-        📊 Final Statistics:
-        • Manuals processed: {len(processed_rows)}
-        • Manuals with multiple pages: {manuals_with_pages}
-        • Total page URLs extracted: {total_pages}
-        • Average pages per manual: {total_pages / max(len(processed_rows), 1):.1f}
-        • Output saved to: {output_csv}
-        """)
+        if i % 10 == 0:
+            profiling.checkpoint(f"rows_{i}")
         
+        return row
+    
+    def split_row(index: int, row: dict):
+        return page_range_parts(row, split_pages) if split_pages > 0 and row.get('url') else None
+    
+    def process_part(index: int, row: dict, page_range) -> Tuple[List[str], bool]:
+        start_page, end_page = page_range
+        logger.info(f"📋 [{index + 1}/{len(rows)}] Processing pages {start_page}-{end_page or 'end'} of: "
+                    f"{row.get('title') or row['url']}")
+        with host_limiter.slot(row['url']):
+            return get_extractor().scan_image_pages(row['url'], start_page, end_page, row.get('title', ''))
+    
+    def merge_parts(index: int, row: dict, parts: List[Tuple[List[str], bool]]) -> dict:
+        row = dict(row)
+        page_urls = [row['url']] + merge_page_ranges(parts)
+        row['total_image_pages'] = str(len(page_urls))
+        row['image_pages'] = '|'.join(page_urls)
+        logger.info(f"✅ [{index + 1}/{len(rows)}] Found {len(page_urls)} pages in {len(parts)} ranges for: "
+                    f"{row.get('title') or row['url']}")
+        return row
+    
+    try:
+        processed_rows = run_backfill(
+            rows, process_row, output_path, fieldnames,
+            workers=workers, order=order, resume=resume, desc="Page extraction",
+            cost=estimate_cost if schedule == "lpt" else None,
+            split=split_row, process_part=process_part, merge_parts=merge_parts
+        )
     finally:
-        extractor.close()
+        for extractor in extractors:
+            extractor.close()
+    
+    # Calculate statistics
+    total_pages = sum(int(row.get('total_image_pages') or 0) for row in processed_rows)
+    manuals_with_pages = sum(1 for row in processed_rows if int(row.get('total_image_pages') or 0) > 1)
+    
+    logger.info(f"""
+    🎉 PAGE EXTRACTION COMPLETED!
+    📊 Final Statistics:
+    • Manuals processed: {len(processed_rows)}
+    • Manuals with multiple pages: {manuals_with_pages}
+    • Total page URLs extracted: {total_pages}
+    • Average pages per manual: {total_pages / max(len(processed_rows), 1):.1f}
+    • Output saved to: {output_csv}
+    """)
 
-def extract_single_manual_pages(manual_url: str) -> List[str]:
+def extract_single_manual_pages(manual_url: str, probe_mode: str = "stream") -> List[str]:
     """Extract page URLs for a single manual URL
     
     Args:
         manual_url: URL of the manual
+        probe_mode: Page discovery mode, one of "full", "stream", "head"
         
     Returns:
         List of all page URLs
     """
-    extractor = ManualPageExtractor()
+    extractor = ManualPageExtractor(probe_mode=probe_mode)
     
     try:
         page_urls = extractor.extract_image_pages(manual_url)
@@ -308,15 +399,30 @@ def main():
     parser.add_argument("--csv", "-c", help="CSV file containing manual URLs")
     parser.add_argument("--output", "-o", help="Output CSV file (optional)")
     parser.add_argument("--url", "-u", help="Single manual URL to extract pages from")
+    parser.add_argument("--workers", "-w", type=int, default=4, help="Manuals processed in parallel")
+    parser.add_argument("--per-host", type=int, default=4, help="Maximum concurrent manuals per host")
+    parser.add_argument("--order", choices=ORDERS, default="input", help="Output row order")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore a partially written output file")
+    parser.add_argument("--probe-mode", choices=PROBE_MODES, default="stream",
+                        help="Page discovery: full parse, streamed early-closed GET, or HEAD first")
+    parser.add_argument("--schedule", choices=SCHEDULES, default="lpt",
+                        help="Start the largest manuals first (lpt) or keep CSV order (input)")
+    parser.add_argument("--split-pages", type=int, default=500,
+                        help="Check manuals longer than this many pages as parallel page ranges (0 disables)")
+    profiling.add_profile_arguments(parser)
     
     args = parser.parse_args()
     
     if args.url:
         # Extract pages for single URL
-        extract_single_manual_pages(args.url)
+        with profiling.profile_from_args(args, name="extract_pages_url"):
+            extract_single_manual_pages(args.url, probe_mode=args.probe_mode)
     elif args.csv:
         # Extract pages for CSV file
-        extract_pages_from_csv(args.csv, args.output)
+        with profiling.profile_from_args(args, name="extract_pages_csv"):
+            extract_pages_from_csv(args.csv, args.output, workers=args.workers, per_host=args.per_host,
+                                   order=args.order, resume=not args.no_resume, probe_mode=args.probe_mode,
+                                   schedule=args.schedule, split_pages=args.split_pages)
     else:
         print("Usage:")
         print("  Extract pages from CSV:")
@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+Persistent Crawl Job Queue
+Features:
+- SQLite-backed queue of typed jobs (listing page, manual info, page discovery,
+  image download, PDF build) that survives crashes, OOM kills and Ctrl-C
+- Leases with timeouts and heartbeats: a dead worker's jobs return to the queue
+- Retry counts with jittered backoff, dead-lettering after max_attempts
+- Idempotent enqueue keyed by (type, key) so no work is duplicated
+- Any number of worker processes can pull from the same database file
+- Priorities from estimated manual size, so the largest manuals start first;
+  huge manuals download as page-range jobs joined by their PDF build
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from retry_policy import RetryPolicy, SERVER_ERROR
+from scheduling import estimate_cost, split_page_ranges
+
+logger = logging.getLogger(__name__)
+
+# Job types
+LISTING_PAGE = "listing_page"
+MANUAL_INFO = "manual_info"
+PAGE_DISCOVERY = "page_discovery"
+IMAGE_DOWNLOAD = "image_download"
+PDF_BUILD = "pdf_build"
+JOB_TYPES = (LISTING_PAGE, MANUAL_INFO, PAGE_DISCOVERY, IMAGE_DOWNLOAD, PDF_BUILD)
+
+# Job states
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+DEAD = "dead"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_until REAL,
+    lease_token TEXT,
+    worker TEXT,
+    last_error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (type, key)
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at, priority);
+"""
+
+@dataclass
+class Job:
+    """A leased job; the lease token proves this worker still owns it"""
+    id: int
+    type: str
+    key: str
+    payload: Dict[str, Any]
+    attempts: int
+    lease_token: str
+
+def job_key(payload: Dict[str, Any]) -> str:
+    """Default idempotency key: hash of the canonical JSON payload"""
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+class JobQueue:
+    """Durable job queue in a SQLite database (WAL mode, one connection per thread)"""
+
+    def __init__(self, db_path: str = "scraped_data/jobs.db", lease_seconds: float = 300.0,
+                 max_attempts: int = 5, retry_policy: Optional[RetryPolicy] = None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_policy = retry_policy or RetryPolicy(base_delay=30.0, max_delay=3600.0)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction; BEGIN IMMEDIATE serializes writers across processes"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def enqueue(self, job_type: str, payload: Dict[str, Any], key: Optional[str] = None,
+                priority: int = 0, delay: float = 0.0) -> bool:
+        """Add a job; returns False if a job with the same (type, key) already exists"""
+        return self.enqueue_many(job_type, [payload], key_func=(lambda _: key) if key else None,
+                                 priority=priority, delay=delay) == 1
+
+    def enqueue_many(self, job_type: str, payloads: Iterable[Dict[str, Any]],
+                     key_func: Optional[Callable[[Dict[str, Any]], str]] = None,
+                     priority: int = 0, delay: float = 0.0,
+                     priority_func: Optional[Callable[[Dict[str, Any]], int]] = None) -> int:
+        """Add jobs in one transaction; returns how many were new
+
+        priority_func, when given, sets each job's priority (higher runs first).
+        """
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"Unknown job type '{job_type}', expected one of {JOB_TYPES}")
+        now = time.time()
+        rows = [(job_type, (key_func or job_key)(payload), json.dumps(payload),
+                 priority_func(payload) if priority_func else priority, now + delay, now, now)
+                for payload in payloads]
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (type, key, payload, priority, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            return conn.total_changes - before
+
+    def lease(self, worker: str, types: Optional[Iterable[str]] = None, limit: int = 1) -> List[Job]:
+        """Claim up to `limit` ready jobs (pending, or leased with an expired lease)
+
+        Each lease counts as an attempt, so a job that keeps killing its worker
+        is dead-lettered instead of crashing workers forever.
+        """
+        now = time.time()
+        type_filter = ""
+        params: List[Any] = [now, now]
+        if types:
+            types = list(types)
+            type_filter = f" AND type IN ({','.join('?' * len(types))})"
+            params.extend(types)
+        params.append(limit)
+
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE ((status = 'pending' AND available_at <= ?)"
+                " OR (status = 'leased' AND lease_until < ?))" + type_filter +
+                " ORDER BY priority DESC, id LIMIT ?", params).fetchall()
+            jobs = []
+            for row in rows:
+                if row["status"] == LEASED:
+                    logger.warning(f"[JOBS] Lease expired on job {row['id']} ({row['type']}) held by {row['worker']}")
+                if row["attempts"] >= self.max_attempts:
+                    conn.execute("UPDATE jobs SET status = ?, lease_token = NULL, updated_at = ?, "
+                                 "last_error = COALESCE(last_error, 'lease expired') WHERE id = ?",
+                                 (DEAD, now, row["id"]))
+                    logger.error(f"[JOBS] Job {row['id']} ({row['type']}) dead-lettered after {row['attempts']} attempts")
+                    continue
+                token = uuid.uuid4().hex
+                conn.execute("UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, "
+                             "lease_token = ?, worker = ?, updated_at = ? WHERE id = ?",
+                             (LEASED, now + self.lease_seconds, token, worker, now, row["id"]))
+                jobs.append(Job(row["id"], row["type"], row["key"], json.loads(row["payload"]),
+                                row["attempts"] + 1, token))
+        return jobs
+
+    def _update_leased(self, job: Job, sql: str, params: tuple) -> bool:
+        """Apply an update only if this worker still holds the job's lease"""
+        with self._transaction() as conn:
+            cursor = conn.execute(sql + " WHERE id = ? AND lease_token = ? AND status = 'leased'",
+                                  params + (job.id, job.lease_token))
+        if cursor.rowcount == 0:
+            logger.warning(f"[JOBS] Lost the lease on job {job.id} ({job.type}); another worker owns it now")
+            return False
+        return True
+
+    def heartbeat(self, job: Job) -> bool:
+        """Extend a running job's lease"""
+        now = time.time()
+        return self._update_leased(job, "UPDATE jobs SET lease_until = ?, updated_at = ?",
+                                   (now + self.lease_seconds, now))
+
+    def complete(self, job: Job, result: Optional[Dict[str, Any]] = None) -> bool:
+        return self._update_leased(
+            job, "UPDATE jobs SET status = 'done', lease_token = NULL, result = ?, updated_at = ?",
+            (json.dumps(result) if result is not None else None, time.time()))
+
+    def fail(self, job: Job, error: str, retryable: bool = True) -> bool:
+        """Record a failure: back off and retry, or dead-letter when out of attempts"""
+        now = time.time()
+        if not retryable or job.attempts >= self.max_attempts:
+            logger.error(f"[JOBS] Job {job.id} ({job.type}) dead-lettered after {job.attempts} attempts: {error}")
+            return self._update_leased(
+                job, "UPDATE jobs SET status = 'dead', lease_token = NULL, last_error = ?, updated_at = ?",
+                (error, now))
+        delay = self.retry_policy.backoff(job.attempts - 1, SERVER_ERROR)
+        logger.warning(f"[JOBS] Job {job.id} ({job.type}) failed (attempt {job.attempts}), retrying in {delay:.0f}s: {error}")
+        return self._update_leased(
+            job, "UPDATE jobs SET status = 'pending', lease_token = NULL, available_at = ?, "
+                 "last_error = ?, updated_at = ?", (now + delay, error, now))
+
+    def release(self, job: Job) -> bool:
+        """Hand a job back untouched (e.g. on shutdown) without spending an attempt"""
+        return self._update_leased(
+            job, "UPDATE jobs SET status = 'pending', lease_token = NULL, attempts = attempts - 1, "
+                 "available_at = ?, updated_at = ?", (time.time(), time.time()))
+
+    def defer(self, job: Job, delay: float) -> bool:
+        """Put a job back to run after `delay` seconds without spending an attempt"""
+        now = time.time()
+        return self._update_leased(
+            job, "UPDATE jobs SET status = 'pending', lease_token = NULL, attempts = attempts - 1, "
+                 "available_at = ?, updated_at = ?", (now + delay, now))
+
+    def unfinished(self, job_type: str, key_prefix: str) -> int:
+        """Pending or leased jobs of a type whose key starts with key_prefix"""
+        return self._count(job_type, key_prefix, (PENDING, LEASED))
+
+    def dead(self, job_type: str, key_prefix: str) -> int:
+        """Dead-lettered jobs of a type whose key starts with key_prefix"""
+        return self._count(job_type, key_prefix, (DEAD,))
+
+    def _count(self, job_type: str, key_prefix: str, statuses: Sequence[str]) -> int:
+        row = self._connect().execute(
+            f"SELECT COUNT(*) AS n FROM jobs WHERE type = ? AND substr(key, 1, ?) = ? "
+            f"AND status IN ({', '.join('?' * len(statuses))})",
+            (job_type, len(key_prefix), key_prefix, *statuses)).fetchone()
+        return row["n"]
+
+    def requeue_dead(self, job_type: Optional[str] = None) -> int:
+        """Give dead-lettered jobs a fresh set of attempts"""
+        sql = "UPDATE jobs SET status = 'pending', attempts = 0, available_at = ?, updated_at = ? WHERE status = 'dead'"
+        params: List[Any] = [time.time(), time.time()]
+        if job_type:
+            sql += " AND type = ?"
+            params.append(job_type)
+        with self._transaction() as conn:
+            return conn.execute(sql, params).rowcount
+
+    def results(self, job_type: str) -> Iterable[Dict[str, Any]]:
+        """Results of completed jobs of one type, in enqueue order"""
+        rows = self._connect().execute(
+            "SELECT result FROM jobs WHERE type = ? AND status = 'done' AND result IS NOT NULL ORDER BY id",
+            (job_type,))
+        for row in rows:
+            yield json.loads(row["result"])
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Job counts by type and status"""
+        counts: Dict[str, Dict[str, int]] = {}
+        for row in self._connect().execute("SELECT type, status, COUNT(*) AS n FROM jobs GROUP BY type, status"):
+            counts.setdefault(row["type"], {})[row["status"]] = row["n"]
+        return counts
+
+class JobNotReady(Exception):
+    """Raised by a handler whose inputs are still being produced; the job is retried later"""
+
+    def __init__(self, message: str, delay: float = 30.0):
+        super().__init__(message)
+        self.delay = delay
+
+class JobWorker:
+    """Pulls jobs from the queue and runs the handler registered for each type
+
+    Handlers are called as handler(payload, queue) and return an optional
+    JSON-serializable result; they may enqueue follow-up jobs. Raising
+    marks the job failed (retried with backoff, dead-lettered when exhausted);
+    raising JobNotReady defers it without counting an attempt.
+    """
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, Callable[[Dict[str, Any], JobQueue], Any]],
+                 worker_id: Optional[str] = None, poll_interval: float = 2.0,
+                 heartbeat_interval: Optional[float] = None):
+        self.queue = queue
+        self.handlers = handlers
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval or max(1.0, queue.lease_seconds / 3)
+        self.processed = 0
+        self.failed = 0
+
+    def _heartbeat_loop(self, job: Job, stop: threading.Event):
+        while not stop.wait(self.heartbeat_interval):
+            if not self.queue.heartbeat(job):
+                return
+
+    def run_one(self, job: Job):
+        stop = threading.Event()
+        beat = threading.Thread(target=self._heartbeat_loop, args=(job, stop), daemon=True)
+        beat.start()
+        try:
+            result = self.handlers[job.type](job.payload, self.queue)
+        except KeyboardInterrupt:
+            self.queue.release(job)
+            raise
+        except JobNotReady as e:
+            logger.debug(f"[JOBS] Job {job.id} ({job.type}) not ready, retrying in {e.delay:.0f}s: {e}")
+            self.queue.defer(job, e.delay)
+        except Exception as e:
+            self.failed += 1
+            self.queue.fail(job, f"{type(e).__name__}: {e}")
+        else:
+            self.processed += 1
+            self.queue.complete(job, result)
+        finally:
+            stop.set()
+            beat.join()
+
+    def run(self, max_jobs: Optional[int] = None, exit_when_empty: bool = False):
+        """Process jobs until interrupted, max_jobs is reached, or (optionally) the queue is empty"""
+        types = list(self.handlers)
+        logger.info(f"[JOBS] Worker {self.worker_id} handling {', '.join(types)}")
+        while max_jobs is None or self.processed + self.failed < max_jobs:
+            jobs = self.queue.lease(self.worker_id, types)
+            if not jobs:
+                if exit_when_empty and not self._has_unfinished(types):
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            self.run_one(jobs[0])
+        logger.info(f"[JOBS] Worker {self.worker_id} finished: {self.processed} done, {self.failed} failed")
+
+    def _has_unfinished(self, types: List[str]) -> bool:
+        stats = self.queue.stats()
+        return any(stats.get(t, {}).get(PENDING, 0) or stats.get(t, {}).get(LEASED, 0) for t in types)
+
+# ---------------------------------------------------------------------------
+# Crawl handlers
+
+def build_handlers(scraper, download_dir: Optional[str] = None, pdf_dir: Optional[str] = None,
+                   split_pages: int = 500, optimize_pdf=None, optimize_workers: int = 0) -> Dict[str, Callable]:
+    """Job handlers backed by an EnhancedCarManualScraper
+
+    listing_page jobs enqueue the next page and a manual_info job per new
+    manual; manual_info feeds page_discovery, which feeds image_download
+    (when download_dir is set), which feeds pdf_build (when pdf_dir is set).
+    Jobs are prioritised by page count, and manuals longer than split_pages
+    download as page-range jobs keyed "<url>#<first>-<last>"; their PDF build
+    waits until every range is done. With optimize_pdf (OptimizeSettings)
+    PDFs are built size-optimized and their size reports added to the result.
+    """
+    from listing_state import fingerprint_links
+    from scraper_with_deduplication import ManualEntry
+
+    def listing_page(payload, queue):
+        brand, page = payload["brand"], payload["page"]
+        fingerprints = payload.get("fingerprints", [])
+        empty_streak = payload.get("empty_streak", 0)
+        links = scraper.fetch_listing_links(brand, page)
+        if links is None:
+            raise RuntimeError(f"Could not fetch listing page {page} for {brand}")
+
+        fingerprint = fingerprint_links([link[0] for link in links]) if links else None
+        if fingerprint and fingerprint in fingerprints:
+            logger.info(f"[WRAP] Stopping {brand}: page {page} repeats an earlier page")
+            return {"brand": brand, "page": page, "wrapped": True}
+
+        # Dedupe on the manual_info job key, not the scraper's seen set: a job that fails or
+        # is retried after its lease expires must enqueue the same manuals again
+        manuals, _, found = scraper.classify_listing_links(brand, links, dedup=False)
+        new = queue.enqueue_many(MANUAL_INFO, [manual.to_dict() for manual in manuals],
+                                 key_func=lambda m: m["url"])
+        empty_streak = empty_streak + 1 if found == 0 else 0
+        if empty_streak < 3 and page < scraper.config.max_pages:
+            queue.enqueue(LISTING_PAGE, {
+                "brand": brand, "page": page + 1, "empty_streak": empty_streak,
+                "fingerprints": fingerprints + ([fingerprint] if fingerprint else []),
+            }, key=f"{brand}/{page + 1}")
+        return {"brand": brand, "page": page, "found": found, "new": new, "duplicates": len(manuals) - new}
+
+    def manual_from(payload) -> ManualEntry:
+        fields = {name: payload.get(name, "") for name in
+                  ("brand", "model", "year", "title", "slug", "url", "manual_type", "pages_count", "file_size")}
+        manual = ManualEntry(**fields)
+        if payload.get("image_pages"):
+            manual.image_pages = payload["image_pages"].split("|")
+        return manual
+
+    def manual_info(payload, queue):
+        manual = manual_from(payload)
+        if not scraper.fetch_page_info(manual):
+            # Failing retries the job with backoff; completing it would drop the manual for good
+            raise RuntimeError(f"Could not fetch manual info for {manual.url}")
+        row = manual.to_dict()
+        queue.enqueue(PAGE_DISCOVERY, row, key=manual.url, priority=int(estimate_cost(row)))
+        return row
+
+    def page_discovery(payload, queue):
+        manual = manual_from(payload)
+        manual.image_pages = scraper.extract_image_pages(manual)
+        row = manual.to_dict()
+        if download_dir:
+            ranges = split_page_ranges(1, len(manual.image_pages), split_pages)
+            if len(ranges) == 1:
+                queue.enqueue(IMAGE_DOWNLOAD, row, key=manual.url, priority=len(manual.image_pages))
+            else:
+                for first, last in ranges:
+                    last = last or len(manual.image_pages)
+                    queue.enqueue(IMAGE_DOWNLOAD, dict(row, first_page=first, last_page=last),
+                                  key=f"{manual.url}#{first}-{last}", priority=last - first + 1)
+        return row
+
+    def image_download(payload, queue):
+        manual = manual_from(payload)
+        scraper.config.download_dir = download_dir
+        downloaded, total = scraper.download_page_range(manual, payload.get("first_page", 1), payload.get("last_page"))
+        if downloaded < total:
+            # Failing retries the range (finished pages are skipped) and keeps the build waiting
+            raise RuntimeError(f"Only {downloaded}/{total} page images downloaded for {manual.url}")
+        if pdf_dir:
+            safe_slug = manual.slug.strip("/").replace("/", "_").replace(":", "_")
+            # Every range enqueues the build; the key makes all but the first a no-op
+            queue.enqueue(PDF_BUILD, {"image_dir": str(Path(download_dir) / safe_slug),
+                                      "output": str(Path(pdf_dir) / f"{safe_slug}.pdf"),
+                                      "pages": len(manual.image_pages) or 1,
+                                      "wait_for": f"{manual.url}#" if "first_page" in payload else None},
+                          key=manual.url)
+        return {"url": manual.url, "first_page": payload.get("first_page", 1), "last_page": payload.get("last_page")}
+
+    def pdf_build(payload, queue):
+        if payload.get("wait_for"):
+            dead = queue.dead(IMAGE_DOWNLOAD, payload["wait_for"])
+            if dead:
+                # Building now would leave pages out; requeue_dead retries the ranges
+                raise RuntimeError(f"{dead} page ranges failed to download")
+            remaining = queue.unfinished(IMAGE_DOWNLOAD, payload["wait_for"])
+            if remaining:
+                raise JobNotReady(f"{remaining} page ranges still downloading", delay=10.0)
+        return build_pdf(payload["image_dir"], payload["output"], optimize_pdf, optimize_workers,
+                         expected_pages=payload.get("pages"))
+
+    return {LISTING_PAGE: listing_page, MANUAL_INFO: manual_info, PAGE_DISCOVERY: page_discovery,
+            IMAGE_DOWNLOAD: image_download, PDF_BUILD: pdf_build}
+
+def build_pdf(image_dir: str, output: str, optimize=None, workers: int = 0,
+              expected_pages: Optional[int] = None) -> Dict[str, Any]:
+    """Combine a manual's page images (page_001.jpg, ...) into one PDF
+
+    optimize (OptimizeSettings) builds a downsampled, recompressed and
+    linearized PDF instead, optimizing pages in `workers` processes.
+    expected_pages (the manual's total_image_pages) refuses to build from an
+    incomplete download.
+    """
+    from PIL import Image
+    from pdf_optimize import build_optimized_pdf, page_images
+
+    images = page_images(image_dir)
+    if not images:
+        raise FileNotFoundError(f"No page images in {image_dir}")
+    if expected_pages and len(images) < expected_pages:
+        raise FileNotFoundError(f"Only {len(images)}/{expected_pages} page images in {image_dir}")
+    if optimize is not None:
+        return build_optimized_pdf([str(p) for p in images], output, optimize, workers)
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    pages = [Image.open(path).convert("RGB") for path in images]
+    tmp_path = output + ".tmp"
+    pages[0].save(tmp_path, "PDF", save_all=True, append_images=pages[1:])
+    os.replace(tmp_path, output)
+    return {"output": output, "pages": len(pages)}
+
+def export_csv(queue: JobQueue, output: str) -> int:
+    """Write completed page_discovery results (manual rows with page URLs) to a CSV"""
+    import csv
+    fieldnames = ["brand", "model", "year", "title", "slug", "url", "manual_type", "pages_count", "file_size", "total_image_pages", "image_pages"]
+    count = 0
+    with open(output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        for row in queue.results(PAGE_DISCOVERY):
+            writer.writerow(row)
+            count += 1
+    return count
+
+def main():
+    import argparse
+    import csv
+    from pdf_optimize import add_arguments as add_optimize_arguments, settings_from_args as optimize_settings_from_args
+
+    parser = argparse.ArgumentParser(description="Durable crawl job queue")
+    parser.add_argument("--db", default="scraped_data/jobs.db", help="Queue database file")
+    parser.add_argument("--lease", type=float, default=300.0, help="Lease timeout in seconds")
+    parser.add_argument("--max-attempts", type=int, default=5, help="Attempts before a job is dead-lettered")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    brands = sub.add_parser("enqueue-brands", help="Queue listing crawls for brands")
+    brands.add_argument("brands", nargs="+")
+    csv_cmd = sub.add_parser("enqueue-csv", help="Queue page discovery for manuals in a CSV")
+    csv_cmd.add_argument("csv_file")
+    work = sub.add_parser("work", help="Run a worker (start several processes to scale out)")
+    work.add_argument("--types", nargs="+", choices=JOB_TYPES, help="Only handle these job types")
+    work.add_argument("--download-dir", help="Queue image downloads into this directory")
+    work.add_argument("--pdf-dir", help="Queue PDF builds into this directory (needs --download-dir)")
+    work.add_argument("--split-pages", type=int, default=500,
+                      help="Download manuals longer than this many pages as parallel page-range jobs")
+    work.add_argument("--optimize-pdf", action="store_true", help="Build size-optimized, linearized PDFs")
+    add_optimize_arguments(work)
+    work.add_argument("--base-url", help="Site to crawl (defaults to the scraper's base URL)")
+    work.add_argument("--max-jobs", type=int, help="Exit after this many jobs")
+    work.add_argument("--exit-when-empty", action="store_true", help="Exit when no work is left")
+    sub.add_parser("stats", help="Show job counts by type and status")
+    requeue = sub.add_parser("requeue-dead", help="Retry dead-lettered jobs")
+    requeue.add_argument("--type", choices=JOB_TYPES)
+    export = sub.add_parser("export", help="Write discovered manuals and page URLs to a CSV")
+    export.add_argument("output")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    queue = JobQueue(args.db, lease_seconds=args.lease, max_attempts=args.max_attempts)
+
+    if args.command == "enqueue-brands":
+        added = queue.enqueue_many(LISTING_PAGE, [{"brand": b, "page": 1} for b in args.brands],
+                                   key_func=lambda p: f"{p['brand']}/1")
+        print(f"Queued {added} brand crawls")
+    elif args.command == "enqueue-csv":
+        with open(args.csv_file, newline="", encoding="utf-8") as f:
+            rows = [row for row in csv.DictReader(f) if row.get("url")]
+        # Largest manuals first so they are not the last jobs running
+        added = queue.enqueue_many(PAGE_DISCOVERY, rows, key_func=lambda row: row["url"],
+                                   priority_func=lambda row: int(estimate_cost(row)))
+        print(f"Queued {added} of {len(rows)} manuals for page discovery")
+    elif args.command == "work":
+        from scraper_with_deduplication import EnhancedCarManualScraper, ScrapingConfig
+        config = ScrapingConfig(extract_pages=True)
+        if args.base_url:
+            config.base_url = args.base_url.rstrip("/")
+        with EnhancedCarManualScraper(config) as scraper:
+            optimize = optimize_settings_from_args(args) if args.optimize_pdf else None
+            handlers = build_handlers(scraper, args.download_dir, args.pdf_dir, split_pages=args.split_pages,
+                                      optimize_pdf=optimize, optimize_workers=args.optimize_workers)
+            if args.types:
+                handlers = {t: handlers[t] for t in args.types}
+            try:
+                JobWorker(queue, handlers).run(max_jobs=args.max_jobs, exit_when_empty=args.exit_when_empty)
+            except KeyboardInterrupt:
+                logger.warning("[JOBS] Interrupted; the in-flight job was handed back to the queue")
+    elif args.command == "stats":
+        print(json.dumps(queue.stats(), indent=2))
+    elif args.command == "requeue-dead":
+        print(f"Requeued {queue.requeue_dead(args.type)} dead jobs")
+    elif args.command == "export":
+        print(f"Wrote {export_csv(queue, args.output)} manuals to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Brand Listing Page Fingerprints
+Features:
+- Fingerprint each /b/{brand}/{n} listing page by its ordered manual links
+- Persist fingerprints between runs so re-crawls can stop at unchanged pages
+- Detect pagination that repeats or wraps around within a single crawl
+"""
+
+import json
+import hashlib
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+def fingerprint_links(hrefs: List[str]) -> str:
+    """Stable fingerprint of a listing page's ordered manual links"""
+    return hashlib.sha1("\n".join(hrefs).encode("utf-8")).hexdigest()
+
+class ListingFingerprintStore:
+    """Remembers the last fingerprint seen for every brand listing page"""
+
+    def __init__(self, state_file: str = "scraped_data/listing_fingerprints.json"):
+        self.state_file = Path(state_file)
+        self.fingerprints: Dict[str, Dict[str, str]] = {}
+        self.load()
+
+    def load(self):
+        """Load fingerprints from the previous run"""
+        if self.state_file.exists():
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    self.fingerprints = json.load(f).get('brands', {})
+                total = sum(len(pages) for pages in self.fingerprints.values())
+                logger.info(f"[DELTA] Loaded {total} listing page fingerprints for {len(self.fingerprints)} brands")
+            except Exception as e:
+                logger.warning(f"[DELTA] Could not load listing fingerprints: {e}")
+                self.fingerprints = {}
+
+    def save(self):
+        """Save fingerprints for the next run"""
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(self.state_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'brands': self.fingerprints,
+                    'last_updated': datetime.now().isoformat()
+                }, f, indent=2)
+        except Exception as e:
+            logger.error(f"[DELTA] Could not save listing fingerprints: {e}")
+
+    def get(self, brand: str, page_num: int) -> Optional[str]:
+        return self.fingerprints.get(brand, {}).get(str(page_num))
+
+    def update(self, brand: str, page_num: int, fingerprint: str) -> bool:
+        """Record a page fingerprint; returns True if it matches the previous run"""
+        previous = self.get(brand, page_num)
+        self.fingerprints.setdefault(brand, {})[str(page_num)] = fingerprint
+        return previous == fingerprint
+
+class ListingWraparoundDetector:
+    """Spots a brand's listing pagination repeating within one crawl
+
+    Past the last real page the site keeps serving earlier pages (or wraps
+    back to page 1) instead of an empty page, so a crawl that only stops on
+    empty pages walks all the way to max_pages.
+    """
+
+    def __init__(self):
+        self.page_by_fingerprint: Dict[str, int] = {}
+        self.seen_hrefs: Set[str] = set()
+
+    def check(self, page_num: int, hrefs: List[str], fingerprint: Optional[str] = None) -> Optional[str]:
+        """Record a listing page; returns why the crawl should stop, or None to continue"""
+        if not hrefs:
+            return None
+        fingerprint = fingerprint or fingerprint_links(hrefs)
+        first_page = self.page_by_fingerprint.get(fingerprint)
+        if first_page is not None:
+            return f"page {page_num} repeats page {first_page}"
+        self.page_by_fingerprint[fingerprint] = page_num
+        if all(href in self.seen_hrefs for href in hrefs):
+            return f"all {len(hrefs)} links on page {page_num} were already seen on earlier pages"
+        self.seen_hrefs.update(hrefs)
+        return None
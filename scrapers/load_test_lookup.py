@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Load Test for the Manual Lookup Service
+Features:
+- Concurrent clients replaying a realistic query mix drawn from the catalog:
+  exact vehicles, model-only, misspelled models and manual_type filters
+- Latency percentiles (p50 / p95 / p99 / max), throughput and error count
+- --in-process mode measures the index alone, without HTTP, for comparison
+"""
+
+import math
+import random
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Sequence
+
+import requests
+
+from manual_lookup import CatalogIndex, load_index
+
+logger = logging.getLogger(__name__)
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def misspell(word: str, rng: random.Random) -> str:
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+def query_mix(index: CatalogIndex, count: int, seed: int = 7) -> List[Dict[str, str]]:
+    """Lookup parameters resembling real traffic against this catalog"""
+    rng = random.Random(seed)
+    vehicles = [record for models in index.tree.values() for years in models.values()
+                for records in years.values() for record in records]
+    if not vehicles:
+        raise ValueError("The catalog is empty")
+    queries = []
+    for _ in range(count):
+        record = rng.choice(vehicles)
+        roll = rng.random()
+        query = {"brand": record["brand"], "model": record["model"]}
+        if roll < 0.6:
+            query["year"] = record["year"]
+        elif roll < 0.75:
+            query["model"] = misspell(record["model"], rng)
+        elif roll < 0.9:
+            query["year"] = record["year"]
+            query["manual_type"] = record["manual_type"].split()[0] if record["manual_type"] else ""
+        queries.append(query)
+    return queries
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "rps": (len(latencies) + errors) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+def run_load(call, queries: List[Dict[str, str]], concurrency: int) -> Dict[str, float]:
+    """Send every query through call(query) from `concurrency` threads"""
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def client(worker: int):
+        nonlocal errors
+        mine, failed = [], 0
+        for query in queries[worker::concurrency]:
+            started = time.perf_counter()
+            try:
+                call(query)
+            except Exception as e:  # Any failure counts as an error, the run carries on
+                logger.debug(f"[LOAD] {query}: {e}")
+                failed += 1
+                continue
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+            errors += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+def http_caller(base_url: str):
+    local = threading.local()
+
+    def call(query):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()  # Keep-alive connection per client thread
+        response = session.get(f"{base_url.rstrip('/')}/manuals", params=query, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    return call
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load test the manual lookup service")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of a running manual_lookup.py")
+    parser.add_argument("--catalog", nargs="+", default=["scraped_data"], help="Catalog to draw queries from")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--in-process", action="store_true", help="Query the index directly instead of over HTTP")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    index = load_index(args.catalog)
+    queries = query_mix(index, args.requests)
+    if args.in_process:
+        call = lambda query: index.lookup(**query)
+    else:
+        call = http_caller(args.url)
+        call(queries[0])  # Fail fast if the service is not up
+    result = run_load(call, queries, args.concurrency)
+
+    target = "in-process index" if args.in_process else args.url
+    print(f"📈 {result['requests']} lookups against {target} with {args.concurrency} clients")
+    print(f"   {result['rps']:.0f} req/s, {result['errors']} errors")
+    print(f"   p50 {result['p50_ms']:.2f} ms  p95 {result['p95_ms']:.2f} ms  "
+          f"p99 {result['p99_ms']:.2f} ms  max {result['max_ms']:.2f} ms")
+
+if __name__ == "__main__":
+    main()
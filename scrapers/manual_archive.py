@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Random-Access Packed Manual Archives
+Features:
+- One .mpak file per manual instead of a folder of page_NNN files
+- Fixed-size header index of page offsets, lengths and CRC32s, so page N is
+  one index lookup and one slice of a memory map: no per-page open()
+- Page bytes returned as zero-copy memoryviews, ready for Pillow or a response body
+- Converters from the downloaded page folders and from built PDFs (pymupdf
+  when installed; otherwise the page images embedded by img2pdf/Pillow are
+  copied out without re-encoding)
+
+Layout (little-endian):
+    header  magic "MPAK", version u8, 3 pad bytes, page count u32, metadata length u32
+    index   page count x (offset u64, length u32, crc32 u32, format u8, 3 pad bytes)
+    meta    JSON metadata (slug, source, sha256 of each page's bytes, ...)
+    data    page bytes, back to back
+A page that is missing from the source has length 0.
+"""
+
+import io
+import os
+import re
+import json
+import mmap
+import zlib
+import hashlib
+import struct
+import logging
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from verify_corpus import IMAGE_SUFFIXES, PAGE_STEM
+
+try:
+    import fitz  # pymupdf
+except ImportError:
+    fitz = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MPAK"
+VERSION = 1
+HEADER = struct.Struct("<4sB3xII")
+INDEX_ENTRY = struct.Struct("<QIIB3x")
+ARCHIVE_SUFFIX = ".mpak"
+
+# Page format codes stored in the index
+FORMATS = {1: "jpeg", 2: "png", 3: "webp", 4: "gif"}
+FORMAT_CODES = {name: code for code, name in FORMATS.items()}
+
+class ArchiveError(Exception):
+    """Not a manual archive, or a damaged one"""
+
+def sniff_format(data: bytes) -> str:
+    """Image format from the first bytes of a page"""
+    if data[:3] == b"\xff\xd8\xff":
+        return "jpeg"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    if data[:4] == b"GIF8":
+        return "gif"
+    raise ArchiveError("Page is not a JPEG, PNG, WebP or GIF image")
+
+def write_archive(output: Union[str, Path], pages: Sequence[Tuple[int, Union[bytes, str, Path]]],
+                  meta: Optional[Dict] = None) -> Dict:
+    """Pack (page number, bytes or file path) pairs into an archive, atomically
+
+    Pages are streamed into the file one at a time, so a manual never has to
+    fit in memory; the index is filled in once every offset is known. The
+    metadata precedes the pages, so their sha256s (the checksum page folders
+    are tracked by) are computed in a first pass.
+    """
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    count = max((number for number, _ in pages), default=0)
+    digests = [""] * count
+    for number, source in pages:
+        data = source if isinstance(source, bytes) else Path(source).read_bytes()
+        digests[number - 1] = hashlib.sha256(data).hexdigest()
+    meta_bytes = json.dumps(dict(meta or {}, sha256=digests)).encode("utf-8")
+    index = [(0, 0, 0, 0)] * count
+    tmp_path = output.with_name(output.name + ".tmp")
+    data_bytes = 0
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, count, len(meta_bytes)))
+        f.write(b"\0" * (INDEX_ENTRY.size * count))
+        f.write(meta_bytes)
+        for number, source in sorted(pages, key=lambda page: page[0]):
+            data = source if isinstance(source, bytes) else Path(source).read_bytes()
+            index[number - 1] = (f.tell(), len(data), zlib.crc32(data), FORMAT_CODES[sniff_format(data)])
+            f.write(data)
+            data_bytes += len(data)
+        f.seek(HEADER.size)
+        f.write(b"".join(INDEX_ENTRY.pack(*entry) for entry in index))
+    os.replace(tmp_path, output)
+    return {"output": str(output), "pages": count, "stored": len(pages), "data_bytes": data_bytes,
+            "archive_bytes": output.stat().st_size}
+
+class ManualArchive:
+    """Read-only, memory-mapped view of a packed manual
+
+    Page numbers are 1-based, like the page_NNN files they replace. Page
+    views point into the map, so copy them (bytes(view)) to keep them past close().
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._file.close()
+            raise ArchiveError(f"{self.path} is empty")
+        self._view = memoryview(self._map)
+        try:
+            magic, version, self.page_count, meta_length = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ArchiveError(f"{self.path} is not a version {VERSION} manual archive")
+            meta_start = HEADER.size + INDEX_ENTRY.size * self.page_count
+            self.meta = json.loads(bytes(self._view[meta_start:meta_start + meta_length]) or b"{}")
+        except ArchiveError:
+            self.close()
+            raise
+        except (struct.error, ValueError) as e:
+            self.close()
+            raise ArchiveError(f"{self.path} has a damaged header: {e}")
+
+    def _entry(self, number: int) -> Tuple[int, int, int, int]:
+        if not 1 <= number <= self.page_count:
+            raise IndexError(f"Page {number} is outside 1-{self.page_count}")
+        return INDEX_ENTRY.unpack_from(self._map, HEADER.size + INDEX_ENTRY.size * (number - 1))
+
+    def has_page(self, number: int) -> bool:
+        return 1 <= number <= self.page_count and self._entry(number)[1] > 0
+
+    def page(self, number: int) -> Optional[memoryview]:
+        """Bytes of page `number` without copying, or None if the page is missing"""
+        offset, length, _, _ = self._entry(number)
+        if not length:
+            return None
+        if offset + length > len(self._map):
+            raise ArchiveError(f"Page {number} of {self.path} runs past the end of the file")
+        return self._view[offset:offset + length]
+
+    def page_format(self, number: int) -> Optional[str]:
+        return FORMATS.get(self._entry(number)[3])
+
+    def page_crc(self, number: int) -> Optional[int]:
+        """CRC32 of page `number` from the index (None if the page is missing)"""
+        _, length, crc, _ = self._entry(number)
+        return crc if length else None
+
+    def __len__(self) -> int:
+        return self.page_count
+
+    def __iter__(self) -> Iterator[Tuple[int, memoryview]]:
+        """(page number, bytes) of every stored page"""
+        for number in range(1, self.page_count + 1):
+            data = self.page(number)
+            if data is not None:
+                yield number, data
+
+    def verify(self) -> List[int]:
+        """Numbers of stored pages whose bytes no longer match their CRC32"""
+        bad = []
+        for number in range(1, self.page_count + 1):
+            offset, length, crc, _ = self._entry(number)
+            if length and (offset + length > len(self._map) or
+                           zlib.crc32(self._view[offset:offset + length]) != crc):
+                bad.append(number)
+        return bad
+
+    def close(self):
+        if self._map is None:
+            return
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # page views are still alive; the map goes when the last of them does
+        self._file.close()
+        self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+# ---------------------------------------------------------------------------
+# Converters
+
+def folder_pages(folder: Union[str, Path]) -> List[Tuple[int, Path]]:
+    """(page number, path) of the page_NNN images in a downloaded manual folder"""
+    pages = {}
+    for path in Path(folder).iterdir():
+        match = PAGE_STEM.match(path.stem)
+        if match and path.suffix.lower() in IMAGE_SUFFIXES:
+            pages[int(match.group(1))] = path
+    return sorted(pages.items())
+
+def pack_folder(folder: Union[str, Path], output: Union[str, Path]) -> Dict:
+    """Archive a page_NNN.* folder as it was laid out by the image downloaders"""
+    folder = Path(folder)
+    pages = folder_pages(folder)
+    if not pages:
+        raise ArchiveError(f"No page images in {folder}")
+    return write_archive(output, pages, {"slug": folder.name, "source": "images"})
+
+_PDF_STREAM_OBJECT = re.compile(rb"\bobj\s*<<((?:(?!endobj).)*?)>>\s*stream\r?\n", re.S)
+
+def _pdf_int(dictionary: bytes, key: bytes) -> Optional[int]:
+    match = re.search(rb"/" + key + rb"\s+(\d+)\b(?!\s+\d+\s+R)", dictionary)
+    return int(match.group(1)) if match else None
+
+def _png_from_flate(dictionary: bytes, data: bytes) -> bytes:
+    """PNG file for a FlateDecode image XObject
+
+    With a PNG predictor the stream already is PNG IDAT data and is wrapped
+    as is; otherwise the raw samples are re-encoded losslessly.
+    """
+    width, height = _pdf_int(dictionary, b"Width"), _pdf_int(dictionary, b"Height")
+    bits = _pdf_int(dictionary, b"BitsPerComponent") or 8
+    gray = b"/DeviceGray" in dictionary
+    if not width or not height or bits != 8 or not (gray or b"/DeviceRGB" in dictionary):
+        raise ArchiveError("Unsupported embedded image (install pymupdf to convert this PDF)")
+    if (_pdf_int(dictionary, b"Predictor") or 1) >= 10:
+        def chunk(kind, body):
+            return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+        header = struct.pack(">IIBBBBB", width, height, 8, 0 if gray else 2, 0, 0, 0)
+        return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", data) + chunk(b"IEND", b"")
+    from PIL import Image
+    img = Image.frombytes("L" if gray else "RGB", (width, height), zlib.decompress(data))
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG")
+    return buffer.getvalue()
+
+def _embedded_images(data: bytes) -> Iterator[bytes]:
+    """Page images of a PDF built by img2pdf or Pillow (one image per page, in page order)"""
+    for match in _PDF_STREAM_OBJECT.finditer(data):
+        dictionary, start = match.group(1), match.end()
+        if not re.search(rb"/Subtype\s*/Image", dictionary):
+            continue
+        length = _pdf_int(dictionary, b"Length")
+        if length is None:
+            length = data.index(b"endstream", start) - start
+        stream = data[start:start + length]
+        if b"/DCTDecode" in dictionary:
+            yield stream[:stream.rfind(b"\xff\xd9") + 2] if b"\xff\xd9" in stream else stream
+        elif b"/FlateDecode" in dictionary:
+            yield _png_from_flate(dictionary, stream)
+        else:
+            raise ArchiveError("Unsupported image encoding (install pymupdf to convert this PDF)")
+
+def pdf_pages(pdf: Union[str, Path]) -> List[Tuple[int, bytes]]:
+    """(page number, image bytes) for every page of a manual PDF"""
+    if fitz is not None:
+        pages = []
+        with fitz.open(pdf) as doc:
+            for number, page in enumerate(doc, 1):
+                images = page.get_images(full=True)
+                if len(images) == 1:
+                    pages.append((number, doc.extract_image(images[0][0])["image"]))
+                else:  # text or mixed content: rasterize the page
+                    pages.append((number, page.get_pixmap(dpi=150).tobytes("png")))
+        return pages
+    return list(enumerate(_embedded_images(Path(pdf).read_bytes()), 1))
+
+def pack_pdf(pdf: Union[str, Path], output: Union[str, Path]) -> Dict:
+    """Archive the page images of a built manual PDF"""
+    pages = pdf_pages(pdf)
+    if not pages:
+        raise ArchiveError(f"No page images found in {pdf}")
+    return write_archive(output, pages, {"slug": Path(pdf).stem, "source": "pdf"})
+
+def main():
+    import argparse
+    import shutil
+
+    parser = argparse.ArgumentParser(description="Pack manuals into random-access archives")
+    sub = parser.add_subparsers(dest="command", required=True)
+    folders = sub.add_parser("pack-folders", help="Pack downloaded page folders")
+    folders.add_argument("--images-dir", default="scraped_data/audi_pages", help="Per-manual page image folders")
+    folders.add_argument("--out-dir", default="scraped_data/archives", help="Where .mpak files are written")
+    folders.add_argument("--remove-source", action="store_true",
+                         help="Delete each folder once its archive has been read back and verified")
+    pdfs = sub.add_parser("pack-pdfs", help="Pack built manual PDFs")
+    pdfs.add_argument("--pdf-dir", default="data/manuals", help="Folder of manual PDFs")
+    pdfs.add_argument("--out-dir", default="scraped_data/archives", help="Where .mpak files are written")
+    info = sub.add_parser("info", help="Show an archive's pages and check their CRCs")
+    info.add_argument("archive")
+    extract = sub.add_parser("extract", help="Write one page of an archive to a file")
+    extract.add_argument("archive")
+    extract.add_argument("page", type=int)
+    extract.add_argument("output")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.command in ("pack-folders", "pack-pdfs"):
+        if args.command == "pack-folders":
+            sources = sorted(p for p in Path(args.images_dir).iterdir() if p.is_dir())
+            pack = pack_folder
+        else:
+            sources = sorted(Path(args.pdf_dir).glob("*.pdf"))
+            pack = pack_pdf
+        packed = failed = 0
+        for source in sources:
+            output = Path(args.out_dir) / f"{source.stem if source.is_file() else source.name}{ARCHIVE_SUFFIX}"
+            try:
+                result = pack(source, output)
+            except (ArchiveError, OSError) as e:
+                logger.error(f"[ARCHIVE] Could not pack {source}: {e}")
+                failed += 1
+                continue
+            packed += 1
+            logger.info(f"[ARCHIVE] {output.name}: {result['stored']} pages, {result['archive_bytes'] / 1e6:.1f} MB")
+            if getattr(args, "remove_source", False):
+                with ManualArchive(output) as archive:
+                    intact = not archive.verify() and \
+                        all(archive.page(n) == path.read_bytes() for n, path in folder_pages(source))
+                if intact:
+                    shutil.rmtree(source)
+                else:
+                    logger.error(f"[ARCHIVE] {output.name} did not read back intact; keeping {source}")
+        print(f"📦 {packed} manuals packed, {failed} failed")
+    elif args.command == "info":
+        with ManualArchive(args.archive) as archive:
+            stored = sum(1 for _ in archive)
+            bad = archive.verify()
+            print(f"📦 {archive.path.name}: {stored}/{len(archive)} pages stored, meta {archive.meta}")
+            print(f"{'✅ All CRCs match' if not bad else f'❌ Damaged pages: {bad}'}")
+    elif args.command == "extract":
+        with ManualArchive(args.archive) as archive:
+            data = archive.page(args.page)
+            if data is None:
+                raise SystemExit(f"Page {args.page} is not stored in {args.archive}")
+            Path(args.output).write_bytes(data)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Manual Metadata Harvesting and Cache
+Features:
+- Parse "Pages:" and "PDF Size:" from any manual markup
+- Harvest that metadata from the brand listing cards, before any extra GET
+- URL-keyed JSON cache so re-runs and CSV backfills never refetch a manual page
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PAGES_PATTERN = re.compile(r'Pages?:\s*(\d+)')
+SIZE_PATTERN = re.compile(r'PDF Size:\s*([\d.]+ [A-Z]+)')
+INFO_FIELDS = ("pages_count", "file_size")
+
+def parse_manual_info(text: str) -> Dict[str, str]:
+    """Extract pages_count / file_size from page or card text (missing keys are omitted)"""
+    info = {}
+    pages_match = PAGES_PATTERN.search(text)
+    if pages_match:
+        info["pages_count"] = pages_match.group(1)
+    size_match = SIZE_PATTERN.search(text)
+    if size_match:
+        info["file_size"] = size_match.group(1)
+    return info
+
+def harvest_listing_info(anchor, max_depth: int = 4) -> Dict[str, str]:
+    """Read manual metadata from the listing card around a link
+
+    Walks up from the anchor while the enclosing element still links to this
+    manual only, so a neighbouring card's "Pages:" is never picked up.
+    """
+    href = anchor.get("href")
+    card = None
+    node = anchor.parent
+    for _ in range(max_depth):
+        if node is None or node.name in ("body", "html", "[document]"):
+            break
+        hrefs = {a.get("href") for a in node.find_all("a", href=True)}
+        if hrefs != {href}:
+            break
+        card = node
+        node = node.parent
+    if card is None:
+        return {}
+    return parse_manual_info(card.get_text(" ", strip=True))
+
+def has_manual_info(manual) -> bool:
+    """True if the manual already has every metadata field"""
+    return all(getattr(manual, name, "") for name in INFO_FIELDS)
+
+class ManualInfoCache:
+    """Manual page metadata keyed by URL, persisted between runs
+
+    Only metadata that was actually found is cached: a fetch that came back
+    empty (a soft error page, a layout change) is retried on the next run.
+    """
+
+    def __init__(self, cache_file: str = "scraped_data/manual_info_cache.json"):
+        self.cache_file = Path(cache_file)
+        self.entries: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        """Load cached metadata from previous runs"""
+        if self.cache_file.exists():
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f).get('manuals', {})
+                logger.info(f"[ENRICH] Loaded cached metadata for {len(self.entries)} manuals")
+            except Exception as e:
+                logger.warning(f"[ENRICH] Could not load manual info cache: {e}")
+                self.entries = {}
+
+    def save(self):
+        """Write the cache atomically if anything changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {'manuals': dict(self.entries), 'last_updated': datetime.now().isoformat()}
+            self._dirty = False
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_file.with_name(self.cache_file.name + ".tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self.cache_file)
+        except Exception as e:
+            logger.error(f"[ENRICH] Could not save manual info cache: {e}")
+
+    def get(self, url: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            return self.entries.get(url)
+
+    def put(self, url: str, info: Dict[str, str]):
+        entry = {name: info.get(name, "") for name in INFO_FIELDS}
+        if not any(entry.values()):
+            return
+        with self._lock:
+            if self.entries.get(url) != entry:
+                self.entries[url] = entry
+                self._dirty = True
+
+    def forget(self, url: str):
+        """Drop a manual's entry so its page is fetched again (e.g. after it changed)"""
+        with self._lock:
+            if self.entries.pop(url, None) is not None:
+                self._dirty = True
+
+    def apply(self, manual) -> bool:
+        """Fill the manual's missing metadata from the cache; True on a cache hit
+
+        Empty entries (written by older versions) count as misses.
+        """
+        cached = self.get(manual.url)
+        if not cached or not any(cached.get(name) for name in INFO_FIELDS):
+            return False
+        for name in INFO_FIELDS:
+            if not getattr(manual, name) and cached.get(name):
+                setattr(manual, name, cached[name])
+        return True
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Vehicle-to-Manual Lookup Service
+Features:
+- In-memory index of the deduplicated catalog keyed by normalized brand / model / year
+- Fuzzy brand and model matching ("wrangler unlimited", "f150", "mercedes benz")
+- manual_type filter ("owner" matches "Owner Manual")
+- Hot reload: watches the catalog CSV/Parquet files and swaps in a freshly built
+  index once a changed file has stopped growing; requests never wait on a reload
+- FastAPI read API (GET /manuals, /brands, /health) served by uvicorn
+"""
+
+import os
+import csv
+import re
+import time
+import difflib
+import logging
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+try:
+    from fastapi import FastAPI, Query
+except ImportError:
+    FastAPI = None
+
+logger = logging.getLogger(__name__)
+
+# Files picked up when a catalog path is a directory
+CATALOG_PATTERNS = ("manual_metadata_deduplicated*.csv", "manuals_*.csv", "*.parquet")
+RECORD_FIELDS = ("brand", "model", "year", "title", "manual_type", "url", "slug", "pages_count", "file_size")
+FUZZY_CUTOFF = 0.75
+MAX_CACHED_RESOLUTIONS = 4096
+
+def normalize_key(value) -> str:
+    """Case, spacing and punctuation-insensitive key: "F-150" and "f 150" both become "f150" """
+    return re.sub(r"[^a-z0-9]+", "", str(value or "").lower())
+
+def deletion_variants(key: str) -> Iterable[str]:
+    yield key
+    for i in range(len(key)):
+        yield key[:i] + key[i + 1:]
+
+def build_typo_index(keys: Iterable[str]) -> Dict[str, List[str]]:
+    index: Dict[str, List[str]] = defaultdict(list)
+    for key in keys:
+        for variant in set(deletion_variants(key)):
+            index[variant].append(key)
+    return dict(index)
+
+class CatalogIndex:
+    """Immutable lookup structure: brand key -> model key -> year -> manuals
+
+    Built once per catalog version; a reload builds a new instance and
+    swaps it in, so lookups need no locking.
+    """
+
+    def __init__(self, rows: Iterable[Dict[str, str]]):
+        tree: Dict[str, Dict[str, Dict[str, List[Dict]]]] = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+        self.brand_names: Dict[str, str] = {}
+        self.model_names: Dict[Tuple[str, str], str] = {}
+        seen = set()
+        for row in rows:
+            url = (row.get("url") or "").strip()
+            brand_key, model_key = normalize_key(row.get("brand")), normalize_key(row.get("model"))
+            if not url or not brand_key or url in seen:
+                continue
+            seen.add(url)
+            record = {name: str(row.get(name) or "") for name in RECORD_FIELDS}
+            tree[brand_key][model_key][record["year"].strip()].append(record)
+            self.brand_names.setdefault(brand_key, record["brand"])
+            self.model_names.setdefault((brand_key, model_key), record["model"])
+        # Freeze into plain dicts, newest year first within each model
+        self.tree = {brand: {model: dict(sorted(years.items(), reverse=True)) for model, years in models.items()}
+                     for brand, models in tree.items()}
+        self.manual_count = len(seen)
+        self._resolved: Dict[Tuple[str, str], Tuple[Optional[str], bool]] = {}
+        # Built up front so a reload (on the watcher thread) pays for it, not the first misspelled request
+        self._typo_indexes = {brand: build_typo_index(models) for brand, models in self.tree.items()}
+        self._typo_indexes[""] = build_typo_index(self.tree)
+
+    def _closest(self, key: str, scope: str, candidates: Sequence[str]) -> Optional[str]:
+        """Closest candidate spelling, or None if nothing is similar enough
+
+        One-typo candidates are found through a deletion index (any two keys
+        one edit apart share a single-deletion variant), so the common case
+        scores a handful of keys instead of running difflib over them all.
+        """
+        typos = self._typo_indexes[scope]
+        near = {candidate for variant in deletion_variants(key) for candidate in typos.get(variant, ())}
+        if near:
+            ratio, best = max((difflib.SequenceMatcher(None, key, candidate).ratio(), candidate)
+                              for candidate in near)
+            return best if ratio >= FUZZY_CUTOFF else None
+        matches = difflib.get_close_matches(key, candidates, n=1, cutoff=FUZZY_CUTOFF)
+        return matches[0] if matches else None
+
+    def resolve_brand(self, brand: str) -> Tuple[Optional[str], bool]:
+        """(brand key, exact?) for a user-typed brand"""
+        key = normalize_key(brand)
+        if key in self.tree:
+            return key, True
+        return self._cached(("", key), lambda: self._closest(key, "", list(self.tree)))
+
+    def resolve_models(self, brand_key: str, model: str) -> Tuple[List[str], bool]:
+        """(model keys, exact?) for a user-typed model within one brand
+
+        An exact key wins. Otherwise every model the query is a prefix of
+        ("wrang" -> "wrangler", "wranglerunlimited") matches, then the longest
+        model that is a prefix of the query ("wrangler unlimited sahara" ->
+        "wranglerunlimited"), and failing that the closest spelling.
+        """
+        key = normalize_key(model)
+        models = self.tree[brand_key]
+        if key in models:
+            return [key], True
+        if not key:
+            return list(models), True
+        extended = sorted((candidate for candidate in models if candidate.startswith(key)), key=len)
+        if extended:
+            return extended, False
+        shortened = [candidate for candidate in models if candidate and key.startswith(candidate)]
+        if shortened:
+            return [max(shortened, key=len)], False
+        closest, _ = self._cached((brand_key, key), lambda: self._closest(key, brand_key, list(models)))
+        return ([closest] if closest else []), False
+
+    def _cached(self, cache_key, compute) -> Tuple[Optional[str], bool]:
+        # difflib is the slow path; typos repeat, so remember the answer for this index version
+        # Another request thread may clear() the dict at any point, so never read back what was stored
+        resolved = self._resolved.get(cache_key)
+        if resolved is None:
+            if len(self._resolved) >= MAX_CACHED_RESOLUTIONS:
+                self._resolved.clear()
+            resolved = self._resolved[cache_key] = (compute(), False)
+        return resolved
+
+    def lookup(self, brand: str, model: Optional[str] = None, year=None,
+               manual_type: Optional[str] = None, limit: int = 50) -> Dict:
+        """Manuals for a vehicle, with how the query was matched"""
+        brand_key, brand_exact = self.resolve_brand(brand)
+        result = {"brand": None, "models": [], "exact": False, "count": 0, "manuals": []}
+        if brand_key is None:
+            return result
+        model_keys, model_exact = self.resolve_models(brand_key, model or "")
+        year_key = str(year).strip() if year not in (None, "") else None
+        type_key = normalize_key(manual_type)
+
+        manuals = []
+        for model_key in model_keys:
+            years = self.tree[brand_key][model_key]
+            for manual_year in ([year_key] if year_key else years):
+                for record in years.get(manual_year, ()):
+                    if type_key and not normalize_key(record["manual_type"]).startswith(type_key):
+                        continue
+                    manuals.append(record)
+        result.update(brand=self.brand_names[brand_key],
+                      models=[self.model_names[(brand_key, key)] for key in model_keys],
+                      exact=brand_exact and model_exact, count=len(manuals), manuals=manuals[:limit])
+        return result
+
+    def brands(self) -> List[str]:
+        return sorted(self.brand_names.values())
+
+    def models(self, brand: str) -> List[str]:
+        brand_key, _ = self.resolve_brand(brand)
+        if brand_key is None:
+            return []
+        return sorted(self.model_names[(brand_key, key)] for key in self.tree[brand_key])
+
+def catalog_stats(paths: Sequence[str]) -> List[Tuple[Path, os.stat_result]]:
+    """(file, stat) for each catalog file, oldest first; files that vanish while listing are skipped"""
+    files = set()
+    for path in map(Path, paths):
+        if path.is_dir():
+            for pattern in CATALOG_PATTERNS:
+                files.update(path.glob(pattern))
+        else:
+            files.add(path)
+    stats = []
+    for path in files:
+        try:
+            stats.append((path, path.stat()))
+        except OSError:
+            continue  # Renamed or replaced between the glob and the stat
+    return sorted(stats, key=lambda item: (item[1].st_mtime_ns, item[0].name))
+
+def catalog_files(paths: Sequence[str]) -> List[Path]:
+    """Catalog files named directly or found in catalog directories, oldest first (newer rows win on reload)"""
+    return [path for path, _ in catalog_stats(paths)]
+
+def read_catalog(path: Path) -> List[Dict[str, str]]:
+    if path.suffix == ".parquet":
+        if pq is None:
+            logger.warning(f"[LOOKUP] pyarrow not installed, skipping {path}")
+            return []
+        return pq.read_table(path).to_pylist()
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+def load_rows(paths: Sequence[str]) -> List[Dict[str, str]]:
+    """Catalog rows, newest file first (consumers keep the first copy of a URL)"""
+    rows: List[Dict[str, str]] = []
+    for path in reversed(catalog_files(paths)):
+        rows.extend(read_catalog(path))
+    return rows
+
+def load_index(paths: Sequence[str]) -> CatalogIndex:
+    return CatalogIndex(load_rows(paths))
+
+class CatalogWatcher:
+    """Holds the current CatalogIndex and rebuilds it when the catalog files change
+
+    A change is applied once the files look the same on two consecutive
+    checks, so a CSV the scraper is still writing is not loaded half-done.
+    A failed rebuild keeps the previous index.
+    """
+
+    def __init__(self, paths: Sequence[str], interval: float = 5.0):
+        self.paths = list(paths)
+        self.interval = interval
+        self.index = CatalogIndex([])
+        self.loaded_at: Optional[float] = None
+        self.reloads = 0
+        self.check_errors = 0
+        self._loaded_signature = None
+        self._pending_signature = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def signature(self) -> Tuple:
+        return tuple((str(path), stat.st_size, stat.st_mtime_ns) for path, stat in catalog_stats(self.paths))
+
+    def reload(self, signature: Optional[Tuple] = None) -> bool:
+        signature = self.signature() if signature is None else signature
+        started = time.perf_counter()
+        try:
+            index = load_index(self.paths)
+        except (OSError, csv.Error, ValueError) as e:
+            logger.warning(f"[LOOKUP] Catalog reload failed, keeping the current index: {e}")
+            return False
+        self.index = index  # Single reference swap: in-flight lookups finish on the old index
+        self._loaded_signature = signature
+        self.loaded_at = time.time()
+        self.reloads += 1
+        logger.info(f"[LOOKUP] Loaded {index.manual_count} manuals from {len(signature)} files "
+                    f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return True
+
+    def check(self) -> bool:
+        """Reload if the catalog changed and has settled; True when a new index was swapped in"""
+        signature = self.signature()
+        if signature == self._loaded_signature:
+            self._pending_signature = None
+            return False
+        if signature != self._pending_signature:
+            self._pending_signature = signature
+            return False
+        self._pending_signature = None
+        return self.reload(signature)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                # Keep watching: an error that kills this thread would stop hot reload for good
+                self.check_errors += 1
+                logger.exception(f"[LOOKUP] Catalog check failed, retrying in {self.interval}s: {e}")
+
+    def start(self):
+        if self._loaded_signature is None:
+            self.reload()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="catalog-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+def create_app(watcher: CatalogWatcher):
+    """FastAPI app serving lookups from the watcher's current index"""
+    if FastAPI is None:
+        raise RuntimeError("FastAPI is not installed (pip install fastapi uvicorn)")
+    app = FastAPI(title="Manual Lookup")
+    app.add_event_handler("startup", watcher.start)
+    app.add_event_handler("shutdown", watcher.stop)
+
+    # async handlers: lookups are short in-memory work, so skip the threadpool hop
+    @app.get("/manuals")
+    async def manuals(brand: str, model: Optional[str] = None, year: Optional[str] = None,
+                      manual_type: Optional[str] = None, limit: int = Query(50, ge=1, le=500)):
+        return watcher.index.lookup(brand, model, year, manual_type, limit)
+
+    @app.get("/brands")
+    async def brands():
+        return watcher.index.brands()
+
+    @app.get("/brands/{brand}/models")
+    async def models(brand: str):
+        return watcher.index.models(brand)
+
+    @app.get("/health")
+    async def health():
+        return {"manuals": watcher.index.manual_count, "loaded_at": watcher.loaded_at, "reloads": watcher.reloads,
+                "check_errors": watcher.check_errors}
+
+    return app
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve vehicle-to-manual lookups")
+    parser.add_argument("--catalog", nargs="+", default=["scraped_data"],
+                        help="Catalog CSV/Parquet files or directories to watch")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--reload-interval", type=float, default=5.0, help="Seconds between catalog checks")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    import uvicorn
+
+    watcher = CatalogWatcher(args.catalog, interval=args.reload_interval)
+    print(f"📚 Serving manual lookups on http://{args.host}:{args.port}/manuals")
+    uvicorn.run(create_app(watcher), host=args.host, port=args.port, access_log=False)
+
+if __name__ == "__main__":
+    main()
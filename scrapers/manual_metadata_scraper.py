@@ -6,9 +6,11 @@ from urllib.parse import urljoin
 from playwright.async_api import async_playwright
 from tqdm import tqdm
 import img2pdf
+from pdf_optimize import OptimizeSettings, add_arguments, append_report, build_optimized_pdf, settings_from_args
 
 BASE_URL = "https://www.carmanualsonline.info"
 DOWNLOAD_DIR = "data/manuals"
+OPTIMIZE_REPORT = "scraped_data/pdf_optimize_report.csv"
 
 async def scrape_all_pages(base_url: str, page, folder_name: str):
     image_urls = []
@@ -28,7 +30,8 @@ async def scrape_all_pages(base_url: str, page, folder_name: str):
             break
     return image_urls
 
-async def scrape_images_to_pdf(manual_url: str, folder_name: str):
+async def scrape_images_to_pdf(manual_url: str, folder_name: str, optimize: OptimizeSettings = None,
+                               optimize_workers: int = 0):
     os.makedirs(DOWNLOAD_DIR, exist_ok=True)
     pdf_path = os.path.join(DOWNLOAD_DIR, f"{folder_name}.pdf")
     if os.path.exists(pdf_path):
@@ -59,7 +62,13 @@ async def scrape_images_to_pdf(manual_url: str, folder_name: str):
                 except Exception as e:
                     print(f"⚠️ Failed to download {img_url}: {e}")
 
-        if image_bytes:
+        if image_bytes and optimize:
+            # CPU-bound; keep it off the event loop
+            report = await asyncio.get_running_loop().run_in_executor(
+                None, build_optimized_pdf, image_bytes, pdf_path, optimize, optimize_workers)
+            append_report(report, OPTIMIZE_REPORT)
+            print(f"✅ PDF created: {pdf_path} ({report['saved_pct']}% smaller than the source images)")
+        elif image_bytes:
             with open(pdf_path, "wb") as f:
                 f.write(img2pdf.convert(image_bytes))
             print(f"✅ PDF created: {pdf_path}")
@@ -68,7 +77,7 @@ async def scrape_images_to_pdf(manual_url: str, folder_name: str):
 
         await browser.close()
 
-async def main():
+async def main(optimize: OptimizeSettings = None, optimize_workers: int = 0):
     csv_path = "manual_url_metadata.csv"
     with open(csv_path, newline='') as csvfile:
         reader = csv.DictReader(csvfile)
@@ -79,9 +88,15 @@ async def main():
             url = row["url"]
             folder_name = f"{brand}-{model}-{year}".replace(" ", "-").lower()
             try:
-                await scrape_images_to_pdf(url, folder_name)
+                await scrape_images_to_pdf(url, folder_name, optimize, optimize_workers)
             except Exception as e:
                 print(f"💥 Failed on {folder_name}: {e}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Download manuals as PDFs")
+    parser.add_argument("--optimize-pdf", action="store_true", help="Build size-optimized, linearized PDFs")
+    add_arguments(parser)
+    args = parser.parse_args()
+    asyncio.run(main(settings_from_args(args) if args.optimize_pdf else None, args.optimize_workers))
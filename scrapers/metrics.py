@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Scraper Metrics and Instrumentation
+Features:
+- Thread-safe counters, gauges and per-stage latency histograms
+- Stage timers for fetch, parse, classification, dedup and CSV writes
+- Periodic export to a Prometheus textfile or a JSON-lines file
+"""
+
+import json
+import os
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+class Histogram:
+    """Cumulative bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_counts: List[int] = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile using the bucket upper bounds"""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for bound, bucket_count in zip(self.buckets, self.bucket_counts):
+            running += bucket_count
+            if running >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": round(self.max, 6),
+        }
+
+class ScraperMetrics:
+    """Live counters, gauges and stage histograms shared by a scraper run"""
+
+    def __init__(self, namespace: str = "scraper"):
+        self.namespace = namespace
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+
+    def inc(self, name: str, value: float = 1):
+        """Increment a monotonically increasing counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def add_gauge(self, name: str, delta: float):
+        with self._lock:
+            self.gauges[name] = self.gauges.get(name, 0) + delta
+
+    def observe(self, stage: str, seconds: float):
+        """Record one latency sample for a stage"""
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Time the enclosed block into the stage histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def record_response(self, status_code: int, num_bytes: int):
+        """Count a completed HTTP response by status class and size"""
+        self.inc("requests_total")
+        self.inc("bytes_downloaded_total", num_bytes)
+        if 400 <= status_code < 500:
+            self.inc("responses_4xx_total")
+        elif status_code >= 500:
+            self.inc("responses_5xx_total")
+
+    def stage_summary(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {stage: h.snapshot() for stage, h in sorted(self.histograms.items())}
+
+    def snapshot(self) -> Dict:
+        """Point-in-time copy of every metric, suitable for JSON output"""
+        with self._lock:
+            return {
+                "timestamp": datetime.now().isoformat(),
+                "uptime_seconds": round(time.time() - self.started_at, 3),
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "stages": {stage: h.snapshot() for stage, h in sorted(self.histograms.items())},
+            }
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        ns = self.namespace
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {ns}_{name} counter")
+                lines.append(f"{ns}_{name} {value}")
+            for name, value in sorted(self.gauges.items()):
+                lines.append(f"# TYPE {ns}_{name} gauge")
+                lines.append(f"{ns}_{name} {value}")
+            if self.histograms:
+                family = f"{ns}_stage_duration_seconds"
+                lines.append(f"# TYPE {family} histogram")
+                for stage, h in sorted(self.histograms.items()):
+                    running = 0
+                    for bound, bucket_count in zip(h.buckets, h.bucket_counts):
+                        running += bucket_count
+                        lines.append(f'{family}_bucket{{stage="{stage}",le="{bound}"}} {running}')
+                    lines.append(f'{family}_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                    lines.append(f'{family}_sum{{stage="{stage}"}} {h.sum:.6f}')
+                    lines.append(f'{family}_count{{stage="{stage}"}} {h.count}')
+            lines.append(f"# TYPE {ns}_uptime_seconds gauge")
+            lines.append(f"{ns}_uptime_seconds {time.time() - self.started_at:.3f}")
+        return "\n".join(lines) + "\n"
+
+class MetricsExporter:
+    """Background thread that periodically writes metrics to disk
+
+    Formats:
+        prometheus: atomically rewrites a textfile for node_exporter's textfile collector
+        jsonl: appends one JSON snapshot per interval
+    """
+
+    FORMATS = ("prometheus", "jsonl")
+
+    def __init__(self, metrics: ScraperMetrics, path: str, fmt: str = "prometheus", interval: float = 15.0):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unknown metrics format '{fmt}', expected one of {self.FORMATS}")
+        self.metrics = metrics
+        self.path = Path(path)
+        self.fmt = fmt
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self):
+        """Write one export immediately"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            if self.fmt == "prometheus":
+                tmp_path = self.path.with_name(self.path.name + ".tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(self.metrics.to_prometheus())
+                os.replace(tmp_path, self.path)
+            else:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(self.metrics.snapshot()) + "\n")
+        except OSError as e:
+            logger.warning(f"[METRICS] Could not write metrics to {self.path}: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+        self._thread.start()
+        logger.info(f"[METRICS] Exporting {self.fmt} metrics to {self.path} every {self.interval:.0f}s")
+
+    def stop(self):
+        """Stop the thread and write a final export"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.write()
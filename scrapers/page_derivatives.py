@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Web-Optimized Page Derivatives
+Features:
+- WebP thumbnail and mid-resolution viewing variant of every page image
+- Pages rendered in a process pool, across all manuals at once
+- Incremental: only pages whose source checksum changed (or whose variants
+  are missing, or whose variant settings changed) are regenerated; checksums
+  come from the download manifest when it is current, so unchanged pages
+  are not even re-read
+- Per-manual manifest.json listing each page's variants and dimensions, for
+  the in-app manual viewer
+"""
+
+import os
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from download_manifest import DownloadManifest, sha256_file
+from verify_corpus import IMAGE_SUFFIXES, PAGE_STEM
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+@dataclass
+class DerivativeSettings:
+    """Variant sizes and WebP encoder settings"""
+    thumb_width: int = 240
+    thumb_quality: int = 60
+    view_width: int = 1200
+    view_quality: int = 75
+    method: int = 4  # WebP encoder effort, 0 (fast) - 6 (smallest)
+
+    def variants(self) -> List[Tuple[str, int, int]]:
+        """(name, max width, quality), largest first"""
+        return [("view", self.view_width, self.view_quality), ("thumb", self.thumb_width, self.thumb_quality)]
+
+def render_page(source: str, out_dir: str, stem: str, settings: DerivativeSettings) -> Dict[str, Dict]:
+    """Write every variant of one page image (runs in a worker process)
+
+    Each variant is resized from the previous, larger one, which is much
+    cheaper than resizing the full scan twice. Pages are never upscaled.
+    """
+    variants = {}
+    with Image.open(source) as img:
+        img.load()
+        current = img.convert("L" if img.mode in ("1", "L", "LA", "I", "F") else "RGB")
+    for name, max_width, quality in settings.variants():
+        if current.width > max_width:
+            height = max(1, round(current.height * max_width / current.width))
+            current = current.resize((max_width, height), Image.LANCZOS)
+        rel = f"{name}/{stem}.webp"
+        path = Path(out_dir) / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        current.save(tmp_path, "WEBP", quality=quality, method=settings.method)
+        os.replace(tmp_path, path)
+        variants[name] = {"src": rel, "width": current.width, "height": current.height,
+                          "bytes": path.stat().st_size}
+    return variants
+
+def _render_task(task: Tuple[str, str, str, DerivativeSettings]) -> Dict[str, Dict]:
+    return render_page(*task)
+
+def source_checksum(path: Path, downloads: DownloadManifest) -> str:
+    """sha256 of a page image, from the download manifest when it still matches the file"""
+    entry = downloads.get(path.stem)
+    if entry and entry["file"] == path.name and entry.get("bytes") == path.stat().st_size:
+        return entry["sha256"]
+    return sha256_file(path)
+
+class DerivativeBuilder:
+    """Brings each manual's derivative folder and manifest up to date with its page images"""
+
+    def __init__(self, images_dir: str, out_dir: str, settings: Optional[DerivativeSettings] = None,
+                 workers: int = 0):
+        """
+        Args:
+            images_dir: Folder of per-manual page image folders
+            out_dir: Where per-manual derivative folders are written
+            settings: Variant sizes and quality
+            workers: Rendering processes (0 renders inline)
+        """
+        self.images_dir = Path(images_dir)
+        self.out_dir = Path(out_dir)
+        self.settings = settings or DerivativeSettings()
+        self.workers = max(0, workers)
+        self.stats = {"manuals": 0, "pages": 0, "rendered": 0, "unchanged": 0, "removed": 0, "failed": 0}
+
+    def _load_manifest(self, slug: str) -> Dict:
+        path = self.out_dir / slug / MANIFEST_NAME
+        if path.exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                if manifest.get("settings") == asdict(self.settings):
+                    return manifest
+                logger.info(f"[DERIV] Variant settings changed for {slug}, regenerating")
+            except Exception as e:
+                logger.warning(f"[DERIV] Could not load {path}: {e}")
+        return {"pages": []}
+
+    def _save_manifest(self, slug: str, pages: List[Dict]):
+        """Write a manual's manifest atomically"""
+        path = self.out_dir / slug / MANIFEST_NAME
+        path.parent.mkdir(parents=True, exist_ok=True)
+        manifest = {
+            "slug": slug,
+            "page_count": len(pages),
+            "variants": {name: {"max_width": width, "format": "webp"} for name, width, _ in self.settings.variants()},
+            "settings": asdict(self.settings),
+            "pages": pages,
+            "generated": datetime.now().isoformat(),
+        }
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+
+    def _plan(self, slug: str) -> Tuple[List[Dict], List[Tuple[int, str]]]:
+        """Page entries of a manual and the (index, source) pairs that need rendering"""
+        folder = self.images_dir / slug
+        downloads = DownloadManifest(folder)
+        known = {page["page"]: page for page in self._load_manifest(slug)["pages"]}
+        pages, todo = [], []
+        sources = sorted((int(PAGE_STEM.match(p.stem).group(1)), p) for p in folder.iterdir()
+                         if p.suffix.lower() in IMAGE_SUFFIXES and PAGE_STEM.match(p.stem))
+        for number, path in sources:
+            checksum = source_checksum(path, downloads)
+            previous = known.pop(number, None)
+            names = [name for name, _, _ in self.settings.variants()]
+            if previous and previous["source_sha256"] == checksum and \
+                    all((self.out_dir / slug / previous[name]["src"]).exists() for name in names):
+                pages.append(previous)
+                self.stats["unchanged"] += 1
+                continue
+            pages.append({"page": number, "source_sha256": checksum})
+            todo.append((len(pages) - 1, str(path)))
+
+        # Pages whose source is gone lose their derivatives too
+        for page in known.values():
+            for name, _, _ in self.settings.variants():
+                if name in page:
+                    (self.out_dir / slug / page[name]["src"]).unlink(missing_ok=True)
+            self.stats["removed"] += 1
+        return pages, todo
+
+    def build(self, slugs: Optional[Sequence[str]] = None) -> Dict[str, int]:
+        """Update derivatives for the given manual folders (default: all)
+
+        A page that cannot be rendered is logged and counted; its manual keeps
+        its previous manifest and is retried on the next build.
+        """
+        slugs = list(slugs) if slugs else sorted(p.name for p in self.images_dir.iterdir() if p.is_dir())
+        plans = {}
+        tasks, owners = [], []
+        for slug in slugs:
+            pages, todo = self._plan(slug)
+            plans[slug] = pages
+            for index, source in todo:
+                stem = f"page_{pages[index]['page']:03d}"
+                tasks.append((source, str(self.out_dir / slug), stem, self.settings))
+                owners.append((slug, index))
+            self.stats["manuals"] += 1
+            self.stats["pages"] += len(pages)
+
+        failed = set()
+        if self.workers and len(tasks) > 1:
+            # spawn: forking a process full of threads can copy held locks into the child
+            with ProcessPoolExecutor(max_workers=self.workers,
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = [pool.submit(_render_task, task) for task in tasks]
+                for task, (slug, index), future in zip(tasks, owners, futures):
+                    try:
+                        variants = future.result()
+                    except Exception as e:
+                        self._failed(task[0], e)
+                        failed.add(slug)
+                        continue
+                    plans[slug][index].update(variants)
+                    self.stats["rendered"] += 1
+        else:
+            for task, (slug, index) in zip(tasks, owners):
+                try:
+                    variants = _render_task(task)
+                except Exception as e:
+                    self._failed(task[0], e)
+                    failed.add(slug)
+                    continue
+                plans[slug][index].update(variants)
+                self.stats["rendered"] += 1
+
+        for slug, pages in plans.items():
+            if slug in failed:
+                logger.warning(f"[DERIV] Not updating the manifest of {slug}: some pages failed to render")
+                continue
+            self._save_manifest(slug, pages)
+        logger.info(f"[DERIV] {self.stats['manuals']} manuals, {self.stats['pages']} pages: "
+                    f"{self.stats['rendered']} rendered, {self.stats['unchanged']} unchanged, "
+                    f"{self.stats['removed']} removed, {self.stats['failed']} failed")
+        return self.stats
+
+    def _failed(self, source: str, error: Exception):
+        logger.error(f"[DERIV] Could not render {source}: {type(error).__name__}: {error}")
+        self.stats["failed"] += 1
+
+def main():
+    import argparse
+
+    defaults = DerivativeSettings()
+    parser = argparse.ArgumentParser(description="Generate WebP page derivatives for the manual viewer")
+    parser.add_argument("--images-dir", default="scraped_data/audi_pages", help="Per-manual page image folders")
+    parser.add_argument("--out-dir", default="scraped_data/page_derivatives", help="Where derivatives are written")
+    parser.add_argument("--thumb-width", type=int, default=defaults.thumb_width, help="Thumbnail width in pixels")
+    parser.add_argument("--view-width", type=int, default=defaults.view_width, help="Viewing variant width in pixels")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Rendering processes (0 = inline)")
+    parser.add_argument("slugs", nargs="*", help="Only these manual folders (default: all)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    settings = DerivativeSettings(thumb_width=args.thumb_width, view_width=args.view_width)
+    stats = DerivativeBuilder(args.images_dir, args.out_dir, settings, workers=args.workers).build(args.slugs)
+    print(f"🖼️  {stats['rendered']} pages rendered, {stats['unchanged']} unchanged, {stats['failed']} failed "
+          f"across {stats['manuals']} manuals")
+
+if __name__ == "__main__":
+    main()
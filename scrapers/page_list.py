@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Compact Manual Page Lists
+Features:
+- Page URLs stored as the manual URL plus an array of page numbers
+- Expands to URL strings only when iterated, indexed or written out
+- Drop-in for List[str]: len(), iteration, slicing, "|".join(), == with lists
+- URLs that do not follow the "<manual url>/<n>" pattern stay a plain list
+"""
+
+from array import array
+from typing import Iterator, List, Optional, Sequence, Union
+
+class PageList(Sequence):
+    """Lazy sequence of a manual's page URLs
+
+    Page 1 is the manual URL itself; page n > 1 is "<manual url>/<n>".
+    Holds one string and 4 bytes per page instead of one string per page.
+    """
+
+    __slots__ = ("base_url", "_numbers")
+
+    def __init__(self, base_url: str, numbers: Sequence[int] = ()):
+        self.base_url = base_url
+        self._numbers = array("I", numbers)
+
+    @classmethod
+    def from_urls(cls, base_url: str, urls: Sequence[str]) -> Optional["PageList"]:
+        """Compact page URLs of the manual at base_url (None if any URL does not fit the pattern)"""
+        if isinstance(urls, PageList) and urls.base_url == base_url:
+            return urls
+        prefix = base_url + "/"
+        numbers = array("I")
+        for url in urls:
+            if url == base_url:
+                numbers.append(1)
+            elif url.startswith(prefix) and url[len(prefix):].isdigit() and url[len(prefix)] != "0":
+                numbers.append(int(url[len(prefix):]))
+            else:
+                return None
+        pages = cls(base_url)
+        pages._numbers = numbers
+        return pages
+
+    @property
+    def page_numbers(self) -> List[int]:
+        return self._numbers.tolist()
+
+    def _url(self, number: int) -> str:
+        return self.base_url if number == 1 else f"{self.base_url}/{number}"
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self._url(number) for number in self._numbers[index]]
+        return self._url(self._numbers[index])
+
+    def __iter__(self) -> Iterator[str]:
+        for number in self._numbers:
+            yield self._url(number)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PageList):
+            return self.base_url == other.base_url and self._numbers == other._numbers
+        if isinstance(other, (list, tuple)):
+            return len(other) == len(self) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"PageList({self.base_url!r}, {len(self)} pages)"
+
+    def __reduce__(self):
+        return (PageList, (self.base_url, self._numbers.tolist()))
+
+def compact_pages(base_url: str, urls: Sequence[str]) -> Sequence[str]:
+    """PageList for urls when they fit the manual's URL pattern, otherwise a plain list"""
+    pages = PageList.from_urls(base_url, urls)
+    return pages if pages is not None else list(urls)
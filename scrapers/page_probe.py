@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Lightweight Manual Page Probing
+Features:
+- Decide whether /{manual}/{n} exists without building a BeautifulSoup tree
+- HEAD requests settle 404/410 and redirects away from the manual
+- Streamed GETs stop at an end-of-manual marker, or once a manual image tag
+  and the head of the page without a marker have been read
+- Ambiguous pages are reported so callers can fall back to full parsing
+"""
+
+import re
+import logging
+from dataclasses import dataclass
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from retry_policy import (
+    RetryPolicy, HostCircuitBreakers, DEFAULT_POLICY, OK, NOT_FOUND, TERMINAL_OUTCOMES, fetch_with_retry
+)
+from parse_offload import END_INDICATORS
+
+logger = logging.getLogger(__name__)
+
+PROBE_MODES = ("full", "stream", "head")
+
+# Manual page images are served from /img/... (and /manuals/... on older pages)
+MANUAL_IMAGE_PATTERN = re.compile(rb"<img[^>]+(?:data-)?src=[\"'][^\"']*/(?:img|manuals)/", re.IGNORECASE)
+END_MARKERS = tuple(indicator.encode() for indicator in END_INDICATORS)
+# Markers are matched in text only: "404" in an image URL or link is not an end marker.
+# Also drops tags cut off at either edge of the window.
+_TAGS = re.compile(rb"<[^>]*>|<[^>]*$|^[^<]*>")
+# Bytes kept from the previous chunk so markers split across chunks are still found
+_OVERLAP = 256
+
+@dataclass
+class ProbeResult:
+    """Outcome of probing one page URL
+
+    exists is True/False when the cheap signal was conclusive and None when
+    the caller should fall back to a full fetch and parse.
+    """
+    exists: Optional[bool]
+    reason: str
+    outcome: str = OK  # retry_policy outcome of the probe request
+    bytes_read: int = 0
+
+    @property
+    def failed(self) -> bool:
+        """The request itself failed after retries (not a 404 or a verdict)"""
+        return self.outcome != OK and self.outcome not in TERMINAL_OUTCOMES
+
+class PageScanInterrupted(Exception):
+    """A manual page could not be checked (failed request, open circuit)
+
+    Unlike a 404 or an end-of-manual marker this says nothing about where the
+    manual ends, so the pages found so far must not be saved as the full list.
+    """
+
+    def __init__(self, page_url: str, outcome: str):
+        super().__init__(f"Could not check {page_url} ({outcome})")
+        self.page_url = page_url
+        self.outcome = outcome
+
+class PageProber:
+    """Cheap existence checks for manual page URLs"""
+
+    def __init__(self, send: Callable[..., requests.Response], mode: str = "stream",
+                 policy: RetryPolicy = DEFAULT_POLICY, breakers: Optional[HostCircuitBreakers] = None,
+                 on_retry: Optional[Callable] = None, max_bytes: int = 256 * 1024, head_bytes: int = 16 * 1024,
+                 drain_limit: int = 32 * 1024, chunk_size: int = 8192):
+        """
+        Args:
+            send: Called as send(url, method=..., stream=...) and returns a response
+            mode: "stream" (streamed GET) or "head" (HEAD, then streamed GET if needed)
+            policy: Retry policy for the probe requests
+            breakers: Per-host circuit breakers (optional)
+            on_retry: Passed through to fetch_with_retry
+            max_bytes: Give up (ambiguous) after reading this much of a body
+            head_bytes: After a manual image, keep reading up to this much for an
+                end-of-manual marker before deciding the page exists
+            drain_limit: After a verdict, finish reading bodies with at most this many
+                bytes left so the keep-alive connection can be reused
+            chunk_size: Streaming chunk size
+        """
+        if mode not in PROBE_MODES or mode == "full":
+            raise ValueError(f"PageProber mode must be 'stream' or 'head', got '{mode}'")
+        self.send = send
+        self.mode = mode
+        self.policy = policy
+        self.breakers = breakers
+        self.on_retry = on_retry
+        self.max_bytes = max_bytes
+        self.head_bytes = head_bytes
+        self.drain_limit = drain_limit
+        self.chunk_size = chunk_size
+
+    def probe(self, url: str) -> ProbeResult:
+        if self.mode == "head":
+            result = self._probe_head(url)
+            if result.exists is not None or result.failed:
+                return result
+        return self._probe_stream(url)
+
+    def _probe_head(self, url: str) -> ProbeResult:
+        response, outcome = fetch_with_retry(
+            lambda: self.send(url, method="HEAD", stream=False), url, self.policy, self.breakers, self.on_retry
+        )
+        if outcome == NOT_FOUND:
+            return ProbeResult(False, f"head {outcome}", outcome)
+        if outcome in TERMINAL_OUTCOMES:
+            # e.g. 405: the server does not answer HEAD, let the GET decide
+            return ProbeResult(None, f"head {outcome}")
+        if response is None:
+            return ProbeResult(None, f"head {outcome}", outcome)
+        # A redirect away from the manual path means the page does not exist
+        requested_path = urlparse(url).path.rstrip("/")
+        final_path = urlparse(response.url or url).path.rstrip("/")
+        if final_path != requested_path:
+            return ProbeResult(False, f"head redirected to {final_path}")
+        # 200 alone does not prove the page has manual content (soft 404s)
+        return ProbeResult(None, "head ok")
+
+    def _probe_stream(self, url: str) -> ProbeResult:
+        response, outcome = fetch_with_retry(
+            lambda: self.send(url, method="GET", stream=True), url, self.policy, self.breakers, self.on_retry
+        )
+        if outcome in TERMINAL_OUTCOMES:
+            return ProbeResult(False, f"get {outcome}", outcome)
+        if response is None:
+            return ProbeResult(None, f"get {outcome}", outcome)
+
+        bytes_read = 0
+        tail = b""
+        verdict: Optional[bool] = None
+        reason = "no signal"
+        image_seen = False
+        try:
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                if not chunk:
+                    continue
+                bytes_read += len(chunk)
+                window = (tail + chunk).lower()
+                # End markers win, as in the full parser: a "not available" notice may follow an image
+                text = _TAGS.sub(b" ", window)
+                marker = next((m for m in END_MARKERS if m in text), None)
+                if marker is not None:
+                    verdict, reason = False, f"end marker '{marker.decode()}'"
+                    break
+                image_seen = image_seen or bool(MANUAL_IMAGE_PATTERN.search(window))
+                if image_seen and bytes_read >= self.head_bytes:
+                    break
+                if bytes_read >= self.max_bytes:
+                    reason = "byte limit"
+                    break
+                tail = window[-_OVERLAP:]
+            if verdict is None and image_seen:
+                verdict, reason = True, "manual image"
+            self._finish(response, bytes_read)
+        finally:
+            response.close()
+
+        return ProbeResult(verdict, reason, OK, bytes_read)
+
+    def _finish(self, response: requests.Response, bytes_read: int):
+        """Drain short remainders so the connection goes back to the pool"""
+        try:
+            remaining = int(response.headers.get("Content-Length", "")) - bytes_read
+        except ValueError:
+            return
+        if 0 < remaining <= self.drain_limit:
+            for _ in response.iter_content(chunk_size=self.chunk_size):
+                pass
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Parallel CSV Backfill
+Features:
+- Worker-pool processing of CSV rows (e.g. page URL extraction)
+- Bounded per-host concurrency with optional spacing between requests
+- Crash-safe append-only output with resume from a partially written file
+- Final output in input order or completion order, keyed by URL
+- Optional largest-first scheduling by estimated cost, and rows split into parallel parts
+- Progress bar with ETA (tqdm when installed, log lines otherwise)
+"""
+
+import os
+import csv
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from scheduling import log_schedule
+
+try:
+    from tqdm import tqdm
+except ImportError:  # tqdm is optional; fall back to log-based progress
+    tqdm = None
+
+logger = logging.getLogger(__name__)
+
+ORDERS = ("input", "completion")
+
+class HostLimiter:
+    """Caps concurrent work per host and spaces out starts on the same host"""
+
+    def __init__(self, per_host: int = 2, min_interval: float = 0.0):
+        self.per_host = per_host
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._next_start: Dict[str, float] = {}
+
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host)
+            return self._semaphores[host]
+
+    @contextmanager
+    def slot(self, url: str):
+        host = urlparse(url).netloc
+        semaphore = self._semaphore(host)
+        with semaphore:
+            if self.min_interval > 0:
+                with self._lock:
+                    now = time.monotonic()
+                    start_at = max(now, self._next_start.get(host, 0.0))
+                    self._next_start[host] = start_at + self.min_interval
+                if start_at > now:
+                    time.sleep(start_at - now)
+            yield
+
+class ProgressReporter:
+    """Progress bar with ETA; logs periodic lines when tqdm is unavailable"""
+
+    def __init__(self, total: int, desc: str = "Backfill", initial: int = 0, log_every: int = 10):
+        self.total = total
+        self.done = initial
+        self.initial = initial
+        self.desc = desc
+        self.log_every = log_every
+        self.started_at = time.monotonic()
+        self._bar = tqdm(total=total, initial=initial, desc=desc, unit="row") if tqdm else None
+
+    def update(self, n: int = 1):
+        self.done += n
+        if self._bar is not None:
+            self._bar.update(n)
+        elif self.done % self.log_every == 0 or self.done == self.total:
+            logger.info(f"[PROGRESS] {self.desc}: {self.done}/{self.total} rows, ETA {self.eta()}")
+
+    def eta(self) -> str:
+        elapsed = time.monotonic() - self.started_at
+        processed = self.done - self.initial
+        if processed <= 0 or elapsed <= 0:
+            return "unknown"
+        remaining = (self.total - self.done) * elapsed / processed
+        minutes, seconds = divmod(int(remaining), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours:d}:{minutes:02d}:{seconds:02d}"
+
+    def close(self):
+        if self._bar is not None:
+            self._bar.close()
+
+def load_completed_rows(output_path: Path, key: str = "url",
+                        is_complete: Optional[Callable[[Dict[str, str]], bool]] = None) -> Dict[str, Dict[str, str]]:
+    """Read rows already written by a previous (possibly interrupted) run
+
+    Later rows win, so a retried row supersedes its earlier failed attempt.
+    """
+    completed: Dict[str, Dict[str, str]] = {}
+    if not output_path.exists():
+        return completed
+    try:
+        with open(output_path, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                row_key = row.get(key, '')
+                if not row_key:
+                    continue
+                if is_complete is None or is_complete(row):
+                    completed[row_key] = row
+                else:
+                    completed.pop(row_key, None)
+    except Exception as e:
+        logger.warning(f"[RESUME] Could not read partial output {output_path}: {e}")
+        return {}
+    return completed
+
+def has_extracted_pages(row: Dict[str, str]) -> bool:
+    """Resume check for page backfills: the row has at least one page URL"""
+    try:
+        return int(row.get('total_image_pages') or 0) > 0
+    except ValueError:
+        return False
+
+def run_backfill(rows: List[Dict[str, str]], process_row: Callable[[int, Dict[str, str]], Dict[str, str]],
+                 output_path: Path, fieldnames: List[str], workers: int = 4, order: str = "input",
+                 resume: bool = True, key: str = "url",
+                 is_complete: Optional[Callable[[Dict[str, str]], bool]] = has_extracted_pages,
+                 desc: str = "Backfill",
+                 cost: Optional[Callable[[Dict[str, str]], float]] = None,
+                 split: Optional[Callable[[int, Dict[str, str]], Optional[List[Tuple[Any, float]]]]] = None,
+                 process_part: Optional[Callable[[int, Dict[str, str], Any], Any]] = None,
+                 merge_parts: Optional[Callable[[int, Dict[str, str], List[Any]], Dict[str, str]]] = None
+                 ) -> List[Dict[str, str]]:
+    """Process CSV rows on a worker pool and write the results to output_path
+
+    Args:
+        rows: Input rows, in file order
+        process_row: Called as process_row(index, row) on a worker thread; returns the output row
+        output_path: CSV to write; rows are appended as they finish so a crash loses nothing
+        fieldnames: Output CSV columns
+        workers: Worker threads
+        order: "input" rewrites the final file in input order, "completion" keeps finish order
+        resume: Reuse rows from an existing output file instead of reprocessing them
+        key: Column identifying a row across runs
+        is_complete: Predicate deciding whether a previously written row can be reused
+        desc: Label for progress and schedule log lines
+        cost: Estimated cost of a row; when given, the most expensive work starts first
+        split: Returns [(part, part_cost), ...] to process a row as independent parts,
+            or None to process it whole with process_row
+        process_part: Called as process_part(index, row, part) on a worker thread
+        merge_parts: Called as merge_parts(index, row, part_results) once all parts finish;
+            returns the output row
+
+    Returns:
+        Output rows in the requested order
+    """
+    if order not in ORDERS:
+        raise ValueError(f"Unknown output order '{order}', expected one of {ORDERS}")
+    if split is not None and (process_part is None or merge_parts is None):
+        raise ValueError("split requires process_part and merge_parts")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    completed = load_completed_rows(output_path, key, is_complete) if resume else {}
+    results: Dict[int, Dict[str, str]] = {}
+    pending = []
+    for index, row in enumerate(rows):
+        row_key = row.get(key, '')
+        if row_key and row_key in completed:
+            results[index] = completed[row_key]
+        else:
+            pending.append(index)
+
+    if completed:
+        logger.info(f"[RESUME] Reusing {len(results)} rows from {output_path}, {len(pending)} left to process")
+
+    # Append to the partial output; start fresh if not resuming or there is no valid header
+    if not resume or not completed:
+        with open(output_path, 'w', newline='', encoding='utf-8') as f:
+            csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore').writeheader()
+    completion_order = list(results.keys())
+
+    # Work units are whole rows (part None) or (number, part) pieces of split rows
+    tasks: List[Tuple[int, Any, float]] = []
+    part_results: Dict[int, List[Any]] = {}
+    for index in pending:
+        parts = split(index, rows[index]) if split is not None else None
+        if parts:
+            part_results[index] = [None] * len(parts)
+            tasks.extend((index, (number, part), part_cost) for number, (part, part_cost) in enumerate(parts))
+        else:
+            tasks.append((index, None, cost(rows[index]) if cost is not None else 0.0))
+    if cost is not None:
+        input_costs = [task[2] for task in tasks]
+        # Longest processing time first: big manuals start early instead of finishing last
+        tasks.sort(key=lambda task: -task[2])
+        log_schedule(input_costs, [task[2] for task in tasks], workers, desc)
+    parts_left = {index: len(parts) for index, parts in part_results.items()}
+    failed = set()
+
+    def run_task(index: int, part: Any):
+        if part is None:
+            return process_row(index, rows[index])
+        return process_part(index, rows[index], part[1])
+
+    progress = ProgressReporter(len(rows), desc=desc, initial=len(results))
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="backfill")
+    try:
+        with open(output_path, 'a', newline='', encoding='utf-8') as out:
+            writer = csv.DictWriter(out, fieldnames=fieldnames, extrasaction='ignore')
+            futures = {executor.submit(run_task, index, part): (index, part) for index, part, _ in tasks}
+            for future in as_completed(futures):
+                index, part = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"[BACKFILL] Row {index + 1} failed: {e}")
+                    failed.add(index)
+                    result = None
+
+                if part is not None:
+                    # A split row is written once, when its last part finishes
+                    part_results[index][part[0]] = result
+                    parts_left[index] -= 1
+                    if parts_left[index] > 0:
+                        continue
+                    if index not in failed:
+                        try:
+                            result = merge_parts(index, rows[index], part_results[index])
+                        except Exception as e:
+                            logger.error(f"[BACKFILL] Row {index + 1} failed to merge: {e}")
+                            failed.add(index)
+                    del part_results[index]
+                if index in failed:
+                    result = dict(rows[index])
+
+                results[index] = result
+                completion_order.append(index)
+                writer.writerow(result)
+                out.flush()
+                progress.update()
+    except KeyboardInterrupt:
+        # Everything finished so far is already on disk; the next run resumes from it
+        logger.warning(f"[BACKFILL] Interrupted, {len(results)}/{len(rows)} rows saved to {output_path}")
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        progress.close()
+
+    ordered_indexes = sorted(results) if order == "input" else completion_order
+    final_rows = [results[index] for index in ordered_indexes]
+
+    # Rewrite once at the end to drop superseded attempts and apply the ordering
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(final_rows)
+    os.replace(tmp_path, output_path)
+
+    return final_rows
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Process-Pool HTML Parse Offload
+Features:
+- Raw response bytes go to worker processes; only small results come back
+  (listing links, manual metadata, has-content flags, image URLs)
+- Fetch threads stop competing for the GIL with BeautifulSoup, so fetching
+  and parsing scale independently (parse_workers=0 parses inline)
+- Parse functions are plain module-level functions, usable without a pool
+- Benchmark of parsed pages/sec against worker count
+"""
+
+import re
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from bs4 import BeautifulSoup
+
+from manual_info import parse_manual_info, harvest_listing_info
+
+logger = logging.getLogger(__name__)
+
+# Extra URL words accepted on top of the scraper's manual types
+EXTENDED_MANUAL_TYPES = (
+    "owner-handbook", "user-handbook", "navigation-manual", "navigation",
+    "infotainment", "manual", "guide", "quick", "quick-guide",
+    "audio", "radio", "multimedia", "wiring", "electrical",
+    "parts", "engine", "transmission", "troubleshooting"
+)
+
+# Visible text marking the page after a manual's last one; page_probe matches the same list
+END_INDICATORS = ("no next", "page not found", "404", "not available", "end of manual", "last page", "no more pages")
+
+@lru_cache(maxsize=256)
+def _manual_url_patterns(brand: str, manual_types: Tuple[str, ...]) -> Tuple["re.Pattern", "re.Pattern"]:
+    """Compiled listing-link patterns for a brand (built once per brand, not per link)"""
+    types = "|".join(manual_types + EXTENDED_MANUAL_TYPES)
+    manual = re.compile(
+        r"^/" + brand + r"-[\w\-]+-\d{4}-(" + types + r")-manual"    # Standard format
+        r"|^/" + brand + r"-[\w\-]+-\d{4}-(" + types + r")$"         # Without "-manual" suffix
+        r"|^/" + brand + r"-[\w\-]+-(" + types + r")-manual"         # Without year
+        r"|^/" + brand + r"-[\w\-]+-(" + types + r")$"               # Simple format
+    )
+    basic = re.compile(r"^/" + brand + r"-[\w\-]+")
+    return manual, basic
+
+def is_valid_manual_url(href: str, brand: str, manual_types: Sequence[str]) -> bool:
+    """Check if a listing link points at a manual page"""
+    # Filter out query parameters, view pages, warning pages, and google vignette noise
+    if "?" in href or "/view/" in href or "warning" in href or "#google_vignette" in href:
+        return False
+    manual, basic = _manual_url_patterns(brand, tuple(manual_types))
+    if manual.search(href):
+        return True
+    # Fallback: if it contains "manual" and matches basic brand-model structure
+    return "manual" in href.lower() and bool(basic.search(href))
+
+def _soup(content: bytes, encoding: Optional[str]) -> BeautifulSoup:
+    return BeautifulSoup(content, "html.parser", from_encoding=encoding)
+
+def parse_listing(content: bytes, encoding: Optional[str], brand: str,
+                  manual_types: Sequence[str]) -> List[Tuple[str, str, Dict[str, str]]]:
+    """Manual links on a brand listing page as (href, link_text, listing_info), in page order"""
+    links = []
+    for link in _soup(content, encoding).find_all("a", href=True):
+        href = link["href"]
+        if not is_valid_manual_url(href, brand, manual_types):
+            continue
+        # Only process links with meaningful text
+        link_text = link.text.strip()
+        if not link_text or len(link_text) < 5:
+            continue
+        links.append((href, link_text, harvest_listing_info(link)))
+    return links
+
+def parse_manual_page(content: bytes, encoding: Optional[str]) -> Dict[str, str]:
+    """pages_count / file_size from a manual's landing page"""
+    return parse_manual_info(_soup(content, encoding).get_text())
+
+def parse_image_page(content: bytes, encoding: Optional[str], page_number: int) -> Optional[bool]:
+    """True if a manual page has content, False if not, None at the end of the manual"""
+    soup = _soup(content, encoding)
+    page_content = soup.get_text().lower()
+    if any(indicator in page_content for indicator in END_INDICATORS):
+        return None
+    # Check if page has actual manual content (images or manual text)
+    return bool(
+        soup.find("img") or
+        "manual" in page_content or
+        "page" in page_content and str(page_number) in page_content
+    )
+
+def parse_page_image(content: bytes, encoding: Optional[str]) -> Optional[str]:
+    """src of the page image shown on a manual page, if any"""
+    img = _soup(content, encoding).select_one('img[src^="/img/"], img[data-src]')
+    if img is None:
+        return None
+    return img.get("data-src") or img.get("src")
+
+class ParseOffload:
+    """Runs parse functions inline (workers=0) or in a process pool
+
+    Callers block on the result, but while a worker process parses, the
+    calling thread holds no GIL, so other fetch threads keep running.
+    """
+
+    def __init__(self, workers: int = 0):
+        self.workers = max(0, workers)
+        self._pool = None
+        if self.workers:
+            # spawn: forking a process full of threads can copy held locks into the child
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+            logger.info(f"[PARSE] Parsing HTML in {self.workers} worker processes")
+
+    def run(self, func: Callable, *args):
+        if self._pool is None:
+            return func(*args)
+        return self._pool.submit(func, *args).result()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+# ---------------------------------------------------------------------------
+# Benchmark
+
+def sample_listing_page(brand: str = "audi", cards: int = 120) -> bytes:
+    """A listing page shaped like the real site: navigation, cards with metadata, footer"""
+    nav = "".join(f'<li><a href="/b/{b}">{b.title()}</a></li>' for b in
+                  ["audi", "bmw", "ford", "kia", "lexus", "mazda", "volvo"] * 8)
+    body = "".join(
+        f'<div class="card"><a href="/{brand}-model-{i}-{2000 + i % 20}-owners-manual">'
+        f'{brand.title()} Model {i} {2000 + i % 20} Owner\'s Manual</a>'
+        f'<span>Pages: {100 + i} PDF Size: {1 + i / 10:.2f} MB</span>'
+        f'<img src="/thumbs/{i}.jpg" alt=""></div>'
+        for i in range(cards))
+    scripts = "<script>var x = 1;</script>" * 20
+    return (f"<html><head><title>{brand}</title>{scripts}</head><body><ul>{nav}</ul>"
+            f"{body}<footer>{nav}</footer></body></html>").encode("utf-8")
+
+def benchmark(worker_counts: Sequence[int], pages: int = 400, fetchers: int = 8,
+              latency: float = 0.0, content: Optional[bytes] = None) -> List[Dict]:
+    """Parse `pages` listing pages from `fetchers` threads for each worker count
+
+    latency simulates network time per fetch (sleeping, so no GIL held).
+    """
+    content = content or sample_listing_page()
+    manual_types = ["owners", "user", "service", "repair"]
+    results = []
+    for workers in worker_counts:
+        with ParseOffload(workers) as offload:
+            # Warm the pool so process start-up is not counted
+            for _ in range(max(1, workers) * 2):
+                offload.run(parse_listing, content, "utf-8", "audi", manual_types)
+
+            def fetch_and_parse(_):
+                if latency:
+                    time.sleep(latency)
+                return len(offload.run(parse_listing, content, "utf-8", "audi", manual_types))
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=fetchers) as pool:
+                links = sum(pool.map(fetch_and_parse, range(pages)))
+            elapsed = time.perf_counter() - started
+        results.append({"workers": workers, "pages": pages, "links": links,
+                        "seconds": round(elapsed, 3), "pages_per_s": round(pages / elapsed, 1)})
+    return results
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark process-pool HTML parsing")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4],
+                        help="Parse worker counts to compare (0 = parse on the fetch threads)")
+    parser.add_argument("--pages", type=int, default=400, help="Pages parsed per run")
+    parser.add_argument("--fetchers", type=int, default=8, help="Fetch threads")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated fetch latency in seconds")
+    parser.add_argument("--html", help="Benchmark on a saved listing page instead of a generated one")
+    args = parser.parse_args()
+
+    content = open(args.html, "rb").read() if args.html else None
+    results = benchmark(args.workers, args.pages, args.fetchers, args.latency, content)
+    baseline = results[0]["pages_per_s"]
+    print(f"{'workers':>8} {'pages/s':>9} {'speedup':>8}")
+    for row in results:
+        print(f"{row['workers']:>8} {row['pages_per_s']:>9} {row['pages_per_s'] / baseline:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
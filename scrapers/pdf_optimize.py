@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Size-Optimized PDF Builds
+Features:
+- Page images downsampled to a target DPI and recompressed as JPEG
+  (or lossless PNG, for PNG line art where that is smaller)
+- Pages that are grey in all but a handful of pixels stored as grayscale
+- A page is only replaced when the result is smaller
+- Pages optimized in a process pool; PDF assembled with img2pdf (JPEG
+  pass-through) or Pillow
+- Linearized output (pikepdf or the qpdf tool, when available) so the first
+  page shows before the whole file has downloaded
+- Per-manual report of bytes saved
+"""
+
+import io
+import os
+import csv
+import shutil
+import logging
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from PIL import Image, ImageChops
+
+try:
+    import img2pdf
+except ImportError:
+    img2pdf = None
+
+try:
+    import pikepdf
+except ImportError:
+    pikepdf = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp")
+
+@dataclass
+class OptimizeSettings:
+    """How far page images may be reduced"""
+    target_dpi: int = 150
+    page_width_in: float = 8.5  # Pages are never treated as wider than this, whatever DPI they claim
+    jpeg_quality: int = 70
+    gray_tolerance: int = 12  # Max channel spread of a pixel still treated as grey
+    gray_max_color_ratio: float = 0.001  # Share of pixels allowed above the tolerance
+    linearize: bool = True
+
+def is_grayscale(img: Image.Image, settings: OptimizeSettings) -> bool:
+    """True if converting to grayscale loses (almost) nothing"""
+    if img.mode in ("1", "L", "LA", "I", "F"):
+        return True
+    r, g, b = img.convert("RGB").split()
+    spread = ImageChops.lighter(ImageChops.lighter(ImageChops.difference(r, g), ImageChops.difference(g, b)),
+                                ImageChops.difference(r, b))
+    histogram = spread.histogram()
+    colored = sum(histogram[settings.gray_tolerance + 1:])
+    return colored <= settings.gray_max_color_ratio * img.width * img.height
+
+def optimize_page(source: Union[bytes, str], settings: OptimizeSettings) -> Tuple[bytes, Dict]:
+    """Smaller version of one page image (runs in a worker process)
+
+    Returns the new bytes, or the original ones when recompressing does not
+    help, plus what was done to the page.
+    """
+    data = source if isinstance(source, bytes) else Path(source).read_bytes()
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    dpi = max(float(img.info.get("dpi", (0, 0))[0] or 0), img.width / settings.page_width_in)
+    gray = is_grayscale(img, settings)
+    resized = dpi > settings.target_dpi * 1.05
+    if resized:
+        scale = settings.target_dpi / dpi
+        img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.LANCZOS)
+        dpi = settings.target_dpi
+    source_format = img.format
+    img = img.convert("L" if gray else "RGB")
+
+    # Line art served as PNG often stays smaller lossless, so PNG sources also try PNG
+    candidates = []
+    for fmt, options in [("JPEG", {"quality": settings.jpeg_quality})] + \
+            ([("PNG", {})] if source_format == "PNG" else []):
+        buffer = io.BytesIO()
+        img.save(buffer, fmt, optimize=True, dpi=(round(dpi), round(dpi)), **options)
+        candidates.append(buffer.getvalue())
+    optimized = min(candidates, key=len)
+    info = {"in": len(data), "gray": gray, "resized": resized}
+    if len(optimized) >= len(data):
+        return data, dict(info, out=len(data), kept=True)
+    return optimized, dict(info, out=len(optimized), kept=False)
+
+def optimize_pages(sources: Sequence[Union[bytes, str]], settings: OptimizeSettings,
+                   workers: int = 0) -> List[Tuple[bytes, Dict]]:
+    """optimize_page over all pages, in page order (workers=0 runs inline)"""
+    if workers and len(sources) > 1:
+        # spawn: forking a process full of threads can copy held locks into the child
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            return list(pool.map(optimize_page, sources, repeat(settings), chunksize=4))
+    return [optimize_page(source, settings) for source in sources]
+
+def linearize_pdf(path: str) -> bool:
+    """Rewrite a PDF linearized in place; False when no linearizer is installed"""
+    tmp_path = path + ".lin"
+    try:
+        if pikepdf is not None:
+            with pikepdf.open(path) as pdf:
+                pdf.save(tmp_path, linearize=True)
+        elif shutil.which("qpdf"):
+            subprocess.run(["qpdf", "--linearize", path, tmp_path], check=True, capture_output=True)
+        else:
+            return False
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        logger.warning(f"[PDF] Could not linearize {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+def write_pdf(pages: List[bytes], output: str, settings: OptimizeSettings):
+    """Assemble page images into a PDF at output (atomically)"""
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output + ".tmp"
+    if img2pdf is not None:
+        with open(tmp_path, "wb") as f:
+            f.write(img2pdf.convert(pages))
+    else:
+        images = [Image.open(io.BytesIO(page)) for page in pages]
+        images[0].save(tmp_path, "PDF", save_all=True, append_images=images[1:],
+                       resolution=float(settings.target_dpi), quality=settings.jpeg_quality)
+    os.replace(tmp_path, output)
+
+def build_optimized_pdf(sources: Sequence[Union[bytes, str]], output: str,
+                        settings: Optional[OptimizeSettings] = None, workers: int = 0) -> Dict:
+    """Optimize page images (bytes or file paths) and write them as one PDF
+
+    Returns the size report for the manual.
+    """
+    settings = settings or OptimizeSettings()
+    if not sources:
+        raise ValueError(f"No page images for {output}")
+    results = optimize_pages(sources, settings, workers)
+    write_pdf([page for page, _ in results], output, settings)
+    linearized = settings.linearize and linearize_pdf(output)
+
+    source_bytes = sum(info["in"] for _, info in results)
+    pdf_bytes = os.path.getsize(output)
+    report = {
+        "output": output,
+        "pages": len(results),
+        "source_bytes": source_bytes,
+        "pdf_bytes": pdf_bytes,
+        "saved_bytes": source_bytes - pdf_bytes,
+        "saved_pct": round(100.0 * (source_bytes - pdf_bytes) / source_bytes, 1) if source_bytes else 0.0,
+        "gray_pages": sum(1 for _, info in results if info["gray"]),
+        "resized_pages": sum(1 for _, info in results if info["resized"]),
+        "kept_pages": sum(1 for _, info in results if info["kept"]),
+        "linearized": linearized,
+    }
+    logger.info(f"[PDF] {output}: {report['pages']} pages, {source_bytes / 1e6:.1f} MB -> "
+                f"{pdf_bytes / 1e6:.1f} MB ({report['saved_pct']}% saved, {report['gray_pages']} grayscale, "
+                f"{report['resized_pages']} downsampled{', linearized' if linearized else ''})")
+    return report
+
+REPORT_FIELDS = ["output", "pages", "source_bytes", "pdf_bytes", "saved_bytes", "saved_pct",
+                 "gray_pages", "resized_pages", "kept_pages", "linearized"]
+
+def append_report(report: Dict, report_csv: str):
+    """Add one manual's size report to a CSV"""
+    path = Path(report_csv)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    new_file = not path.exists()
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS, extrasaction="ignore")
+        if new_file:
+            writer.writeheader()
+        writer.writerow(report)
+
+def page_images(image_dir: Union[str, Path]) -> List[Path]:
+    """A manual's page images in page order"""
+    return sorted(p for p in Path(image_dir).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+
+def add_arguments(parser):
+    """Optimization flags shared by the CLIs that build PDFs"""
+    defaults = OptimizeSettings()
+    parser.add_argument("--target-dpi", type=int, default=defaults.target_dpi, help="Downsample pages above this DPI")
+    parser.add_argument("--jpeg-quality", type=int, default=defaults.jpeg_quality, help="JPEG quality of recompressed pages")
+    parser.add_argument("--no-linearize", action="store_true", help="Skip PDF linearization")
+    parser.add_argument("--optimize-workers", type=int, default=os.cpu_count() or 1,
+                        help="Page optimization processes (0 = inline)")
+
+def settings_from_args(args) -> OptimizeSettings:
+    return OptimizeSettings(target_dpi=args.target_dpi, jpeg_quality=args.jpeg_quality,
+                            linearize=not args.no_linearize)
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build size-optimized PDFs from downloaded page images")
+    parser.add_argument("--images-dir", default="scraped_data/audi_pages", help="Per-manual page image folders")
+    parser.add_argument("--pdf-dir", default="data/manuals", help="Where to write the PDFs")
+    parser.add_argument("--report", default="scraped_data/pdf_optimize_report.csv", help="Size report CSV")
+    parser.add_argument("slugs", nargs="*", help="Only these manual folders (default: all)")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    settings = settings_from_args(args)
+    folders = [Path(args.images_dir) / slug for slug in args.slugs] or \
+        sorted(p for p in Path(args.images_dir).iterdir() if p.is_dir())
+    saved = 0
+    for folder in folders:
+        images = page_images(folder)
+        if not images:
+            logger.warning(f"[PDF] No page images in {folder}")
+            continue
+        report = build_optimized_pdf([str(p) for p in images], str(Path(args.pdf_dir) / f"{folder.name}.pdf"),
+                                     settings, workers=args.optimize_workers)
+        append_report(report, args.report)
+        saved += report["saved_bytes"]
+    print(f"📉 {len(folders)} manuals, {saved / 1e6:.1f} MB saved (report: {args.report})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Pipelined Crawl Stages
+Features:
+- Producer/consumer stages connected by bounded queues
+- Per-stage worker counts; a full queue blocks upstream workers (backpressure)
+- Memory bounded by the queue sizes, not by the size of the crawl
+- Per-stage queue depth, throughput and utilization, logged and exported as metrics
+"""
+
+import time
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tells a worker that its upstream stage has finished
+_DONE = object()
+
+class Stage:
+    """One pipeline step run by a pool of worker threads
+
+    func receives one item. A regular stage passes its return value downstream;
+    a fan_out stage returns an iterable whose elements are passed downstream
+    one by one as they are produced. None results are dropped.
+    """
+
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1,
+                 queue_size: int = 100, fan_out: bool = False):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.fan_out = fan_out
+        self.inbox: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self.received = 0
+        self.completed = 0
+        self.emitted = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+        self._active_workers = 0
+
+    def stats(self, elapsed: float) -> Dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.inbox.qsize(),
+                "queue_size": self.inbox.maxsize,
+                "received": self.received,
+                "completed": self.completed,
+                "emitted": self.emitted,
+                "errors": self.errors,
+                "throughput_per_s": round(self.completed / elapsed, 3) if elapsed > 0 else 0.0,
+                "utilization": round(self.busy_seconds / (elapsed * self.workers), 3) if elapsed > 0 else 0.0,
+            }
+
+class Pipeline:
+    """Runs items through a chain of stages, all stages working at once"""
+
+    def __init__(self, stages: List[Stage], sink: Optional[Callable[[Any], None]] = None,
+                 metrics=None, report_interval: float = 30.0, output_queue_size: int = 100):
+        """
+        Args:
+            stages: Stages in order; each feeds the next
+            sink: Called on the calling thread for every item leaving the last stage
+            metrics: Optional ScraperMetrics for queue depth gauges and stage timings
+            report_interval: Seconds between [PIPELINE] progress log lines (0 disables)
+            output_queue_size: Bound on finished items waiting for the sink
+        """
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = stages
+        self.sink = sink
+        self.metrics = metrics
+        self.report_interval = report_interval
+        self.output: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, output_queue_size))
+        self.started_at = 0.0
+        self._stop_reporting = threading.Event()
+
+    def _downstream(self, index: int) -> "queue.Queue[Any]":
+        return self.stages[index + 1].inbox if index + 1 < len(self.stages) else self.output
+
+    def _worker(self, index: int):
+        stage = self.stages[index]
+        downstream = self._downstream(index)
+        try:
+            while True:
+                item = stage.inbox.get()
+                if item is _DONE:
+                    break
+                with stage._lock:
+                    stage.received += 1
+                started = time.perf_counter()
+                busy = 0.0
+                try:
+                    results = stage.func(item) if stage.fan_out else [stage.func(item)]
+                    for result in results:
+                        if result is None:
+                            continue
+                        # Time spent blocked on a full downstream queue is not work
+                        busy += time.perf_counter() - started
+                        downstream.put(result)
+                        started = time.perf_counter()
+                        with stage._lock:
+                            stage.emitted += 1
+                except Exception as e:
+                    logger.error(f"[PIPELINE] {stage.name} failed on {item!r}: {e}")
+                    with stage._lock:
+                        stage.errors += 1
+                finally:
+                    busy += time.perf_counter() - started
+                    with stage._lock:
+                        stage.busy_seconds += busy
+                        stage.completed += 1
+                    if self.metrics is not None:
+                        self.metrics.observe(f"pipeline_{stage.name}", busy)
+                        self.metrics.inc(f"pipeline_{stage.name}_items_total")
+        finally:
+            # The last worker out tells every downstream worker to finish
+            with stage._lock:
+                stage._active_workers -= 1
+                last = stage._active_workers == 0
+            if last:
+                consumers = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+                for _ in range(consumers):
+                    downstream.put(_DONE)
+
+    def _feed(self, items: Iterable):
+        first = self.stages[0]
+        try:
+            for item in items:
+                first.inbox.put(item)
+        finally:
+            for _ in range(first.workers):
+                first.inbox.put(_DONE)
+
+    def _report_loop(self):
+        while not self._stop_reporting.wait(self.report_interval):
+            self.report()
+
+    def report(self):
+        """Log one line per stage and refresh the queue depth gauges"""
+        for name, stats in self.stats().items():
+            logger.info(f"[PIPELINE] {name}: queue {stats['queue_depth']}/{stats['queue_size']}, "
+                        f"{stats['completed']} done, {stats['throughput_per_s']}/s, "
+                        f"{stats['utilization']:.0%} busy, {stats['errors']} errors")
+            if self.metrics is not None:
+                self.metrics.set_gauge(f"pipeline_{name}_queue_depth", stats["queue_depth"])
+
+    def stats(self) -> Dict[str, Dict]:
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {stage.name: stage.stats(elapsed) for stage in self.stages}
+
+    def run(self, items: Iterable) -> Dict[str, Dict]:
+        """Push items through every stage; returns the final per-stage stats"""
+        self.started_at = time.monotonic()
+        threads = []
+        for index, stage in enumerate(self.stages):
+            stage._active_workers = stage.workers
+            for n in range(stage.workers):
+                thread = threading.Thread(target=self._worker, args=(index,),
+                                          name=f"pipeline-{stage.name}-{n}", daemon=True)
+                thread.start()
+                threads.append(thread)
+        threading.Thread(target=self._feed, args=(items,), name="pipeline-feed", daemon=True).start()
+        if self.report_interval > 0:
+            threading.Thread(target=self._report_loop, name="pipeline-report", daemon=True).start()
+
+        try:
+            while True:
+                item = self.output.get()
+                if item is _DONE:
+                    break
+                if self.sink is not None:
+                    self.sink(item)
+            for thread in threads:
+                thread.join()
+        finally:
+            self._stop_reporting.set()
+
+        stats = self.stats()
+        self.report()
+        return stats
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Profiling Support for Scraper Entry Points
+Features:
+- Wrap a whole run in cProfile or a low-overhead sampling profiler; both
+  cover worker threads (cProfile with one profiler per thread, merged)
+- Per-function cumulative time reports at checkpoints and at exit
+- tracemalloc top-N allocation snapshots (with growth since the last checkpoint)
+"""
+
+import io
+import sys
+import time
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILERS = ("cprofile", "sampling")
+
+# Session that module-level checkpoint() calls report to, if any
+_active_session: Optional["ProfileSession"] = None
+
+class SamplingProfiler:
+    """Periodically samples every thread's stack from a background thread
+
+    Much cheaper than cProfile on long crawls; counts are in samples, so
+    `samples * interval` approximates seconds spent in a function.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.self_counts: Counter = Counter()
+        self.cumulative_counts: Counter = Counter()
+        self.total_samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _frame_key(frame) -> str:
+        code = frame.f_code
+        return f"{Path(code.co_filename).name}:{code.co_firstlineno}({code.co_name})"
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            self.total_samples += 1
+            self.self_counts[self._frame_key(frame)] += 1
+            seen = set()
+            while frame is not None:
+                key = self._frame_key(frame)
+                if key not in seen:
+                    seen.add(key)
+                    self.cumulative_counts[key] += 1
+                frame = frame.f_back
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def report(self, top_n: int = 30) -> str:
+        lines = [f"Sampling profile: {self.total_samples} samples every {self.interval * 1000:.1f}ms", ""]
+        lines.append(f"{'cumulative':>10} {'self':>8}  function")
+        for key, cumulative in self.cumulative_counts.most_common(top_n):
+            lines.append(f"{cumulative:>10} {self.self_counts.get(key, 0):>8}  {key}")
+        return "\n".join(lines) + "\n"
+
+class _StatsSnapshot:
+    """pstats input holding a profiler's stats so far, taken without disabling it
+
+    A cProfile profiler can only be disabled from its own thread; reading a
+    snapshot works from any thread, so checkpoints can be written anywhere.
+    """
+
+    def __init__(self, profiler: cProfile.Profile):
+        profiler.snapshot_stats()
+        self.stats = profiler.stats
+
+    def create_stats(self):
+        pass
+
+class ThreadedCProfiler:
+    """cProfile for the starting thread and every thread started after it
+
+    cProfile only sees the thread that enabled it, so threading.setprofile
+    gives each new thread (e.g. ThreadPoolExecutor workers) its own profiler
+    and reports merge them. Threads already running at start() are not seen.
+    """
+
+    def __init__(self):
+        self._profilers = []
+        self._lock = threading.Lock()
+        self._main: Optional[cProfile.Profile] = None
+
+    def _start_thread(self, frame, event, arg):
+        # Runs as the new thread's profile hook once; enable() replaces it
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+: one profiler per interpreter, which already sees every thread
+            sys.setprofile(None)
+            return
+        with self._lock:
+            self._profilers.append(profiler)
+
+    def start(self):
+        self._main = cProfile.Profile()
+        self._profilers = [self._main]
+        threading.setprofile(self._start_thread)
+        self._main.enable()
+
+    def stop(self):
+        """Stop profiling new threads and the starting thread (call from that thread)"""
+        threading.setprofile(None)
+        if self._main is not None:
+            self._main.disable()
+
+    def stats(self, stream=None) -> pstats.Stats:
+        """Merged stats of every thread so far"""
+        with self._lock:
+            profilers = list(self._profilers)
+        stats = pstats.Stats(_StatsSnapshot(profilers[0]), stream=stream)
+        for profiler in profilers[1:]:
+            stats.add(_StatsSnapshot(profiler))
+        return stats
+
+    @property
+    def threads(self) -> int:
+        with self._lock:
+            return len(self._profilers)
+
+class ProfileSession:
+    """Profile a run and dump CPU and memory reports at checkpoints"""
+
+    def __init__(self, mode: str = "cprofile", output_dir: str = "scraped_data/profiles",
+                 top_n: int = 25, trace_memory: bool = True, name: str = "run"):
+        if mode not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{mode}', expected one of {PROFILERS}")
+        self.mode = mode
+        self.output_dir = Path(output_dir)
+        self.top_n = top_n
+        self.trace_memory = trace_memory
+        self.prefix = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.checkpoint_count = 0
+        self.started_at = 0.0
+        self._profiler = None
+        self._last_snapshot = None
+        # Backfill workers checkpoint from their own threads
+        self._checkpoint_lock = threading.Lock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        global _active_session
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.mode == "cprofile":
+            self._profiler = ThreadedCProfiler()
+            self._profiler.start()
+        else:
+            self._profiler = SamplingProfiler()
+            self._profiler.start()
+        self.started_at = time.perf_counter()
+        _active_session = self
+        logger.info(f"[PROFILE] {self.mode} profiling enabled, reports in {self.output_dir}")
+
+    def _cpu_report(self) -> str:
+        if self.mode == "sampling":
+            return self._profiler.report(self.top_n)
+        buffer = io.StringIO()
+        buffer.write(f"cProfile: {self._profiler.threads} threads\n")
+        self._profiler.stats(stream=buffer).sort_stats("cumulative").print_stats(self.top_n)
+        return buffer.getvalue()
+
+    def _memory_report(self) -> str:
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, pstats.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced memory: current={current / 1024 / 1024:.1f} MB, peak={peak / 1024 / 1024:.1f} MB", ""]
+        lines.append(f"Top {self.top_n} allocation sites:")
+        for stat in snapshot.statistics("lineno")[:self.top_n]:
+            lines.append(f"  {stat}")
+        if self._last_snapshot is not None:
+            lines.append("")
+            lines.append(f"Top {self.top_n} growth since previous checkpoint:")
+            for stat in snapshot.compare_to(self._last_snapshot, "lineno")[:self.top_n]:
+                lines.append(f"  {stat}")
+        self._last_snapshot = snapshot
+        return "\n".join(lines) + "\n"
+
+    def checkpoint(self, label: str = ""):
+        """Write CPU and allocation reports for the run so far (safe to call from any thread)"""
+        with self._checkpoint_lock:
+            if self._profiler is None:
+                return  # Stopped while a worker was still running
+            self.checkpoint_count += 1
+            elapsed = time.perf_counter() - self.started_at
+            safe_label = "".join(c if c.isalnum() or c in "-_" else "_" for c in label) or "checkpoint"
+            report_path = self.output_dir / f"{self.prefix}_{self.checkpoint_count:03d}_{safe_label}.txt"
+
+            sections = [f"Checkpoint '{label}' after {elapsed:.1f}s", "", self._cpu_report()]
+            if self.trace_memory and tracemalloc.is_tracing():
+                sections.append(self._memory_report())
+
+            with open(report_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(sections))
+        logger.info(f"[PROFILE] Wrote checkpoint report {report_path}")
+
+    def stop(self):
+        global _active_session
+        if self._profiler is None:
+            return
+        self.checkpoint("final")
+        with self._checkpoint_lock:
+            self._profiler.stop()
+            if self.mode == "cprofile":
+                # Raw stats for snakeviz / pstats browsing
+                self._profiler.stats().dump_stats(str(self.output_dir / f"{self.prefix}.prof"))
+            if self.trace_memory and tracemalloc.is_tracing():
+                tracemalloc.stop()
+            self._profiler = None
+        _active_session = None
+
+def checkpoint(label: str = ""):
+    """Report to the active profile session; a no-op when profiling is off"""
+    if _active_session is not None:
+        _active_session.checkpoint(label)
+
+def add_profile_arguments(parser):
+    """Register the shared --profile options on an argparse parser"""
+    parser.add_argument("--profile", action="store_true", help="Profile the run")
+    parser.add_argument("--profiler", choices=PROFILERS, default="cprofile",
+                        help="Profiler to use with --profile")
+    parser.add_argument("--profile-dir", default="scraped_data/profiles",
+                        help="Directory for profile reports")
+    parser.add_argument("--profile-top", type=int, default=25,
+                        help="Number of functions/allocation sites per report")
+    parser.add_argument("--no-trace-memory", action="store_true",
+                        help="Skip tracemalloc allocation snapshots")
+
+def profile_from_args(args, name: str = "run"):
+    """Build a ProfileSession from parsed arguments, or a null context"""
+    if not getattr(args, "profile", False):
+        return nullcontext()
+    return ProfileSession(
+        mode=args.profiler,
+        output_dir=args.profile_dir,
+        top_n=args.profile_top,
+        trace_memory=not args.no_trace_memory,
+        name=name,
+    )
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Shared Retry Policy and Per-Host Circuit Breaker
+Features:
+- Classifies request outcomes: terminal (404/410 and other 4xx) vs retryable
+  (429, 5xx, timeouts, connection resets)
+- Jittered exponential backoff that honours Retry-After
+- Per-host circuit breaker that stops hammering a site during outages
+- urllib3 Retry / HTTPAdapter equivalents for plain requests sessions
+"""
+
+import time
+import random
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Request outcomes
+OK = "ok"
+NOT_FOUND = "not_found"         # 404/410: the resource does not exist, never retry
+CLIENT_ERROR = "client_error"   # other 4xx: retrying will not help
+THROTTLED = "throttled"         # 429
+SERVER_ERROR = "server_error"   # 5xx
+TIMEOUT = "timeout"             # read/connect timeouts and 408
+CONNECTION_ERROR = "connection_error"  # resets, refused connections, DNS failures
+CIRCUIT_OPEN = "circuit_open"   # request not sent: the host's circuit is open
+
+RETRYABLE_OUTCOMES = {THROTTLED, SERVER_ERROR, TIMEOUT, CONNECTION_ERROR}
+TERMINAL_OUTCOMES = {NOT_FOUND, CLIENT_ERROR}
+RETRYABLE_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request while a host's circuit is open"""
+
+def classify_status(status_code: int) -> str:
+    """Map an HTTP status code to an outcome"""
+    if status_code in (404, 410):
+        return NOT_FOUND
+    if status_code == 408:
+        return TIMEOUT
+    if status_code == 429:
+        return THROTTLED
+    if status_code >= 500:
+        return SERVER_ERROR
+    if status_code >= 400:
+        return CLIENT_ERROR
+    return OK
+
+def classify_exception(exc: Exception) -> str:
+    """Map a requests exception to an outcome"""
+    if isinstance(exc, CircuitOpenError):
+        return CIRCUIT_OPEN
+    response = getattr(exc, "response", None)
+    if response is not None:
+        return classify_status(response.status_code)
+    if isinstance(exc, requests.exceptions.Timeout):
+        return TIMEOUT
+    return CONNECTION_ERROR
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds from now"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+@dataclass
+class RetryPolicy:
+    """How many times to try a request and how long to wait in between"""
+    max_attempts: int = 3
+    base_delay: float = 1.0
+    throttle_base_delay: float = 5.0  # 429s back off harder than transient errors
+    max_delay: float = 60.0
+    max_retry_after: float = 300.0  # ignore absurd Retry-After values beyond this
+
+    def should_retry(self, outcome: str, attempt: int) -> bool:
+        """attempt is zero-based; True if another attempt should follow"""
+        return outcome in RETRYABLE_OUTCOMES and attempt < self.max_attempts - 1
+
+    def backoff(self, attempt: int, outcome: str, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before the next attempt (equal-jitter exponential)"""
+        base = self.throttle_base_delay if outcome == THROTTLED else self.base_delay
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after) + random.uniform(0, base)
+        ceiling = min(self.max_delay, base * (2 ** attempt))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    def urllib3_retry(self) -> Retry:
+        """Equivalent urllib3 Retry for sessions that retry inside the adapter"""
+        kwargs = dict(
+            total=self.max_attempts - 1,
+            backoff_factor=self.base_delay,
+            status_forcelist=list(RETRYABLE_STATUS_CODES),
+            allowed_methods=["HEAD", "GET", "OPTIONS"],
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        try:
+            return Retry(backoff_max=self.max_delay, backoff_jitter=self.base_delay, **kwargs)
+        except TypeError:  # urllib3 < 2.0 has no jitter/max options
+            return Retry(**kwargs)
+
+DEFAULT_POLICY = RetryPolicy()
+
+class _HostCircuit:
+    def __init__(self):
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.reset_timeout = 0.0
+        self.probe_in_flight = False
+
+class HostCircuitBreakers:
+    """Per-host circuit breakers
+
+    After `failure_threshold` consecutive retryable failures the host's circuit
+    opens and requests wait (or fail fast) for `reset_timeout` seconds. Then a
+    single probe request is let through: success closes the circuit, failure
+    re-opens it with a doubled timeout (up to `max_reset_timeout`).
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 max_reset_timeout: float = 600.0):
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._lock = threading.Lock()
+        self._circuits: Dict[str, _HostCircuit] = {}
+
+    def _circuit(self, host: str) -> _HostCircuit:
+        circuit = self._circuits.get(host)
+        if circuit is None:
+            circuit = self._circuits[host] = _HostCircuit()
+        return circuit
+
+    def state(self, url: str) -> str:
+        with self._lock:
+            return self._circuit(urlparse(url).netloc).state
+
+    def _try_acquire(self, host: str) -> float:
+        """0 if a request may be sent now, otherwise seconds to wait"""
+        with self._lock:
+            circuit = self._circuit(host)
+            if circuit.state == "closed":
+                return 0.0
+            if circuit.state == "open":
+                remaining = circuit.opened_at + circuit.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    return remaining
+                circuit.state = "half_open"
+                circuit.probe_in_flight = False
+            if not circuit.probe_in_flight:
+                circuit.probe_in_flight = True
+                return 0.0
+            return 1.0  # wait for the probe's verdict
+
+    def wait_until_allowed(self, url: str, max_wait: float) -> bool:
+        """Block until the host accepts requests; False if that takes longer than max_wait"""
+        host = urlparse(url).netloc
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self._try_acquire(host)
+            if wait <= 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(min(wait, 1.0))
+
+    def record(self, url: str, outcome: str):
+        """Update the host's circuit with a request outcome"""
+        if outcome == CIRCUIT_OPEN:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            circuit = self._circuit(host)
+            if outcome not in RETRYABLE_OUTCOMES:
+                if circuit.state != "closed":
+                    logger.info(f"[CIRCUIT] {host} recovered, closing circuit")
+                circuit.state = "closed"
+                circuit.failures = 0
+                circuit.probe_in_flight = False
+                return
+
+            circuit.failures += 1
+            if circuit.state == "half_open":
+                circuit.reset_timeout = min(circuit.reset_timeout * 2, self.max_reset_timeout)
+                self._open(host, circuit)
+            elif circuit.state == "closed" and circuit.failures >= self.failure_threshold:
+                circuit.reset_timeout = self.base_reset_timeout
+                self._open(host, circuit)
+
+    def _open(self, host: str, circuit: _HostCircuit):
+        circuit.state = "open"
+        circuit.opened_at = time.monotonic()
+        circuit.probe_in_flight = False
+        logger.warning(f"[CIRCUIT] {host} failing ({circuit.failures} consecutive errors), "
+                       f"pausing requests for {circuit.reset_timeout:.0f}s")
+
+# Shared by extractors that do not bring their own breakers
+DEFAULT_BREAKERS = HostCircuitBreakers()
+
+def fetch_with_retry(send: Callable[[], requests.Response], url: str,
+                     policy: RetryPolicy = DEFAULT_POLICY,
+                     breakers: Optional[HostCircuitBreakers] = None,
+                     on_retry: Optional[Callable[[int, str, float, Optional[float]], None]] = None
+                     ) -> Tuple[Optional[requests.Response], str]:
+    """Run `send` under the retry policy and circuit breaker
+
+    Args:
+        send: Performs one request and returns the response (errors may raise)
+        url: Request URL, used for the host's circuit and for logging
+        policy: Retry policy
+        breakers: Circuit breakers to consult and update (optional)
+        on_retry: Called as on_retry(attempt, outcome, delay, retry_after) before each backoff sleep
+
+    Returns:
+        (response, outcome); response is None unless the outcome is OK
+    """
+    outcome = CONNECTION_ERROR
+    for attempt in range(policy.max_attempts):
+        if breakers is not None and not breakers.wait_until_allowed(url, policy.max_delay):
+            logger.error(f"[CIRCUIT] Circuit open for {urlparse(url).netloc}, not fetching {url}")
+            return None, CIRCUIT_OPEN
+
+        response = None
+        error: Optional[Exception] = None
+        try:
+            response = send()
+            outcome = classify_status(response.status_code)
+        except requests.exceptions.RequestException as e:
+            error = e
+            outcome = classify_exception(e)
+        except Exception:
+            # Release a half-open probe slot before propagating unexpected errors
+            if breakers is not None:
+                breakers.record(url, CONNECTION_ERROR)
+            raise
+
+        if breakers is not None:
+            breakers.record(url, outcome)
+
+        if outcome == OK:
+            return response, OK
+        if outcome in TERMINAL_OUTCOMES:
+            logger.debug(f"Terminal {outcome} for {url}, not retrying")
+            return None, outcome
+
+        reason = error if error is not None else f"HTTP {response.status_code}"
+        if not policy.should_retry(outcome, attempt):
+            logger.error(f"Failed to fetch {url} after {attempt + 1} attempts: {reason}")
+            return None, outcome
+
+        retry_after = None
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        delay = policy.backoff(attempt, outcome, retry_after)
+        if on_retry is not None:
+            on_retry(attempt, outcome, delay, retry_after)
+        logger.warning(f"Attempt {attempt + 1} failed for {url} ({outcome}), retrying in {delay:.1f}s: {reason}")
+        time.sleep(delay)
+
+    return None, outcome
+
+class CircuitBreakerAdapter(HTTPAdapter):
+    """HTTPAdapter that consults per-host circuit breakers around every send"""
+
+    def __init__(self, breakers: HostCircuitBreakers = DEFAULT_BREAKERS, max_wait: float = 60.0, **kwargs):
+        self.breakers = breakers
+        self.max_wait = max_wait
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if not self.breakers.wait_until_allowed(request.url, self.max_wait):
+            raise CircuitOpenError(f"Circuit open for {urlparse(request.url).netloc}", request=request)
+        try:
+            response = super().send(request, **kwargs)
+        except requests.exceptions.RequestException as e:
+            self.breakers.record(request.url, classify_exception(e))
+            raise
+        self.breakers.record(request.url, classify_status(response.status_code))
+        return response
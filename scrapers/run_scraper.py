@@ -8,6 +8,7 @@ import argparse
 from pathlib import Path
 from scrape_all_manuals_improved import CarManualScraper, ScrapingConfig
 from config import BRANDS, SCRAPING_CONFIG, HEADERS
+from profiling import add_profile_arguments, profile_from_args
 import logging
 
 def setup_logging(level="INFO"):
@@ -29,6 +30,7 @@ def main():
     parser.add_argument('--delay', type=float, nargs=2, default=[1.0, 2.0], help='Delay range between requests')
     parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
     parser.add_argument('--output-dir', default='scraped_data', help='Output directory')
+    add_profile_arguments(parser)
     
     args = parser.parse_args()
     
@@ -52,7 +54,7 @@ def main():
     logger.info(f"⚙️  Config: max_pages={args.max_pages}, timeout={args.timeout}s")
     
     try:
-        with CarManualScraper(config) as scraper:
+        with profile_from_args(args, name="run_scraper"), CarManualScraper(config) as scraper:
             manuals = scraper.scrape_all_brands(args.brands)
             
         logger.info(f"✅ Scraping completed successfully!")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Cost-Aware Scheduling for Manual Backfills
+Features:
+- Estimate a manual's work from pages_count, falling back to file_size
+- Longest-processing-time-first (LPT) ordering so big manuals start early
+- Split huge manuals into page-range sub-jobs that run in parallel
+- Makespan estimates for comparing schedules in logs
+"""
+
+import re
+import heapq
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEDULES = ("lpt", "input")
+
+# Observed in the CSVs: ~7 pages per MB of PDF (e.g. 322 pages / 44.16 MB)
+PAGES_PER_MB = 7.3
+# Cost assumed for manuals with neither pages_count nor file_size
+DEFAULT_PAGES = 100.0
+
+_SIZE_PATTERN = re.compile(r'^\s*([\d.]+)\s*([KMGT]?B)\s*$', re.IGNORECASE)
+_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4}
+
+def parse_file_size(value: Optional[str]) -> Optional[int]:
+    """Parse "44.16 MB" style sizes into bytes"""
+    if not value:
+        return None
+    match = _SIZE_PATTERN.match(value)
+    if not match:
+        return None
+    try:
+        return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+    except ValueError:
+        return None
+
+def estimate_pages(row: Dict[str, str]) -> Optional[int]:
+    """Best guess at a manual's page count from its CSV row (None if unknown)"""
+    try:
+        pages = int(row.get("pages_count") or 0)
+    except ValueError:
+        pages = 0
+    if pages > 0:
+        return pages
+    size = parse_file_size(row.get("file_size"))
+    if size:
+        return max(1, int(size / _UNITS["MB"] * PAGES_PER_MB))
+    return None
+
+def estimate_cost(row: Dict[str, str]) -> float:
+    """Relative cost of processing a manual, in pages"""
+    pages = estimate_pages(row)
+    return float(pages) if pages else DEFAULT_PAGES
+
+def lpt_order(items: Sequence, cost: Callable = estimate_cost) -> List[int]:
+    """Indexes of items, most expensive first (ties keep input order)"""
+    return sorted(range(len(items)), key=lambda i: -cost(items[i]))
+
+def estimate_makespan(costs: Sequence[float], workers: int) -> float:
+    """Finish time of list scheduling: each job goes to the first free worker"""
+    finish_times = [0.0] * max(1, workers)
+    for job_cost in costs:
+        earliest = heapq.heappop(finish_times)
+        heapq.heappush(finish_times, earliest + job_cost)
+    return max(finish_times)
+
+def split_page_ranges(first_page: int, total_pages: Optional[int], chunk_pages: int) -> List[Tuple[int, Optional[int]]]:
+    """Cut pages first_page..total_pages into inclusive ranges of chunk_pages
+
+    The last range is open-ended (end None) so a pages_count that undercounts
+    the manual still discovers every page.
+    """
+    if not total_pages or chunk_pages <= 0 or total_pages - first_page + 1 <= chunk_pages:
+        return [(first_page, None)]
+    ranges: List[Tuple[int, Optional[int]]] = []
+    start = first_page
+    while start + chunk_pages <= total_pages:
+        ranges.append((start, start + chunk_pages - 1))
+        start += chunk_pages
+    ranges.append((start, None))
+    return ranges
+
+def page_range_parts(row: Dict[str, str], chunk_pages: int,
+                     first_page: int = 2) -> Optional[List[Tuple[Tuple[int, Optional[int]], float]]]:
+    """Page-range sub-jobs with their costs for a manual, or None if it is not worth splitting"""
+    total_pages = estimate_pages(row)
+    ranges = split_page_ranges(first_page, total_pages, chunk_pages)
+    if len(ranges) < 2:
+        return None
+    return [((start, end), float(max(1, (end or total_pages) - start + 1))) for start, end in ranges]
+
+def merge_page_ranges(parts: Sequence[Tuple[List[str], bool]]) -> List[str]:
+    """Join per-range page URLs in order, dropping ranges after the manual's real end
+
+    Each part is (urls, reached_end); a range that stopped early means the
+    estimate overcounted and later ranges only found stray pages.
+    """
+    urls: List[str] = []
+    for part_urls, reached_end in parts:
+        urls.extend(part_urls)
+        if not reached_end:
+            break
+    return urls
+
+def log_schedule(costs_in_order: Sequence[float], scheduled_costs: Sequence[float], workers: int, desc: str):
+    """Log the estimated makespan of the chosen schedule against input order"""
+    if not costs_in_order:
+        return
+    before = estimate_makespan(costs_in_order, workers)
+    after = estimate_makespan(scheduled_costs, workers)
+    logger.info(f"[SCHEDULE] {desc}: {len(scheduled_costs)} jobs on {workers} workers, estimated makespan "
+                f"{after:.0f} pages vs {before:.0f} in input order (largest job {max(scheduled_costs):.0f})")
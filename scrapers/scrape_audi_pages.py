@@ -6,11 +6,15 @@ import logging
 from bs4 import BeautifulSoup
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 import mimetypes
 from typing import Optional, Tuple
 
+from retry_policy import (
+    DEFAULT_POLICY, DEFAULT_BREAKERS, TERMINAL_OUTCOMES, CONNECTION_ERROR,
+    CircuitBreakerAdapter, classify_exception
+)
+from download_manifest import DownloadManifest, manifest_for, sha256_file, verify_image
+
 # Configuration
 INPUT_CSV = "scraped_data/manuals_audi.csv"
 OUTPUT_DIR = Path("scraped_data/audi_pages")
@@ -43,15 +47,8 @@ def create_session() -> requests.Session:
     """Create a requests session with retry strategy"""
     session = requests.Session()
     
-    # Define retry strategy
-    retry_strategy = Retry(
-        total=3,
-        backoff_factor=1,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["HEAD", "GET", "OPTIONS"]
-    )
-    
-    adapter = HTTPAdapter(max_retries=retry_strategy)
+    # Shared retry policy (jittered backoff, Retry-After) behind a per-host circuit breaker
+    adapter = CircuitBreakerAdapter(DEFAULT_BREAKERS, max_retries=DEFAULT_POLICY.urllib3_retry())
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     session.headers.update(HEADERS)
@@ -75,40 +72,120 @@ def get_file_extension(url: str, content_type: str = None) -> str:
     # Default to .jpg for images
     return '.jpg'
 
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+class IncompleteDownload(Exception):
+    """The body ended before Content-Length; the .part file is kept for resuming"""
+
+def _expected_size(response: requests.Response, offset: int) -> Optional[int]:
+    """Full file size announced by the server (Content-Range total or offset + Content-Length)"""
+    content_range = response.headers.get('content-range', '')
+    if '/' in content_range:
+        total = content_range.rsplit('/', 1)[-1].strip()
+        if total.isdigit():
+            return int(total)
+    length = response.headers.get('content-length')
+    if length and length.isdigit() and not response.headers.get('content-encoding'):
+        return offset + int(length)
+    return None
+
+def _adopt_existing(img_path: Path, manifest: DownloadManifest, img_url: str) -> bool:
+    """Record a page saved before manifests existed, if it decodes; delete it if it does not"""
+    for path in img_path.parent.glob(img_path.stem + '.*'):
+        if path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        problem = verify_image(path)
+        if problem is None:
+            manifest.record(img_path.stem, path.name, path.stat().st_size, sha256_file(path), img_url)
+            logging.info(f"⏭️  Verified existing file: {path.name}")
+            return True
+        logging.warning(f"⚠️  Discarding damaged {path.name}: {problem}")
+        path.unlink()
+    return False
+
+def _fetch_to_part(session: requests.Session, img_url: str, part_path: Path) -> str:
+    """Download (or resume) img_url into part_path and return the response content type
+
+    An existing .part file is resumed with a Range request; a server that
+    ignores the range (200) restarts the file and 416 means it is already complete.
+    """
+    offset = part_path.stat().st_size if part_path.exists() else 0
+    headers = {'Accept-Encoding': 'identity'}  # Range and Content-Length count raw bytes
+    if offset:
+        headers['Range'] = f"bytes={offset}-"
+    with session.get(img_url, timeout=30, stream=True, headers=headers) as response:
+        if offset and response.status_code == 416:
+            logging.info(f"⏭️  {part_path.name} was already complete")
+            return response.headers.get('content-type', '')
+        response.raise_for_status()
+        if offset and response.status_code == 206:
+            logging.info(f"⏩ Resuming {part_path.name} at {offset} bytes")
+            mode = 'ab'
+        else:
+            offset, mode = 0, 'wb'
+        expected = _expected_size(response, offset)
+        
+        # Download with streaming to handle large files
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=8192):
+                if chunk:
+                    f.write(chunk)
+        
+        size = part_path.stat().st_size
+        if expected is not None and size < expected:
+            raise IncompleteDownload(f"got {size} of {expected} bytes")
+        if expected is not None and size > expected:
+            part_path.unlink()
+            raise IncompleteDownload(f"got {size} bytes, expected {expected}; restarting")
+        return response.headers.get('content-type', '')
+
 def download_image(session: requests.Session, img_url: str, img_path: Path, 
-                  max_retries: int = 3) -> bool:
-    """Download an individual image with retry logic"""
-    if img_path.exists():
-        logging.info(f"⏭️  Skipping existing file: {img_path.name}")
+                  max_retries: int = 3, manifest: Optional[DownloadManifest] = None) -> bool:
+    """Download an individual image with retry logic
+    
+    The body goes to a .part file that survives crashes and is resumed with
+    a Range request, is checked against Content-Length and decoded, and only
+    then renamed into place and recorded in the folder's manifest. A page is
+    done when its manifest entry exists, whatever extension it was saved with.
+    """
+    manifest = manifest or manifest_for(img_path.parent)
+    if manifest.is_done(img_path.stem):
+        logging.info(f"⏭️  Skipping downloaded page: {img_path.stem}")
+        return True
+    if _adopt_existing(img_path, manifest, img_url):
         return True
     
+    part_path = img_path.with_name(img_path.stem + '.part')
     for attempt in range(max_retries):
         try:
             logging.info(f"🔄 Downloading: {img_url} (attempt {attempt + 1})")
+            content_type = _fetch_to_part(session, img_url, part_path)
             
-            with session.get(img_url, timeout=30, stream=True) as response:
-                response.raise_for_status()
-                
-                # Get proper file extension
-                content_type = response.headers.get('content-type', '')
-                if not img_path.suffix or img_path.suffix == '.jpg':
-                    proper_ext = get_file_extension(img_url, content_type)
-                    if proper_ext != img_path.suffix:
-                        img_path = img_path.with_suffix(proper_ext)
-                
-                # Download with streaming to handle large files
-                with open(img_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                
-                logging.info(f"✅ Downloaded: {img_path.name}")
-                return True
+            problem = verify_image(part_path)
+            if problem is not None:
+                part_path.unlink()
+                raise IncompleteDownload(problem)
+            
+            # Get proper file extension
+            final_path = img_path
+            if not img_path.suffix or img_path.suffix == '.jpg':
+                final_path = img_path.with_suffix(get_file_extension(img_url, content_type))
+            size = part_path.stat().st_size
+            digest = sha256_file(part_path)
+            os.replace(part_path, final_path)
+            manifest.record(img_path.stem, final_path.name, size, digest, img_url)
+            
+            logging.info(f"✅ Downloaded: {final_path.name}")
+            return True
                 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, IncompleteDownload) as e:
+            outcome = classify_exception(e) if isinstance(e, requests.exceptions.RequestException) else CONNECTION_ERROR
             logging.warning(f"⚠️  Attempt {attempt + 1} failed for {img_url}: {e}")
+            if outcome in TERMINAL_OUTCOMES:
+                logging.error(f"❌ {img_url} is not available ({outcome}), not retrying")
+                return False
             if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  # Exponential backoff
+                time.sleep(DEFAULT_POLICY.backoff(attempt, outcome))
             else:
                 logging.error(f"❌ Failed to download {img_url} after {max_retries} attempts")
                 return False
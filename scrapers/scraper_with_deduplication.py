@@ -11,20 +11,42 @@ Features:
 
 import csv
 import re
+import sys
 import time
 import random
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple, Set
-from dataclasses import dataclass, field
+from typing import List, Dict, Iterator, Optional, Sequence, Tuple, Set
+from dataclasses import dataclass
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import json
 import hashlib
+import threading
 from urllib.parse import urljoin, urlparse
 
+from metrics import ScraperMetrics, MetricsExporter
+from concurrency import AdaptiveConcurrencyController
+from retry_policy import (
+    RetryPolicy, HostCircuitBreakers, TERMINAL_OUTCOMES,
+    classify_status, classify_exception, fetch_with_retry
+)
+from listing_state import ListingFingerprintStore, ListingWraparoundDetector, fingerprint_links
+from parallel_backfill import HostLimiter, run_backfill, ORDERS
+from scheduling import SCHEDULES, estimate_cost, page_range_parts, merge_page_ranges
+from page_probe import PageProber, PageScanInterrupted, PROBE_MODES
+from manual_info import ManualInfoCache, has_manual_info
+from pipeline import Pipeline, Stage
+from page_list import compact_pages
+from sitemap_discovery import SitemapDiscovery, SitemapState, match_brand, title_from_slug
+from parse_offload import (ParseOffload, is_valid_manual_url, parse_listing, parse_manual_page,
+                           parse_image_page, parse_page_image)
+from scrape_audi_pages import download_image
+from download_manifest import manifest_for
+import profiling
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -44,8 +66,43 @@ class ScrapingConfig:
     max_retries: int = 3
     timeout: int = 20
     delay_range: Tuple[float, float] = (1.0, 2.0)
-    max_workers: int = 3
+    max_workers: int = 3  # Starting (or, without adaptive_concurrency, fixed) request parallelism
     extract_pages: bool = False  # Set to True to extract all page URLs
+    probe_mode: str = "stream"  # page discovery: "full" parse, "stream" early-closed GET, or "head" first
+    
+    # AIMD concurrency control between min_workers and max_concurrency
+    adaptive_concurrency: bool = False
+    min_workers: int = 1
+    max_concurrency: int = 16
+    target_p95_latency: float = 3.0  # seconds
+    max_error_rate: float = 0.05
+    concurrency_log_file: Optional[str] = None  # JSON-lines history of limit changes
+    
+    # Delta re-crawl: stop a brand after this many consecutive listing pages
+    # that are unchanged since the last run or contain only known manuals
+    incremental: bool = False
+    incremental_stop_after: int = 3
+    
+    # Sitemap discovery: enumerate manuals from the sitemap index instead of
+    # paginating listing pages; only new or changed (lastmod) manuals are fetched
+    sitemap: bool = False
+    sitemap_url: Optional[str] = None  # defaults to <base_url>/sitemap.xml
+    
+    # Pipelined crawl: discovery, enrichment, page extraction and download run as
+    # concurrent stages connected by bounded queues
+    pipeline: bool = False
+    discovery_workers: int = 2  # brands crawled at once
+    enrichment_workers: int = 4
+    page_workers: int = 4
+    download_workers: int = 2
+    stage_queue_size: int = 100
+    download_dir: Optional[str] = None  # download page images as a final stage when set
+    parse_workers: int = 0  # >0 parses HTML in this many processes instead of on the fetch threads
+    
+    # Live metrics export (None disables the exporter; counters are still kept)
+    metrics_file: Optional[str] = None
+    metrics_format: str = "prometheus"  # "prometheus" textfile or "jsonl"
+    metrics_interval: float = 15.0
     
     headers: Optional[Dict[str, str]] = None
     
@@ -55,19 +112,58 @@ class ScrapingConfig:
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
             }
 
-@dataclass
 class ManualEntry:
-    """Data structure for a manual entry"""
-    brand: str
-    model: str
-    year: str
-    title: str
-    slug: str
-    url: str
-    manual_type: str = ""
-    pages_count: str = ""
-    file_size: str = ""
-    image_pages: List[str] = field(default_factory=list)
+    """Data structure for a manual entry
+    
+    Slotted to keep 50k-manual runs small: categorical fields (brand, model,
+    year, type, page count, size) are interned so equal values share one
+    string, and image_pages is kept as a PageList (manual URL + page numbers)
+    that only expands to URL strings on output.
+    """
+    
+    __slots__ = ("brand", "model", "year", "title", "slug", "url",
+                 "manual_type", "pages_count", "file_size", "image_pages")
+    
+    _INTERNED = frozenset(("brand", "model", "year", "manual_type", "pages_count", "file_size"))
+    
+    def __init__(self, brand: str, model: str, year: str, title: str, slug: str, url: str,
+                 manual_type: str = "", pages_count: str = "", file_size: str = "",
+                 image_pages: Optional[Sequence[str]] = None):
+        self.brand = brand
+        self.model = model
+        self.year = year
+        self.title = title
+        self.slug = slug
+        self.url = url
+        self.manual_type = manual_type
+        self.pages_count = pages_count
+        self.file_size = file_size
+        self.image_pages = image_pages if image_pages is not None else []
+    
+    def __setattr__(self, name: str, value):
+        if name in self._INTERNED and isinstance(value, str):
+            value = sys.intern(value)
+        elif name == "image_pages":
+            value = compact_pages(self.url, value)
+        object.__setattr__(self, name, value)
+    
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ManualEntry):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+    
+    __hash__ = None
+    
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"ManualEntry({fields})"
+    
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+    
+    def __setstate__(self, state):
+        for name in self.__slots__:
+            setattr(self, name, state[name])
     
     def to_dict(self) -> Dict[str, str]:
         return {
@@ -101,6 +197,12 @@ class DeduplicationManager:
         self.dedup_file = Path(dedup_file)
         self.seen_urls: Set[str] = set()
         self.seen_content_hashes: Set[str] = set()
+        self.changed = False  # Only write the file back if this process saw something new
+        # When set, manuals claimed by check_and_add stay in in_flight (url key -> content
+        # hash) and out of the saved file until mark_saved confirms they were written
+        self.hold_until_saved = False
+        self.in_flight: Dict[str, str] = {}
+        self._lock = threading.Lock()
         self.load_seen_data()
     
     def load_seen_data(self):
@@ -118,16 +220,25 @@ class DeduplicationManager:
                 self.seen_content_hashes = set()
     
     def save_seen_data(self):
-        """Save seen URLs and hashes to file"""
+        """Save seen URLs and hashes to file (skipped when nothing was added since loading)
+        
+        In-flight manuals are left out, so a crash before their CSV is written
+        does not make later runs skip them.
+        """
+        if not self.changed:
+            return
         self.dedup_file.parent.mkdir(parents=True, exist_ok=True)
         try:
+            with self._lock:
+                urls = list(self.seen_urls.difference(self.in_flight))
+                content_hashes = list(self.seen_content_hashes.difference(self.in_flight.values()))
             with open(self.dedup_file, 'w', encoding='utf-8') as f:
                 json.dump({
-                    'urls': list(self.seen_urls),
-                    'content_hashes': list(self.seen_content_hashes),
+                    'urls': urls,
+                    'content_hashes': content_hashes,
                     'last_updated': datetime.now().isoformat()
                 }, f, indent=2)
-            logger.info(f"[DEDUP] Saved {len(self.seen_urls)} URLs and {len(self.seen_content_hashes)} content hashes")
+            logger.info(f"[DEDUP] Saved {len(urls)} URLs and {len(content_hashes)} content hashes")
         except Exception as e:
             logger.error(f"[DEDUP] Could not save deduplication data: {e}")
     
@@ -148,8 +259,39 @@ class DeduplicationManager:
     
     def add_manual(self, manual: ManualEntry):
         """Add manual to seen data"""
-        self.seen_urls.add(manual.get_unique_key())
-        self.seen_content_hashes.add(manual.get_content_hash())
+        with self._lock:
+            self.seen_urls.add(manual.get_unique_key())
+            self.seen_content_hashes.add(manual.get_content_hash())
+            self.changed = True
+    
+    def check_and_add(self, manual: ManualEntry) -> bool:
+        """Atomically check for a duplicate and mark the manual as seen
+        
+        Returns:
+            True if the manual was already seen
+        """
+        with self._lock:
+            if self.is_duplicate(manual):
+                return True
+            self.seen_urls.add(manual.get_unique_key())
+            self.seen_content_hashes.add(manual.get_content_hash())
+            if self.hold_until_saved:
+                self.in_flight[manual.get_unique_key()] = manual.get_content_hash()
+            self.changed = True
+            return False
+    
+    def mark_saved(self, manual: ManualEntry):
+        """Let save_seen_data persist an in-flight manual once its CSV row is written"""
+        with self._lock:
+            self.in_flight.pop(manual.get_unique_key(), None)
+    
+    def discard(self, manual: ManualEntry):
+        """Forget a manual marked as seen in this run whose processing failed, so the next run retries it"""
+        with self._lock:
+            self.seen_urls.discard(manual.get_unique_key())
+            self.seen_content_hashes.discard(manual.get_content_hash())
+            self.in_flight.pop(manual.get_unique_key(), None)
+            self.changed = True
 
 class ScrapingStats:
     """Track scraping statistics with deduplication metrics"""
@@ -162,8 +304,16 @@ class ScrapingStats:
         self.failed_requests = 0
         self.retries_used = 0
         self.brand_stats = {}
+        self.metrics = ScraperMetrics()
+        self.concurrency_history: List[Dict] = []
+        self.pipeline_stats: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
     
     def add_brand_result(self, brand: str, total_found: int, unique_added: int, duplicates: int, failed_requests: int = 0):
+        with self._lock:
+            self._add_brand_result(brand, total_found, unique_added, duplicates, failed_requests)
+    
+    def _add_brand_result(self, brand: str, total_found: int, unique_added: int, duplicates: int, failed_requests: int):
         self.brands_processed += 1
         self.total_manuals += total_found
         self.unique_manuals += unique_added
@@ -187,7 +337,11 @@ class ScrapingStats:
             "failed_requests": self.failed_requests,
             "retries_used": self.retries_used,
             "avg_unique_per_brand": self.unique_manuals / max(self.brands_processed, 1),
-            "brand_breakdown": self.brand_stats
+            "brand_breakdown": self.brand_stats,
+            "counters": self.metrics.snapshot()["counters"],
+            "stage_latency": self.metrics.stage_summary(),
+            "concurrency_history": self.concurrency_history,
+            "pipeline": self.pipeline_stats
         }
 
 class EnhancedCarManualScraper:
@@ -256,7 +410,43 @@ class EnhancedCarManualScraper:
         self.session = requests.Session()
         self.session.headers.update(config.headers)
         self.stats = ScrapingStats()
+        self.metrics = self.stats.metrics
+        
+        # Request parallelism: fixed at max_workers unless adaptive control is on
+        pool_size = config.max_concurrency if config.adaptive_concurrency else config.max_workers
+        self.concurrency = AdaptiveConcurrencyController(
+            initial=config.max_workers,
+            min_limit=config.min_workers if config.adaptive_concurrency else config.max_workers,
+            max_limit=pool_size,
+            adaptive=config.adaptive_concurrency,
+            target_p95=config.target_p95_latency,
+            max_error_rate=config.max_error_rate,
+            metrics=self.metrics,
+            history_file=config.concurrency_log_file
+        )
+        self.retry_policy = RetryPolicy(max_attempts=config.max_retries)
+        self.circuit_breakers = HostCircuitBreakers()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if config.probe_mode not in PROBE_MODES:
+            raise ValueError(f"Unknown probe_mode '{config.probe_mode}', expected one of {PROBE_MODES}")
+        self.prober = None
+        if config.probe_mode != "full":
+            self.prober = PageProber(
+                self._send_request, config.probe_mode,
+                policy=self.retry_policy, breakers=self.circuit_breakers, on_retry=self._on_retry
+            )
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="scraper")
+        self.parse_offload = ParseOffload(config.parse_workers)
         self.dedup_manager = DeduplicationManager()
+        self.listing_store = ListingFingerprintStore()
+        self.info_cache = ManualInfoCache()
+        self.metrics_exporter = None
+        if config.metrics_file:
+            self.metrics_exporter = MetricsExporter(
+                self.metrics, config.metrics_file, config.metrics_format, config.metrics_interval
+            )
         
         # Create output directory
         self.output_dir = Path("scraped_data")
@@ -269,68 +459,75 @@ class EnhancedCarManualScraper:
         ]
         
     def __enter__(self):
+        if self.metrics_exporter:
+            self.metrics_exporter.start()
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self.executor.shutdown(wait=True)
+        self.parse_offload.close()
         self.session.close()
         self.dedup_manager.save_seen_data()
+        self.listing_store.save()
+        self.info_cache.save()
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
         
-    def make_request_with_retry(self, url: str) -> Optional[requests.Response]:
-        """Make HTTP request with retry logic"""
-        for attempt in range(self.config.max_retries):
+    def _send_request(self, url: str, method: str = "GET", stream: bool = False) -> requests.Response:
+        """Send one request, gated by the concurrency controller and instrumented
+        
+        Streamed responses are counted without their body; the caller reads it.
+        """
+        with self.concurrency.slot():
+            self.metrics.add_gauge("requests_in_flight", 1)
+            started = time.perf_counter()
             try:
-                response = self.session.get(url, timeout=self.config.timeout)
-                response.raise_for_status()
-                return response
-                
+                response = self.session.request(method, url, stream=stream, timeout=self.config.timeout)
             except requests.exceptions.RequestException as e:
-                self.stats.retries_used += 1
-                if attempt == self.config.max_retries - 1:
-                    logger.error(f"Failed to fetch {url} after {self.config.max_retries} attempts: {e}")
-                    return None
-                else:
-                    wait_time = (attempt + 1) * 2
-                    logger.warning(f"Attempt {attempt + 1} failed for {url}, retrying in {wait_time}s: {e}")
-                    time.sleep(wait_time)
+                self.concurrency.record(time.perf_counter() - started, classify_exception(e))
+                raise
+            finally:
+                latency = time.perf_counter() - started
+                self.metrics.observe("fetch", latency)
+                self.metrics.add_gauge("requests_in_flight", -1)
         
-        return None
+        self.concurrency.record(latency, classify_status(response.status_code))
+        self.metrics.record_response(response.status_code, 0 if stream else len(response.content))
+        return response
+    
+    def _on_retry(self, attempt: int, outcome: str, delay: float, retry_after: Optional[float]):
+        self.stats.retries_used += 1
+        self.metrics.inc("retries_total")
+        if retry_after is not None:
+            self.concurrency.pause(retry_after)
+    
+    def make_request_with_retry(self, url: str, stream: bool = False) -> Optional[requests.Response]:
+        """Make HTTP request with retry logic
+        
+        404/410 and other client errors return None without retrying; 429s,
+        5xx, timeouts and connection errors are retried with jittered backoff
+        while the host's circuit breaker is closed.
+        """
+        return self.fetch_with_outcome(url, stream=stream)[0]
+
+    def fetch_with_outcome(self, url: str, stream: bool = False) -> Tuple[Optional[requests.Response], str]:
+        """make_request_with_retry, also returning the retry_policy outcome
+
+        Lets callers tell a 404 (terminal outcome) from a request that failed.
+        """
+        response, outcome = fetch_with_retry(
+            lambda: self._send_request(url, stream=stream), url,
+            policy=self.retry_policy,
+            breakers=self.circuit_breakers,
+            on_retry=self._on_retry
+        )
+        if response is None and outcome not in TERMINAL_OUTCOMES:
+            self.metrics.inc("failed_requests_total")
+        return response, outcome
     
     def is_valid_manual_url(self, href: str, brand: str) -> bool:
         """Check if URL is a valid manual page"""
-        # Filter out query parameters, view pages, warning pages, and google vignette noise
-        if "?" in href or "/view/" in href or "warning" in href or "#google_vignette" in href:
-            return False
-            
-        # Enhanced pattern to catch more manual types including hyphenated ones
-        manual_types_extended = self.manual_types + [
-            "owner-handbook", "user-handbook", "navigation-manual", "navigation", 
-            "infotainment", "manual", "guide", "quick", "quick-guide",
-            "audio", "radio", "multimedia", "wiring", "electrical", 
-            "parts", "engine", "transmission", "troubleshooting"
-        ]
-        
-        # Create dynamic pattern with all manual types
-        manual_types_pattern = "|".join(manual_types_extended)
-        
-        # More flexible pattern that can match various URL structures
-        patterns = [
-            r"^/" + brand + r"-[\w\-]+-\d{4}-(" + manual_types_pattern + r")-manual",  # Standard format
-            r"^/" + brand + r"-[\w\-]+-\d{4}-(" + manual_types_pattern + r")$",       # Without "-manual" suffix
-            r"^/" + brand + r"-[\w\-]+-(" + manual_types_pattern + r")-manual",       # Without year
-            r"^/" + brand + r"-[\w\-]+-(" + manual_types_pattern + r")$",             # Simple format
-        ]
-        
-        # Try each pattern
-        for pattern in patterns:
-            if re.search(pattern, href):
-                return True
-        
-        # Fallback: if it contains "manual" and matches basic brand-model structure
-        if "manual" in href.lower():
-            basic_pattern = r"^/" + brand + r"-[\w\-]+"
-            return bool(re.search(basic_pattern, href))
-            
-        return False
+        return is_valid_manual_url(href, brand, self.manual_types)
     
     def normalize_manual_type(self, raw_type: str, title: str, href: str) -> str:
         """Normalize manual type to standard format"""
@@ -566,33 +763,111 @@ class EnhancedCarManualScraper:
             return None
     
     def enhance_manual_with_page_info(self, manual: ManualEntry) -> ManualEntry:
-        """Get additional info from the manual page itself"""
+        """Get additional info from the manual page itself
+        
+        Skipped when the listing card or the info cache already supplied it.
+        """
+        self.fetch_page_info(manual)
+        return manual
+    
+    def fetch_page_info(self, manual: ManualEntry) -> bool:
+        """enhance_manual_with_page_info; False if the manual page could not be fetched or parsed"""
+        if has_manual_info(manual) or self.info_cache.apply(manual):
+            return True
+        
         try:
             response = self.make_request_with_retry(manual.url)
             if not response:
-                return manual
+                return False
                 
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            # Look for pages count and file size info
-            info_text = soup.get_text()
-            
-            # Extract pages count
-            pages_match = re.search(r'Pages?:\s*(\d+)', info_text)
-            if pages_match:
-                manual.pages_count = pages_match.group(1)
+            with self.metrics.timer("parse"):
+                # Look for pages count and file size info
+                info = self.parse_offload.run(parse_manual_page, response.content, response.encoding)
             
-            # Extract file size
-            size_match = re.search(r'PDF Size:\s*([\d.]+ [A-Z]+)', info_text)
-            if size_match:
-                manual.file_size = size_match.group(1)
+            for name, value in info.items():
+                setattr(manual, name, value)
+            self.info_cache.put(manual.url, info)
+            self.metrics.inc("enrich_fetched_total")
                 
             logger.debug(f"Enhanced manual info: {manual.pages_count} pages, {manual.file_size}")
             
         except Exception as e:
             logger.debug(f"Could not enhance manual info for {manual.url}: {e}")
+            return False
         
-        return manual
+        return True
+    
+    def enrich_manuals(self, manuals: List[ManualEntry], failed: Optional[Set[str]] = None) -> List[ManualEntry]:
+        """Fill pages/size metadata for a batch of manuals
+        
+        Listing-card metadata and the URL cache are used first; only manuals
+        still missing metadata are fetched, concurrently on the worker pool.
+        URLs of manuals whose page could not be fetched are added to `failed`.
+        """
+        missing = []
+        from_listing = from_cache = 0
+        for manual in manuals:
+            if has_manual_info(manual):
+                from_listing += 1
+                self.info_cache.put(manual.url, {"pages_count": manual.pages_count, "file_size": manual.file_size})
+            elif self.info_cache.apply(manual):
+                from_cache += 1
+            else:
+                missing.append(manual)
+        
+        self.metrics.inc("enrich_listing_hits_total", from_listing)
+        self.metrics.inc("enrich_cache_hits_total", from_cache)
+        if missing:
+            fetched = list(self.executor.map(self.fetch_page_info, missing))
+            if failed is not None:
+                failed.update(manual.url for manual, ok in zip(missing, fetched) if not ok)
+        if manuals:
+            logger.debug(f"[ENRICH] {len(manuals)} manuals: {from_listing} from listing, "
+                         f"{from_cache} from cache, {len(missing)} fetched")
+        return manuals
+    
+    def check_image_page(self, page_url: str, page_number: int) -> Optional[bool]:
+        """Decide whether a manual page exists
+        
+        Returns True if the page has manual content, False if it has none, and
+        None when extraction should stop (404, end-of-manual marker).
+        The configured probe answers most pages from a HEAD or the first few KB
+        of a streamed GET; only ambiguous pages are downloaded and parsed.
+
+        Raises:
+            PageScanInterrupted: the request failed after retries or the host's
+                circuit is open, so whether the page exists is unknown
+        """
+        if self.prober is not None:
+            with self.metrics.timer("probe"):
+                probe = self.prober.probe(page_url)
+            self.metrics.inc("bytes_downloaded_total", probe.bytes_read)
+            if probe.failed:
+                self.metrics.inc("failed_requests_total")
+                raise PageScanInterrupted(page_url, probe.outcome)
+            if probe.exists is not None:
+                self.metrics.inc("probe_decided_total")
+                if not probe.exists:
+                    logger.debug(f"[PAGES] Page {page_number} probe: {probe.reason}, stopping")
+                    return None
+                return True
+            self.metrics.inc("probe_fallback_total")
+            logger.debug(f"[PAGES] Page {page_number} probe ambiguous ({probe.reason}), parsing full page")
+
+        response, outcome = self.fetch_with_outcome(page_url)
+
+        if response is None:
+            if outcome not in TERMINAL_OUTCOMES:
+                raise PageScanInterrupted(page_url, outcome)
+            logger.debug(f"[PAGES] Page {page_number} returned {outcome}, stopping")
+            return None
+        
+        # Check if page actually contains content, or marks the end of the manual
+        with self.metrics.timer("parse"):
+            has_content = self.parse_offload.run(parse_image_page, response.content, response.encoding, page_number)
+        if has_content is None:
+            logger.debug(f"[PAGES] Found end indicator on page {page_number}, stopping")
+        return has_content
     
     def extract_image_pages(self, manual: ManualEntry) -> List[str]:
         """Extract all image page URLs from a manual
@@ -602,50 +877,53 @@ class EnhancedCarManualScraper:
             
         Returns:
             List of all valid page URLs including the base URL
+        
+        Raises:
+            PageScanInterrupted: a page could not be checked, so the list would be incomplete
         """
-        page_urls = [manual.url]  # Start with the base URL (page 1)
-        page_number = 2
+        logger.info(f"[PAGES] Starting page extraction for: {manual.url}")
+        
+        # Start with the base URL (page 1)
+        page_urls = [manual.url] + self.scan_image_pages(manual)[0]
+        return self.set_image_pages(manual, page_urls)
+    
+    def set_image_pages(self, manual: ManualEntry, page_urls: List[str]) -> List[str]:
+        """Record the page count found by extraction; returns page_urls"""
+        total_pages = len(page_urls)
+        logger.info(f"[PAGES] Found {total_pages} pages for manual: {manual.title}")
+        
+        # Update manual with actual page count if not already set
+        if not manual.pages_count and total_pages > 1:
+            manual.pages_count = str(total_pages)
+        
+        return page_urls
+    
+    def scan_image_pages(self, manual: ManualEntry, start_page: int = 2,
+                         end_page: Optional[int] = None) -> Tuple[List[str], bool]:
+        """Check pages start_page..end_page of a manual (inclusive; open-ended when end_page is None)
+        
+        Returns:
+            (URLs of pages with manual content, whether the scan reached end_page
+            without hitting the end of the manual)
+        
+        Raises:
+            PageScanInterrupted: a page could not be checked; the range is unfinished
+        """
+        page_urls = []
+        page_number = start_page
         max_pages = 10000  # Safety limit
+        last_page = min(end_page, max_pages) if end_page else max_pages
         consecutive_failures = 0
         max_consecutive_failures = 3
         
-        logger.info(f"[PAGES] Starting page extraction for: {manual.url}")
-        
-        while page_number <= max_pages and consecutive_failures < max_consecutive_failures:
+        while page_number <= last_page and consecutive_failures < max_consecutive_failures:
             page_url = f"{manual.url}/{page_number}"
             
             try:
-                response = self.make_request_with_retry(page_url)
-                
-                if not response or response.status_code == 404:
-                    logger.debug(f"[PAGES] Page {page_number} returned 404, stopping")
-                    break
-                
-                # Check if page actually contains content
-                soup = BeautifulSoup(response.text, "html.parser")
-                page_content = soup.get_text().lower()
-                
-                # Check for indicators that we've reached the end
-                end_indicators = [
-                    "no next",
-                    "page not found", 
-                    "404", 
-                    "not available",
-                    "end of manual",
-                    "last page"
-                ]
-                
-                if any(indicator in page_content for indicator in end_indicators):
-                    logger.debug(f"[PAGES] Found end indicator on page {page_number}, stopping")
+                has_manual_content = self.check_image_page(page_url, page_number)
+                if has_manual_content is None:
                     break
                 
-                # Check if page has actual manual content (images or manual text)
-                has_manual_content = (
-                    soup.find("img") or
-                    "manual" in page_content or
-                    "page" in page_content and str(page_number) in page_content
-                )
-                
                 if not has_manual_content:
                     consecutive_failures += 1
                     logger.debug(f"[PAGES] Page {page_number} has no manual content (attempt {consecutive_failures})")
@@ -667,35 +945,56 @@ class EnhancedCarManualScraper:
                 # Small delay to be respectful
                 time.sleep(0.1)
                 
+            except PageScanInterrupted as e:
+                logger.warning(f"[PAGES] Stopped at page {page_number} of {manual.title}, scan incomplete: {e}")
+                self.metrics.inc("page_scans_interrupted_total")
+                raise
+                
             except requests.exceptions.RequestException as e:
                 logger.debug(f"[PAGES] Request failed for page {page_number}: {e}")
                 consecutive_failures += 1
                 
                 if consecutive_failures >= max_consecutive_failures:
-                    logger.warning(f"[PAGES] Too many request failures, stopping at page {page_number}")
-                    break
+                    logger.warning(f"[PAGES] Too many request failures at page {page_number} of {manual.title}")
+                    self.metrics.inc("page_scans_interrupted_total")
+                    raise PageScanInterrupted(page_url, classify_exception(e)) from e
                     
                 page_number += 1
                 
             except Exception as e:
                 logger.error(f"[PAGES] Unexpected error on page {page_number}: {e}")
                 consecutive_failures += 1
+                if consecutive_failures >= max_consecutive_failures:
+                    self.metrics.inc("page_scans_interrupted_total")
+                    raise PageScanInterrupted(page_url, "error") from e
                 page_number += 1
         
-        total_pages = len(page_urls)
-        logger.info(f"[PAGES] Found {total_pages} pages for manual: {manual.title}")
+        return page_urls, end_page is not None and page_number > end_page
+    
+    def add_image_pages(self, manual: ManualEntry) -> ManualEntry:
+        """Extract all image page URLs if configured (runs on the worker pool)
         
-        # Update manual with actual page count if not already set
-        if not manual.pages_count and total_pages > 1:
-            manual.pages_count = str(total_pages)
+        An interrupted scan leaves image_pages empty rather than partial: rows
+        with no pages are what the extract backfill picks up again on resume.
+        """
+        if hasattr(self.config, 'extract_pages') and self.config.extract_pages:
+            try:
+                manual.image_pages = self.extract_image_pages(manual)
+            except PageScanInterrupted as e:
+                logger.warning(f"[PAGES] Page extraction for {manual.title} left for a later backfill: {e}")
+                manual.image_pages = []
+                return manual
+            logger.info(f"[PAGES] Extracted {len(manual.image_pages)} image page URLs for {manual.title}")
         
-        return page_urls
+        return manual
     
-    def scrape_brand_page(self, brand: str, page_num: int) -> Tuple[List[ManualEntry], int, int]:
-        """Scrape a single page for a brand
+    def fetch_listing_links(self, brand: str, page_num: int) -> Optional[List[Tuple[str, str, Dict[str, str]]]]:
+        """Fetch a brand listing page and return its manual links in page order
         
         Returns:
-            (list_of_manuals, duplicates_found, total_found)
+            List of (href, link_text, listing_info) tuples, where listing_info holds any
+            pages_count/file_size shown on the listing card, or None if the page could
+            not be fetched
         """
         url = f"{self.config.base_url}/b/{brand}"
         if page_num > 1:
@@ -703,71 +1002,137 @@ class EnhancedCarManualScraper:
             
         response = self.make_request_with_retry(url)
         if not response:
-            return [], 0, 0
+            return None
             
         try:
-            soup = BeautifulSoup(response.text, "html.parser")
-            links = soup.find_all("a", href=True)
-            unique_manuals = []
-            duplicates_found = 0
-            total_found = 0
-            
-            for link in links:
-                href = link["href"]
-                
-                if not self.is_valid_manual_url(href, brand):
-                    continue
-                
-                # Only process links with meaningful text
-                link_text = link.text.strip()
-                if not link_text or len(link_text) < 5:
-                    continue
-                    
-                manual = self.extract_manual_info(href, link_text, brand)
-                if manual:
-                    total_found += 1
-                    
-                    # Check for duplicates using global deduplication
-                    if self.dedup_manager.is_duplicate(manual):
-                        duplicates_found += 1
-                        logger.debug(f"[DEDUP] Skipping duplicate: {manual.url}")
-                        continue
-                    
-                    # Enhance manual with additional info
-                    manual = self.enhance_manual_with_page_info(manual)
-                    
-                    # Extract all image page URLs if needed
-                    if hasattr(self.config, 'extract_pages') and self.config.extract_pages:
-                        manual.image_pages = self.extract_image_pages(manual)
-                        logger.info(f"[PAGES] Extracted {len(manual.image_pages)} image page URLs for {manual.title}")
-                    
-                    # Add to seen data
-                    self.dedup_manager.add_manual(manual)
-                    unique_manuals.append(manual)
-                    logger.debug(f"[NEW] Found unique manual: {manual.url}")
-            
-            return unique_manuals, duplicates_found, total_found
+            with self.metrics.timer("parse"):
+                return self.parse_offload.run(parse_listing, response.content, response.encoding,
+                                              brand, self.manual_types)
             
         except Exception as e:
             logger.error(f"Error parsing page {url}: {e}")
+            return None
+    
+    def classify_listing_links(self, brand: str, links: List[Tuple[str, str, Dict[str, str]]],
+                               dedup: bool = True) -> Tuple[List[ManualEntry], int, int]:
+        """Turn listing links into new manuals, skipping global duplicates (no requests)
+        
+        With dedup=False every manual is returned and nothing is marked as
+        seen; callers such as the job queue dedupe on their own keys instead.
+        
+        Returns:
+            (list_of_manuals, duplicates_found, total_found)
+        """
+        unique_manuals = []
+        duplicates_found = 0
+        total_found = 0
+        
+        for href, link_text, listing_info in links:
+            with self.metrics.timer("classify"):
+                manual = self.extract_manual_info(href, link_text, brand)
+            if manual:
+                total_found += 1
+                self.metrics.inc("manuals_found_total")
+                
+                # Check for duplicates using global deduplication; the manual is marked
+                # as seen right away so repeats later on this page (or brand) are caught
+                is_duplicate = False
+                if dedup:
+                    with self.metrics.timer("dedup"):
+                        is_duplicate = self.dedup_manager.check_and_add(manual)
+                if is_duplicate:
+                    self.metrics.inc("duplicates_total")
+                    duplicates_found += 1
+                    logger.debug(f"[DEDUP] Skipping duplicate: {manual.url}")
+                    continue
+                
+                for name, value in listing_info.items():
+                    setattr(manual, name, value)
+                unique_manuals.append(manual)
+                logger.debug(f"[NEW] Found unique manual: {manual.url}")
+        
+        return unique_manuals, duplicates_found, total_found
+    
+    def process_listing_links(self, brand: str, links: List[Tuple[str, str, Dict[str, str]]]) -> Tuple[List[ManualEntry], int, int]:
+        """Turn listing links into new, enriched manuals, skipping global duplicates
+        
+        Returns:
+            (list_of_manuals, duplicates_found, total_found)
+        """
+        unique_manuals, duplicates_found, total_found = self.classify_listing_links(brand, links)
+        
+        # Fetch missing details concurrently; the controller bounds in-flight requests
+        unique_manuals = self.enrich_manuals(unique_manuals)
+        if self.config.extract_pages:
+            unique_manuals = list(self.executor.map(self.add_image_pages, unique_manuals))
+        
+        return unique_manuals, duplicates_found, total_found
+    
+    def scrape_brand_page(self, brand: str, page_num: int) -> Tuple[List[ManualEntry], int, int]:
+        """Scrape a single page for a brand
+        
+        Returns:
+            (list_of_manuals, duplicates_found, total_found)
+        """
+        links = self.fetch_listing_links(brand, page_num)
+        if links is None:
             return [], 0, 0
+        return self.process_listing_links(brand, links)
     
-    def scrape_brand(self, brand: str) -> List[ManualEntry]:
-        """Scrape all pages for a single brand with deduplication"""
+    def discover_brand(self, brand: str) -> Iterator[List[ManualEntry]]:
+        """Walk a brand's listing pages, yielding each page's new manuals
+        
+        Manuals are classified and deduplicated but not enriched. Stops at
+        pagination wraparound, consecutive empty pages, or (in incremental mode)
+        consecutive pages that are unchanged or hold only known manuals.
+        """
         logger.info(f"[SEARCH] Starting scrape for brand: {brand}")
-        all_manuals = []
         page_num = 1
         failed_requests = 0
         consecutive_empty_pages = 0
         total_duplicates = 0
         total_found = 0
+        total_unique = 0
+        consecutive_known_pages = 0
+        wraparound = ListingWraparoundDetector()
         
         while page_num <= self.config.max_pages:
-            manuals, duplicates, found = self.scrape_brand_page(brand, page_num)
+            links = self.fetch_listing_links(brand, page_num)
+            fingerprint = None
+            if links:
+                # Stop before processing a page that repeats what this crawl already saw
+                hrefs = [link[0] for link in links]
+                fingerprint = fingerprint_links(hrefs)
+                wrap_reason = wraparound.check(page_num, hrefs, fingerprint)
+                if wrap_reason:
+                    logger.info(f"[WRAP] Stopping {brand}: {wrap_reason}")
+                    self.metrics.inc("wraparound_stops_total")
+                    break
+            
+            if links is None:
+                manuals, duplicates, found = [], 0, 0
+            else:
+                manuals, duplicates, found = self.classify_listing_links(brand, links)
             
             total_duplicates += duplicates
             total_found += found
             
+            if links:
+                unchanged = self.listing_store.update(brand, page_num, fingerprint)
+                if self.config.incremental:
+                    # A page is "known" if it is identical to last run or yielded nothing new
+                    if unchanged or (found > 0 and not manuals):
+                        consecutive_known_pages += 1
+                    else:
+                        consecutive_known_pages = 0
+                    if consecutive_known_pages >= self.config.incremental_stop_after:
+                        total_unique += len(manuals)
+                        if manuals:
+                            yield manuals
+                        logger.info(f"[DELTA] Stopping {brand} at page {page_num} after {consecutive_known_pages} consecutive known pages")
+                        self.metrics.inc("delta_early_stops_total")
+                        break
+            
             if not manuals and found == 0:
                 failed_requests += 1
                 consecutive_empty_pages += 1
@@ -776,15 +1141,31 @@ class EnhancedCarManualScraper:
                     break
             else:
                 consecutive_empty_pages = 0
-                all_manuals.extend(manuals)
+                total_unique += len(manuals)
                 logger.info(f"[PAGE] Page {page_num}: Found {found} total, {len(manuals)} unique, {duplicates} duplicates")
+                if manuals:
+                    yield manuals
             
             page_num += 1
             time.sleep(random.uniform(*self.config.delay_range))
         
-        logger.info(f"[DONE] Completed {brand}: {len(all_manuals)} unique manuals (out of {total_found} total, {total_duplicates} duplicates)")
-        self.stats.add_brand_result(brand, total_found, len(all_manuals), total_duplicates, failed_requests)
-        
+        logger.info(f"[DONE] Completed {brand}: {total_unique} unique manuals (out of {total_found} total, {total_duplicates} duplicates)")
+        self.stats.add_brand_result(brand, total_found, total_unique, total_duplicates, failed_requests)
+    
+    def discover_brand_manuals(self, brand: str) -> Iterator[ManualEntry]:
+        """Pipeline discovery stage: a brand's new manuals, one at a time"""
+        for manuals in self.discover_brand(brand):
+            yield from manuals
+    
+    def scrape_brand(self, brand: str) -> List[ManualEntry]:
+        """Scrape all pages for a single brand with deduplication"""
+        all_manuals = []
+        for manuals in self.discover_brand(brand):
+            # Fetch missing details concurrently; the controller bounds in-flight requests
+            manuals = self.enrich_manuals(manuals)
+            if self.config.extract_pages:
+                manuals = list(self.executor.map(self.add_image_pages, manuals))
+            all_manuals.extend(manuals)
         return all_manuals
     
     def save_brand_data(self, brand: str, manuals: List[ManualEntry]):
@@ -796,7 +1177,7 @@ class EnhancedCarManualScraper:
         
         fieldnames = ["brand", "model", "year", "title", "slug", "url", "manual_type", "pages_count", "file_size", "total_image_pages", "image_pages"]
         
-        with open(filename, "w", newline="", encoding="utf-8") as f:
+        with self.metrics.timer("write"), open(filename, "w", newline="", encoding="utf-8") as f:
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
             writer.writerows([manual.to_dict() for manual in manuals])
@@ -809,7 +1190,7 @@ class EnhancedCarManualScraper:
         
         fieldnames = ["brand", "model", "year", "title", "slug", "url", "manual_type", "pages_count", "file_size", "total_image_pages", "image_pages"]
         
-        with open(filename, "w", newline="", encoding="utf-8") as f:
+        with self.metrics.timer("write"), open(filename, "w", newline="", encoding="utf-8") as f:
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
             writer.writerows([manual.to_dict() for manual in all_manuals])
@@ -853,12 +1234,197 @@ class EnhancedCarManualScraper:
                 # Save deduplication data periodically
                 if i % 5 == 0:
                     self.dedup_manager.save_seen_data()
+                    self.listing_store.save()
+                    self.info_cache.save()
+                
+                profiling.checkpoint(f"brand_{brand}")
                 
             except Exception as e:
                 logger.error(f"[ERROR] Failed to process brand {brand}: {e}")
                 continue
         
-        # Save final data
+        self.finish_run(brands, all_manuals)
+        return all_manuals
+    
+    def scrape_all_brands_pipelined(self, brands: List[str]) -> List[ManualEntry]:
+        """Scrape all brands as a pipeline of concurrent stages
+        
+        Discovery (listing pages) -> enrichment (manual page metadata) ->
+        page extraction -> image download, connected by bounded queues so a
+        slow manual never stalls discovery and memory stays bounded.
+        """
+        config = self.config
+        stages = [
+            Stage("discovery", self.discover_brand_manuals, config.discovery_workers,
+                  config.stage_queue_size, fan_out=True),
+            Stage("enrichment", self.enhance_manual_with_page_info, config.enrichment_workers,
+                  config.stage_queue_size),
+        ]
+        if config.extract_pages:
+            stages.append(Stage("pages", self.add_image_pages, config.page_workers, config.stage_queue_size))
+        if config.download_dir:
+            stages.append(Stage("download", self.download_manual_images, config.download_workers,
+                                config.stage_queue_size))
+        
+        logger.info(f"[START] Pipelined scrape for {len(brands)} brands: "
+                    + " -> ".join(f"{stage.name} x{stage.workers}" for stage in stages))
+        logger.info(f"[DEDUP] Starting with {len(self.dedup_manager.seen_urls)} previously seen URLs")
+        
+        all_manuals = []
+        by_brand: Dict[str, List[ManualEntry]] = {}
+        unsaved: List[ManualEntry] = []
+        brand_names = {brand.title(): brand for brand in brands}
+        
+        def save_collected():
+            # Brand CSVs first: a URL is only persisted as seen once its row is on disk
+            for brand_title in {manual.brand for manual in unsaved}:
+                self.save_brand_data(brand_names.get(brand_title, brand_title.lower()), by_brand[brand_title])
+            for manual in unsaved:
+                self.dedup_manager.mark_saved(manual)
+            unsaved.clear()
+        
+        def collect(manual: ManualEntry):
+            all_manuals.append(manual)
+            by_brand.setdefault(manual.brand, []).append(manual)
+            unsaved.append(manual)
+            if len(all_manuals) % 100 == 0:
+                save_collected()
+                self.dedup_manager.save_seen_data()
+                self.info_cache.save()
+                profiling.checkpoint(f"manuals_{len(all_manuals)}")
+        
+        # Discovered manuals stay out of the seen-URL file until they reach a brand CSV;
+        # ones dropped by a stage error or a crash are retried by the next run
+        self.dedup_manager.hold_until_saved = True
+        pipeline = Pipeline(stages, sink=collect, metrics=self.metrics,
+                            output_queue_size=config.stage_queue_size)
+        self.stats.pipeline_stats = pipeline.run(brands)
+        
+        save_collected()
+        if self.dedup_manager.in_flight:
+            logger.warning(f"[DEDUP] {len(self.dedup_manager.in_flight)} manuals did not finish the pipeline, "
+                           f"retrying them next run")
+        
+        self.finish_run(brands, all_manuals)
+        return all_manuals
+    
+    def scrape_from_sitemap(self, brands: Optional[List[str]] = None) -> List[ManualEntry]:
+        """Discover manuals from the sitemap instead of paginating listing pages
+        
+        The sitemap index and its child sitemaps cover the whole catalog in a
+        few hundred requests. Only manuals that are new, or whose lastmod changed
+        since the last sitemap run, are enriched and have their pages extracted.
+        """
+        def accept(path: str) -> bool:
+            brand = match_brand(path, brands)
+            return brand is not None and self.is_valid_manual_url(path, brand)
+        
+        sitemap_url = self.config.sitemap_url or f"{self.config.base_url}/sitemap.xml"
+        discovery = SitemapDiscovery(lambda url: self.make_request_with_retry(url, stream=True),
+                                     accept, SitemapState())
+        logger.info(f"[START] Sitemap discovery from {sitemap_url}")
+        logger.info(f"[DEDUP] Starting with {len(self.dedup_manager.seen_urls)} previously seen URLs")
+        
+        manuals = []
+        counts: Dict[str, List[int]] = {}  # brand -> [found, duplicates]
+        locs: Dict[str, str] = {}  # manual URL -> sitemap loc
+        added: Set[str] = set()  # first seen in this run
+        for entry in discovery.discover([sitemap_url]):
+            path = urlparse(entry.loc).path
+            brand = match_brand(path, brands)
+            manual = self.extract_manual_info(path, title_from_slug(path), brand)
+            if not manual:
+                discovery.discard(entry.loc)
+                continue
+            self.metrics.inc("manuals_found_total")
+            brand_counts = counts.setdefault(brand, [0, 0])
+            brand_counts[0] += 1
+            # A changed manual is refetched even though an earlier run saw it
+            seen = self.dedup_manager.check_and_add(manual)
+            if seen and not entry.changed:
+                self.metrics.inc("duplicates_total")
+                brand_counts[1] += 1
+                continue
+            if not seen:
+                added.add(manual.url)
+            if entry.changed:
+                self.info_cache.forget(manual.url)
+            locs[manual.url] = entry.loc
+            manuals.append(manual)
+        
+        failed: Set[str] = set()
+        manuals = self.enrich_manuals(manuals, failed)
+        if self.config.extract_pages:
+            manuals = list(self.executor.map(self.add_image_pages, manuals))
+            failed.update(manual.url for manual in manuals if not manual.image_pages)
+        if failed:
+            # Not saved and not committed: the next sitemap run yields them again
+            logger.warning(f"[SITEMAP] {len(failed)} manuals could not be fetched, retrying them next run")
+            for manual in manuals:
+                if manual.url in failed:
+                    discovery.discard(locs[manual.url])
+                    if manual.url in added:
+                        self.dedup_manager.discard(manual)
+            manuals = [manual for manual in manuals if manual.url not in failed]
+        
+        by_brand: Dict[str, List[ManualEntry]] = {}
+        for manual in manuals:
+            by_brand.setdefault(manual.brand, []).append(manual)
+        for brand, (found, duplicates) in sorted(counts.items()):
+            brand_manuals = by_brand.get(brand.title(), [])
+            self.stats.add_brand_result(brand, found, len(brand_manuals), duplicates)
+            self.save_brand_data(brand, brand_manuals)
+        
+        self.finish_run(sorted(counts), manuals)
+        # lastmods are recorded only once the manuals they cover are saved
+        discovery.commit()
+        return manuals
+    
+    def download_manual_images(self, manual: ManualEntry, first_page: int = 1,
+                               last_page: Optional[int] = None) -> ManualEntry:
+        """Download the image shown on each of a manual's pages (pipeline download stage)
+        
+        first_page/last_page (1-based, inclusive) limit the download to a page range,
+        so a huge manual can be fetched by several workers at once.
+        """
+        self.download_page_range(manual, first_page, last_page)
+        return manual
+    
+    def download_page_range(self, manual: ManualEntry, first_page: int = 1,
+                            last_page: Optional[int] = None) -> Tuple[int, int]:
+        """download_manual_images, returning (pages downloaded, pages in the range)"""
+        safe_slug = manual.slug.strip("/").replace("/", "_").replace(":", "_")
+        folder = Path(self.config.download_dir) / safe_slug
+        folder.mkdir(parents=True, exist_ok=True)
+        
+        manifest = manifest_for(folder)
+        downloaded = 0
+        page_urls = (manual.image_pages or [manual.url])[first_page - 1:last_page]
+        for number, page_url in enumerate(page_urls, first_page):
+            if manifest.is_done(f"page_{number:03d}"):
+                downloaded += 1  # Verified earlier: no page fetch, no file probe
+                continue
+            response = self.make_request_with_retry(page_url)
+            if not response:
+                continue
+            with self.metrics.timer("parse"):
+                img_src = self.parse_offload.run(parse_page_image, response.content, response.encoding)
+            if img_src is None:
+                continue
+            img_url = urljoin(page_url, img_src)
+            with self.concurrency.slot(), self.metrics.timer("download"):
+                ok = download_image(self.session, img_url, folder / f"page_{number:03d}.jpg",
+                                    manifest=manifest)
+            if ok:
+                downloaded += 1
+        
+        self.metrics.inc("images_downloaded_total", downloaded)
+        logger.info(f"[DOWNLOAD] {downloaded}/{len(page_urls)} page images for {manual.title}")
+        return downloaded, len(page_urls)
+    
+    def finish_run(self, brands: List[str], all_manuals: List[ManualEntry]):
+        """Save final data and log the run summary"""
+        self.stats.concurrency_history = self.concurrency.history
         self.save_all_data(all_manuals)
         self.save_stats()
         
@@ -876,10 +1442,8 @@ class EnhancedCarManualScraper:
         - Failed requests: {summary['failed_requests']}
         - Average unique per brand: {summary['avg_unique_per_brand']:.1f}
         """)
-        
-        return all_manuals
 
-def main():
+def main(incremental: bool = False, pipelined: bool = False, parse_workers: int = 0, sitemap: bool = False):
     """Main execution function"""
     # Define brands to scrape
     BRANDS = [
@@ -891,12 +1455,24 @@ def main():
     config = ScrapingConfig(
         extract_pages=True,  # Set to True to extract all page URLs for each manual
         max_retries=3,
-        timeout=30
+        timeout=30,
+        metrics_file="scraped_data/scraper_metrics.prom",  # Scraped by node_exporter's textfile collector
+        adaptive_concurrency=True,
+        concurrency_log_file="scraped_data/concurrency_history.jsonl",
+        incremental=incremental,  # Delta mode: stop at listing pages already seen
+        pipeline=pipelined,
+        parse_workers=parse_workers,  # HTML parsing in worker processes, off the fetch threads
+        sitemap=sitemap  # Enumerate manuals from the sitemap instead of listing pages
     )
     
     # Run scraper with deduplication
     with EnhancedCarManualScraper(config) as scraper:
-        manuals = scraper.scrape_all_brands(BRANDS)
+        if config.sitemap:
+            manuals = scraper.scrape_from_sitemap(BRANDS)
+        elif config.pipeline:
+            manuals = scraper.scrape_all_brands_pipelined(BRANDS)
+        else:
+            manuals = scraper.scrape_all_brands(BRANDS)
         
         # Show some statistics about page extraction
         if config.extract_pages:
@@ -906,59 +1482,125 @@ def main():
         
         logger.info(f"[FINAL] Scraping completed! {len(manuals)} unique manuals collected.")
 
-def extract_pages_for_existing_csv(csv_file: str, output_file: str = None):
-    """Extract page URLs for manuals from existing CSV file"""
+def extract_pages_for_existing_csv(csv_file: str, output_file: str = None, workers: int = 4,
+                                   per_host: int = 4, order: str = "input", resume: bool = True,
+                                   probe_mode: str = "stream", schedule: str = "lpt", split_pages: int = 500,
+                                   parse_workers: int = 0):
+    """Extract page URLs for manuals from existing CSV file
+    
+    Manuals are processed on a worker pool; rows are appended to the output as
+    they finish, so an interrupted run resumes where it stopped. With the "lpt"
+    schedule the largest manuals start first, and manuals longer than
+    split_pages are checked as page ranges on several workers at once.
+    """
     if not output_file:
         output_file = csv_file.replace('.csv', '_with_pages.csv')
     
-    config = ScrapingConfig(extract_pages=True)
+    config = ScrapingConfig(extract_pages=True, max_workers=workers, probe_mode=probe_mode,
+                            parse_workers=parse_workers)
+    fieldnames = ["brand", "model", "year", "title", "slug", "url", "manual_type", "pages_count", "file_size", "total_image_pages", "image_pages"]
+    host_limiter = HostLimiter(per_host=per_host)
     
     with EnhancedCarManualScraper(config) as scraper:
         # Read existing CSV
-        manuals = []
         with open(csv_file, 'r', newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                manual = ManualEntry(
-                    brand=row['brand'],
-                    model=row['model'],
-                    year=row['year'],
-                    title=row['title'],
-                    slug=row['slug'],
-                    url=row['url'],
-                    manual_type=row.get('manual_type', ''),
-                    pages_count=row.get('pages_count', ''),
-                    file_size=row.get('file_size', '')
-                )
-                
-                # Extract page URLs
-                logger.info(f"[EXTRACT] Extracting pages for: {manual.title}")
+            rows = list(csv.DictReader(f))
+        
+        def manual_from_row(row: Dict[str, str]) -> ManualEntry:
+            manual = ManualEntry(
+                brand=row['brand'],
+                model=row['model'],
+                year=row['year'],
+                title=row['title'],
+                slug=row['slug'],
+                url=row['url'],
+                manual_type=row.get('manual_type', ''),
+                pages_count=row.get('pages_count', ''),
+                file_size=row.get('file_size', '')
+            )
+            # Metadata fetched by earlier scrapes fills gaps without another request
+            scraper.info_cache.apply(manual)
+            return manual
+        
+        def process_row(index: int, row: Dict[str, str]) -> Dict[str, str]:
+            manual = manual_from_row(row)
+            
+            # Extract page URLs
+            logger.info(f"[EXTRACT] [{index + 1}/{len(rows)}] Extracting pages for: {manual.title}")
+            with host_limiter.slot(manual.url):
                 manual.image_pages = scraper.extract_image_pages(manual)
-                manuals.append(manual)
+            
+            if (index + 1) % 10 == 0:
+                profiling.checkpoint(f"rows_{index + 1}")
+            return manual.to_dict()
         
-        # Save updated data
-        fieldnames = ["brand", "model", "year", "title", "slug", "url", "manual_type", "pages_count", "file_size", "total_image_pages", "image_pages"]
+        def split_row(index: int, row: Dict[str, str]):
+            return page_range_parts(row, split_pages) if split_pages > 0 else None
         
-        with open(output_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows([manual.to_dict() for manual in manuals])
+        def process_part(index: int, row: Dict[str, str], page_range) -> Tuple[List[str], bool]:
+            start_page, end_page = page_range
+            logger.info(f"[EXTRACT] [{index + 1}/{len(rows)}] Extracting pages {start_page}-{end_page or 'end'} "
+                        f"for: {row['title']}")
+            with host_limiter.slot(row['url']):
+                return scraper.scan_image_pages(manual_from_row(row), start_page, end_page)
         
-        total_pages = sum(len(manual.image_pages) for manual in manuals if manual.image_pages)
+        def merge_parts(index: int, row: Dict[str, str], parts: List[Tuple[List[str], bool]]) -> Dict[str, str]:
+            manual = manual_from_row(row)
+            manual.image_pages = scraper.set_image_pages(manual, [manual.url] + merge_page_ranges(parts))
+            return manual.to_dict()
+        
+        # Save updated data
+        processed_rows = run_backfill(
+            rows, process_row, Path(output_file), fieldnames,
+            workers=workers, order=order, resume=resume, desc="Page extraction",
+            cost=estimate_cost if schedule == "lpt" else None,
+            split=split_row, process_part=process_part, merge_parts=merge_parts
+        )
+        
+        total_pages = sum(int(row.get('total_image_pages') or 0) for row in processed_rows)
         logger.info(f"[COMPLETE] Extracted {total_pages} total page URLs, saved to {output_file}")
 
 if __name__ == "__main__":
-    import sys
-    
-    if len(sys.argv) > 1 and sys.argv[1] == "extract":
-        # Extract pages for existing CSV
-        if len(sys.argv) < 3:
-            print("Usage: python scraper_with_deduplication.py extract <csv_file> [output_file]")
-            sys.exit(1)
-        
-        csv_file = sys.argv[2]
-        output_file = sys.argv[3] if len(sys.argv) > 3 else None
-        extract_pages_for_existing_csv(csv_file, output_file)
-    else:
-        # Run normal scraping
-        main()
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Car manual scraper with global deduplication")
+    parser.add_argument("command", nargs="?", choices=["scrape", "extract"], default="scrape",
+                        help="'scrape' (default) or 'extract' pages for an existing CSV")
+    parser.add_argument("csv_file", nargs="?", help="CSV file for the extract command")
+    parser.add_argument("output_file", nargs="?", help="Output CSV for the extract command (optional)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Delta re-crawl: stop each brand at unchanged or fully known listing pages")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Run discovery, enrichment and page extraction as concurrent pipeline stages")
+    parser.add_argument("--sitemap", action="store_true",
+                        help="Discover manuals from the sitemap (new or changed since the last run only)")
+    parser.add_argument("--parse-workers", type=int, default=0,
+                        help="Parse HTML in this many worker processes instead of on the fetch threads")
+    parser.add_argument("--workers", type=int, default=4, help="Extract: manuals processed in parallel")
+    parser.add_argument("--per-host", type=int, default=4, help="Extract: maximum concurrent manuals per host")
+    parser.add_argument("--order", choices=ORDERS, default="input", help="Extract: output row order")
+    parser.add_argument("--no-resume", action="store_true", help="Extract: ignore a partially written output file")
+    parser.add_argument("--probe-mode", choices=PROBE_MODES, default="stream",
+                        help="Extract: page discovery by full parse, streamed early-closed GET, or HEAD first")
+    parser.add_argument("--schedule", choices=SCHEDULES, default="lpt",
+                        help="Extract: start the largest manuals first (lpt) or keep CSV order (input)")
+    parser.add_argument("--split-pages", type=int, default=500,
+                        help="Extract: check manuals longer than this many pages as parallel page ranges (0 disables)")
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args()
+    
+    with profiling.profile_from_args(args, name=f"dedup_{args.command}"):
+        if args.command == "extract":
+            # Extract pages for existing CSV
+            if not args.csv_file:
+                print("Usage: python scraper_with_deduplication.py extract <csv_file> [output_file]")
+                sys.exit(1)
+            extract_pages_for_existing_csv(args.csv_file, args.output_file, workers=args.workers,
+                                           per_host=args.per_host, order=args.order,
+                                           resume=not args.no_resume, probe_mode=args.probe_mode,
+                                           schedule=args.schedule, split_pages=args.split_pages,
+                                           parse_workers=args.parse_workers)
+        else:
+            # Run normal scraping
+            main(incremental=args.incremental, pipelined=args.pipeline, parse_workers=args.parse_workers,
+                 sitemap=args.sitemap)
\ No newline at end of file
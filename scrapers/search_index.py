@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Local Full-Text Search over Manual Metadata and Page Text
+Features:
+- SQLite FTS5 index of brand, model, year, manual_type and title, plus the
+  per-page text from text_extraction.py
+- Incremental: manuals upserted by URL only when their metadata changed,
+  pages re-indexed only when their text checksum changed
+- Rebuildable from the CSV outputs of scraper_with_deduplication.py
+- Query API returning ranked manual hits (with their best matching pages
+  and snippets) or page hits, filtered by brand / model / year / type
+"""
+
+import re
+import sqlite3
+import hashlib
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from verify_corpus import load_metadata, safe_slug
+
+logger = logging.getLogger(__name__)
+
+METADATA_FIELDS = ("brand", "model", "year", "manual_type", "title")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS manuals (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    slug TEXT NOT NULL,
+    brand TEXT NOT NULL,
+    model TEXT NOT NULL,
+    year TEXT NOT NULL,
+    manual_type TEXT NOT NULL,
+    title TEXT NOT NULL,
+    pages_count TEXT NOT NULL,
+    fingerprint TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS manuals_slug ON manuals (slug);
+CREATE INDEX IF NOT EXISTS manuals_filter ON manuals (brand, year);
+CREATE VIRTUAL TABLE IF NOT EXISTS manuals_fts USING fts5(
+    brand, model, year, manual_type, title, tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    manual_id INTEGER NOT NULL REFERENCES manuals (id),
+    page INTEGER NOT NULL,
+    checksum TEXT NOT NULL,
+    UNIQUE (manual_id, page)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+    text, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# bm25 column weights for manuals_fts: a title or model hit counts more than a year hit
+METADATA_WEIGHTS = (3.0, 6.0, 2.0, 1.0, 10.0)
+# How much a metadata hit counts against the best page hit when ranking manuals
+METADATA_BOOST = 2.0
+
+@dataclass
+class PageHit:
+    page: int
+    score: float
+    snippet: str
+
+@dataclass
+class ManualHit:
+    url: str
+    title: str
+    brand: str
+    model: str
+    year: str
+    manual_type: str
+    score: float  # Higher is better
+    pages: List[PageHit] = field(default_factory=list)
+
+def fts_query(text: str) -> str:
+    """FTS5 query matching all words of free text (a trailing * keeps prefix matching)
+
+    Words are quoted, so user input can never be parsed as FTS5 syntax.
+    """
+    terms = []
+    for word, star in re.findall(r"(\w+)(\*?)", text):
+        terms.append(f'"{word}"' + ("*" if star else ""))
+    return " ".join(terms)
+
+def metadata_fingerprint(row: Dict[str, str]) -> str:
+    return hashlib.sha1("\x1f".join(row.get(name) or "" for name in
+                                    METADATA_FIELDS + ("slug", "pages_count")).encode("utf-8")).hexdigest()
+
+class SearchIndex:
+    """The FTS5 index in one SQLite file"""
+
+    def __init__(self, db_path: str = "scraped_data/search_index.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30.0)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # -- indexing ----------------------------------------------------------
+
+    def index_manuals(self, rows: Iterable[Dict[str, str]]) -> Dict[str, int]:
+        """Upsert manual metadata rows, keyed by URL; unchanged rows are skipped"""
+        stats = {"added": 0, "updated": 0, "unchanged": 0}
+        with self.conn:
+            for row in rows:
+                url = (row.get("url") or "").strip()
+                if not url:
+                    continue
+                fingerprint = metadata_fingerprint(row)
+                existing = self.conn.execute("SELECT id, fingerprint FROM manuals WHERE url = ?", (url,)).fetchone()
+                if existing and existing[1] == fingerprint:
+                    stats["unchanged"] += 1
+                    continue
+                values = [row.get(name) or "" for name in METADATA_FIELDS]
+                record = (safe_slug(row.get("slug") or ""), *values, row.get("pages_count") or "", fingerprint)
+                if existing:
+                    manual_id = existing[0]
+                    self.conn.execute("UPDATE manuals SET slug = ?, brand = ?, model = ?, year = ?, manual_type = ?, "
+                                      "title = ?, pages_count = ?, fingerprint = ? WHERE id = ?",
+                                      (*record, manual_id))
+                    self.conn.execute("DELETE FROM manuals_fts WHERE rowid = ?", (manual_id,))
+                    stats["updated"] += 1
+                else:
+                    manual_id = self.conn.execute(
+                        "INSERT INTO manuals (url, slug, brand, model, year, manual_type, title, pages_count, "
+                        "fingerprint) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (url, *record)).lastrowid
+                    stats["added"] += 1
+                self.conn.execute("INSERT INTO manuals_fts (rowid, brand, model, year, manual_type, title) "
+                                  "VALUES (?, ?, ?, ?, ?, ?)", (manual_id, *values))
+        logger.info(f"[SEARCH] Manuals: {stats['added']} added, {stats['updated']} updated, "
+                    f"{stats['unchanged']} unchanged")
+        return stats
+
+    def index_pages(self, pages: Iterable[Tuple[str, int, str, str, str]]) -> Dict[str, int]:
+        """Index (manual slug, page, checksum, method, text) rows from the page text store
+
+        Pages are matched to manuals by slug; pages of manuals not in the index are counted as unknown.
+        Indexed pages of a manual that appears in the rows but that the rows no longer list are removed.
+        """
+        stats = {"indexed": 0, "unchanged": 0, "unknown": 0, "removed": 0}
+        manual_ids = dict(self.conn.execute("SELECT slug, id FROM manuals"))
+        present: Dict[int, set] = {}
+        with self.conn:
+            for slug, page, checksum, _, text in pages:
+                manual_id = manual_ids.get(slug)
+                if manual_id is None:
+                    stats["unknown"] += 1
+                    continue
+                present.setdefault(manual_id, set()).add(page)
+                existing = self.conn.execute("SELECT id, checksum FROM pages WHERE manual_id = ? AND page = ?",
+                                             (manual_id, page)).fetchone()
+                if existing and existing[1] == checksum:
+                    stats["unchanged"] += 1
+                    continue
+                if existing:
+                    page_id = existing[0]
+                    self.conn.execute("UPDATE pages SET checksum = ? WHERE id = ?", (checksum, page_id))
+                    self.conn.execute("DELETE FROM pages_fts WHERE rowid = ?", (page_id,))
+                else:
+                    page_id = self.conn.execute("INSERT INTO pages (manual_id, page, checksum) VALUES (?, ?, ?)",
+                                                (manual_id, page, checksum)).lastrowid
+                self.conn.execute("INSERT INTO pages_fts (rowid, text) VALUES (?, ?)", (page_id, text))
+                stats["indexed"] += 1
+            for manual_id, numbers in present.items():
+                stale = [page_id for page_id, page in
+                         self.conn.execute("SELECT id, page FROM pages WHERE manual_id = ?", (manual_id,))
+                         if page not in numbers]
+                self.conn.executemany("DELETE FROM pages_fts WHERE rowid = ?", [(pid,) for pid in stale])
+                self.conn.executemany("DELETE FROM pages WHERE id = ?", [(pid,) for pid in stale])
+                stats["removed"] += len(stale)
+        logger.info(f"[SEARCH] Pages: {stats['indexed']} indexed, {stats['unchanged']} unchanged, "
+                    f"{stats['removed']} removed, {stats['unknown']} of manuals not in the index")
+        return stats
+
+    def remove(self, url: str) -> bool:
+        """Drop a manual and its pages from the index"""
+        row = self.conn.execute("SELECT id FROM manuals WHERE url = ?", (url,)).fetchone()
+        if not row:
+            return False
+        with self.conn:
+            page_ids = [pid for pid, in self.conn.execute("SELECT id FROM pages WHERE manual_id = ?", row)]
+            self.conn.executemany("DELETE FROM pages_fts WHERE rowid = ?", [(pid,) for pid in page_ids])
+            self.conn.execute("DELETE FROM pages WHERE manual_id = ?", row)
+            self.conn.execute("DELETE FROM manuals_fts WHERE rowid = ?", row)
+            self.conn.execute("DELETE FROM manuals WHERE id = ?", row)
+        return True
+
+    def clear(self):
+        with self.conn:
+            for table in ("pages_fts", "pages", "manuals_fts", "manuals"):
+                self.conn.execute(f"DELETE FROM {table}")
+
+    def optimize(self):
+        """Merge FTS5 segments after a large load (faster queries, smaller file)"""
+        with self.conn:
+            self.conn.execute("INSERT INTO manuals_fts (manuals_fts) VALUES ('optimize')")
+            self.conn.execute("INSERT INTO pages_fts (pages_fts) VALUES ('optimize')")
+
+    # -- queries -----------------------------------------------------------
+
+    def _filters(self, brand, model, year, manual_type) -> Tuple[str, list]:
+        clauses, params = [], []
+        for column, value in (("brand", brand), ("year", year), ("manual_type", manual_type)):
+            if value:
+                clauses.append(f"m.{column} = ? COLLATE NOCASE")
+                params.append(str(value))
+        if model:
+            clauses.append("m.model LIKE ?")
+            params.append(f"%{model}%")
+        return (" AND " + " AND ".join(clauses)) if clauses else "", params
+
+    def search_pages(self, text: str, brand: Optional[str] = None, model: Optional[str] = None,
+                     year: Optional[str] = None, manual_type: Optional[str] = None,
+                     limit: int = 50) -> List[Tuple[ManualHit, PageHit]]:
+        """Best matching pages, each with its manual"""
+        query = fts_query(text)
+        if not query:
+            return []
+        where, params = self._filters(brand, model, year, manual_type)
+        rows = self.conn.execute(
+            "SELECT m.url, m.title, m.brand, m.model, m.year, m.manual_type, p.page, "
+            "bm25(pages_fts) AS rank, snippet(pages_fts, 0, '[', ']', '…', 12) "
+            "FROM pages_fts JOIN pages p ON p.id = pages_fts.rowid JOIN manuals m ON m.id = p.manual_id "
+            f"WHERE pages_fts MATCH ?{where} ORDER BY rank LIMIT ?", (query, *params, limit)).fetchall()
+        return [(ManualHit(*row[:6], score=-row[7]), PageHit(row[6], -row[7], row[8])) for row in rows]
+
+    def search(self, text: str = "", brand: Optional[str] = None, model: Optional[str] = None,
+               year: Optional[str] = None, manual_type: Optional[str] = None,
+               limit: int = 20, pages_per_manual: int = 3) -> List[ManualHit]:
+        """Manuals matching all words of `text` in their metadata or in a page, best first
+
+        A manual's score combines its metadata match with its best page
+        match; each hit carries up to pages_per_manual matching pages.
+        With no text, the filters alone select manuals.
+        """
+        where, params = self._filters(brand, model, year, manual_type)
+        columns = "m.id, m.url, m.title, m.brand, m.model, m.year, m.manual_type"
+        query = fts_query(text)
+        if not query:
+            rows = self.conn.execute(f"SELECT {columns} FROM manuals m WHERE 1 = 1{where} "
+                                     "ORDER BY m.brand, m.model, m.year LIMIT ?", (*params, limit))
+            return [ManualHit(*row[1:], score=0.0) for row in rows]
+
+        hits: Dict[int, ManualHit] = {}
+        weights = ", ".join(str(w) for w in METADATA_WEIGHTS)
+        for row in self.conn.execute(
+                f"SELECT {columns}, bm25(manuals_fts, {weights}) FROM manuals_fts "
+                f"JOIN manuals m ON m.id = manuals_fts.rowid WHERE manuals_fts MATCH ?{where}",
+                (query, *params)):
+            hits[row[0]] = ManualHit(*row[1:7], score=-row[7] * METADATA_BOOST)
+
+        # Score manuals by their best page first (bm25 cannot be aggregated directly, hence the materialized
+        # CTE); snippets are only built for the pages that are returned
+        for row in self.conn.execute(
+                "WITH r AS MATERIALIZED (SELECT rowid, bm25(pages_fts) AS rank FROM pages_fts WHERE pages_fts MATCH ?) "
+                f"SELECT {columns}, MIN(r.rank) FROM r JOIN pages p ON p.id = r.rowid "
+                f"JOIN manuals m ON m.id = p.manual_id WHERE 1 = 1{where} GROUP BY m.id",
+                (query, *params)):
+            hit = hits.get(row[0])
+            if hit is None:
+                hit = hits[row[0]] = ManualHit(*row[1:7], score=0.0)
+            hit.score -= row[7]
+        ranked = sorted(hits.items(), key=lambda item: -item[1].score)[:limit]
+        for manual_id, hit in ranked:
+            hit.pages = [PageHit(page, -rank, snippet) for page, rank, snippet in self.conn.execute(
+                "SELECT p.page, bm25(pages_fts) AS rank, snippet(pages_fts, 0, '[', ']', '…', 12) "
+                "FROM pages_fts JOIN pages p ON p.id = pages_fts.rowid "
+                "WHERE pages_fts MATCH ? AND p.manual_id = ? ORDER BY rank LIMIT ?",
+                (query, manual_id, pages_per_manual))]
+        return [hit for _, hit in ranked]
+
+    def stats(self) -> Dict[str, int]:
+        return {"manuals": self.conn.execute("SELECT COUNT(*) FROM manuals").fetchone()[0],
+                "pages": self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]}
+
+def build_index(index: SearchIndex, csv_paths: Sequence[str], text_db: Optional[str] = None,
+                rebuild: bool = False) -> Dict[str, Dict[str, int]]:
+    """Load metadata CSVs (and page text, when a page text database exists) into the index"""
+    if rebuild:
+        index.clear()
+    result = {"manuals": index.index_manuals(load_metadata(csv_paths))}
+    if text_db and Path(text_db).exists():
+        from text_extraction import PageTextStore
+        store = PageTextStore(text_db)
+        try:
+            result["pages"] = index.index_pages(store.pages())
+        finally:
+            store.close()
+    if rebuild:
+        index.optimize()
+    return result
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Full-text search over manuals")
+    parser.add_argument("--db", default="scraped_data/search_index.db", help="Search index file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("index", "Add new and changed manuals and pages"),
+                            ("rebuild", "Rebuild the index from scratch")):
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.add_argument("--csv", nargs="+", default=["scraped_data/manual_metadata_deduplicated.csv"],
+                         help="Metadata CSVs written by scraper_with_deduplication.py")
+        cmd.add_argument("--text-db", default="scraped_data/page_text.db", help="Page text from text_extraction.py")
+    query = sub.add_parser("query", help="Search the index")
+    query.add_argument("text", nargs="?", default="", help="Words to find")
+    query.add_argument("--brand")
+    query.add_argument("--model")
+    query.add_argument("--year")
+    query.add_argument("--manual-type")
+    query.add_argument("--limit", type=int, default=20)
+    query.add_argument("--pages", action="store_true", help="List matching pages instead of manuals")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    with SearchIndex(args.db) as index:
+        if args.command in ("index", "rebuild"):
+            build_index(index, args.csv, args.text_db, rebuild=args.command == "rebuild")
+            stats = index.stats()
+            print(f"🔎 Index holds {stats['manuals']} manuals and {stats['pages']} pages")
+            return
+        filters = dict(brand=args.brand, model=args.model, year=args.year, manual_type=args.manual_type)
+        started = time.perf_counter()
+        if args.pages:
+            results = index.search_pages(args.text, limit=args.limit, **filters)
+            elapsed = (time.perf_counter() - started) * 1000
+            for manual, page in results:
+                print(f"{page.score:7.2f}  {manual.title} p.{page.page}: {page.snippet}")
+        else:
+            results = index.search(args.text, limit=args.limit, **filters)
+            elapsed = (time.perf_counter() - started) * 1000
+            for hit in results:
+                pages = ", ".join(f"p.{page.page}" for page in hit.pages)
+                print(f"{hit.score:7.2f}  {hit.title} ({hit.year}) {hit.url}" + (f"  [{pages}]" if pages else ""))
+        print(f"⏱️  {len(results)} hits in {elapsed:.1f} ms")
+
+if __name__ == "__main__":
+    main()
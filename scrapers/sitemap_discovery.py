@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Sitemap-Driven Manual Discovery
+Features:
+- Streams the sitemap index and child sitemaps with an incremental XML parser
+  (constant memory, however many URLs a sitemap lists)
+- gzip sitemaps (.xml.gz or Content-Encoding: gzip) are decompressed on the fly
+- URLs filtered through the same manual URL classifier as listing pages
+- lastmod state: unchanged child sitemaps are not fetched, unchanged manuals
+  are not returned, so a re-run only touches new or changed manuals
+- Manuals whose processing failed are kept in a retry pool and returned again
+  by the next run without refetching their sitemap
+"""
+
+import os
+import zlib
+import json
+import logging
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+@dataclass
+class SitemapEntry:
+    """One <url> or <sitemap> element"""
+    loc: str
+    lastmod: str = ""
+    is_sitemap: bool = False  # True for child sitemaps listed in a sitemap index
+    changed: bool = False  # Seen by an earlier run with a different lastmod
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+def iter_sitemap_chunks(response, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Body of a streamed sitemap response as XML chunks, gunzipped if needed
+
+    Content-Encoding: gzip is undone by requests; a .xml.gz file served as
+    is is recognised by its magic bytes and decompressed incrementally.
+    """
+    decompressor = None
+    first = True
+    for chunk in response.iter_content(chunk_size):
+        if not chunk:
+            continue
+        if first:
+            first = False
+            if chunk[:2] == GZIP_MAGIC:
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        yield decompressor.decompress(chunk) if decompressor else chunk
+    if decompressor:
+        yield decompressor.flush()
+
+def iter_sitemap(chunks: Iterable[bytes]) -> Iterator[SitemapEntry]:
+    """Parse <url>/<sitemap> elements as chunks arrive, freeing each after use"""
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+
+    def entries():
+        nonlocal root
+        for event, elem in parser.read_events():
+            if root is None:
+                root = elem
+            if event != "end":
+                continue
+            name = _local_name(elem.tag)
+            if name not in ("url", "sitemap"):
+                continue
+            loc = lastmod = ""
+            for child in elem:
+                child_name = _local_name(child.tag)
+                if child_name == "loc":
+                    loc = (child.text or "").strip()
+                elif child_name == "lastmod":
+                    lastmod = (child.text or "").strip()
+            if loc:
+                yield SitemapEntry(loc, lastmod, is_sitemap=(name == "sitemap"))
+            root.clear()
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from entries()
+    parser.close()  # raises ParseError on a truncated document
+    yield from entries()
+
+def match_brand(path: str, brands: Optional[Sequence[str]] = None) -> Optional[str]:
+    """Brand of a manual path like "/land-rover-defender-2015-owners-manual"
+
+    With a brand list the longest matching prefix wins (so hyphenated brands
+    work); without one the first path word is taken as the brand.
+    """
+    slug = path.lstrip("/")
+    if "/" in slug or "-" not in slug:
+        return None
+    if brands is None:
+        return slug.split("-", 1)[0]
+    matches = [brand for brand in brands if slug.startswith(brand + "-")]
+    return max(matches, key=len) if matches else None
+
+def title_from_slug(path: str) -> str:
+    """Readable title for a manual known only by its URL"""
+    return path.strip("/").replace("-", " ").title()
+
+class SitemapState:
+    """lastmod of every child sitemap and manual URL seen, persisted between runs
+
+    retry holds manuals whose processing failed: URL -> [lastmod, sitemap that listed it].
+    """
+
+    def __init__(self, state_file: str = "scraped_data/sitemap_state.json"):
+        self.state_file = Path(state_file)
+        self.sitemaps: Dict[str, str] = {}
+        self.manuals: Dict[str, str] = {}
+        self.retry: Dict[str, List[str]] = {}
+        self.load()
+
+    def load(self):
+        if self.state_file.exists():
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.sitemaps = data.get('sitemaps', {})
+                self.manuals = data.get('manuals', {})
+                self.retry = data.get('retry', {})
+                logger.info(f"[SITEMAP] Loaded lastmod state for {len(self.sitemaps)} sitemaps, "
+                            f"{len(self.manuals)} manuals, {len(self.retry)} to retry")
+            except Exception as e:
+                logger.warning(f"[SITEMAP] Could not load sitemap state: {e}")
+                self.sitemaps, self.manuals, self.retry = {}, {}, {}
+
+    def save(self):
+        """Write the state atomically"""
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_file.with_name(self.state_file.name + ".tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'sitemaps': self.sitemaps, 'manuals': self.manuals, 'retry': self.retry,
+                           'last_updated': datetime.now().isoformat()}, f)
+            os.replace(tmp_path, self.state_file)
+        except Exception as e:
+            logger.error(f"[SITEMAP] Could not save sitemap state: {e}")
+
+class SitemapDiscovery:
+    """Walks a sitemap index and yields manual URLs that are new or changed
+
+    State is only updated by commit(), after the caller has processed what
+    was yielded, so an interrupted run re-discovers the same manuals. A child
+    sitemap is recorded once it has been walked; manuals the caller discard()s
+    go to the retry pool, which the next run yields again even when their
+    sitemap is unchanged and not fetched.
+    """
+
+    def __init__(self, fetch: Callable[[str], Optional[object]], accept: Callable[[str], bool],
+                 state: Optional[SitemapState] = None, max_depth: int = 3):
+        """
+        Args:
+            fetch: Returns a streamed response for a URL, or None on failure
+            accept: Manual URL classifier, called with the URL path
+            state: lastmod state; None reports every manual as new
+            max_depth: Nesting limit for sitemap indexes
+        """
+        self.fetch = fetch
+        self.accept = accept
+        self.state = state
+        self.max_depth = max_depth
+        self._pending_sitemaps: Dict[str, str] = {}
+        self._pending_manuals: Dict[str, str] = {}
+        self._sources: Dict[str, str] = {}  # manual URL -> sitemap that listed it
+        self._walked: Set[str] = set()  # sitemaps fetched and parsed in this run
+        self._retry: Dict[str, List[str]] = {}  # discarded in this run: URL -> [lastmod, sitemap]
+        self.stats = {"sitemaps_fetched": 0, "sitemaps_skipped": 0, "sitemaps_failed": 0, "urls_seen": 0,
+                      "manual_urls": 0, "new": 0, "changed": 0, "unchanged": 0, "retried": 0}
+
+    def discover(self, sitemap_urls: Sequence[str]) -> Iterator[SitemapEntry]:
+        """Yield new or changed manual URLs from the given sitemaps (indexes are followed)"""
+        for url in sitemap_urls:
+            yield from self._walk(url, 0)
+        yield from self._retry_pool()
+        logger.info(f"[SITEMAP] {self.stats['sitemaps_fetched']} sitemaps fetched "
+                    f"({self.stats['sitemaps_skipped']} unchanged, {self.stats['sitemaps_failed']} failed), "
+                    f"{self.stats['manual_urls']} manual URLs: {self.stats['new']} new, "
+                    f"{self.stats['changed']} changed, {self.stats['unchanged']} unchanged, "
+                    f"{self.stats['retried']} retried")
+
+    def _retry_pool(self) -> Iterator[SitemapEntry]:
+        """Manuals that failed in an earlier run and were not listed by a sitemap walked in this one
+
+        A retried manual whose sitemap was walked either came back through it or
+        is no longer listed, and is dropped.
+        """
+        if self.state is None:
+            return
+        for loc, (lastmod, sitemap) in list(self.state.retry.items()):
+            if sitemap in self._walked or loc in self._pending_manuals:
+                continue
+            entry = SitemapEntry(loc, lastmod, changed=loc in self.state.manuals)
+            self.stats["retried"] += 1
+            self._pending_manuals[loc] = lastmod
+            self._sources[loc] = sitemap
+            yield entry
+
+    def _walk(self, url: str, depth: int) -> Iterator[SitemapEntry]:
+        response = self.fetch(url)
+        if response is None:
+            self.stats["sitemaps_failed"] += 1
+            logger.warning(f"[SITEMAP] Could not fetch {url}")
+            return
+        self.stats["sitemaps_fetched"] += 1
+        children: List[SitemapEntry] = []
+        try:
+            for entry in iter_sitemap(iter_sitemap_chunks(response)):
+                if entry.is_sitemap:
+                    children.append(entry)
+                else:
+                    yield from self._check_manual(entry, url)
+        except (ET.ParseError, zlib.error) as e:
+            self.stats["sitemaps_failed"] += 1
+            logger.error(f"[SITEMAP] Malformed sitemap {url}: {e}")
+            return
+        finally:
+            response.close()
+        self._walked.add(url)
+
+        # Children after the index is fully read, so one connection is never held open twice
+        for child in children:
+            known = self.state.sitemaps.get(child.loc) if self.state else None
+            if child.lastmod and known == child.lastmod:
+                self.stats["sitemaps_skipped"] += 1
+                continue
+            if depth + 1 > self.max_depth:
+                logger.warning(f"[SITEMAP] Not following {child.loc}: nested deeper than {self.max_depth}")
+                continue
+            failed_before = self.stats["sitemaps_failed"]
+            yield from self._walk(child.loc, depth + 1)
+            if child.lastmod and self.stats["sitemaps_failed"] == failed_before:
+                self._pending_sitemaps[child.loc] = child.lastmod
+
+    def _check_manual(self, entry: SitemapEntry, sitemap_url: str) -> Iterator[SitemapEntry]:
+        self.stats["urls_seen"] += 1
+        if not self.accept(urlparse(entry.loc).path):
+            return
+        self.stats["manual_urls"] += 1
+        known = self.state.manuals.get(entry.loc) if self.state else None
+        if known is not None and (known == entry.lastmod or not entry.lastmod):
+            self.stats["unchanged"] += 1
+            return
+        entry.changed = known is not None
+        self.stats["changed" if entry.changed else "new"] += 1
+        self._pending_manuals[entry.loc] = entry.lastmod
+        self._sources[entry.loc] = sitemap_url
+        yield entry
+
+    def discard(self, loc: str):
+        """Leave a yielded manual out of commit() because processing it failed
+
+        Its lastmod is not recorded; commit() puts it in the retry pool instead,
+        so the next run yields it again without refetching its sitemap.
+        """
+        lastmod = self._pending_manuals.pop(loc, None)
+        sitemap = self._sources.pop(loc, None)
+        if lastmod is not None:
+            self._retry[loc] = [lastmod, sitemap or ""]
+
+    def commit(self):
+        """Record the lastmods seen in this run and save the state"""
+        if self.state is None:
+            return
+        self.state.sitemaps.update(self._pending_sitemaps)
+        self.state.manuals.update(self._pending_manuals)
+        # Every earlier retry was yielded again this run or is no longer listed
+        self.state.retry = dict(self._retry)
+        self._pending_sitemaps.clear()
+        self._pending_manuals.clear()
+        self._sources.clear()
+        self._walked.clear()
+        self._retry.clear()
+        self.state.save()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Sharded Static Catalog for the Frontend
+Features:
+- Builds compact JSON (or MessagePack) shards from the scraper's catalog output:
+  one per brand (its models with years, types and counts) and one per
+  brand/model (its manuals: year, title, type, page count, url, slug)
+- Content-hashed shard names, so hosting can cache them forever; only the
+  small manifest.json needs revalidation
+- Incremental: a shard is only written when its content changed, the
+  manifest only when any shard did
+- Shards of the previous build are kept for clients still holding the old
+  manifest; older ones are removed
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from manual_lookup import load_rows, normalize_key
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"json": ".json", "msgpack": ".msgpack"}
+MANUAL_FIELDS = ["year", "title", "manual_type", "pages", "url", "slug"]
+MANIFEST_NAME = "manifest.json"
+BUILD_FILES_NAME = ".build_files.json"  # Shards of the last two builds, for cleanup
+HASH_LENGTH = 12
+
+def encode(obj, fmt: str) -> bytes:
+    if fmt == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed (pip install msgpack)")
+        return msgpack.packb(obj, use_bin_type=True)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def shard_key(value: str) -> str:
+    """Same normalization as the lookup service, so the app can derive keys itself"""
+    return normalize_key(value) or "_"
+
+def display_year(value: str):
+    value = (value or "").strip()
+    return int(value) if value.isdigit() and len(value) == 4 else value
+
+def page_count(row: Dict[str, str]) -> Optional[int]:
+    """Image pages found by the scraper, else the page count the site lists"""
+    for name in ("total_image_pages", "pages_count"):
+        match = re.search(r"\d+", str(row.get(name) or ""))
+        if match and int(match.group()) > 0:
+            return int(match.group())
+    return None
+
+def group_rows(rows: Iterable[Dict[str, str]]) -> Dict[str, Dict[str, List[Dict[str, str]]]]:
+    """brand key -> model key -> rows, keeping the first row seen per URL"""
+    grouped: Dict[str, Dict[str, List[Dict[str, str]]]] = defaultdict(lambda: defaultdict(list))
+    seen = set()
+    for row in rows:
+        url = (row.get("url") or "").strip()
+        if not url or url in seen or not normalize_key(row.get("brand")):
+            continue
+        seen.add(url)
+        grouped[shard_key(row["brand"])][shard_key(row.get("model") or "")].append(row)
+    return grouped
+
+class StaticCatalogBuilder:
+    """Writes the shard tree under output_dir:
+
+        manifest.json                          brands -> brand shard
+        brands/<brand>.<hash>.json             models -> model shard
+        models/<brand>/<model>.<hash>.json     manuals as rows of MANUAL_FIELDS
+    """
+
+    def __init__(self, output_dir: str = "scraped_data/catalog", fmt: str = "json"):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown catalog format '{fmt}', expected one of {tuple(FORMATS)}")
+        self.output_dir = Path(output_dir)
+        self.fmt = fmt
+        self.stats = {"written": 0, "unchanged": 0, "removed": 0}
+        self._files: Set[str] = set()
+
+    def _write_shard(self, name: str, obj) -> str:
+        """Store obj under <name>.<content hash><ext> unless it is already there; returns the relative path"""
+        data = encode(obj, self.fmt)
+        relative = f"{name}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{FORMATS[self.fmt]}"
+        self._files.add(relative)
+        path = self.output_dir / relative
+        if path.exists():
+            self.stats["unchanged"] += 1
+            return relative
+        self._write_atomic(path, data)
+        self.stats["written"] += 1
+        return relative
+
+    def _write_atomic(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def _model_shard(self, brand_key: str, model_key: str, rows: List[Dict[str, str]]) -> Dict:
+        manuals = sorted(([display_year(row.get("year")), row.get("title") or "", row.get("manual_type") or "",
+                           page_count(row), row["url"].strip(), row.get("slug") or ""] for row in rows),
+                         key=lambda manual: (manual[1], manual[4]))
+        manuals.sort(key=lambda manual: str(manual[0]), reverse=True)  # Newest year first, titles A-Z within it
+        path = self._write_shard(f"models/{brand_key}/{model_key}", {
+            "brand": rows[0].get("brand") or "", "model": rows[0].get("model") or "",
+            "fields": MANUAL_FIELDS, "manuals": manuals})
+        years = sorted({manual[0] for manual in manuals if manual[0] != ""}, key=str, reverse=True)
+        return {"model": rows[0].get("model") or "", "key": model_key, "years": years,
+                "types": sorted({manual[2] for manual in manuals if manual[2]}),
+                "manuals": len(manuals), "shard": path}
+
+    def build(self, rows: Iterable[Dict[str, str]]) -> Dict:
+        """Write all shards and the manifest; returns the manifest"""
+        self.stats = {"written": 0, "unchanged": 0, "removed": 0}
+        self._files = set()
+        brands = []
+        for brand_key, models in sorted(group_rows(rows).items()):
+            entries = [self._model_shard(brand_key, model_key, model_rows)
+                       for model_key, model_rows in sorted(models.items())]
+            brand_name = next(iter(models.values()))[0]["brand"]
+            shard = self._write_shard(f"brands/{brand_key}", {"brand": brand_name, "models": entries})
+            brands.append({"brand": brand_name, "key": brand_key, "models": len(entries),
+                           "manuals": sum(entry["manuals"] for entry in entries), "shard": shard})
+
+        manifest = {"format": self.fmt, "manuals": sum(brand["manuals"] for brand in brands), "brands": brands}
+        manifest["version"] = hashlib.sha256(encode(manifest, "json")).hexdigest()[:HASH_LENGTH]
+        manifest_path = self.output_dir / MANIFEST_NAME
+        previous = self._read_json(manifest_path)
+        if previous.get("version") == manifest["version"]:
+            manifest["generated"] = previous.get("generated")
+        else:
+            manifest["generated"] = datetime.now().isoformat()
+            # Manifest last: clients never see it before the shards it points to
+            self._write_atomic(manifest_path, encode(manifest, "json"))
+        self._cleanup()
+        logger.info(f"[CATALOG] {len(brands)} brands, {manifest['manuals']} manuals: {self.stats['written']} "
+                    f"shards written, {self.stats['unchanged']} unchanged, {self.stats['removed']} removed")
+        return manifest
+
+    def _read_json(self, path: Path) -> Dict:
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _cleanup(self):
+        """Remove shards that neither this build nor the previous one references"""
+        record_path = self.output_dir / BUILD_FILES_NAME
+        record = self._read_json(record_path)
+        current = sorted(self._files)
+        if record.get("current") != current:
+            record = {"current": current, "previous": record.get("current", [])}
+            self._write_atomic(record_path, encode(record, "json"))
+        keep = set(record["current"]) | set(record["previous"])
+        for directory in ("brands", "models"):
+            for path in (self.output_dir / directory).rglob("*"):
+                relative = path.relative_to(self.output_dir).as_posix()
+                if path.is_file() and relative not in keep:
+                    path.unlink()
+                    self.stats["removed"] += 1
+
+def build_catalog(catalog: Sequence[str], output_dir: str = "scraped_data/catalog", fmt: str = "json") -> Dict:
+    return StaticCatalogBuilder(output_dir, fmt).build(load_rows(catalog))
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the sharded static catalog for the frontend")
+    parser.add_argument("--catalog", nargs="+", default=["scraped_data"],
+                        help="Catalog CSV/Parquet files or directories (scraper output)")
+    parser.add_argument("--output", default="scraped_data/catalog", help="Directory to publish (e.g. ../public/catalog)")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="json", help="Shard encoding")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    builder = StaticCatalogBuilder(args.output, args.format)
+    manifest = builder.build(load_rows(args.catalog))
+    print(f"🗂️  Catalog {manifest['version']}: {len(manifest['brands'])} brands, {manifest['manuals']} manuals "
+          f"({builder.stats['written']} shards written, {builder.stats['unchanged']} unchanged) in {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test Adaptive Concurrency Control
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+sys.path.append('.')
+
+from concurrency import AdaptiveConcurrencyController
+from metrics import ScraperMetrics
+from retry_policy import OK, NOT_FOUND, SERVER_ERROR, THROTTLED, TIMEOUT
+
+def healthy_window(controller, latency=0.1):
+    controller.in_flight = controller.current_limit  # the limit is fully used
+    for _ in range(controller.window):
+        controller.record(latency, OK)
+    controller.in_flight = 0
+
+def test_additive_increase_up_to_max():
+    controller = AdaptiveConcurrencyController(initial=2, max_limit=4, window=5)
+    healthy_window(controller)
+    assert controller.current_limit == 3
+    for _ in range(3):
+        healthy_window(controller)
+    assert controller.current_limit == 4  # capped at max_limit
+
+    # An idle window (limit not used) is no evidence the site can take more
+    controller = AdaptiveConcurrencyController(initial=2, max_limit=4, window=5)
+    for _ in range(5):
+        controller.record(0.1, OK)
+    assert controller.current_limit == 2
+    print("✅ Healthy, fully used windows grow the limit by one up to max_limit")
+
+def test_multiplicative_decrease_with_cooldown():
+    controller = AdaptiveConcurrencyController(initial=8, min_limit=1, max_limit=16, window=5, cooldown=60)
+    controller.record(0.1, SERVER_ERROR)
+    assert controller.current_limit == 4
+    controller.record(0.1, TIMEOUT)  # same burst: within the cooldown
+    assert controller.current_limit == 4
+    controller.record(0.1, NOT_FOUND)  # not an overload signal
+    assert controller.current_limit == 4
+
+    controller = AdaptiveConcurrencyController(initial=2, min_limit=1, window=5, cooldown=0)
+    for _ in range(3):
+        controller.record(0.1, THROTTLED)
+    assert controller.current_limit == 1  # never below min_limit
+    print("✅ Overload halves the limit once per cooldown, down to min_limit")
+
+def test_slow_window_decreases_limit():
+    controller = AdaptiveConcurrencyController(initial=5, window=5, target_p95=1.0)
+    healthy_window(controller, latency=2.5)
+    assert controller.current_limit == 4
+    print("✅ p95 over target steps the limit down")
+
+def test_slots_respect_the_limit():
+    controller = AdaptiveConcurrencyController(initial=3, adaptive=False)
+    peak = 0
+    lock = threading.Lock()
+
+    def request():
+        nonlocal peak
+        with controller.slot():
+            with lock:
+                peak = max(peak, controller.in_flight)
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=request) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak == 3 and controller.in_flight == 0
+
+    controller.record(0.1, SERVER_ERROR)  # fixed limit: feedback is ignored
+    assert controller.current_limit == 3
+    print("✅ In-flight requests never exceed the limit")
+
+def test_retry_after_pause_blocks_new_requests():
+    controller = AdaptiveConcurrencyController(initial=2)
+    controller.pause(0.2)
+    started = time.monotonic()
+    with controller.slot():
+        waited = time.monotonic() - started
+    assert waited >= 0.15
+    print(f"✅ Retry-After pause held the next request for {waited:.2f}s")
+
+def test_limit_history_is_exported():
+    with tempfile.TemporaryDirectory() as tmp:
+        history_file = os.path.join(tmp, "concurrency.jsonl")
+        metrics = ScraperMetrics()
+        controller = AdaptiveConcurrencyController(initial=4, window=5, cooldown=0,
+                                                   metrics=metrics, history_file=history_file)
+        controller.record(0.1, THROTTLED)
+        healthy_window(controller)
+        with open(history_file, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f]
+        assert [entry["limit"] for entry in entries] == [4, 2, 3]
+        assert entries == controller.history
+        assert metrics.snapshot()["gauges"]["concurrency_limit"] == 3
+    print("✅ Limit changes logged to history, JSON lines and the metrics gauge")
+
+if __name__ == "__main__":
+    print("🚀 Starting Adaptive Concurrency Tests\n")
+    test_additive_increase_up_to_max()
+    test_multiplicative_decrease_with_cooldown()
+    test_slow_window_decreases_limit()
+    test_slots_respect_the_limit()
+    test_retry_after_pause_blocks_new_requests()
+    test_limit_history_is_exported()
+    print("🎉 ALL TESTS PASSED!")
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Test Persistent Job Queue
+"""
+
+import os
+import sys
+import time
+import tempfile
+import multiprocessing
+sys.path.append('.')
+
+from retry_policy import RetryPolicy
+from job_queue import (JobQueue, JobWorker, build_handlers, build_pdf, LISTING_PAGE, MANUAL_INFO, PAGE_DISCOVERY,
+                       IMAGE_DOWNLOAD, PDF_BUILD, DONE, DEAD, PENDING)
+from manual_info import ManualInfoCache
+from scraper_with_deduplication import DeduplicationManager, EnhancedCarManualScraper, ScrapingConfig
+
+def make_queue(tmp, **kwargs) -> JobQueue:
+    kwargs.setdefault("retry_policy", RetryPolicy(base_delay=0.0, max_delay=0.0))
+    return JobQueue(os.path.join(tmp, "jobs.db"), **kwargs)
+
+def test_enqueue_is_idempotent():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp)
+        assert queue.enqueue(LISTING_PAGE, {"brand": "kia", "page": 1}, key="kia/1")
+        assert not queue.enqueue(LISTING_PAGE, {"brand": "kia", "page": 1}, key="kia/1")
+        assert queue.enqueue_many(PAGE_DISCOVERY, [{"url": "a"}, {"url": "b"}, {"url": "a"}],
+                                  key_func=lambda p: p["url"]) == 2
+        assert queue.stats() == {LISTING_PAGE: {PENDING: 1}, PAGE_DISCOVERY: {PENDING: 2}}
+    print("✅ Duplicate jobs ignored")
+
+def test_expired_lease_is_reclaimed():
+    """A crashed worker's job goes back to the queue; its late completion is rejected"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp, lease_seconds=0.1)
+        queue.enqueue(PAGE_DISCOVERY, {"url": "a"})
+        crashed = queue.lease("worker-1")[0]
+        assert queue.lease("worker-2") == []  # still leased
+
+        time.sleep(0.15)
+        retried = queue.lease("worker-2")[0]
+        assert retried.id == crashed.id and retried.attempts == 2
+        assert not queue.complete(crashed)
+        assert queue.complete(retried, {"pages": 3})
+        assert list(queue.results(PAGE_DISCOVERY)) == [{"pages": 3}]
+    print("✅ Expired lease reclaimed without double completion")
+
+def test_failures_retry_then_dead_letter():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp, max_attempts=2)
+        queue.enqueue(PAGE_DISCOVERY, {"url": "broken"})
+
+        def handler(payload, q):
+            raise RuntimeError("server error")
+
+        worker = JobWorker(queue, {PAGE_DISCOVERY: handler}, poll_interval=0.01)
+        worker.run(exit_when_empty=True)
+        assert worker.failed == 2
+        assert queue.stats() == {PAGE_DISCOVERY: {DEAD: 1}}
+        assert queue.requeue_dead() == 1
+    print("✅ Failed job retried, then dead-lettered")
+
+def _work(db_path, worker_id):
+    queue = JobQueue(db_path)
+    JobWorker(queue, {PAGE_DISCOVERY: lambda payload, q: {"n": payload["n"], "worker": worker_id}},
+              worker_id=worker_id, poll_interval=0.01).run(exit_when_empty=True)
+
+def test_parallel_workers_share_the_queue():
+    """Several processes drain the queue with every job done exactly once"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp)
+        queue.enqueue_many(PAGE_DISCOVERY, [{"n": n} for n in range(60)])
+        workers = [multiprocessing.Process(target=_work, args=(str(queue.db_path), f"w{i}")) for i in range(3)]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join(60)
+
+        results = list(queue.results(PAGE_DISCOVERY))
+        assert sorted(r["n"] for r in results) == list(range(60))
+        assert queue.stats() == {PAGE_DISCOVERY: {DONE: 60}}
+        print(f"✅ 60 jobs done once each by {len({r['worker'] for r in results})} worker processes")
+
+class FlakyQueue(JobQueue):
+    """Fails the first manual_info enqueue, as a crash between classify and commit would"""
+    fail_next = True
+
+    def enqueue_many(self, job_type, payloads, **kwargs):
+        if job_type == MANUAL_INFO and self.fail_next:
+            self.fail_next = False
+            raise RuntimeError("database is locked")
+        return super().enqueue_many(job_type, payloads, **kwargs)
+
+def test_listing_job_retry_requeues_manuals():
+    """A listing job that fails or loses its lease enqueues its manuals again, once each"""
+    links = [(f"/jeep-{model}-2014-owners-manual", f"Jeep {model} 2014 Owners Manual", {})
+             for model in ("wrangler", "cherokee", "compass")]
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = FlakyQueue(os.path.join(tmp, "jobs.db"), lease_seconds=0.1, max_attempts=5,
+                           retry_policy=RetryPolicy(base_delay=0.0, max_delay=0.0))
+        scraper = EnhancedCarManualScraper(ScrapingConfig())
+        try:
+            scraper.dedup_manager = DeduplicationManager(os.path.join(tmp, "seen_urls.json"))
+            scraper.fetch_listing_links = lambda brand, page: links if page == 1 else []
+            worker = JobWorker(queue, {LISTING_PAGE: build_handlers(scraper)[LISTING_PAGE]}, poll_interval=0.01)
+            queue.enqueue(LISTING_PAGE, {"brand": "jeep", "page": 1}, key="jeep/1")
+
+            worker.run_one(queue.lease("w1", [LISTING_PAGE])[0])
+            assert worker.failed == 1 and MANUAL_INFO not in queue.stats()
+
+            worker.run_one(queue.lease("w1", [LISTING_PAGE])[0])
+            assert queue.stats()[MANUAL_INFO] == {PENDING: 3}
+            assert list(queue.results(LISTING_PAGE))[0]["new"] == 3
+
+            # The same page run again (a lease expired mid-job) finds them already queued
+            queue.enqueue(LISTING_PAGE, {"brand": "jeep", "page": 1}, key="jeep/1-again", priority=1)
+            worker.run_one(queue.lease("w2", [LISTING_PAGE])[0])
+            again = [r for r in queue.results(LISTING_PAGE) if r["page"] == 1][-1]
+            assert again["new"] == 0 and again["duplicates"] == 3
+            assert queue.stats()[MANUAL_INFO] == {PENDING: 3}
+
+            # Queue workers never touch the shared seen-URL file
+            assert not scraper.dedup_manager.seen_urls
+            scraper.dedup_manager.save_seen_data()
+            assert not os.path.exists(os.path.join(tmp, "seen_urls.json"))
+        finally:
+            scraper.executor.shutdown()
+    print("✅ Retried listing jobs re-enqueue their manuals; the queue key dedupes them")
+
+class FakeResponse:
+    content = b"<html><body><p>Pages: 312</p><p>PDF Size: 2.5 MB</p></body></html>"
+    encoding = "utf-8"
+
+def test_failed_manual_info_is_retried():
+    """A manual_info job whose page fetch fails is retried, not completed empty"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp)
+        scraper = EnhancedCarManualScraper(ScrapingConfig())
+        try:
+            scraper.info_cache = ManualInfoCache(os.path.join(tmp, "manual_info_cache.json"))
+            responses = [None, FakeResponse()]  # fetch gives up once, then succeeds
+            scraper.make_request_with_retry = lambda url, stream=False: responses.pop(0)
+            worker = JobWorker(queue, {MANUAL_INFO: build_handlers(scraper)[MANUAL_INFO]}, poll_interval=0.01)
+            url = "https://example.com/jeep-wrangler-2014-owners-manual"
+            queue.enqueue(MANUAL_INFO, {"brand": "Jeep", "title": "Jeep Wrangler 2014", "url": url}, key=url)
+
+            worker.run_one(queue.lease("w1", [MANUAL_INFO])[0])
+            assert worker.failed == 1 and queue.stats()[MANUAL_INFO] == {PENDING: 1}
+            assert PAGE_DISCOVERY not in queue.stats() and not scraper.info_cache.get(url)
+
+            worker.run_one(queue.lease("w1", [MANUAL_INFO])[0])
+            assert queue.stats()[MANUAL_INFO] == {DONE: 1} and queue.stats()[PAGE_DISCOVERY] == {PENDING: 1}
+            assert list(queue.results(MANUAL_INFO))[0]["pages_count"] == "312"
+        finally:
+            scraper.executor.shutdown()
+    print("✅ Failed manual_info jobs are retried instead of completed")
+
+def test_pdf_build_waits_for_every_page():
+    """A short or dead-lettered range keeps the PDF from being built with pages missing"""
+    from PIL import Image
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp, max_attempts=1)
+        scraper = EnhancedCarManualScraper(ScrapingConfig())
+        try:
+            url = "https://example.com/audi-a4-2020-owners-manual"
+            scraper.extract_image_pages = lambda manual: [url] + [f"{url}/{n}" for n in range(2, 5)]
+            missing = {4}  # page 4 fails to download at first
+
+            def download_page_range(manual, first_page, last_page):
+                folder = os.path.join(tmp, "images", manual.slug)
+                os.makedirs(folder, exist_ok=True)
+                pages = [n for n in range(first_page, last_page + 1) if n not in missing]
+                for n in pages:
+                    Image.new("RGB", (8, 8), "white").save(os.path.join(folder, f"page_{n:03d}.jpg"))
+                return len(pages), last_page - first_page + 1
+            scraper.download_page_range = download_page_range
+
+            handlers = build_handlers(scraper, os.path.join(tmp, "images"), os.path.join(tmp, "pdf"), split_pages=2)
+            worker = JobWorker(queue, handlers, poll_interval=0.01)
+            queue.enqueue(PAGE_DISCOVERY, {"brand": "Audi", "title": "Audi A4 2020", "slug": "audi-a4", "url": url})
+            worker.run_one(queue.lease("w1", [PAGE_DISCOVERY])[0])
+            for job in queue.lease("w1", [IMAGE_DOWNLOAD], limit=2):
+                worker.run_one(job)
+            assert queue.stats()[IMAGE_DOWNLOAD] == {DONE: 1, DEAD: 1}
+
+            worker.run_one(queue.lease("w1", [PDF_BUILD])[0])
+            assert queue.stats()[PDF_BUILD] == {DEAD: 1}
+            assert not os.path.exists(os.path.join(tmp, "pdf", "audi-a4.pdf"))
+
+            # Once the range is requeued and completes, the build goes through
+            missing.clear()
+            assert queue.requeue_dead() == 2
+            worker.run_one(queue.lease("w1", [IMAGE_DOWNLOAD])[0])
+            worker.run_one(queue.lease("w1", [PDF_BUILD])[0])
+            assert list(queue.results(PDF_BUILD))[0]["pages"] == 4
+
+            # A single-range build also checks the page count against the manual
+            os.remove(os.path.join(tmp, "images", "audi-a4", "page_004.jpg"))
+            try:
+                build_pdf(os.path.join(tmp, "images", "audi-a4"), os.path.join(tmp, "short.pdf"), expected_pages=4)
+                assert False, "expected FileNotFoundError"
+            except FileNotFoundError:
+                pass
+        finally:
+            scraper.executor.shutdown()
+    print("✅ PDF build waits for dead or short page ranges")
+
+if __name__ == "__main__":
+    print("🚀 Starting Job Queue Tests\n")
+    test_enqueue_is_idempotent()
+    test_expired_lease_is_reclaimed()
+    test_failures_retry_then_dead_letter()
+    test_parallel_workers_share_the_queue()
+    test_listing_job_retry_requeues_manuals()
+    test_failed_manual_info_is_retried()
+    test_pdf_build_waits_for_every_page()
+    print("🎉 ALL TESTS PASSED!")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test Listing Page Fingerprints and Wraparound Detection
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+from listing_state import ListingFingerprintStore, ListingWraparoundDetector, fingerprint_links
+from scraper_with_deduplication import DeduplicationManager, EnhancedCarManualScraper, ScrapingConfig
+
+def listing(page, models=3):
+    return [(f"/jeep-p{page}m{n}-2014-owners-manual", f"Jeep P{page}M{n} 2014 Owners Manual",
+             {"pages_count": "100", "file_size": "2 MB"}) for n in range(models)]
+
+def crawl(tmp, pages, stop_after=2):
+    """scrape_brand over fake listing pages; returns the page numbers fetched"""
+    scraper = EnhancedCarManualScraper(ScrapingConfig(incremental=True, incremental_stop_after=stop_after,
+                                                      delay_range=(0.0, 0.0)))
+    try:
+        scraper.listing_store = ListingFingerprintStore(os.path.join(tmp, "listing_fingerprints.json"))
+        scraper.dedup_manager = DeduplicationManager(os.path.join(tmp, "seen_urls.json"))  # nothing known
+        fetched = []
+
+        def fetch_listing_links(brand, page_num):
+            fetched.append(page_num)
+            return pages.get(page_num, [])
+        scraper.fetch_listing_links = fetch_listing_links
+        scraper.scrape_brand("jeep")
+        scraper.listing_store.save()
+    finally:
+        scraper.executor.shutdown()
+    return fetched
+
+def test_fingerprint_depends_on_order():
+    assert fingerprint_links(["/a", "/b"]) == fingerprint_links(["/a", "/b"])
+    assert fingerprint_links(["/a", "/b"]) != fingerprint_links(["/b", "/a"])
+    print("✅ Fingerprints are stable and order-sensitive")
+
+def test_repeated_page_stops_crawl():
+    """Past the last page the site serves page 1 again"""
+    detector = ListingWraparoundDetector()
+    assert detector.check(1, ["/lamborghini-a", "/lamborghini-b"]) is None
+    assert detector.check(2, ["/lamborghini-c"]) is None
+    reason = detector.check(3, ["/lamborghini-a", "/lamborghini-b"])
+    assert reason == "page 3 repeats page 1"
+    print("✅ Repeated page detected:", reason)
+
+def test_page_of_known_links_stops_crawl():
+    """A reshuffled page with nothing new also ends the crawl"""
+    detector = ListingWraparoundDetector()
+    assert detector.check(1, ["/a", "/b", "/c"]) is None
+    assert detector.check(2, ["/d", "/a"]) is None  # partially new is fine
+    reason = detector.check(3, ["/c", "/d", "/b"])
+    assert reason is not None and "already seen" in reason
+    assert detector.check(4, []) is None  # empty pages are left to the empty-page stop
+    print("✅ Page of already-seen links detected")
+
+def test_fingerprints_persist():
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = os.path.join(tmp, "listing_fingerprints.json")
+        store = ListingFingerprintStore(state_file)
+        assert store.update("kia", 1, "aaa") is False  # first sighting
+        assert store.update("kia", 2, "bbb") is False
+        store.save()
+
+        store = ListingFingerprintStore(state_file)
+        assert store.get("kia", 1) == "aaa" and store.get("kia", 3) is None
+        assert store.update("kia", 1, "aaa") is True
+        assert store.update("kia", 2, "ccc") is False and store.get("kia", 2) == "ccc"
+    print("✅ Listing fingerprints persist between runs")
+
+def test_incremental_stop_after_unchanged_pages():
+    pages = {n: listing(n) for n in range(1, 7)}
+    with tempfile.TemporaryDirectory() as tmp:
+        assert crawl(tmp, pages) == [1, 2, 3, 4, 5, 6, 7, 8, 9]  # first run: ends on empty pages
+        # Manuals are not in the seen set, so only the fingerprints stop this run
+        assert crawl(tmp, pages) == [1, 2]
+    print("✅ Incremental crawl stops after incremental_stop_after unchanged pages")
+
+def test_changed_page_resets_the_count():
+    pages = {n: listing(n) for n in range(1, 7)}
+    with tempfile.TemporaryDirectory() as tmp:
+        crawl(tmp, pages)
+        pages[2] = listing(2, models=4)  # a manual was added on page 2
+        assert crawl(tmp, pages) == [1, 2, 3, 4]
+        assert crawl(tmp, pages, stop_after=3) == [1, 2, 3]
+    print("✅ A changed listing page resets the unchanged-page count")
+
+if __name__ == "__main__":
+    print("🚀 Starting Listing State Tests\n")
+    test_fingerprint_depends_on_order()
+    test_repeated_page_stops_crawl()
+    test_page_of_known_links_stops_crawl()
+    test_fingerprints_persist()
+    test_incremental_stop_after_unchanged_pages()
+    test_changed_page_resets_the_count()
+    print("🎉 ALL TESTS PASSED!")
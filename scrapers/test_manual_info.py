@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test Manual Metadata Harvesting and Cache
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+from bs4 import BeautifulSoup
+
+from manual_info import ManualInfoCache, harvest_listing_info, parse_manual_info
+from scraper_with_deduplication import ManualEntry
+
+LISTING = """
+<ul>
+  <li><a href="/audi-a4-2010-owners-manual">Audi A4 2010 owners manual</a>
+      <span>Pages: 312</span> <span>PDF Size: 7.5 MB</span></li>
+  <li><a href="/audi-a6-2011-owners-manual">Audi A6 2011 owners manual</a></li>
+</ul>
+"""
+
+def test_parse_manual_info():
+    assert parse_manual_info("Pages: 42 PDF Size: 3.1 MB") == {"pages_count": "42", "file_size": "3.1 MB"}
+    assert parse_manual_info("nothing here") == {}
+    print("✅ Pages and size parsed")
+
+def test_harvest_listing_info_stays_within_card():
+    soup = BeautifulSoup(LISTING, "html.parser")
+    first, second = soup.find_all("a")
+    assert harvest_listing_info(first) == {"pages_count": "312", "file_size": "7.5 MB"}
+    # The second card has no metadata and must not borrow its neighbour's
+    assert harvest_listing_info(second) == {}
+    print("✅ Listing card metadata harvested")
+
+def test_cache_round_trip():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, "manual_info_cache.json")
+        cache = ManualInfoCache(cache_file)
+        cache.put("https://example.com/audi-a6", {"pages_count": "280"})
+        cache.save()
+
+        manual = ManualEntry(brand="Audi", model="A6", year="2011", title="Audi A6",
+                             slug="/audi-a6", url="https://example.com/audi-a6")
+        assert ManualInfoCache(cache_file).apply(manual)
+        assert manual.pages_count == "280" and manual.file_size == ""
+    print("✅ Cached metadata applied on the next run")
+
+def test_empty_fetch_is_not_cached():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, "manual_info_cache.json")
+        cache = ManualInfoCache(cache_file)
+        cache.put("https://example.com/audi-a4", {})
+        assert cache.get("https://example.com/audi-a4") is None
+        cache.save()
+        assert not os.path.exists(cache_file)
+
+        # An all-empty entry from an older cache file is a miss, not a hit
+        cache.entries["https://example.com/audi-a4"] = {"pages_count": "", "file_size": ""}
+        manual = ManualEntry(brand="Audi", model="A4", year="2010", title="Audi A4",
+                             slug="/audi-a4", url="https://example.com/audi-a4")
+        assert not cache.apply(manual)
+    print("✅ Empty fetch results are neither cached nor counted as hits")
+
+if __name__ == "__main__":
+    print("🚀 Starting Manual Info Tests\n")
+    test_parse_manual_info()
+    test_harvest_listing_info_stays_within_card()
+    test_cache_round_trip()
+    test_empty_fetch_is_not_cached()
+    print("🎉 ALL TESTS PASSED!")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test Vehicle-to-Manual Lookup
+"""
+
+import csv
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+sys.path.append('.')
+
+from load_test_lookup import percentile, query_mix, run_load
+from manual_lookup import CatalogIndex, CatalogWatcher, catalog_files
+
+FIELDS = ["brand", "model", "year", "title", "slug", "url", "manual_type", "pages_count", "file_size"]
+
+def row(brand, model, year, manual_type="Owner Manual"):
+    slug = f"{brand}-{model}-{year}-{manual_type}".lower().replace(" ", "-")
+    return {"brand": brand, "model": model, "year": year, "title": f"{year} {brand} {model} {manual_type}",
+            "slug": slug, "url": f"https://example.com/{slug}", "manual_type": manual_type,
+            "pages_count": "300", "file_size": ""}
+
+CATALOG = [
+    row("Jeep", "Wrangler", "2014"), row("Jeep", "Wrangler", "2014", "Navigation Manual"),
+    row("Jeep", "Wrangler Unlimited", "2014"), row("Jeep", "Wrangler", "2015"),
+    row("Jeep", "Grand Cherokee", "2014"), row("Ford", "F-150", "2018"),
+    row("Mercedes-Benz", "C-Class", "2012"),
+]
+
+def write_csv(path: Path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def test_lookup_matching():
+    index = CatalogIndex(CATALOG + [CATALOG[0]])
+    assert index.manual_count == len(CATALOG)
+
+    result = index.lookup("jeep", "Wrangler", 2014)
+    assert result["exact"] and result["models"] == ["Wrangler"] and result["count"] == 2
+    assert index.lookup("JEEP", "wrangler", "2014", manual_type="owner")["count"] == 1
+    assert index.lookup("Jeep", "grand-cherokee")["manuals"][0]["year"] == "2014"
+    assert index.lookup("ford", "F150", "2018")["count"] == 1
+    assert index.lookup("mercedes benz", "c class")["brand"] == "Mercedes-Benz"
+
+    # Query shorter or longer than a model name reaches the models it prefixes
+    result = index.lookup("Jeep", "Wrangler Unlimited Sahara", 2014)
+    assert not result["exact"] and result["models"] == ["Wrangler Unlimited"]
+    # Typos fall back to the closest spelling
+    result = index.lookup("Jepp", "Wranlger", 2015)
+    assert result["brand"] == "Jeep" and result["models"] == ["Wrangler"] and result["count"] == 1
+    assert index.lookup("Jepp", "Wranlger", 2015) == result
+
+    assert index.lookup("Tesla", "Model S")["brand"] is None
+    assert index.lookup("Jeep", "Zzzzzz")["count"] == 0
+    assert index.lookup("Jeep", limit=2)["count"] == 5 and len(index.lookup("Jeep", limit=2)["manuals"]) == 2
+    assert index.models("jeep") == ["Grand Cherokee", "Wrangler", "Wrangler Unlimited"]
+    print("✅ Exact, normalized, prefix and misspelled lookups resolve to the right manuals")
+
+class ClearedAfterStore(dict):
+    """Stands in for another request thread clearing the cache right after a store"""
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.clear()
+
+def test_cache_cleared_by_another_thread():
+    index = CatalogIndex(CATALOG)
+    index._resolved = ClearedAfterStore()
+    result = index.lookup("Jepp", "Wranlger", 2015)
+    assert result["brand"] == "Jeep" and result["models"] == ["Wrangler"]
+    print("✅ Fuzzy resolution survives the cache being cleared mid-lookup")
+
+def test_hot_reload_waits_for_settled_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = Path(tmp) / "manual_metadata_deduplicated.csv"
+        write_csv(catalog, CATALOG[:3])
+        (Path(tmp) / "unrelated.csv").write_text("not,a,catalog\n")
+        watcher = CatalogWatcher([tmp])
+        watcher.reload()
+        old_index = watcher.index
+        assert old_index.manual_count == 3 and not watcher.check()
+
+        write_csv(catalog, CATALOG)
+        os.utime(catalog, ns=(1, 10 ** 18))
+        assert not watcher.check() and watcher.index is old_index  # Seen once: maybe still being written
+        assert watcher.check() and watcher.index.manual_count == len(CATALOG)
+        assert old_index.lookup("Ford")["count"] == 0  # Old index untouched for in-flight requests
+
+        newer = Path(tmp) / "manuals_jeep.csv"
+        write_csv(newer, [dict(CATALOG[0], title="Retitled")])
+        os.utime(newer, ns=(1, 2 * 10 ** 18))
+        watcher.check(), watcher.check()
+        assert watcher.index.lookup("Jeep", "Wrangler", 2014, "owner")["manuals"][0]["title"] == "Retitled"
+    print("✅ Changed catalogs are swapped in once settled; the newest file wins per URL")
+
+def test_watcher_survives_vanishing_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        write_csv(Path(tmp) / "manuals_jeep.csv", CATALOG[:3])
+        # A catalog replaced mid-listing: glob still sees the name, stat does not
+        os.symlink(Path(tmp) / "gone.csv", Path(tmp) / "manuals_ford.csv")
+        watcher = CatalogWatcher([tmp], interval=0.01)
+        assert [path.name for path in catalog_files([tmp])] == ["manuals_jeep.csv"]
+        assert len(watcher.signature()) == 1
+
+        failures = []
+        def flaky_check():
+            if not failures:
+                failures.append(1)
+                raise FileNotFoundError("manuals_ford.csv")
+            return CatalogWatcher.check(watcher)
+        watcher.check = flaky_check
+        watcher.start()
+        try:
+            write_csv(Path(tmp) / "manuals_mercedes.csv", CATALOG[6:])
+            deadline = time.monotonic() + 5
+            while watcher.index.manual_count != 4 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert watcher._thread.is_alive() and watcher.check_errors == 1
+            assert watcher.index.manual_count == 4  # Hot reload kept going after the error
+        finally:
+            watcher.stop()
+    print("✅ Vanishing catalog files and failed checks don't stop the watcher")
+
+def test_load_test_helpers():
+    assert percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 0.99) == 10
+    assert percentile([1, 2, 3, 4], 0.5) == 2 and percentile([], 0.5) == 0.0
+    index = CatalogIndex(CATALOG)
+    queries = query_mix(index, 200)
+    result = run_load(lambda query: index.lookup(**query), queries, concurrency=4)
+    assert result["requests"] == 200 and result["errors"] == 0 and result["p99_ms"] >= result["p50_ms"]
+    print("✅ Load test replays the query mix and reports percentiles")
+
+if __name__ == "__main__":
+    print("🚀 Starting Manual Lookup Tests\n")
+    test_lookup_matching()
+    test_cache_cleared_by_another_thread()
+    test_hot_reload_waits_for_settled_files()
+    test_watcher_survives_vanishing_files()
+    test_load_test_helpers()
+    print("🎉 ALL TESTS PASSED!")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test Scraper Metrics and Exporters
+"""
+
+import sys
+import json
+import tempfile
+from pathlib import Path
+sys.path.append('.')
+
+from metrics import Histogram, ScraperMetrics, MetricsExporter
+
+def test_histogram_quantiles():
+    """Quantiles are bounded by the bucket containing the sample"""
+    histogram = Histogram(buckets=(0.1, 0.5, 1.0))
+    for value in [0.05] * 90 + [0.7] * 10:
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    print(f"📊 Histogram snapshot: {snapshot}")
+    assert snapshot["count"] == 100
+    assert snapshot["p50"] == 0.1
+    assert snapshot["p95"] == 0.7  # capped by the observed max
+    assert histogram.bucket_counts == [90, 0, 10]
+
+def test_counters_and_stage_timers():
+    """Responses are classified and stage timers feed histograms"""
+    metrics = ScraperMetrics()
+    metrics.record_response(200, 1000)
+    metrics.record_response(404, 10)
+    metrics.record_response(503, 20)
+    with metrics.timer("parse"):
+        pass
+
+    assert metrics.counters["requests_total"] == 3
+    assert metrics.counters["bytes_downloaded_total"] == 1030
+    assert metrics.counters["responses_4xx_total"] == 1
+    assert metrics.counters["responses_5xx_total"] == 1
+    assert metrics.stage_summary()["parse"]["count"] == 1
+
+    text = metrics.to_prometheus()
+    assert "scraper_requests_total 3" in text
+    assert 'scraper_stage_duration_seconds_count{stage="parse"} 1' in text
+    print("✅ Prometheus exposition rendered")
+
+def test_exporters_write_files():
+    """Both export formats produce readable files"""
+    metrics = ScraperMetrics()
+    metrics.inc("retries_total", 2)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prom_path = Path(tmp) / "scraper.prom"
+        MetricsExporter(metrics, str(prom_path), "prometheus").write()
+        assert "scraper_retries_total 2" in prom_path.read_text()
+
+        jsonl_path = Path(tmp) / "scraper.jsonl"
+        exporter = MetricsExporter(metrics, str(jsonl_path), "jsonl")
+        exporter.write()
+        exporter.write()
+        lines = jsonl_path.read_text().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[0])["counters"]["retries_total"] == 2
+    print("✅ Exporters wrote prometheus and jsonl output")
+
+if __name__ == "__main__":
+    print("🚀 Starting Metrics Tests\n")
+    test_histogram_quantiles()
+    test_counters_and_stage_timers()
+    test_exporters_write_files()
+    print("🎉 ALL TESTS PASSED!")
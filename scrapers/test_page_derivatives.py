@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test Web-Optimized Page Derivatives
+"""
+
+import sys
+import json
+import tempfile
+from pathlib import Path
+sys.path.append('.')
+
+from PIL import Image
+
+from page_derivatives import DerivativeBuilder, DerivativeSettings
+
+def save_page(path: Path, width: int, height: int, shade: int = 90):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", (width, height), (shade, shade, shade)).save(path)
+
+def build(root: Path, workers: int = 0, **settings):
+    return DerivativeBuilder(str(root / "pages"), str(root / "derived"),
+                             DerivativeSettings(**settings), workers=workers).build()
+
+def read_manifest(root: Path) -> dict:
+    with open(root / "derived" / "kia-amanti-2005-owners-manual" / "manifest.json", encoding="utf-8") as f:
+        return json.load(f)
+
+def test_variants_and_manifest():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        folder = root / "pages" / "kia-amanti-2005-owners-manual"
+        save_page(folder / "page_001.jpg", 2400, 3200)
+        save_page(folder / "page_002.png", 600, 800)
+        assert build(root)["rendered"] == 2
+
+        manifest = read_manifest(root)
+        assert manifest["page_count"] == 2 and [p["page"] for p in manifest["pages"]] == [1, 2]
+        first, second = manifest["pages"]
+        assert (first["view"]["width"], first["view"]["height"]) == (1200, 1600)
+        assert (first["thumb"]["width"], first["thumb"]["height"]) == (240, 320)
+        assert second["view"]["width"] == 600  # never upscaled
+        view = Image.open(root / "derived" / "kia-amanti-2005-owners-manual" / first["view"]["src"])
+        assert view.format == "WEBP" and view.size == (1200, 1600)
+    print("✅ WebP thumbnail and viewing variants listed in the manual manifest")
+
+def test_incremental_rebuild():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        folder = root / "pages" / "kia-amanti-2005-owners-manual"
+        for n in (1, 2, 3):
+            save_page(folder / f"page_{n:03d}.jpg", 1600, 2000, shade=n * 40)
+        assert build(root)["rendered"] == 3
+
+        stats = build(root)
+        assert stats["rendered"] == 0 and stats["unchanged"] == 3
+
+        save_page(folder / "page_002.jpg", 1600, 2000, shade=250)  # source changed
+        (folder / "page_003.jpg").unlink()  # source removed
+        stats = build(root)
+        assert stats["rendered"] == 1 and stats["unchanged"] == 1 and stats["removed"] == 1
+        assert not (root / "derived" / "kia-amanti-2005-owners-manual" / "thumb" / "page_003.webp").exists()
+        assert read_manifest(root)["page_count"] == 2
+
+        assert build(root, workers=2, thumb_width=160)["rendered"] == 2  # settings changed
+        assert build(root, thumb_width=160)["rendered"] == 0
+        assert read_manifest(root)["pages"][0]["thumb"]["width"] == 160
+    print("✅ Only changed pages regenerated")
+
+def test_unreadable_page_skips_only_its_manual():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        save_page(root / "pages" / "kia-amanti-2005-owners-manual" / "page_001.jpg", 600, 800)
+        broken = root / "pages" / "jeep-compass-2014-owners-manual"
+        save_page(broken / "page_001.jpg", 600, 800)
+        (broken / "page_002.jpg").write_bytes(b"\xff\xd8 truncated")
+        for workers in (0, 2):
+            stats = build(root, workers=workers)
+            assert stats["failed"] == 1
+            assert read_manifest(root)["page_count"] == 1
+            assert not (root / "derived" / "jeep-compass-2014-owners-manual" / "manifest.json").exists()
+
+        save_page(broken / "page_002.jpg", 600, 800)
+        stats = build(root)
+        assert stats["failed"] == 0 and stats["rendered"] == 2
+        assert (root / "derived" / "jeep-compass-2014-owners-manual" / "manifest.json").exists()
+    print("✅ An unreadable page holds back its own manual's manifest only")
+
+if __name__ == "__main__":
+    print("🚀 Starting Page Derivative Tests\n")
+    test_variants_and_manifest()
+    test_incremental_rebuild()
+    test_unreadable_page_skips_only_its_manual()
+    print("🎉 ALL TESTS PASSED!")
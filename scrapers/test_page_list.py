@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test Compact Manual Records
+"""
+
+import sys
+import pickle
+sys.path.append('.')
+
+from page_list import PageList, compact_pages
+from scraper_with_deduplication import ManualEntry
+
+BASE = "https://www.carmanualsonline.info/audi-a4-2010-owners-manual"
+
+def test_page_list_behaves_like_a_list():
+    urls = [BASE, f"{BASE}/2", f"{BASE}/3", f"{BASE}/5"]
+    pages = PageList.from_urls(BASE, urls)
+    assert pages is not None
+    assert pages.page_numbers == [1, 2, 3, 5]
+    assert len(pages) == 4 and pages == urls and list(pages) == urls
+    assert pages[0] == BASE and pages[-1] == f"{BASE}/5"
+    assert pages[1:3] == urls[1:3]
+    assert "|".join(pages) == "|".join(urls)
+    assert pickle.loads(pickle.dumps(pages)) == pages
+
+    # URLs outside the manual's pattern are kept as given
+    odd = [BASE, "https://cdn.example.com/page2.jpg"]
+    assert PageList.from_urls(BASE, odd) is None
+    assert compact_pages(BASE, odd) == odd and isinstance(compact_pages(BASE, odd), list)
+    assert PageList.from_urls(BASE, [f"{BASE}/02"]) is None
+    print("✅ PageList round-trips page URLs")
+
+def test_manual_entry_stays_compatible():
+    manual = ManualEntry("Audi", "A4", "2010", "Audi A4 2010 Owner's Manual",
+                         "audi-a4-2010-owners-manual", BASE, manual_type="Owner's Manual")
+    assert manual.to_dict()["total_image_pages"] == "0" and manual.to_dict()["image_pages"] == ""
+
+    manual.image_pages = [BASE, f"{BASE}/2"]
+    assert isinstance(manual.image_pages, PageList)
+    row = manual.to_dict()
+    assert row["total_image_pages"] == "2"
+    assert row["image_pages"] == f"{BASE}|{BASE}/2"
+    assert list(row) == ["brand", "model", "year", "title", "slug", "url", "manual_type",
+                         "pages_count", "file_size", "total_image_pages", "image_pages"]
+
+    other = ManualEntry("".join(["Au", "di"]), "A4", "2010", "t", "s", BASE + "-x")
+    assert other.brand is manual.brand  # interned
+    assert not hasattr(manual, "__dict__")
+    assert pickle.loads(pickle.dumps(manual)) == manual
+    print("✅ ManualEntry is slotted, interned and writes the same CSV row")
+
+if __name__ == "__main__":
+    print("🚀 Starting Compact Record Tests\n")
+    test_page_list_behaves_like_a_list()
+    test_manual_entry_stays_compatible()
+    print("🎉 ALL TESTS PASSED!")
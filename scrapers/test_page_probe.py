@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Test Lightweight Page Probing
+"""
+
+import sys
+sys.path.append('.')
+
+import csv
+import tempfile
+from pathlib import Path
+
+import requests
+
+from retry_policy import RetryPolicy, HostCircuitBreakers, NOT_FOUND, CONNECTION_ERROR, CIRCUIT_OPEN
+from page_probe import PageProber
+from scraper_with_deduplication import EnhancedCarManualScraper, ManualEntry, PageScanInterrupted, ScrapingConfig
+from parallel_backfill import load_completed_rows, has_extracted_pages
+import extract_manual_pages
+
+class FakeStreamResponse:
+    def __init__(self, status_code, body=b"", url="", chunk_size=64):
+        self.status_code = status_code
+        self.body = body
+        self.url = url
+        self.headers = {"Content-Length": str(len(body))}
+        self.chunk_size = chunk_size
+        self.sent = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size=1):
+        while self.sent < len(self.body):
+            chunk = self.body[self.sent:self.sent + self.chunk_size]
+            self.sent += len(chunk)
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+def make_prober(responses, mode="stream", **kwargs):
+    calls = []
+    def send(url, method, stream):
+        calls.append(method)
+        return responses.pop(0)
+    return PageProber(send, mode, policy=RetryPolicy(max_attempts=1), **kwargs), calls
+
+def test_stream_stops_after_page_head():
+    body = b"<html><head>" + b"x" * 500 + b'</head><IMG class="p" src="/img/audi/1.jpg">' + b"y" * 200_000
+    response = FakeStreamResponse(200, body)
+    prober, _ = make_prober([response])
+    result = prober.probe("https://example.com/audi-a4-manual/2")
+    assert result.exists is True
+    assert result.bytes_read <= prober.head_bytes + 64
+    assert response.closed
+    print("✅ Stream probe stopped after", result.bytes_read, "bytes")
+
+def test_end_marker_split_across_chunks():
+    body = b"<html>" + b"z" * 60 + b"<p>End of manual</p></html>"
+    prober, _ = make_prober([FakeStreamResponse(200, body, chunk_size=64)])
+    result = prober.probe("https://example.com/m/9")
+    assert result.exists is False and not result.failed
+    print("✅ End marker found across a chunk boundary")
+
+def test_end_markers_match_the_parser():
+    """The probe uses the parser's END_INDICATORS, checked before the image and only in text"""
+    from parse_offload import parse_image_page
+
+    end_page = b'<html><img src="/img/audi/logo.jpg"><p>This page is not available</p></html>'
+    prober, _ = make_prober([FakeStreamResponse(200, end_page)])
+    assert prober.probe("https://example.com/m/7").exists is False
+    assert parse_image_page(end_page, "utf-8", 7) is None
+
+    # "404" in a URL is markup, not an end marker
+    page = b'<html><a href="/m/404">next</a><img src="/img/audi/404.jpg"></html>'
+    prober, _ = make_prober([FakeStreamResponse(200, page)])
+    assert prober.probe("https://example.com/m/403").exists is True
+    assert parse_image_page(page, "utf-8", 403) is True
+    print("✅ End markers shared with the parser and checked first")
+
+def test_ambiguous_page_and_404():
+    prober, _ = make_prober([FakeStreamResponse(200, b"<html><img src='/logo.png'></html>"),
+                             FakeStreamResponse(404)])
+    assert prober.probe("https://example.com/m/3").exists is None
+    result = prober.probe("https://example.com/m/4")
+    assert result.exists is False and result.outcome == NOT_FOUND
+    print("✅ Ambiguous page left to the full parser, 404 settled")
+
+def test_head_mode():
+    # A redirect to the manual's first page means the page is gone
+    prober, calls = make_prober([FakeStreamResponse(200, url="https://example.com/m")], mode="head")
+    assert prober.probe("https://example.com/m/5").exists is False
+    assert calls == ["HEAD"]
+
+    # HEAD 200 cannot rule out a soft 404, so a streamed GET follows
+    prober, calls = make_prober([FakeStreamResponse(200, url="https://example.com/m/2"),
+                                 FakeStreamResponse(200, b'<img src="/img/2.jpg">')], mode="head")
+    assert prober.probe("https://example.com/m/2").exists is True
+    assert calls == ["HEAD", "GET"]
+    print("✅ HEAD settles redirects and defers 200s to a streamed GET")
+
+def test_failed_probe_is_not_end_of_manual():
+    """A failed request or open circuit interrupts the scan instead of truncating it"""
+    scraper = EnhancedCarManualScraper(ScrapingConfig(extract_pages=True))
+    try:
+        def send(url, method, stream):
+            if url.endswith("/4"):
+                raise requests.exceptions.ConnectionError("connection reset")
+            if url.endswith("/5"):
+                return FakeStreamResponse(404)
+            return FakeStreamResponse(200, b'<img src="/img/p.jpg">')
+        breakers = HostCircuitBreakers(failure_threshold=1, reset_timeout=600)
+        scraper.prober = PageProber(send, policy=RetryPolicy(max_attempts=1, max_delay=0.0), breakers=breakers)
+        manual = ManualEntry("Audi", "A4", "2020", "Audi A4 2020", "audi-a4-2020", "https://example.com/audi-a4")
+
+        # A 404 still ends the manual normally
+        assert scraper.scan_image_pages(manual, start_page=5) == ([], False)
+
+        try:
+            scraper.scan_image_pages(manual)
+            assert False, "expected PageScanInterrupted"
+        except PageScanInterrupted as e:
+            assert e.page_url.endswith("/4") and e.outcome == CONNECTION_ERROR
+
+        # The host's circuit is now open: page 2 cannot be checked either
+        try:
+            scraper.scan_image_pages(manual)
+            assert False, "expected PageScanInterrupted"
+        except PageScanInterrupted as e:
+            assert e.page_url.endswith("/2") and e.outcome == CIRCUIT_OPEN
+
+        # No partial page list: an empty row is what the backfill resumes
+        assert len(scraper.add_image_pages(manual).image_pages) == 0
+        assert scraper.metrics.snapshot()["counters"]["page_scans_interrupted_total"] == 3
+    finally:
+        scraper.executor.shutdown()
+    print("✅ Failed probes and open circuits interrupt the scan")
+
+def test_backfill_probe_failure_mid_manual():
+    """The page backfill fails a row whose scan was interrupted instead of saving it short"""
+    breakers = HostCircuitBreakers(failure_threshold=1, reset_timeout=600)
+
+    def send(url, method, stream):
+        if url.startswith("https://example.com/broken/4"):
+            raise requests.exceptions.ConnectionError("connection reset")
+        if int(url.rsplit("/", 1)[1]) >= 6:
+            return FakeStreamResponse(404)
+        return FakeStreamResponse(200, b'<img src="/img/p.jpg">')
+
+    class FlakyExtractor(extract_manual_pages.ManualPageExtractor):
+        def __init__(self, probe_mode="stream"):
+            super().__init__(retry_policy=RetryPolicy(max_attempts=1, max_delay=0.0), breakers=breakers)
+            self.prober = PageProber(send, policy=self.retry_policy, breakers=breakers)
+
+    extractor = FlakyExtractor()
+    assert extractor.scan_image_pages("https://example.com/ok") == (
+        [f"https://example.com/ok/{n}" for n in range(2, 6)], False)
+    try:
+        extractor.scan_image_pages("https://example.com/broken")
+        assert False, "expected PageScanInterrupted"
+    except PageScanInterrupted as e:
+        assert e.page_url == "https://example.com/broken/4" and e.outcome == CONNECTION_ERROR
+
+    original = extract_manual_pages.ManualPageExtractor
+    extract_manual_pages.ManualPageExtractor = FlakyExtractor
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            input_csv = Path(tmp) / "manuals.csv"
+            with open(input_csv, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=["url", "title"])
+                writer.writeheader()
+                writer.writerow({"url": "https://example.com/broken", "title": "Broken"})
+            output_csv = Path(tmp) / "out.csv"
+            extract_manual_pages.extract_pages_from_csv(str(input_csv), str(output_csv), workers=1, delay=0)
+
+            with open(output_csv, newline="", encoding="utf-8") as f:
+                (row,) = list(csv.DictReader(f))
+            # Pages 2-3 were found before the failure, but none are saved
+            assert row["total_image_pages"] == "0" and row["image_pages"] == ""
+            assert not has_extracted_pages(row)
+            assert load_completed_rows(output_csv, is_complete=has_extracted_pages) == {}
+    finally:
+        extract_manual_pages.ManualPageExtractor = original
+    print("✅ Backfill rows with a failed probe are left for the next run")
+
+if __name__ == "__main__":
+    print("🚀 Starting Page Probe Tests\n")
+    test_stream_stops_after_page_head()
+    test_end_marker_split_across_chunks()
+    test_end_markers_match_the_parser()
+    test_ambiguous_page_and_404()
+    test_head_mode()
+    test_failed_probe_is_not_end_of_manual()
+    test_backfill_probe_failure_mid_manual()
+    print("🎉 ALL TESTS PASSED!")
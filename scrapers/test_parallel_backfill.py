@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test Parallel CSV Backfill
+"""
+
+import csv
+import sys
+import time
+import tempfile
+import threading
+from pathlib import Path
+sys.path.append('.')
+
+from parallel_backfill import HostLimiter, run_backfill, load_completed_rows, has_extracted_pages
+
+FIELDS = ["url", "title", "total_image_pages"]
+
+def make_rows(n):
+    return [{"url": f"https://example.com/manual-{i}", "title": f"Manual {i}", "total_image_pages": ""}
+            for i in range(n)]
+
+def read_csv(path: Path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+def test_rows_processed_in_parallel_and_kept_in_input_order():
+    rows = make_rows(8)
+    active, peak = 0, 0
+    lock = threading.Lock()
+
+    def process_row(index, row):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.01 * (8 - index))  # later rows finish first
+        with lock:
+            active -= 1
+        return dict(row, total_image_pages=str(index + 1))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "out.csv"
+        result = run_backfill(rows, process_row, output, FIELDS, workers=4)
+        assert [row["url"] for row in result] == [row["url"] for row in rows]
+        assert read_csv(output) == result
+        assert peak == 4
+
+        output = Path(tmp) / "completion.csv"
+        result = run_backfill(rows, process_row, output, FIELDS, workers=4, order="completion")
+        assert [row["url"] for row in result] != [row["url"] for row in rows]
+        assert sorted(row["url"] for row in result) == sorted(row["url"] for row in rows)
+    print("✅ Rows processed on the pool, written in input or completion order")
+
+def test_resume_skips_completed_rows():
+    rows = make_rows(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "out.csv"
+        # A crashed run: rows 0 and 1 done, row 2 written without pages
+        with open(output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerow(dict(rows[0], total_image_pages="10"))
+            writer.writerow(dict(rows[1], total_image_pages="20"))
+            writer.writerow(dict(rows[2], total_image_pages="0"))
+        assert set(load_completed_rows(output, is_complete=has_extracted_pages)) == {rows[0]["url"], rows[1]["url"]}
+
+        processed = []
+        def process_row(index, row):
+            processed.append(index)
+            return dict(row, total_image_pages="5")
+
+        result = run_backfill(rows, process_row, output, FIELDS, workers=2)
+        assert sorted(processed) == [2, 3, 4]
+        assert [row["total_image_pages"] for row in result] == ["10", "20", "5", "5", "5"]
+        assert read_csv(output) == result  # superseded attempts dropped
+
+        processed.clear()
+        run_backfill(rows, process_row, output, FIELDS, workers=2, resume=False)
+        assert sorted(processed) == [0, 1, 2, 3, 4]
+    print("✅ Resume reuses completed rows and reprocesses the rest")
+
+def test_failed_rows_are_retried_on_resume():
+    rows = make_rows(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "out.csv"
+
+        def flaky(index, row):
+            if index == 1:
+                raise RuntimeError("page scan interrupted")
+            return dict(row, total_image_pages="7")
+
+        result = run_backfill(rows, flaky, output, FIELDS, workers=2)
+        assert result[1] == rows[1]  # written unchanged, so it is not complete
+
+        retried = []
+        def process_row(index, row):
+            retried.append(index)
+            return dict(row, total_image_pages="9")
+
+        result = run_backfill(rows, process_row, output, FIELDS, workers=2)
+        assert retried == [1]
+        assert [row["total_image_pages"] for row in result] == ["7", "9", "7"]
+    print("✅ A failed row keeps its input values and is retried on the next run")
+
+def test_host_limiter_caps_and_spaces_requests():
+    limiter = HostLimiter(per_host=2, min_interval=0.05)
+    active, peak = {}, {}
+    starts = []
+    lock = threading.Lock()
+
+    def work(url):
+        host = url.split("/")[2]
+        with limiter.slot(url):
+            with lock:
+                active[host] = active.get(host, 0) + 1
+                peak[host] = max(peak.get(host, 0), active[host])
+                if host == "a.example":
+                    starts.append(time.monotonic())
+            time.sleep(0.12)
+            with lock:
+                active[host] -= 1
+
+    urls = [f"https://a.example/{i}" for i in range(5)] + [f"https://b.example/{i}" for i in range(3)]
+    threads = [threading.Thread(target=work, args=(url,)) for url in urls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak == {"a.example": 2, "b.example": 2}
+    starts.sort()
+    assert all(later - earlier >= 0.045 for earlier, later in zip(starts, starts[1:]))
+    print("✅ Per-host limit and start spacing respected")
+
+def test_unknown_order_rejected():
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            run_backfill(make_rows(1), lambda i, r: r, Path(tmp) / "out.csv", FIELDS, order="random")
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+    print("✅ Unknown output order rejected")
+
+if __name__ == "__main__":
+    print("🚀 Starting Parallel Backfill Tests\n")
+    test_rows_processed_in_parallel_and_kept_in_input_order()
+    test_resume_skips_completed_rows()
+    test_failed_rows_are_retried_on_resume()
+    test_host_limiter_caps_and_spaces_requests()
+    test_unknown_order_rejected()
+    print("🎉 ALL TESTS PASSED!")
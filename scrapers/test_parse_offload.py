@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test Process-Pool Parse Offload
+"""
+
+import sys
+sys.path.append('.')
+
+from parse_offload import (ParseOffload, is_valid_manual_url, parse_listing, parse_manual_page,
+                           parse_image_page, parse_page_image, sample_listing_page)
+
+MANUAL_TYPES = ["owners", "user", "service", "repair"]
+
+def test_manual_url_filter():
+    assert is_valid_manual_url("/audi-a4-2010-owners-manual", "audi", MANUAL_TYPES)
+    assert is_valid_manual_url("/audi-a4-2010-navigation", "audi", MANUAL_TYPES)
+    assert is_valid_manual_url("/audi-a4-manual-pdf", "audi", MANUAL_TYPES)  # fallback
+    assert not is_valid_manual_url("/audi-a4-2010-owners-manual?page=2", "audi", MANUAL_TYPES)
+    assert not is_valid_manual_url("/bmw-x5-2010-owners-manual", "audi", MANUAL_TYPES)
+    assert not is_valid_manual_url("/b/audi", "audi", MANUAL_TYPES)
+    print("✅ Listing links filtered")
+
+def test_parsers_return_small_results():
+    links = parse_listing(sample_listing_page(cards=3), "utf-8", "audi", MANUAL_TYPES)
+    assert [href for href, _, _ in links] == [f"/audi-model-{i}-{2000 + i}-owners-manual" for i in range(3)]
+    assert links[1][2] == {"pages_count": "101", "file_size": "1.10 MB"}
+
+    assert parse_manual_page(b"<div>Pages: 322 PDF Size: 44.16 MB</div>", None) == \
+        {"pages_count": "322", "file_size": "44.16 MB"}
+    assert parse_image_page(b'<img src="/img/7.jpg">', "utf-8", 7) is True
+    assert parse_image_page(b"<p>nothing here</p>", "utf-8", 7) is False
+    assert parse_image_page(b"<p>End of manual</p>", "utf-8", 7) is None
+    assert parse_page_image(b'<img src="/logo.png"><img src="/img/7.jpg">', "utf-8") == "/img/7.jpg"
+    print("✅ Parsers return links, metadata and content flags")
+
+def test_pool_matches_inline():
+    content = sample_listing_page()
+    inline = parse_listing(content, "utf-8", "audi", MANUAL_TYPES)
+    with ParseOffload(workers=2) as offload:
+        pooled = offload.run(parse_listing, content, "utf-8", "audi", MANUAL_TYPES)
+        assert offload.run(parse_image_page, b"<p>last page</p>", "utf-8", 3) is None
+    assert pooled == inline and len(pooled) == 120
+    print("✅ Worker processes return the same results as inline parsing")
+
+if __name__ == "__main__":
+    print("🚀 Starting Parse Offload Tests\n")
+    test_manual_url_filter()
+    test_parsers_return_small_results()
+    test_pool_matches_inline()
+    print("🎉 ALL TESTS PASSED!")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test Size-Optimized PDF Builds
+"""
+
+import io
+import sys
+import tempfile
+from pathlib import Path
+sys.path.append('.')
+
+from PIL import Image, ImageDraw
+
+from pdf_optimize import OptimizeSettings, build_optimized_pdf, is_grayscale, optimize_page
+from verify_corpus import pdf_page_count
+
+def page(width: int, height: int, color: bool = False, fmt: str = "JPEG", dpi=None) -> bytes:
+    """A scanned-looking page: paper grain, lines of "text", optionally a colored figure"""
+    grain = Image.effect_noise((width, height), 6).point(lambda v: 190 + v // 4)
+    img = Image.merge("RGB", [grain] * 3)
+    draw = ImageDraw.Draw(img)
+    for y in range(40, height - 40, 24):  # lines of "text"
+        draw.rectangle((60, y, width - 60, y + 10), fill=(30, 30, 30))
+    if color:
+        draw.rectangle((60, 60, width // 2, height // 3), fill=(200, 30, 30))
+    buffer = io.BytesIO()
+    img.save(buffer, fmt, **({"quality": 95} if fmt == "JPEG" else {}), **({"dpi": dpi} if dpi else {}))
+    return buffer.getvalue()
+
+def test_grayscale_detection():
+    settings = OptimizeSettings()
+    gray = Image.open(io.BytesIO(page(400, 500)))
+    gray.putpixel((5, 5), (255, 0, 0))  # a stray colored pixel is not enough
+    assert is_grayscale(gray, settings)
+    assert not is_grayscale(Image.open(io.BytesIO(page(400, 500, color=True))), settings)
+    print("✅ Near-grey pages detected, colored pages kept in color")
+
+def test_page_downsampled_and_recompressed():
+    settings = OptimizeSettings(target_dpi=150)
+    data, info = optimize_page(page(2550, 3300, dpi=(300, 300)), settings)
+    img = Image.open(io.BytesIO(data))
+    assert img.format == "JPEG" and img.mode == "L" and img.width == 1275
+    assert round(img.info["dpi"][0]) == 150
+    assert info["resized"] and info["gray"] and info["out"] < info["in"]
+
+    # Already small: recompressing would not help, the original is kept
+    small = page(300, 400)
+    data, info = optimize_page(small, OptimizeSettings(target_dpi=150, jpeg_quality=100))
+    assert data == small and info["kept"]
+
+    # Line art stays lossless PNG, and a page never grows
+    line_art = Image.new("L", (2550, 3300), 255)
+    draw = ImageDraw.Draw(line_art)
+    for y in range(100, 3200, 40):
+        draw.line((100, y, 2400, y + 17), fill=0, width=3)
+    buffer = io.BytesIO()
+    line_art.save(buffer, "PNG", dpi=(300, 300))
+    data, info = optimize_page(buffer.getvalue(), settings)
+    assert Image.open(io.BytesIO(data)).format == "PNG" and info["out"] <= info["in"]
+    print("✅ Pages downsampled to the target DPI and stored as grayscale JPEG")
+
+def test_pdf_build_and_report():
+    sources = [page(2550, 3300, color=(i == 1)) for i in range(4)]
+    with tempfile.TemporaryDirectory() as tmp:
+        inline = build_optimized_pdf(sources, str(Path(tmp) / "inline.pdf"))
+        pooled = build_optimized_pdf(sources, str(Path(tmp) / "pooled.pdf"), workers=2)
+        assert pdf_page_count(Path(tmp) / "pooled.pdf") == (4, None)
+    for report in (inline, pooled):
+        assert report["pages"] == 4 and report["gray_pages"] == 3 and report["resized_pages"] == 4
+        assert report["pdf_bytes"] < report["source_bytes"] and report["saved_pct"] > 0
+    assert inline["pdf_bytes"] == pooled["pdf_bytes"]
+    print("✅ Optimized PDF built in a process pool with a size report")
+
+if __name__ == "__main__":
+    print("🚀 Starting PDF Optimization Tests\n")
+    test_grayscale_detection()
+    test_page_downsampled_and_recompressed()
+    test_pdf_build_and_report()
+    print("🎉 ALL TESTS PASSED!")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test Postgres Bulk Loader Row Preparation and Merge
+"""
+
+import csv
+import io
+import os
+import re
+import sys
+from pathlib import Path
+sys.path.append('.')
+
+from pg_loader import (MANUAL_COLUMNS, batches, bulk_load, copy_rows, parse_int, prepare_manual, psycopg2,
+                       synthetic_rows)
+
+MIGRATION = Path(__file__).resolve().parent.parent / "supabase" / "migrations" / "20250622000000_manual_catalog.sql"
+
+ROW = {"brand": "Jeep", "model": "Wrangler", "year": "2014", "title": "2014 Jeep Wrangler Owner's Manual",
+       "slug": "jeep-wrangler-2014", "url": "https://example.com/jeep/wrangler-2014", "manual_type": "Owner Manual",
+       "pages_count": "312 pages", "file_size": "",
+       "image_pages": "https://example.com/jeep/wrangler-2014|https://example.com/jeep/wrangler-2014/3"}
+
+class RecordingCursor:
+    """Captures what COPY would receive"""
+    def copy_expert(self, sql, buffer):
+        self.sql, self.data = sql, buffer.read()
+
+def test_prepare_manual():
+    manual, pages = prepare_manual(ROW)
+    values = dict(zip(MANUAL_COLUMNS, manual))
+    assert values["year"] == 2014 and values["pages_count"] == 312 and values["file_size"] is None
+    assert values["total_image_pages"] == 2
+    assert pages == [(ROW["url"], 1, ROW["url"]), (ROW["url"], 3, ROW["url"] + "/3")]
+
+    changed, _ = prepare_manual(dict(ROW, title="Retitled"))
+    assert changed[-1] != manual[-1] and prepare_manual(dict(ROW))[0][-1] == manual[-1]
+    odd, odd_pages = prepare_manual(dict(ROW, year="n/a", image_pages="https://cdn.example.com/a.jpg"))
+    assert dict(zip(MANUAL_COLUMNS, odd))["year"] is None and odd_pages[0][1:] == (1, "https://cdn.example.com/a.jpg")
+    assert parse_int("") is None and parse_int("1,024 pages") == 1 and parse_int("99999999999") is None
+    print("✅ CSV rows become typed manual and page tuples with a content hash")
+
+def test_batches_and_copy_format():
+    rows = synthetic_rows(5, 2) + [dict(synthetic_rows(1, 2)[0], title="last wins"), {"url": ""}]
+    chunks = list(batches(rows, batch_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3]
+    assert sum(1 for chunk in chunks for row in chunk if row["title"] == "last wins") == 1
+
+    cursor = RecordingCursor()
+    copy_rows(cursor, "manual_stage", MANUAL_COLUMNS, [prepare_manual(ROW)[0]])
+    assert cursor.sql.startswith("COPY manual_stage (url, slug,") and "FORMAT csv" in cursor.sql
+    fields = next(csv.reader(io.StringIO(cursor.data)))
+    assert fields[3] == "Wrangler" and fields[8] == "" and cursor.data.count(",,") == 1  # NULL file_size
+    print("✅ Batches hold each URL once; COPY gets CSV with NULLs left empty")
+
+def skip(reason: str):
+    print(f"⏭️  Skipped: {reason}")
+    if "pytest" in sys.modules:
+        import pytest
+        pytest.skip(reason)
+
+def test_merge_against_postgres():
+    """COPY + merge on a real database: insert/update split, page deletes, idempotent reruns
+
+    Runs in a scratch schema of the throwaway database in DATABASE_URL.
+    """
+    if psycopg2 is None or not os.environ.get("DATABASE_URL"):
+        return skip("needs psycopg2 and DATABASE_URL pointing at a throwaway Postgres")
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        tables = re.findall(r"CREATE TABLE IF NOT EXISTS .*?\n\);", MIGRATION.read_text(encoding="utf-8"), re.S)
+        with conn:
+            with conn.cursor() as cursor:
+                cursor.execute("DROP SCHEMA IF EXISTS loader_test CASCADE; CREATE SCHEMA loader_test; "
+                               "SET search_path TO loader_test")
+                cursor.execute("\n".join(tables))
+
+        def pages_of(url):
+            with conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT p.page_number FROM manual_pages p JOIN manuals m ON m.id = p.manual_id "
+                                   "WHERE m.url = %s ORDER BY p.page_number", (url,))
+                    return [number for (number,) in cursor.fetchall()]
+
+        rows = synthetic_rows(12, 4)
+        first = bulk_load(conn, rows, batch_size=5)
+        assert (first.inserted, first.updated, first.unchanged, first.batches) == (12, 0, 0, 3)
+        assert pages_of(rows[0]["url"]) == [1, 2, 3, 4]
+
+        # Re-running the same data rewrites nothing
+        rerun = bulk_load(conn, rows, batch_size=5)
+        assert (rerun.inserted, rerun.updated, rerun.unchanged) == (0, 0, 12)
+
+        # A manual re-scraped with fewer pages loses the extra page rows; new manuals are inserted
+        shrunk = dict(rows[0], image_pages="|".join(rows[0]["image_pages"].split("|")[:2]))
+        retitled = dict(rows[1], title="Retitled")
+        new = synthetic_rows(13, 4)[12]
+        changed = bulk_load(conn, [shrunk, retitled, new] + rows[2:], batch_size=5)
+        assert (changed.inserted, changed.updated, changed.unchanged) == (1, 2, 10)
+        assert pages_of(shrunk["url"]) == [1, 2]
+        assert pages_of(retitled["url"]) == [1, 2, 3, 4] and pages_of(new["url"]) == [1, 2, 3, 4]
+        with conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT count(*) FROM manual_pages")
+                assert cursor.fetchone()[0] == 13 * 4 - 2
+    finally:
+        with conn:
+            with conn.cursor() as cursor:
+                cursor.execute("RESET search_path; DROP SCHEMA IF EXISTS loader_test CASCADE")
+        conn.close()
+    print("✅ Merge splits inserts from updates, drops removed pages and reruns as a no-op")
+
+if __name__ == "__main__":
+    print("🚀 Starting Postgres Loader Tests\n")
+    test_prepare_manual()
+    test_batches_and_copy_format()
+    test_merge_against_postgres()
+    print("🎉 ALL TESTS PASSED!")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test Pipelined Crawl Stages
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import tempfile
+import threading
+from pathlib import Path
+sys.path.append('.')
+
+from pipeline import Pipeline, Stage
+from scraper_with_deduplication import DeduplicationManager, EnhancedCarManualScraper, ScrapingConfig
+
+def test_items_flow_through_all_stages():
+    """Fan-out, transform and drop, with errors counted rather than fatal"""
+    def discover(brand):
+        for i in range(5):
+            yield f"{brand}-{i}"
+
+    def enrich(manual):
+        if manual.endswith("-3"):
+            raise ValueError("broken manual page")
+        return manual.upper()
+
+    results = []
+    pipeline = Pipeline([
+        Stage("discovery", discover, workers=2, queue_size=2, fan_out=True),
+        Stage("enrichment", enrich, workers=3, queue_size=2),
+    ], sink=results.append, report_interval=0)
+    stats = pipeline.run(["kia", "lexus", "mazda"])
+
+    assert sorted(results) == sorted(f"{b}-{i}".upper() for b in ("kia", "lexus", "mazda") for i in (0, 1, 2, 4))
+    assert stats["discovery"]["emitted"] == 15
+    assert stats["enrichment"]["completed"] == 15
+    assert stats["enrichment"]["errors"] == 3
+    print("✅ Items flowed through every stage")
+
+def test_stages_overlap_and_queues_stay_bounded():
+    """A slow downstream stage applies backpressure instead of buffering everything"""
+    produced = []
+    max_depth = []
+
+    def discover(_):
+        for i in range(30):
+            produced.append(i)
+            yield i
+
+    slow = Stage("pages", lambda item: time.sleep(0.01) or item, workers=2, queue_size=4)
+
+    def watch():
+        while not done.is_set():
+            max_depth.append(slow.inbox.qsize())
+            time.sleep(0.002)
+
+    done = threading.Event()
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    results = []
+    Pipeline([Stage("discovery", discover, fan_out=True), slow],
+             sink=results.append, report_interval=0).run(["brand"])
+    done.set()
+
+    assert len(results) == 30
+    assert max(max_depth) <= 4
+    print("✅ Queue depth stayed within its bound:", max(max_depth))
+
+def test_pipelined_scrape_saves_urls_only_with_their_rows():
+    """A manual dropped by a stage is neither written nor persisted as seen"""
+    listing = [(f"/jeep-m{n}-2014-owners-manual", f"Jeep M{n} 2014 Owners Manual",
+                {"pages_count": "100", "file_size": "2 MB"}) for n in range(3)]
+    scraper = EnhancedCarManualScraper(ScrapingConfig(delay_range=(0.0, 0.0)))
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            scraper.output_dir = Path(tmp)
+            scraper.dedup_manager = DeduplicationManager(os.path.join(tmp, "seen_urls.json"))
+            scraper.fetch_listing_links = lambda brand, page_num: listing if page_num == 1 else []
+
+            def enhance(manual):
+                if "m1" in manual.url:
+                    raise RuntimeError("enrichment failed")
+                return manual
+            scraper.enhance_manual_with_page_info = enhance
+
+            # Mid-run checkpoint: discovered but unsaved manuals stay out of the file
+            held = scraper.extract_manual_info(*listing[2][:2], "jeep")
+            scraper.dedup_manager.hold_until_saved = True
+            scraper.dedup_manager.check_and_add(held)
+            scraper.dedup_manager.save_seen_data()
+            with open(scraper.dedup_manager.dedup_file, encoding="utf-8") as f:
+                assert json.load(f)["urls"] == []
+            scraper.dedup_manager.discard(held)
+
+            manuals = scraper.scrape_all_brands_pipelined(["jeep"])
+            assert len(manuals) == 2 and not any("m1" in manual.url for manual in manuals)
+            with open(Path(tmp) / "manuals_jeep.csv", newline="", encoding="utf-8") as f:
+                assert sorted(row["url"] for row in csv.DictReader(f)) == sorted(m.url for m in manuals)
+
+            scraper.dedup_manager.save_seen_data()
+            with open(scraper.dedup_manager.dedup_file, encoding="utf-8") as f:
+                saved = set(json.load(f)["urls"])
+            assert saved == {manual.get_unique_key() for manual in manuals}
+    finally:
+        scraper.executor.shutdown()
+    print("✅ Seen URLs are saved only for manuals written to a brand CSV")
+
+if __name__ == "__main__":
+    print("🚀 Starting Pipeline Tests\n")
+    test_items_flow_through_all_stages()
+    test_stages_overlap_and_queues_stay_bounded()
+    test_pipelined_scrape_saves_urls_only_with_their_rows()
+    print("🎉 ALL TESTS PASSED!")
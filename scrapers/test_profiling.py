@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test Profiling Support
+"""
+
+import sys
+import time
+import pstats
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+sys.path.append('.')
+
+import profiling
+from profiling import ProfileSession
+
+def busy_worker_task(seconds: float) -> int:
+    """Work that only ever runs on pool threads"""
+    deadline = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < deadline:
+        n += sum(range(200))
+    return n
+
+def profile_run(mode: str, tmp: str) -> ProfileSession:
+    with ProfileSession(mode=mode, output_dir=tmp, trace_memory=False, name=mode) as session:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            list(pool.map(busy_worker_task, [0.2, 0.2]))
+    return session
+
+def test_cprofile_sees_worker_threads():
+    with tempfile.TemporaryDirectory() as tmp:
+        profile_run("cprofile", tmp)
+        stats = pstats.Stats(str(next(Path(tmp).glob("cprofile_*.prof"))))
+        calls = {func[2]: stat[1] for func, stat in stats.stats.items()}
+        assert calls.get("busy_worker_task") == 2
+        report = next(Path(tmp).glob("cprofile_*_final.txt")).read_text(encoding="utf-8")
+        assert "busy_worker_task" in report and "cProfile: 3 threads" in report
+    print("✅ cProfile mode merges the worker threads' profiles")
+
+def test_sampling_sees_worker_threads():
+    with tempfile.TemporaryDirectory() as tmp:
+        session = profile_run("sampling", tmp)
+        report = next(Path(tmp).glob("sampling_*_final.txt")).read_text(encoding="utf-8")
+        assert "busy_worker_task" in report
+        assert session._profiler is None  # stopped
+    print("✅ Sampling mode samples the worker threads")
+
+def test_concurrent_checkpoints_get_their_own_reports():
+    """Backfill workers checkpoint from pool threads; no report may be overwritten"""
+    with tempfile.TemporaryDirectory() as tmp:
+        with ProfileSession(mode="cprofile", output_dir=tmp, trace_memory=False, name="threads") as session:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                list(pool.map(lambda i: profiling.checkpoint(f"rows_{i}"), range(12)))
+        reports = list(Path(tmp).glob("threads_*.txt"))
+        assert len(reports) == 13 and session.checkpoint_count == 13
+        numbers = sorted(int(path.name.split("_")[3]) for path in reports)
+        assert numbers == list(range(1, 14))
+        profiling.checkpoint("after_stop")  # no active session: ignored
+        session.checkpoint("after_stop")  # stopped session: ignored
+        assert session.checkpoint_count == 13
+    print("✅ Concurrent checkpoints write one report each")
+
+if __name__ == "__main__":
+    print("🚀 Starting Profiling Tests\n")
+    test_cprofile_sees_worker_threads()
+    test_sampling_sees_worker_threads()
+    test_concurrent_checkpoints_get_their_own_reports()
+    print("🎉 ALL TESTS PASSED!")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test Retry Policy, Circuit Breaker and Adaptive Concurrency
+"""
+
+import sys
+import time
+sys.path.append('.')
+
+import requests
+
+from retry_policy import (
+    RetryPolicy, HostCircuitBreakers, fetch_with_retry, classify_status, classify_exception,
+    parse_retry_after, OK, NOT_FOUND, THROTTLED, SERVER_ERROR, TIMEOUT, CLIENT_ERROR, CIRCUIT_OPEN
+)
+from concurrency import AdaptiveConcurrencyController
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+def test_classification():
+    """Terminal and retryable outcomes are told apart"""
+    assert classify_status(200) == OK
+    assert classify_status(404) == NOT_FOUND
+    assert classify_status(410) == NOT_FOUND
+    assert classify_status(403) == CLIENT_ERROR
+    assert classify_status(429) == THROTTLED
+    assert classify_status(503) == SERVER_ERROR
+    assert classify_exception(requests.exceptions.ReadTimeout()) == TIMEOUT
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after("not a date") is None
+    print("✅ Outcomes classified")
+
+def test_backoff_is_jittered_and_bounded():
+    policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+    delays = [policy.backoff(5, SERVER_ERROR) for _ in range(50)]
+    assert all(2.0 <= d <= 4.0 for d in delays)
+    assert len(set(delays)) > 1
+    assert 10.0 <= policy.backoff(0, THROTTLED, retry_after=10.0) <= 15.0
+    print("✅ Backoff jittered within bounds")
+
+def test_404_is_not_retried():
+    """The end-of-manual 404 costs one request and no sleep"""
+    calls = []
+    def send():
+        calls.append(1)
+        return FakeResponse(404)
+
+    started = time.monotonic()
+    response, outcome = fetch_with_retry(send, "https://example.com/manual/99", RetryPolicy(max_attempts=3))
+    assert response is None and outcome == NOT_FOUND
+    assert len(calls) == 1
+    assert time.monotonic() - started < 0.5
+    print("✅ 404 returned immediately")
+
+def test_retryable_errors_are_retried():
+    responses = [FakeResponse(503), FakeResponse(200)]
+    policy = RetryPolicy(max_attempts=3, base_delay=0.01)
+    response, outcome = fetch_with_retry(lambda: responses.pop(0), "https://example.com/a", policy)
+    assert outcome == OK and response.status_code == 200
+    print("✅ 503 retried until success")
+
+def test_circuit_breaker_opens_and_recovers():
+    breakers = HostCircuitBreakers(failure_threshold=2, reset_timeout=0.2)
+    url = "https://example.com/page"
+    breakers.record(url, SERVER_ERROR)
+    assert breakers.state(url) == "closed"
+    breakers.record(url, TIMEOUT)
+    assert breakers.state(url) == "open"
+
+    # Fails fast when the caller will not wait long enough
+    policy = RetryPolicy(max_attempts=1, max_delay=0.05)
+    response, outcome = fetch_with_retry(lambda: FakeResponse(200), url, policy, breakers)
+    assert outcome == CIRCUIT_OPEN
+
+    # After the reset timeout a probe goes through and closes the circuit
+    time.sleep(0.25)
+    response, outcome = fetch_with_retry(lambda: FakeResponse(200), url, policy, breakers)
+    assert outcome == OK
+    assert breakers.state(url) == "closed"
+    print("✅ Circuit opened, probed and closed")
+
+def test_aimd_controller():
+    controller = AdaptiveConcurrencyController(initial=4, min_limit=1, max_limit=8, window=5, cooldown=0)
+    controller.record(0.1, THROTTLED)
+    assert controller.current_limit == 2
+
+    # A healthy, fully used window grows the limit by one
+    controller.in_flight = controller.current_limit
+    for _ in range(5):
+        controller.record(0.1, OK)
+    assert controller.current_limit == 3
+    assert [entry["limit"] for entry in controller.history] == [4, 2, 3]
+    print("✅ AIMD limit halved on 429 and grew on healthy window")
+
+if __name__ == "__main__":
+    print("🚀 Starting Retry Policy Tests\n")
+    test_classification()
+    test_backoff_is_jittered_and_bounded()
+    test_404_is_not_retried()
+    test_retryable_errors_are_retried()
+    test_circuit_breaker_opens_and_recovers()
+    test_aimd_controller()
+    print("🎉 ALL TESTS PASSED!")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test Cost-Aware Backfill Scheduling
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+sys.path.append('.')
+
+from scheduling import (parse_file_size, estimate_pages, lpt_order, estimate_makespan,
+                        split_page_ranges, page_range_parts, merge_page_ranges)
+from parallel_backfill import run_backfill
+from job_queue import JobQueue, JobWorker, JobNotReady, IMAGE_DOWNLOAD, PDF_BUILD, DONE, PENDING
+
+def test_cost_estimates():
+    assert parse_file_size("44.16 MB") == int(44.16 * 1024 ** 2)
+    assert parse_file_size("512 KB") == 512 * 1024
+    assert parse_file_size("unknown") is None
+    assert estimate_pages({"pages_count": "322", "file_size": "1 MB"}) == 322
+    assert estimate_pages({"pages_count": "", "file_size": "10 MB"}) == 73
+    assert estimate_pages({}) is None
+    print("✅ Page estimates from pages_count, then file_size")
+
+def test_lpt_beats_input_order():
+    """One huge manual at the end of the CSV dominates the run unless it starts first"""
+    rows = [{"pages_count": str(n)} for n in [20] * 12 + [240]]
+    costs = [int(row["pages_count"]) for row in rows]
+    lpt_costs = [costs[i] for i in lpt_order(rows)]
+    assert lpt_costs[0] == 240
+    assert estimate_makespan(costs, 4) == 300
+    assert estimate_makespan(lpt_costs, 4) == 240
+    print("✅ LPT order shortens the estimated makespan: 300 -> 240 pages")
+
+def test_page_ranges():
+    assert split_page_ranges(2, 50, 100) == [(2, None)]
+    assert split_page_ranges(2, 25, 10) == [(2, 11), (12, 21), (22, None)]
+    assert page_range_parts({"pages_count": "25"}, 10) == [((2, 11), 10.0), ((12, 21), 10.0), ((22, None), 4.0)]
+    assert page_range_parts({"pages_count": "25"}, 100) is None
+
+    # Estimate said 30 pages but the manual ends at 14: the third range is stray
+    parts = [(["p2", "p3"], True), (["p12", "p13", "p14"], False), (["p25"], False)]
+    assert merge_page_ranges(parts) == ["p2", "p3", "p12", "p13", "p14"]
+    print("✅ Page ranges split and merged")
+
+def test_backfill_runs_largest_first_and_merges_parts():
+    rows = [{"url": f"m{n}", "pages_count": str(n)} for n in (3, 50, 10)]
+    started = []
+    lock = threading.Lock()
+
+    def process_row(index, row):
+        with lock:
+            started.append(row["url"])
+        return dict(row, total_image_pages=row["pages_count"])
+
+    def split(index, row):
+        return [((1, 25), 25.0), ((26, 50), 25.0)] if row["url"] == "m50" else None
+
+    def process_part(index, row, page_range):
+        with lock:
+            started.append(f"{row['url']}:{page_range[0]}")
+        return page_range[1] - page_range[0] + 1
+
+    def merge_parts(index, row, counts):
+        return dict(row, total_image_pages=str(sum(counts)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "out.csv"
+        result = run_backfill(rows, process_row, output, ["url", "pages_count", "total_image_pages"],
+                              workers=1, cost=lambda row: float(row["pages_count"]),
+                              split=split, process_part=process_part, merge_parts=merge_parts)
+    assert started == ["m50:1", "m50:26", "m10", "m3"]
+    assert [row["total_image_pages"] for row in result] == ["3", "50", "10"]
+    print("✅ Backfill started the largest work first and wrote split rows once")
+
+def test_pdf_build_waits_for_page_ranges():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, "jobs.db"))
+        queue.enqueue(IMAGE_DOWNLOAD, {"part": 1}, key="m#1-500", priority=500)
+        queue.enqueue(IMAGE_DOWNLOAD, {"part": 2}, key="m#501-620", priority=120)
+        queue.enqueue(PDF_BUILD, {"wait_for": "m#"}, key="m", priority=1000)
+
+        def pdf_build(payload, q):
+            if q.unfinished(IMAGE_DOWNLOAD, payload["wait_for"]):
+                raise JobNotReady("ranges still downloading", delay=0.05)
+            return {"built": True}
+
+        built_after = []
+        worker = JobWorker(queue, {IMAGE_DOWNLOAD: lambda payload, q: built_after.append(payload["part"]),
+                                   PDF_BUILD: pdf_build}, poll_interval=0.01)
+        worker.run_one(queue.lease("w", [PDF_BUILD])[0])
+        assert queue.stats()[PDF_BUILD] == {PENDING: 1}
+        worker.run(exit_when_empty=True)
+
+        assert built_after == [1, 2]  # higher priority range first
+        assert list(queue.results(PDF_BUILD)) == [{"built": True}]
+        assert queue.stats() == {IMAGE_DOWNLOAD: {DONE: 2}, PDF_BUILD: {DONE: 1}}
+    print("✅ PDF build deferred until every page range finished")
+
+if __name__ == "__main__":
+    print("🚀 Starting Scheduling Tests\n")
+    test_cost_estimates()
+    test_lpt_beats_input_order()
+    test_page_ranges()
+    test_backfill_runs_largest_first_and_merges_parts()
+    test_pdf_build_waits_for_page_ranges()
+    print("🎉 ALL TESTS PASSED!")
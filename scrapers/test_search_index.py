@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test Manual Search Index
+"""
+
+import csv
+import sys
+import tempfile
+from pathlib import Path
+sys.path.append('.')
+
+from search_index import SearchIndex, build_index, fts_query
+from text_extraction import PageTask, PageTextStore
+
+FIELDS = ["brand", "model", "year", "title", "slug", "url", "manual_type", "pages_count", "file_size"]
+
+MANUALS = [
+    ("Jeep", "Wrangler", "2014", "2014 Jeep Wrangler Owner's Manual", "jeep-wrangler-2014-owners-manual"),
+    ("Jeep", "Wrangler", "2015", "2015 Jeep Wrangler Owner's Manual", "jeep-wrangler-2015-owners-manual"),
+    ("Jeep", "Cherokee", "2014", "2014 Jeep Cherokee Owner's Manual", "jeep-cherokee-2014-owners-manual"),
+    ("Audi", "A4", "2010", "2010 Audi A4 Owner's Manual", "audi-a4-2010-owners-manual"),
+]
+
+def write_csv(path: Path, manuals):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for brand, model, year, title, slug in manuals:
+            writer.writerow({"brand": brand, "model": model, "year": year, "title": title, "slug": slug,
+                             "url": f"https://example.com/{slug}", "manual_type": "Owner's Manual",
+                             "pages_count": "400", "file_size": ""})
+
+def write_text(db: Path, pages):
+    store = PageTextStore(str(db))
+    try:
+        for (manual, page), text in pages.items():
+            store.put(PageTask(manual, page, str(hash(text)), "pdf_page", ""), "embedded", text)
+    finally:
+        store.close()
+
+def test_fts_query_escapes_syntax():
+    assert fts_query('tire "pressure" OR NEAR(') == '"tire" "pressure" "OR" "NEAR"'
+    assert fts_query("press*") == '"press"*'
+    assert fts_query("  ") == ""
+    print("✅ Free text becomes a quoted FTS5 query")
+
+def test_index_query_and_incremental_update():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        write_csv(root / "manuals.csv", MANUALS)
+        write_text(root / "text.db", {
+            ("jeep-wrangler-2014-owners-manual", 310): "Check the tire pressure monthly. Tire pressure label on door.",
+            ("jeep-wrangler-2014-owners-manual", 12): "Fuel requirements and octane.",
+            ("jeep-wrangler-2015-owners-manual", 305): "Recommended tire pressure is on the placard.",
+            ("jeep-cherokee-2014-owners-manual", 290): "Tire pressure monitoring system (TPMS).",
+        })
+
+        with SearchIndex(str(root / "index.db")) as index:
+            result = build_index(index, [str(root / "manuals.csv")], str(root / "text.db"))
+            assert result["manuals"]["added"] == 4 and result["pages"]["indexed"] == 4
+
+            hits = index.search("tire pressure", brand="jeep", model="Wrangler", year="2014")
+            assert [hit.url for hit in hits] == ["https://example.com/jeep-wrangler-2014-owners-manual"]
+            assert [page.page for page in hits[0].pages] == [310]
+            assert "[pressure]" in hits[0].pages[0].snippet.lower()
+
+            hits = index.search("tire pressure", brand="Jeep")
+            assert len(hits) == 3 and all(hit.score > 0 for hit in hits)
+            assert index.search("wrangler")[0].model == "Wrangler"
+            assert len(index.search("", year="2014")) == 2
+            assert [page.page for _, page in index.search_pages("octane")] == [12]
+            assert index.search("audi tire") == []
+
+            # Unchanged rows and pages are skipped; a changed title is re-indexed under the same URL
+            result = build_index(index, [str(root / "manuals.csv")], str(root / "text.db"))
+            assert result["manuals"]["unchanged"] == 4 and result["pages"]["unchanged"] == 4
+            retitled = [MANUALS[3][:3] + ("2010 Audi A4 Quattro Owner's Manual",) + MANUALS[3][4:]]
+            write_csv(root / "audi.csv", retitled)
+            result = build_index(index, [str(root / "audi.csv")])
+            assert result["manuals"]["updated"] == 1 and index.stats()["manuals"] == 4
+            assert [hit.model for hit in index.search("quattro")] == ["A4"]
+
+            assert index.remove("https://example.com/jeep-cherokee-2014-owners-manual")
+            assert len(index.search("tire pressure")) == 2
+
+            build_index(index, [str(root / "manuals.csv")], str(root / "text.db"), rebuild=True)
+            assert index.stats() == {"manuals": 4, "pages": 4}
+            assert index.search("quattro") == []
+    print("✅ Metadata and page text indexed by URL, ranked and filtered, updated incrementally")
+
+def test_vanished_pages_are_removed():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        write_csv(root / "manuals.csv", MANUALS)
+        write_text(root / "text.db", {
+            ("jeep-wrangler-2014-owners-manual", 310): "Check the tire pressure monthly.",
+            ("jeep-wrangler-2014-owners-manual", 12): "Fuel requirements and octane.",
+            ("jeep-cherokee-2014-owners-manual", 290): "Tire pressure monitoring system (TPMS).",
+        })
+        with SearchIndex(str(root / "index.db")) as index:
+            build_index(index, [str(root / "manuals.csv")], str(root / "text.db"))
+            # The manual was re-downloaded without page 12; the Cherokee is untouched
+            store = PageTextStore(str(root / "text.db"))
+            store.delete("jeep-wrangler-2014-owners-manual", [12])
+            store.close()
+            result = build_index(index, [str(root / "manuals.csv")], str(root / "text.db"))
+            assert result["pages"]["removed"] == 1 and result["pages"]["unchanged"] == 2
+            assert index.search_pages("octane") == [] and index.stats()["pages"] == 2
+    print("✅ Pages gone from the page text are dropped from the index")
+
+if __name__ == "__main__":
+    print("🚀 Starting Search Index Tests\n")
+    test_fts_query_escapes_syntax()
+    test_index_query_and_incremental_update()
+    test_vanished_pages_are_removed()
+    print("🎉 ALL TESTS PASSED!")
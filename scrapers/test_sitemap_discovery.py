@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test Sitemap Discovery
+"""
+
+import os
+import sys
+import gzip
+import tempfile
+sys.path.append('.')
+
+from sitemap_discovery import SitemapDiscovery, SitemapState, iter_sitemap, iter_sitemap_chunks, match_brand
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+BASE = "https://www.carmanualsonline.info"
+
+class FakeStreamResponse:
+    def __init__(self, body: bytes):
+        self.body = body
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), 7):  # tiny chunks split elements mid-tag
+            yield self.body[i:i + 7]
+
+    def close(self):
+        self.closed = True
+
+def urlset(entries) -> bytes:
+    return (f'<?xml version="1.0"?><urlset {NS}>' +
+            "".join(f"<url><loc>{BASE}{path}</loc><lastmod>{lastmod}</lastmod></url>" for path, lastmod in entries) +
+            "</urlset>").encode()
+
+def make_site(kia_lastmod="2024-01-01", rover_lastmod="2024-01-01"):
+    return {
+        f"{BASE}/sitemap.xml": (f'<sitemapindex {NS}>'
+                                f"<sitemap><loc>{BASE}/kia.xml.gz</loc><lastmod>{kia_lastmod}</lastmod></sitemap>"
+                                f"<sitemap><loc>{BASE}/rover.xml</loc><lastmod>{rover_lastmod}</lastmod></sitemap>"
+                                "</sitemapindex>").encode(),
+        f"{BASE}/kia.xml.gz": gzip.compress(urlset([("/kia-rio-2010-owners-manual", kia_lastmod),
+                                                    ("/kia-ceed-2012-owners-manual", "2024-01-01"),
+                                                    ("/b/kia", "2024-01-01")])),
+        f"{BASE}/rover.xml": urlset([("/land-rover-defender-2015-service-manual", rover_lastmod)]),
+    }
+
+def run(site, state, failed=()):
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url.rsplit("/", 1)[-1])
+        return FakeStreamResponse(site[url]) if url in site else None
+
+    discovery = SitemapDiscovery(fetch, lambda path: path.endswith("-manual"), state)
+    found = [(entry.loc.rsplit("/", 1)[-1], entry.changed) for entry in discovery.discover([f"{BASE}/sitemap.xml"])]
+    for name in failed:
+        discovery.discard(f"{BASE}/{name}")
+    discovery.commit()
+    return found, fetched
+
+def test_streaming_parse_handles_gzip():
+    body = gzip.compress(urlset([("/kia-rio-2010-owners-manual", "2024-01-01")]))
+    entries = list(iter_sitemap(iter_sitemap_chunks(FakeStreamResponse(body))))
+    assert [(e.loc, e.lastmod, e.is_sitemap) for e in entries] == \
+        [(f"{BASE}/kia-rio-2010-owners-manual", "2024-01-01", False)]
+    print("✅ gzip sitemap parsed from small chunks")
+
+def test_only_new_or_changed_manuals_are_returned():
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = os.path.join(tmp, "sitemap_state.json")
+        found, fetched = run(make_site(), SitemapState(state_file))
+        assert sorted(found) == [("kia-ceed-2012-owners-manual", False), ("kia-rio-2010-owners-manual", False),
+                                 ("land-rover-defender-2015-service-manual", False)]
+        assert fetched == ["sitemap.xml", "kia.xml.gz", "rover.xml"]
+
+        # Nothing changed: only the index is fetched
+        found, fetched = run(make_site(), SitemapState(state_file))
+        assert found == [] and fetched == ["sitemap.xml"]
+
+        # One manual changed: only its child sitemap is fetched, only it is returned
+        found, fetched = run(make_site(kia_lastmod="2024-03-01"), SitemapState(state_file))
+        assert found == [("kia-rio-2010-owners-manual", True)]
+        assert fetched == ["sitemap.xml", "kia.xml.gz"]
+    print("✅ lastmod state skips unchanged sitemaps and manuals")
+
+def test_failed_manuals_are_not_committed():
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = os.path.join(tmp, "sitemap_state.json")
+        found, _ = run(make_site(), SitemapState(state_file), failed=["kia-ceed-2012-owners-manual"])
+        assert len(found) == 3
+
+        # Its child sitemap was recorded: only the failed manual comes back, from the retry pool
+        found, fetched = run(make_site(), SitemapState(state_file), failed=["kia-ceed-2012-owners-manual"])
+        assert found == [("kia-ceed-2012-owners-manual", False)]
+        assert fetched == ["sitemap.xml"]
+
+        # Still failing after its sitemap changed: yielded once, through the walk
+        site = make_site(kia_lastmod="2024-03-01")
+        found, fetched = run(site, SitemapState(state_file))
+        assert sorted(found) == [("kia-ceed-2012-owners-manual", False), ("kia-rio-2010-owners-manual", True)]
+        assert fetched == ["sitemap.xml", "kia.xml.gz"]
+
+        found, fetched = run(site, SitemapState(state_file))
+        assert found == [] and fetched == ["sitemap.xml"]
+    print("✅ Only discarded manuals are retried; their sitemaps are not refetched")
+
+def test_retried_manual_dropped_when_unlisted():
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = os.path.join(tmp, "sitemap_state.json")
+        run(make_site(), SitemapState(state_file), failed=["kia-ceed-2012-owners-manual"])
+        assert list(SitemapState(state_file).retry) == [f"{BASE}/kia-ceed-2012-owners-manual"]
+
+        # The manual left the site: its walked sitemap no longer lists it, so the retry is dropped
+        site = make_site(kia_lastmod="2024-03-01")
+        site[f"{BASE}/kia.xml.gz"] = gzip.compress(urlset([("/kia-rio-2010-owners-manual", "2024-03-01")]))
+        found, _ = run(site, SitemapState(state_file))
+        assert found == [("kia-rio-2010-owners-manual", True)]
+        assert SitemapState(state_file).retry == {}
+    print("✅ Retries whose manual is no longer listed are dropped")
+
+def test_brand_matching():
+    brands = ["kia", "land", "land-rover"]
+    assert match_brand("/land-rover-defender-2015-service-manual", brands) == "land-rover"
+    assert match_brand("/kia-rio-2010-owners-manual", brands) == "kia"
+    assert match_brand("/bmw-x5-2010-owners-manual", brands) is None
+    assert match_brand("/bmw-x5-2010-owners-manual") == "bmw"
+    assert match_brand("/b/kia") is None
+    print("✅ Brands matched by longest prefix")
+
+if __name__ == "__main__":
+    print("🚀 Starting Sitemap Discovery Tests\n")
+    test_streaming_parse_handles_gzip()
+    test_only_new_or_changed_manuals_are_returned()
+    test_failed_manuals_are_not_committed()
+    test_retried_manual_dropped_when_unlisted()
+    test_brand_matching()
+    print("🎉 ALL TESTS PASSED!")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test Sharded Static Catalog
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+sys.path.append('.')
+
+from static_catalog import MANIFEST_NAME, StaticCatalogBuilder
+
+def row(brand, model, year, title=None, pages=""):
+    slug = f"{brand}-{model}-{year}".lower().replace(" ", "-")
+    return {"brand": brand, "model": model, "year": year, "title": title or f"{year} {brand} {model}",
+            "slug": slug, "url": f"https://example.com/{slug}", "manual_type": "Owner Manual",
+            "pages_count": "312 pages", "file_size": "4 MB", "total_image_pages": pages,
+            "image_pages": "|".join(f"https://example.com/{slug}/{n}" for n in range(2, 50))}
+
+ROWS = [row("Jeep", "Wrangler", "2014", pages="300"), row("Jeep", "Wrangler", "2015"),
+        row("Jeep", "Grand Cherokee", "2014"), row("Audi", "A4", "2010")]
+
+def files(root: Path):
+    return sorted(p.relative_to(root).as_posix() for p in root.rglob("*") if p.is_file())
+
+def test_shards_and_incremental_rebuild():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        builder = StaticCatalogBuilder(tmp)
+        manifest = builder.build(ROWS + [ROWS[0]])
+        assert builder.stats == {"written": 5, "unchanged": 0, "removed": 0}
+        assert manifest["manuals"] == 4 and [b["key"] for b in manifest["brands"]] == ["audi", "jeep"]
+        assert json.loads((root / MANIFEST_NAME).read_text()) == manifest
+
+        jeep = json.loads((root / manifest["brands"][1]["shard"]).read_text())
+        wrangler = next(m for m in jeep["models"] if m["key"] == "wrangler")
+        assert wrangler["years"] == [2015, 2014] and wrangler["manuals"] == 2
+        shard = json.loads((root / wrangler["shard"]).read_text())
+        by_field = [dict(zip(shard["fields"], manual)) for manual in shard["manuals"]]
+        assert [m["year"] for m in by_field] == [2015, 2014] and [m["pages"] for m in by_field] == [312, 300]
+        assert "image_pages" not in shard and "file_size" not in shard["fields"]
+        assert wrangler["shard"].startswith("models/jeep/wrangler.") and ".json" in wrangler["shard"]
+
+        # Nothing changed: nothing rewritten, manifest untouched
+        before = (root / MANIFEST_NAME).stat().st_mtime_ns
+        assert builder.build(ROWS) == manifest and builder.stats["written"] == 0
+        assert (root / MANIFEST_NAME).stat().st_mtime_ns == before
+
+        # One Wrangler row changes: its model shard, the Jeep shard and the manifest are rewritten
+        changed = [row("Jeep", "Wrangler", "2014", title="Retitled", pages="300")] + ROWS[1:]
+        new_manifest = builder.build(changed)
+        assert builder.stats == {"written": 2, "unchanged": 3, "removed": 0}
+        assert new_manifest["version"] != manifest["version"]
+        old_files = files(root)
+
+        # A third build drops the first build's orphans but keeps the previous build's
+        builder.build(ROWS[1:])
+        assert builder.stats["removed"] == 2
+        assert wrangler["shard"] not in files(root) and len(files(root)) < len(old_files) + 3
+    print("✅ Brand and model shards are content-hashed and only rewritten when their rows change")
+
+if __name__ == "__main__":
+    print("🚀 Starting Static Catalog Tests\n")
+    test_shards_and_incremental_rebuild()
+    print("🎉 ALL TESTS PASSED!")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test Parallel Text Extraction
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+sys.path.append('.')
+
+from PIL import Image
+
+from manual_archive import pack_folder
+from text_extraction import OCR, PageTextStore, TextExtractor, collect_tasks
+
+def fake_ocr(image, lang):
+    """Stands in for tesseract: "reads" the page's grey level"""
+    return f"{lang} page shade {image.getpixel((5, 5))}"
+
+def make_sources(root: Path):
+    folder = root / "pages" / "audi-a4-2010-owners-manual"
+    folder.mkdir(parents=True)
+    for n in (1, 2):
+        Image.new("L", (40, 50), n * 50).save(folder / f"page_{n:03d}.png")
+    (root / "pdfs").mkdir()
+    images = [Image.new("L", (40, 50), 200 + n) for n in range(3)]
+    images[0].save(root / "pdfs" / "kia-amanti-2005-owners-manual.pdf", "PDF", save_all=True,
+                   append_images=images[1:])
+    (root / "archives").mkdir()
+    pack_folder(folder, root / "archives" / "audi-a4-2010-owners-manual-packed.mpak")
+    return folder
+
+def run(root: Path, workers: int = 0, ocr=fake_ocr):
+    store = PageTextStore(str(root / "text.db"))
+    try:
+        tasks = collect_tasks(str(root / "pdfs"), str(root / "pages"), str(root / "archives"))
+        return TextExtractor(store, workers=workers, ocr=ocr).run(tasks), dict(
+            ((manual, page), (method, text)) for manual, page, _, method, text in store.pages())
+    finally:
+        store.close()
+
+def test_extract_and_resume():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        folder = make_sources(root)
+        stats, pages = run(root)
+        assert stats[OCR] == 5 and stats["skipped"] == 0 and len(pages) == 5
+        assert pages[("audi-a4-2010-owners-manual", 2)] == (OCR, "eng page shade 100")
+        assert pages[("kia-amanti-2005-owners-manual", 3)][1].startswith("eng page shade 20")
+
+        stats, _ = run(root)
+        assert stats[OCR] == 0 and stats["skipped"] == 5
+
+        # The packed copy of the folder is the source that is read
+        Image.new("L", (40, 50), 7).save(folder / "page_002.png")
+        pack_folder(folder, root / "archives" / "audi-a4-2010-owners-manual-packed.mpak")
+        stats, pages = run(root)
+        assert stats[OCR] == 1 and pages[("audi-a4-2010-owners-manual", 2)][1] == "eng page shade 7"
+    print("✅ Pages extracted once, re-extracted only when their checksum changes")
+
+def test_packing_keeps_text_and_repacking_prunes_pages():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        folder = make_sources(root)
+        (root / "archives" / "audi-a4-2010-owners-manual-packed.mpak").unlink()
+        stats, _ = run(root)
+        assert stats[OCR] == 5
+
+        # Moving the folder into an archive keeps the page checksums: nothing is re-read
+        pack_folder(folder, root / "archives" / "audi-a4-2010-owners-manual-packed.mpak")
+        stats, _ = run(root)
+        assert stats[OCR] == 0 and stats["skipped"] == 5 and stats["removed"] == 0
+
+        # Repacked with fewer pages: the dropped page's text goes too
+        (folder / "page_002.png").unlink()
+        pack_folder(folder, root / "archives" / "audi-a4-2010-owners-manual-packed.mpak")
+        stats, pages = run(root)
+        assert stats["removed"] == 1 and stats[OCR] == 0 and len(pages) == 4
+        assert ("audi-a4-2010-owners-manual", 2) not in pages
+    print("✅ Packed pages keep their text; pages a source no longer has are removed")
+
+def test_missing_ocr_engine_leaves_pages_pending():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_sources(root)
+        stats, pages = run(root, ocr=None)
+        assert stats["needs_ocr"] == 5 and pages == {}
+        stats, pages = run(root, workers=2)
+        assert stats[OCR] == 5 and len(pages) == 5
+    print("✅ Without OCR nothing is stored; a later pooled run picks the pages up")
+
+def test_corrupt_page_does_not_abort_the_run():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_sources(root)
+        broken = root / "pages" / "jeep-compass-2014-owners-manual"
+        broken.mkdir()
+        Image.new("L", (40, 50), 90).save(broken / "page_001.png")
+        (broken / "page_002.png").write_bytes(b"\x89PNG truncated")
+        for workers in (0, 2):
+            stats, pages = run(root, workers=workers)
+            assert stats["failed"] == 1 and ("jeep-compass-2014-owners-manual", 2) not in pages
+            assert len(pages) == 6
+
+        # Left out of the store, the page is tried again once it is fixed
+        Image.new("L", (40, 50), 91).save(broken / "page_002.png")
+        stats, pages = run(root)
+        assert stats["failed"] == 0 and stats[OCR] == 1 and len(pages) == 7
+    print("✅ A corrupt page is counted as failed; the rest of the run completes")
+
+if __name__ == "__main__":
+    print("🚀 Starting Text Extraction Tests\n")
+    test_extract_and_resume()
+    test_packing_keeps_text_and_repacking_prunes_pages()
+    test_missing_ocr_engine_leaves_pages_pending()
+    test_corrupt_page_does_not_abort_the_run()
+    print("🎉 ALL TESTS PASSED!")
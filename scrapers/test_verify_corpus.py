@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test Corpus Verification
+"""
+
+import os
+import csv
+import sys
+import tempfile
+from pathlib import Path
+sys.path.append('.')
+
+from PIL import Image
+
+from download_manifest import DownloadManifest
+from verify_corpus import CorpusManifest, CorpusVerifier, format_ranges, pdf_page_count, write_repair_csv
+
+def save_page(path: Path, shade: int = 0):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", (40, 60), (shade, shade, shade)).save(path)
+
+def build_corpus(root: Path):
+    images, pdfs = root / "pages", root / "pdfs"
+    # Complete manual with a matching PDF
+    for n in (1, 2):
+        save_page(images / "audi-a4-2010-owners-manual" / f"page_{n:03d}.png", n)
+    pdfs.mkdir(parents=True)
+    pages = [Image.new("RGB", (40, 60)) for _ in range(2)]
+    pages[0].save(pdfs / "audi-a4-2010-owners-manual.pdf", "PDF", save_all=True, append_images=pages[1:])
+    # Broken manual: page 2 truncated, page 4 missing, page 5 half downloaded
+    broken = images / "audi-a6-2012-owners-manual"
+    for n in (1, 2, 3):
+        save_page(broken / f"page_{n:03d}.jpg", n)
+    data = (broken / "page_002.jpg").read_bytes()
+    (broken / "page_002.jpg").write_bytes(data[:len(data) // 2])
+    (broken / "page_005.part").write_bytes(b"\xff\xd8\xff")
+    # Folder no metadata row refers to
+    save_page(images / "audi-old-manual" / "page_001.png")
+    rows = [
+        {"slug": "/audi-a4-2010-owners-manual", "url": "u1", "pages_count": "2", "total_image_pages": "2"},
+        {"slug": "/audi-a6-2012-owners-manual", "url": "u2", "pages_count": "", "total_image_pages": "5"},
+        {"slug": "/audi-q7-2015-owners-manual", "url": "u3", "pages_count": "9", "total_image_pages": ""},
+    ]
+    return images, pdfs, rows
+
+def test_report_and_repair_csv():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        images, pdfs, rows = build_corpus(root)
+        manifest = CorpusManifest(str(root / "manifest.json"))
+        verifier = CorpusVerifier(str(images), str(pdfs), manifest)
+        verifier.update()
+        report = verifier.cross_check(rows)
+        manuals = report["manuals"]
+
+        assert manuals["audi-a4-2010-owners-manual"]["images"] == "complete"
+        assert manuals["audi-a4-2010-owners-manual"]["pdf"] == "complete"
+        assert not manuals["audi-a4-2010-owners-manual"]["needs_repair"]
+        broken = manuals["audi-a6-2012-owners-manual"]
+        assert broken["images"] == "corrupt" and broken["valid_pages"] == 2
+        assert broken["missing_pages"] == "4-5" and len(broken["corrupt"]) == 1
+        assert broken["partial_files"] == ["image/audi-a6-2012-owners-manual/page_005.part"]
+        assert manuals["audi-q7-2015-owners-manual"]["images"] == "missing"
+        assert report["orphans"] == ["image/audi-old-manual"]
+        assert report["summary"]["needs_repair"] == 2
+
+        repair_csv = root / "repair.csv"
+        assert write_repair_csv(report, rows, str(repair_csv)) == 2
+        with open(repair_csv, newline="", encoding="utf-8") as f:
+            repair = list(csv.DictReader(f))
+        assert [(r["url"], r["repair_images"], r["missing_pages"]) for r in repair] == \
+            [("u2", "corrupt", "4-5"), ("u3", "missing", "1-9")]
+
+        # Corrupt pages are deleted and forgotten by the download manifest
+        downloads = DownloadManifest(images / "audi-a6-2012-owners-manual")
+        downloads.record("page_002", "page_002.jpg", 1, "x")
+        assert verifier.delete_corrupt(report) == 1
+        assert not (images / "audi-a6-2012-owners-manual" / "page_002.jpg").exists()
+        assert not DownloadManifest(images / "audi-a6-2012-owners-manual").is_done("page_002")
+    print("✅ Missing, partial, corrupt and orphaned assets reported")
+
+def test_incremental_update():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        images, pdfs, rows = build_corpus(root)
+        manifest = CorpusManifest(str(root / "manifest.json"))
+        assert CorpusVerifier(str(images), str(pdfs), manifest).update()["hashed"] == 7
+        manifest.save()
+
+        manifest = CorpusManifest(str(root / "manifest.json"))
+        stats = CorpusVerifier(str(images), str(pdfs), manifest).update()
+        assert stats["hashed"] == 0 and stats["unchanged"] == 7
+
+        page = images / "audi-a4-2010-owners-manual" / "page_001.png"
+        save_page(page, 200)
+        os.utime(page, ns=(1, 1))
+        (pdfs / "audi-a4-2010-owners-manual.pdf").unlink()
+        stats = CorpusVerifier(str(images), str(pdfs), manifest).update()
+        assert stats["hashed"] == 1 and stats["removed"] == 1
+    print("✅ Unchanged files skipped by size and mtime")
+
+def test_parallel_hashing_matches_inline():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        images, pdfs, _ = build_corpus(root)
+        inline, pooled = CorpusManifest(str(root / "a.json")), CorpusManifest(str(root / "b.json"))
+        CorpusVerifier(str(images), str(pdfs), inline).update()
+        CorpusVerifier(str(images), str(pdfs), pooled, workers=2).update()
+        assert inline.files == pooled.files
+        assert pdf_page_count(pdfs / "audi-a4-2010-owners-manual.pdf") == (2, None)
+    assert format_ranges([1, 2, 3, 7, 9, 10]) == "1-3,7,9-10"
+    print("✅ Worker processes produce the same manifest")
+
+if __name__ == "__main__":
+    print("🚀 Starting Corpus Verification Tests\n")
+    test_report_and_repair_csv()
+    test_incremental_update()
+    test_parallel_hashing_matches_inline()
+    print("🎉 ALL TESTS PASSED!")
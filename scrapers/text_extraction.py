@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Parallel Text Extraction from Manual PDFs and Page Images
+Features:
+- Embedded PDF text (pymupdf) where a page has it, local OCR (tesseract
+  through pytesseract) where it does not; both optional
+- Sources: manual PDFs, downloaded page image folders and .mpak archives
+- Pages extracted in a process pool, results written as they arrive, one
+  row per page, so an interrupted run resumes where it stopped
+- Every page stored with the checksum of its source; re-runs skip pages
+  whose checksum is unchanged, and drop pages their source no longer has
+"""
+
+import io
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from download_manifest import DownloadManifest
+from manual_archive import ARCHIVE_SUFFIX, ManualArchive, folder_pages, pdf_pages
+from page_derivatives import source_checksum
+
+try:
+    import fitz  # pymupdf
+except ImportError:
+    fitz = None
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+logger = logging.getLogger(__name__)
+
+EMBEDDED = "embedded"
+OCR = "ocr"
+
+# Page sources a worker knows how to open
+PDF_PAGE = "pdf"
+IMAGE_FILE = "image"
+ARCHIVE_PAGE = "archive"
+PDF_IMAGE = "pdf_image"  # page image embedded in a PDF, when pymupdf is not installed
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS page_text (
+    manual TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    checksum TEXT NOT NULL,
+    method TEXT NOT NULL,
+    text TEXT NOT NULL,
+    extracted_at REAL NOT NULL,
+    PRIMARY KEY (manual, page)
+);
+"""
+
+@dataclass
+class PageTask:
+    """One page to extract: where it comes from and the checksum of that source"""
+    manual: str
+    page: int
+    checksum: str
+    kind: str
+    ref: str  # PDF, image or archive path
+
+@dataclass
+class ExtractSettings:
+    min_chars: int = 20  # Less embedded text than this and the page is OCRed
+    ocr_dpi: int = 300  # Rendering resolution for OCR of PDF pages
+    lang: str = "eng"
+
+def tesseract_ocr(image, lang: str) -> str:
+    return pytesseract.image_to_string(image, lang=lang)
+
+def ocr_available() -> bool:
+    if pytesseract is None:
+        return False
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+# Cached per process; keyed by mtime too, so a rewritten file is reopened
+@lru_cache(maxsize=8)
+def _open_pdf(path: str, mtime_ns: int):
+    return fitz.open(path)
+
+@lru_cache(maxsize=8)
+def _open_archive(path: str, mtime_ns: int) -> ManualArchive:
+    return ManualArchive(path)
+
+@lru_cache(maxsize=2)
+def _pdf_images(path: str, mtime_ns: int) -> Dict[int, bytes]:
+    return dict(pdf_pages(path))
+
+def extract_page(kind: str, ref, page: int, settings: ExtractSettings,
+                 ocr: Optional[Callable] = None) -> Tuple[Optional[str], str]:
+    """(method, text) for one page (runs in a worker process)
+
+    method is None when the page needs OCR but no OCR engine is available,
+    so the page is retried on a later run instead of being stored empty.
+    Worker processes keep recently used PDFs and archives open.
+    """
+    from PIL import Image
+
+    if kind == PDF_PAGE:
+        pdf_page = _open_pdf(ref, os.stat(ref).st_mtime_ns)[page - 1]
+        text = pdf_page.get_text()
+        if len(text.strip()) >= settings.min_chars:
+            return EMBEDDED, text
+        if ocr is None:
+            return None, ""
+        pixmap = pdf_page.get_pixmap(dpi=settings.ocr_dpi)
+        image = Image.open(io.BytesIO(pixmap.tobytes("png")))
+    else:
+        if ocr is None:
+            return None, ""
+        if kind == IMAGE_FILE:
+            image = Image.open(ref)
+        elif kind == ARCHIVE_PAGE:
+            image = Image.open(io.BytesIO(bytes(_open_archive(ref, os.stat(ref).st_mtime_ns).page(page))))
+        else:
+            image = Image.open(io.BytesIO(_pdf_images(ref, os.stat(ref).st_mtime_ns)[page]))
+    return OCR, ocr(image.convert("L"), settings.lang)
+
+def _extract_task(task: PageTask, settings: ExtractSettings, ocr: Optional[Callable]) -> Tuple[Optional[str], str]:
+    return extract_page(task.kind, task.ref, task.page, settings, ocr)
+
+# ---------------------------------------------------------------------------
+# Page sources
+
+def pdf_tasks(pdf: Path) -> Iterator[PageTask]:
+    """Pages of a manual PDF, checksummed by their content and image streams"""
+    manual = pdf.stem
+    if fitz is None:
+        # No pymupdf: no embedded text either, so OCR the page images the PDF carries
+        for number, data in pdf_pages(pdf):
+            yield PageTask(manual, number, hashlib.sha256(data).hexdigest(), PDF_IMAGE, str(pdf))
+        return
+    with fitz.open(pdf) as doc:
+        for number, page in enumerate(doc, 1):
+            digest = hashlib.sha256(page.read_contents())
+            for image in page.get_images(full=True):
+                digest.update(doc.xref_stream_raw(image[0]) or b"")
+            yield PageTask(manual, number, digest.hexdigest(), PDF_PAGE, str(pdf))
+
+def folder_tasks(folder: Path) -> Iterator[PageTask]:
+    """Pages of a downloaded page_NNN folder, checksummed like the download manifest"""
+    downloads = DownloadManifest(folder)
+    for number, path in folder_pages(folder):
+        yield PageTask(folder.name, number, source_checksum(path, downloads), IMAGE_FILE, str(path))
+
+def archive_tasks(path: Path) -> Iterator[PageTask]:
+    """Pages of a packed manual, checksummed by sha256 like the page folder it was packed from
+
+    The sha256s come from the archive metadata; older archives without them are hashed page by page.
+    """
+    with ManualArchive(path) as archive:
+        manual = archive.meta.get("slug") or path.stem
+        digests = archive.meta.get("sha256") or []
+        for number in range(1, len(archive) + 1):
+            if not archive.has_page(number):
+                continue
+            digest = digests[number - 1] if len(digests) == len(archive) else ""
+            yield PageTask(manual, number, digest or hashlib.sha256(archive.page(number)).hexdigest(),
+                           ARCHIVE_PAGE, str(path))
+
+# ---------------------------------------------------------------------------
+# Storage and the batch run
+
+class PageTextStore:
+    """Per-page text in SQLite, keyed by (manual, page)"""
+
+    def __init__(self, db_path: str = "scraped_data/page_text.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30.0, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def checksums(self, manual: str) -> Dict[int, str]:
+        return dict(self.conn.execute("SELECT page, checksum FROM page_text WHERE manual = ?", (manual,)))
+
+    def put(self, task: PageTask, method: str, text: str):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO page_text (manual, page, checksum, method, text, extracted_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)", (task.manual, task.page, task.checksum, method, text, time.time()))
+
+    def delete(self, manual: str, pages: Sequence[int]):
+        self.conn.executemany("DELETE FROM page_text WHERE manual = ? AND page = ?",
+                              [(manual, page) for page in pages])
+
+    def get(self, manual: str, page: int) -> Optional[str]:
+        row = self.conn.execute("SELECT text FROM page_text WHERE manual = ? AND page = ?",
+                                (manual, page)).fetchone()
+        return row[0] if row else None
+
+    def pages(self, manual: Optional[str] = None) -> Iterator[Tuple[str, int, str, str, str]]:
+        """(manual, page, checksum, method, text) rows, in page order"""
+        if manual is None:
+            return self.conn.execute("SELECT manual, page, checksum, method, text FROM page_text "
+                                     "ORDER BY manual, page")
+        return self.conn.execute("SELECT manual, page, checksum, method, text FROM page_text "
+                                 "WHERE manual = ? ORDER BY page", (manual,))
+
+    def close(self):
+        self.conn.close()
+
+class TextExtractor:
+    """Runs extraction for every page whose source checksum is not in the store yet"""
+
+    def __init__(self, store: PageTextStore, settings: Optional[ExtractSettings] = None,
+                 workers: int = 0, ocr: Optional[Callable] = None):
+        """
+        Args:
+            store: Where page text is kept
+            settings: Embedded-text threshold, OCR resolution and language
+            workers: Extraction processes (0 extracts inline)
+            ocr: OCR function (image, lang) -> text; defaults to tesseract when installed.
+                 Must be a module-level function when workers > 0.
+        """
+        self.store = store
+        self.settings = settings or ExtractSettings()
+        self.workers = max(0, workers)
+        self.ocr = ocr if ocr is not None else (tesseract_ocr if ocr_available() else None)
+        self.stats = {"pages": 0, "skipped": 0, EMBEDDED: 0, OCR: 0, "needs_ocr": 0, "failed": 0, "removed": 0}
+
+    def pending(self, tasks: Iterator[PageTask], present: Optional[Dict[str, Set[int]]] = None) -> List[PageTask]:
+        """Tasks whose page is new or whose source changed
+
+        The page numbers seen for each manual are added to `present`.
+        """
+        todo = []
+        known: Dict[str, Dict[int, str]] = {}
+        for task in tasks:
+            self.stats["pages"] += 1
+            if task.manual not in known:
+                known[task.manual] = self.store.checksums(task.manual)
+            if present is not None:
+                present.setdefault(task.manual, set()).add(task.page)
+            if known[task.manual].get(task.page) == task.checksum:
+                self.stats["skipped"] += 1
+            else:
+                todo.append(task)
+        return todo
+
+    def run(self, tasks: Iterator[PageTask]) -> Dict[str, int]:
+        """Extract every pending page; a page that fails is logged, counted and retried next run
+
+        tasks must list every page of each manual they include (as the *_tasks
+        sources do): stored pages of those manuals that are not listed are deleted.
+        """
+        present: Dict[str, Set[int]] = {}
+        todo = self.pending(tasks, present)
+        for manual, pages in present.items():
+            # Re-downloaded with fewer pages or repacked: the old page text is stale
+            stale = sorted(set(self.store.checksums(manual)) - pages)
+            if stale:
+                self.store.delete(manual, stale)
+                self.stats["removed"] += len(stale)
+        if self.ocr is None:
+            logger.warning("[TEXT] No OCR engine (pytesseract + tesseract) available; "
+                           "pages without embedded text are left for a later run")
+        if self.workers and len(todo) > 1:
+            # spawn: forking a process full of threads can copy held locks into the child
+            with ProcessPoolExecutor(max_workers=self.workers,
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = [pool.submit(_extract_task, task, self.settings, self.ocr) for task in todo]
+                for task, future in zip(todo, futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        self._failed(task, e)
+                        continue
+                    self._store(task, *result)
+        else:
+            for task in todo:
+                try:
+                    result = _extract_task(task, self.settings, self.ocr)
+                except Exception as e:
+                    self._failed(task, e)
+                    continue
+                self._store(task, *result)
+        logger.info(f"[TEXT] {self.stats['pages']} pages: {self.stats['skipped']} unchanged, "
+                    f"{self.stats[EMBEDDED]} embedded text, {self.stats[OCR]} OCR, "
+                    f"{self.stats['needs_ocr']} waiting for OCR, {self.stats['failed']} failed, "
+                    f"{self.stats['removed']} removed")
+        return self.stats
+
+    def _store(self, task: PageTask, method: Optional[str], text: str):
+        if method is None:
+            self.stats["needs_ocr"] += 1
+            return
+        self.store.put(task, method, text)  # committed per page, so a crash loses at most one
+        self.stats[method] += 1
+
+    def _failed(self, task: PageTask, error: Exception):
+        logger.error(f"[TEXT] {task.manual} page {task.page} failed: {type(error).__name__}: {error}")
+        self.stats["failed"] += 1
+
+def collect_tasks(pdf_dir: Optional[str] = None, images_dir: Optional[str] = None,
+                  archives_dir: Optional[str] = None, manuals: Sequence[str] = ()) -> Iterator[PageTask]:
+    """Page tasks for every manual in the given locations (or only the named manuals)
+
+    A manual found in several places is read from one source only, so its
+    checksums do not flip between runs: archives first, then page folders
+    (both hold the original page images), then PDFs.
+    """
+    wanted = set(manuals)
+    seen = set()
+    sources = []
+    if archives_dir and Path(archives_dir).exists():
+        sources += [(archive, archive_tasks) for archive in sorted(Path(archives_dir).glob(f"*{ARCHIVE_SUFFIX}"))]
+    if images_dir and Path(images_dir).exists():
+        sources += [(folder, folder_tasks) for folder in sorted(p for p in Path(images_dir).iterdir() if p.is_dir())]
+    if pdf_dir and Path(pdf_dir).exists():
+        sources += [(pdf, pdf_tasks) for pdf in sorted(Path(pdf_dir).glob("*.pdf"))]
+    for path, tasks in sources:
+        manual = None
+        for task in tasks(path):
+            if manual is None:
+                manual = task.manual
+                if (wanted and manual not in wanted) or manual in seen:
+                    break
+            yield task
+        if manual is not None:
+            seen.add(manual)
+
+def main():
+    import argparse
+
+    defaults = ExtractSettings()
+    parser = argparse.ArgumentParser(description="Extract per-page text from manuals")
+    parser.add_argument("--pdf-dir", default="data/manuals", help="Manual PDFs ('' to skip)")
+    parser.add_argument("--images-dir", default="", help="Per-manual page image folders")
+    parser.add_argument("--archives-dir", default="", help="Packed .mpak manuals")
+    parser.add_argument("--db", default="scraped_data/page_text.db", help="Page text database")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Extraction processes (0 = inline)")
+    parser.add_argument("--min-chars", type=int, default=defaults.min_chars,
+                        help="OCR PDF pages with less embedded text than this")
+    parser.add_argument("--lang", default=defaults.lang, help="Tesseract language(s), e.g. eng+deu")
+    parser.add_argument("manuals", nargs="*", help="Only these manuals (PDF stem / folder name)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    store = PageTextStore(args.db)
+    try:
+        extractor = TextExtractor(store, ExtractSettings(min_chars=args.min_chars, lang=args.lang),
+                                  workers=args.workers)
+        stats = extractor.run(collect_tasks(args.pdf_dir, args.images_dir, args.archives_dir, args.manuals))
+    finally:
+        store.close()
+    print(f"📝 {stats[EMBEDDED] + stats[OCR]} pages extracted ({stats[EMBEDDED]} embedded, {stats[OCR]} OCR), "
+          f"{stats['skipped']} unchanged, {stats['needs_ocr']} waiting for OCR, {stats['failed']} failed, "
+          f"{stats['removed']} removed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Corpus Verification and Integrity Manifest
+Features:
+- Checksum manifest for every page image and PDF, updated incrementally:
+  files whose size and mtime are unchanged are not re-read
+- New or changed files hashed and decode-checked in parallel worker processes
+- Page counts cross-checked against total_image_pages / pages_count in the
+  metadata CSVs, and hashes against the download manifests
+- Reports missing, partial, corrupt and orphaned assets, and writes a repair
+  CSV so a repair run only fetches manuals that are actually broken
+"""
+
+import os
+import re
+import csv
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from download_manifest import DownloadManifest, sha256_file, verify_image
+
+try:
+    import fitz  # pymupdf
+except ImportError:
+    fitz = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE = "image"
+PDF = "pdf"
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+PAGE_STEM = re.compile(r"^page_(\d+)$")
+_PDF_PAGE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+
+def safe_slug(slug: str) -> str:
+    """Folder / PDF name the downloaders use for a manual slug"""
+    return slug.strip("/").replace("/", "_").replace(":", "_")
+
+def pdf_page_count(path: Path) -> Tuple[Optional[int], Optional[str]]:
+    """(page count, problem) of a PDF; pymupdf when installed, a structure scan otherwise"""
+    if fitz is not None:
+        try:
+            with fitz.open(path) as doc:
+                return doc.page_count, None
+        except Exception as e:
+            return None, f"unreadable PDF: {e}"
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(b"%PDF-"):
+        return None, "not a PDF"
+    if b"%%EOF" not in data[-1024:]:
+        return None, "truncated (no %%EOF)"
+    return len(_PDF_PAGE.findall(data)), None
+
+def check_file(path: str, kind: str) -> Dict:
+    """Hash and integrity-check one file (runs in a worker process)"""
+    file_path = Path(path)
+    record = {"sha256": sha256_file(file_path), "error": None, "pages": None}
+    if kind == PDF:
+        record["pages"], record["error"] = pdf_page_count(file_path)
+    else:
+        record["error"] = verify_image(file_path)
+    return record
+
+def format_ranges(numbers: Sequence[int]) -> str:
+    """[1, 2, 3, 7, 9, 10] -> "1-3,7,9-10" """
+    ranges = []
+    for number in sorted(numbers):
+        if ranges and number == ranges[-1][1] + 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+class CorpusManifest:
+    """sha256, size, mtime and check result of every corpus file, persisted between runs"""
+
+    def __init__(self, manifest_file: str = "scraped_data/corpus_manifest.json"):
+        self.manifest_file = Path(manifest_file)
+        self.files: Dict[str, Dict] = {}
+        self.load()
+
+    def load(self):
+        if self.manifest_file.exists():
+            try:
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    self.files = json.load(f).get('files', {})
+                logger.info(f"[VERIFY] Loaded manifest with {len(self.files)} files")
+            except Exception as e:
+                logger.warning(f"[VERIFY] Could not load corpus manifest: {e}")
+                self.files = {}
+
+    def save(self):
+        """Write the manifest atomically"""
+        self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_file.with_name(self.manifest_file.name + ".tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'files': self.files, 'last_updated': datetime.now().isoformat()}, f)
+            os.replace(tmp_path, self.manifest_file)
+        except Exception as e:
+            logger.error(f"[VERIFY] Could not save corpus manifest: {e}")
+
+class CorpusVerifier:
+    """Brings the manifest up to date with the files on disk and checks them against the metadata"""
+
+    def __init__(self, images_dir: Optional[str], pdf_dir: Optional[str],
+                 manifest: CorpusManifest, workers: int = 0):
+        """
+        Args:
+            images_dir: Folder of per-manual page image folders (None to skip images)
+            pdf_dir: Folder of per-manual PDFs (None to skip PDFs)
+            manifest: Checksum manifest, updated in place
+            workers: Hashing processes (0 hashes inline)
+        """
+        self.roots = {IMAGE: Path(images_dir) if images_dir else None,
+                      PDF: Path(pdf_dir) if pdf_dir else None}
+        self.manifest = manifest
+        self.workers = max(0, workers)
+        self.partial_files: List[str] = []
+        self.stats = {"files": 0, "hashed": 0, "unchanged": 0, "removed": 0}
+
+    def _scan(self) -> Iterator[Tuple[str, str, Path, os.stat_result]]:
+        """(manifest key, kind, path, stat) of every image and PDF on disk"""
+        for kind, root in self.roots.items():
+            if root is None or not root.exists():
+                continue
+            if kind == PDF:
+                paths = root.glob("*.pdf")
+            else:
+                paths = (p for folder in root.iterdir() if folder.is_dir() for p in folder.iterdir())
+            for path in paths:
+                if path.suffix == ".part":
+                    self.partial_files.append(f"{kind}/{path.relative_to(root).as_posix()}")
+                    continue
+                if kind == IMAGE and path.suffix.lower() not in IMAGE_SUFFIXES:
+                    continue
+                yield f"{kind}/{path.relative_to(root).as_posix()}", kind, path, path.stat()
+
+    def update(self) -> Dict[str, int]:
+        """Hash new and changed files in parallel; drop entries for deleted files"""
+        seen = set()
+        todo = []
+        for key, kind, path, stat in self._scan():
+            seen.add(key)
+            known = self.manifest.files.get(key)
+            if known and known["bytes"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+                self.stats["unchanged"] += 1
+            else:
+                todo.append((key, kind, path, stat))
+        self.stats["files"] = len(seen)
+
+        paths = [str(path) for _, _, path, _ in todo]
+        kinds = [kind for _, kind, _, _ in todo]
+        if self.workers and len(todo) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers,
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                results = pool.map(check_file, paths, kinds, chunksize=16)
+                self._record(todo, results)
+        else:
+            self._record(todo, map(check_file, paths, kinds))
+
+        for key in set(self.manifest.files) - seen:
+            del self.manifest.files[key]
+            self.stats["removed"] += 1
+        logger.info(f"[VERIFY] {self.stats['files']} files: {self.stats['hashed']} hashed, "
+                    f"{self.stats['unchanged']} unchanged, {self.stats['removed']} removed")
+        return self.stats
+
+    def _record(self, todo, results):
+        for (key, kind, path, stat), result in zip(todo, results):
+            self.manifest.files[key] = dict(result, kind=kind, bytes=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            self.stats["hashed"] += 1
+            if self.stats["hashed"] % 1000 == 0:
+                logger.info(f"[VERIFY] Hashed {self.stats['hashed']}/{len(todo)} files")
+
+    def cross_check(self, rows: List[Dict[str, str]]) -> Dict:
+        """Compare the manifest with the manuals in the metadata rows"""
+        images: Dict[str, Dict[int, Tuple[str, Dict]]] = {}
+        pdfs: Dict[str, Dict] = {}
+        partial: Dict[str, List[str]] = {}
+        orphans: List[str] = []
+        for key, entry in self.manifest.files.items():
+            kind, rel = key.split("/", 1)
+            if kind == PDF:
+                pdfs[rel[:-len(".pdf")]] = entry
+                continue
+            folder, name = rel.split("/", 1)
+            match = PAGE_STEM.match(Path(name).stem)
+            if match:
+                images.setdefault(folder, {})[int(match.group(1))] = (name, entry)
+            else:
+                orphans.append(key)
+        for key in self.partial_files:
+            kind, rel = key.split("/", 1)
+            partial.setdefault(rel.split("/", 1)[0], []).append(key)
+
+        manuals = {}
+        known = set()
+        for row in rows:
+            slug = safe_slug(row.get("slug") or "")
+            if not slug or slug in known:
+                continue
+            known.add(slug)
+            result = self._check_manual(row, slug, images.get(slug, {}), pdfs.get(slug), partial.get(slug, []))
+            manuals[slug] = result
+            orphans.extend(result.pop("extra"))
+
+        orphans.extend(f"{IMAGE}/{folder}" for folder in images if folder not in known)
+        orphans.extend(f"{PDF}/{name}.pdf" for name in pdfs if name not in known)
+        orphans.extend(key for folder, keys in partial.items() if folder not in known for key in keys)
+
+        summary = {"manuals": len(manuals), "orphans": len(orphans)}
+        for result in manuals.values():
+            summary[result["images"]] = summary.get(result["images"], 0) + 1
+        summary["needs_repair"] = sum(1 for result in manuals.values() if result["needs_repair"])
+        return {"summary": summary, "manuals": manuals, "orphans": sorted(orphans)}
+
+    def _check_manual(self, row: Dict[str, str], slug: str, pages: Dict[int, Tuple[str, Dict]],
+                      pdf: Optional[Dict], partial_files: List[str]) -> Dict:
+        expected = int(row.get("total_image_pages") or 0) or int(row.get("pages_count") or 0)
+        downloads = DownloadManifest(self.roots[IMAGE] / slug) if self.roots[IMAGE] and pages else None
+        corrupt = {}
+        for number, (name, entry) in pages.items():
+            problem = entry["error"]
+            recorded = downloads.get(Path(name).stem) if downloads else None
+            if problem is None and recorded and recorded["file"] == name and recorded["sha256"] != entry["sha256"]:
+                problem = "checksum differs from download manifest"
+            if problem:
+                corrupt[number] = f"{name}: {problem}"
+        valid = [n for n in pages if n not in corrupt and (not expected or n <= expected)]
+        missing = [n for n in range(1, expected + 1) if n not in pages]
+        extra = [f"{IMAGE}/{slug}/{pages[n][0]}" for n in sorted(pages) if expected and n > expected]
+
+        if not pages and not partial_files:
+            images_status = "missing"
+        elif corrupt:
+            images_status = "corrupt"
+        elif not expected:
+            images_status = "unverified"  # no page count in the metadata to check against
+        elif missing or partial_files:
+            images_status = "partial"
+        else:
+            images_status = "complete"
+
+        pdf_status = None
+        if self.roots[PDF] is not None:
+            if pdf is None:
+                pdf_status = "missing"
+            elif pdf["error"]:
+                pdf_status = "corrupt"
+            elif expected and pdf["pages"] != expected:
+                pdf_status = "mismatch"
+            else:
+                pdf_status = "complete"
+
+        return {
+            "url": row.get("url", ""),
+            "expected_pages": expected,
+            "valid_pages": len(valid),
+            "images": images_status,
+            "missing_pages": format_ranges(missing),
+            "corrupt": [corrupt[n] for n in sorted(corrupt)],
+            "partial_files": partial_files,
+            "pdf": pdf_status,
+            "pdf_pages": pdf["pages"] if pdf else None,
+            "needs_repair": (images_status not in ("complete", "unverified") and pdf_status != "complete") or
+                            pdf_status in ("corrupt", "mismatch"),
+            "extra": extra,
+        }
+
+    def delete_corrupt(self, report: Dict) -> int:
+        """Delete corrupt page images and un-record them, so the next download run fetches them again"""
+        deleted = 0
+        for slug, result in report["manuals"].items():
+            if not result["corrupt"]:
+                continue
+            downloads = DownloadManifest(self.roots[IMAGE] / slug)
+            for item in result["corrupt"]:
+                name = item.split(":", 1)[0]
+                path = self.roots[IMAGE] / slug / name
+                if path.exists():
+                    path.unlink()
+                downloads.discard(Path(name).stem)
+                self.manifest.files.pop(f"{IMAGE}/{slug}/{name}", None)
+                deleted += 1
+        logger.info(f"[VERIFY] Deleted {deleted} corrupt page images")
+        return deleted
+
+def load_metadata(csv_paths: Sequence[str]) -> List[Dict[str, str]]:
+    rows = []
+    for csv_path in csv_paths:
+        with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+            rows.extend(csv.DictReader(f))
+    return rows
+
+def write_repair_csv(report: Dict, rows: List[Dict[str, str]], output: str) -> int:
+    """Metadata rows of manuals that need repair, with what is wrong with them"""
+    broken = {slug for slug, result in report["manuals"].items() if result["needs_repair"]}
+    fieldnames = list(rows[0].keys()) if rows else []
+    fieldnames += [name for name in ("repair_images", "repair_pdf", "missing_pages") if name not in fieldnames]
+    written = set()
+    with open(output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            slug = safe_slug(row.get("slug") or "")
+            if slug not in broken or slug in written:
+                continue
+            written.add(slug)
+            result = report["manuals"][slug]
+            writer.writerow(dict(row, repair_images=result["images"], repair_pdf=result["pdf"] or "",
+                                 missing_pages=result["missing_pages"]))
+    return len(written)
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Verify downloaded page images and PDFs")
+    parser.add_argument("--csv", nargs="+", default=["scraped_data/manuals_audi.csv"],
+                        help="Metadata CSVs with slug, total_image_pages and pages_count")
+    parser.add_argument("--images-dir", default="scraped_data/audi_pages", help="Per-manual page image folders")
+    parser.add_argument("--pdf-dir", default="data/manuals", help="Per-manual PDFs ('' to skip)")
+    parser.add_argument("--manifest", default="scraped_data/corpus_manifest.json", help="Checksum manifest file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Hashing processes (0 = inline)")
+    parser.add_argument("--report", help="Write the full JSON report here")
+    parser.add_argument("--repair-csv", help="Write metadata rows of broken manuals here")
+    parser.add_argument("--delete-corrupt", action="store_true",
+                        help="Delete corrupt page images so the next download run re-fetches them")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    manifest = CorpusManifest(args.manifest)
+    verifier = CorpusVerifier(args.images_dir or None, args.pdf_dir or None, manifest, workers=args.workers)
+    verifier.update()
+    rows = load_metadata(args.csv)
+    report = verifier.cross_check(rows)
+    if args.delete_corrupt:
+        verifier.delete_corrupt(report)
+    manifest.save()
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.repair_csv:
+        count = write_repair_csv(report, rows, args.repair_csv)
+        print(f"🔧 {count} manuals written to {args.repair_csv}")
+
+    summary = report["summary"]
+    print(f"📊 {summary['manuals']} manuals: " +
+          ", ".join(f"{summary.get(status, 0)} {status}" for status in ("complete", "partial", "corrupt", "missing")))
+    print(f"🧹 {summary['orphans']} orphaned assets, 🔧 {summary['needs_repair']} manuals need repair")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+-- Manual Catalog Migration
+-- Created: 2025-06-22
+-- Adds the scraped manual catalog (loaded by scrapers/pg_loader.py)
+
+-- =====================================================
+-- MANUAL CATALOG TABLES
+-- =====================================================
+
+-- One row per manual; url is the natural key the loader upserts on
+CREATE TABLE IF NOT EXISTS manuals (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    url TEXT NOT NULL UNIQUE,
+    slug TEXT NOT NULL,
+    brand TEXT NOT NULL,
+    model TEXT NOT NULL,
+    year INTEGER,
+    title TEXT NOT NULL,
+    manual_type TEXT NOT NULL DEFAULT '',
+    pages_count INTEGER,
+    file_size TEXT,
+    total_image_pages INTEGER NOT NULL DEFAULT 0,
+    content_hash TEXT NOT NULL, -- md5 of the loaded fields; unchanged rows are not rewritten
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Page image URLs of each manual
+CREATE TABLE IF NOT EXISTS manual_pages (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    manual_id UUID NOT NULL REFERENCES manuals(id) ON DELETE CASCADE,
+    page_number INTEGER NOT NULL,
+    image_url TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE(manual_id, page_number)
+);
+
+-- =====================================================
+-- INDEXES
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_manuals_vehicle ON manuals (lower(brand), lower(model), year);
+CREATE INDEX IF NOT EXISTS idx_manuals_type ON manuals (manual_type);
+CREATE INDEX IF NOT EXISTS idx_manuals_slug ON manuals (slug);
+
+-- =====================================================
+-- ROW LEVEL SECURITY
+-- =====================================================
+
+-- The catalog is public reference data; only the service role (which bypasses RLS) writes it
+ALTER TABLE manuals ENABLE ROW LEVEL SECURITY;
+ALTER TABLE manual_pages ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can view manuals"
+  ON manuals
+  FOR SELECT
+  TO anon, authenticated
+  USING (true);
+
+CREATE POLICY "Anyone can view manual pages"
+  ON manual_pages
+  FOR SELECT
+  TO anon, authenticated
+  USING (true);
+
+-- =====================================================
+-- TRIGGERS
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION update_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS update_manuals_updated_at ON manuals;
+CREATE TRIGGER update_manuals_updated_at BEFORE UPDATE ON manuals
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();